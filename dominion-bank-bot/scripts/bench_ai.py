@@ -0,0 +1,246 @@
+"""
+AI load benchmark.
+Drives AIService or the AI command handlers at a fixed concurrency against a
+fake (or real) chat-completions endpoint and reports throughput and tail
+latency.
+
+Usage:
+    python scripts/bench_ai.py --mode generate --requests 200 --concurrency 20
+    python scripts/bench_ai.py --mode stream --latency exp:300 --rate-limit-rate 0.05
+    python scripts/bench_ai.py --mode handlers --handlers ruleta,escena,tarea
+    python scripts/bench_ai.py --base-url http://127.0.0.1:8088 --json
+
+Without --base-url an in-process fake server is started with the given
+latency / error / 429 options (see scripts/fake_llm_server.py).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.fake_llm_server import build_parser, server_from_args  # noqa: E402
+
+PROMPT_TYPES = ["task", "challenge", "punishment", "reward", "scene", "prediction", "truth", "dare"]
+
+# Command handlers and the arguments they are called with
+HANDLERS = {
+    "ruleta": ("src.handlers.games", "ruleta_command", []),
+    "dado": ("src.handlers.games", "dado_perverso_command", []),
+    "verdad_reto": ("src.handlers.games", "verdad_reto_command", []),
+    "prediccion": ("src.handlers.games", "prediccion_command", []),
+    "fantasia": ("src.handlers.games", "fantasia_command", []),
+    "tarea": ("src.handlers.ai_tasks", "tarea_command", ["@sumisa"]),
+    "reto": ("src.handlers.ai_tasks", "reto_command", ["@rival"]),
+    "castigo": ("src.handlers.ai_tasks", "castigo_creativo_command", ["@sumisa", "por", "tardar"]),
+    "recompensa": ("src.handlers.ai_tasks", "recompensa_command", ["@sumisa"]),
+    "protocolo": ("src.handlers.ai_tasks", "protocolo_command", ["@sumisa"]),
+    "escena": ("src.handlers.roleplay", "escena_command", ["mazmorra"]),
+    "ritual": ("src.handlers.roleplay", "ritual_command", ["@sumisa"]),
+    "titulo": ("src.handlers.roleplay", "titulo_command", ["dom"]),
+    "descripcion": ("src.handlers.roleplay", "descripcion_ai_command", ["sub"]),
+    "compatibilidad": ("src.handlers.roleplay", "compatibilidad_command", ["@otra", "dom", "sub"]),
+}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AI load benchmark")
+    parser.add_argument("--mode", choices=["generate", "stream", "handlers"], default="generate")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight (default: 20)")
+    parser.add_argument("--users", type=int, default=10, help="Distinct simulated users (default: 10)")
+    parser.add_argument("--prompt-types", default=",".join(PROMPT_TYPES),
+                        help="Prompt types for generate/stream modes")
+    parser.add_argument("--handlers", default=",".join(HANDLERS),
+                        help="Handlers for handlers mode")
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                        help="Override AI_MAX_CONCURRENT for the scheduler")
+    parser.add_argument("--base-url", default=None,
+                        help="Use an already running endpoint instead of the in-process fake")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    build_parser(parser)
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Settings are read at import time, so set them before importing src."""
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+    os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    # Simulated users would otherwise run into the daily quota
+    os.environ.setdefault("AI_DAILY_TOKEN_QUOTA", "0")
+    os.environ.setdefault("AI_MAX_PENDING", str(max(args.requests, 50)))
+    os.environ.setdefault("AI_MAX_PENDING_PER_USER", str(args.requests))
+    if args.max_concurrent:
+        os.environ["AI_MAX_CONCURRENT"] = str(args.max_concurrent)
+
+
+def make_update(user_id: int, private: bool):
+    """Build a stand-in Telegram update whose replies can be edited."""
+    from unittest.mock import AsyncMock, MagicMock
+
+    update = MagicMock()
+    update.effective_user.id = user_id
+    update.effective_user.username = f"bench{user_id}"
+    update.effective_user.first_name = f"Bench{user_id}"
+    update.effective_user.last_name = None
+    update.effective_chat.id = user_id if private else -1000
+    update.effective_chat.type = "private" if private else "supergroup"
+
+    reply = MagicMock()
+    reply.edit_text = AsyncMock()
+    update.message.reply_text = AsyncMock(return_value=reply)
+    return update
+
+
+def make_context(args: list):
+    from unittest.mock import AsyncMock, MagicMock
+
+    context = MagicMock()
+    context.args = list(args)
+    context.bot.send_message = AsyncMock()
+    return context
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    import importlib
+
+    from src.database.connection import close_database, get_session, init_database
+    from src.database.repositories import UserRepository
+    from src.services.ai_metrics import get_ai_metrics
+    from src.services.ai_scheduler import (
+        AIRequester, reset_current_requester, set_current_requester,
+    )
+    from src.services.ai_service import AIService
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = server_from_args(args)
+        await server.start()
+        base_url = server.url
+
+    await init_database()
+    user_ids = [900000 + i for i in range(args.users)]
+    async with get_session() as session:
+        user_repo = UserRepository(session)
+        for user_id in user_ids:
+            await user_repo.get_or_create(user_id, username=f"bench{user_id}", first_name=f"Bench{user_id}")
+
+    from src.services import ai_service as ai_service_module
+    ai_service_module._ai_service = AIService(api_key=os.environ["GROQ_API_KEY"], base_url=base_url)
+    service = ai_service_module._ai_service
+
+    prompt_types = [p for p in args.prompt_types.split(",") if p]
+    handlers = []
+    for name in [h for h in args.handlers.split(",") if h]:
+        module, func, call_args = HANDLERS[name]
+        handlers.append((name, getattr(importlib.import_module(module), func), call_args))
+
+    latencies: list[float] = []
+    failures = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        user_id = random.choice(user_ids)
+        private = i % 3 == 0
+        started = time.perf_counter()
+        try:
+            if args.mode == "handlers":
+                _, handler, call_args = handlers[i % len(handlers)]
+                await handler(make_update(user_id, private), make_context(call_args))
+            else:
+                token = set_current_requester(AIRequester(user_id, private=private))
+                try:
+                    prompt_type = prompt_types[i % len(prompt_types)]
+                    if args.mode == "stream":
+                        async for _ in service.generate_stream(prompt_type, "bench"):
+                            pass
+                    else:
+                        await service.generate(prompt_type, "bench")
+                finally:
+                    reset_current_requester(token)
+        except Exception as e:
+            failures += 1
+            print(f"request {i} failed: {e!r}", file=sys.stderr)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    async def worker() -> None:
+        while not queue.empty():
+            await one(queue.get_nowait())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    snapshot = get_ai_metrics().snapshot()
+    report = {
+        "mode": args.mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "max": round(max(latencies, default=0), 1),
+        },
+        "failures": failures,
+        "ai": snapshot["totals"],
+        "scheduler": snapshot["scheduler"],
+    }
+    await service.client.close()
+    if server:
+        report["server"] = vars(server.stats)
+        await server.stop()
+    await close_database()
+    return report
+
+
+def print_report(report: dict) -> None:
+    latency = report["latency_ms"]
+    ai = report["ai"]
+    print(f"mode={report['mode']} requests={report['requests']} concurrency={report['concurrency']}")
+    print(f"elapsed      {report['elapsed_s']:.2f}s")
+    print(f"throughput   {report['throughput_rps']} req/s")
+    print(f"latency ms   p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} max={latency['max']}")
+    print(f"ai           errors={ai['errors']} fallbacks={ai['fallbacks']} "
+          f"tokens={ai['prompt_tokens']}+{ai['completion_tokens']}")
+    print(f"scheduler    {report['scheduler']}")
+    if "server" in report:
+        print(f"fake server  {report['server']}")
+    if report["failures"]:
+        print(f"FAILURES     {report['failures']}")
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+    configure_environment(args)
+    report = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Fake LLM server for offline AI benchmarks.
+Serves an OpenAI/Groq-compatible chat-completions endpoint with configurable
+latency, token streaming, error rates and 429 rate limiting.
+
+Usage:
+    python scripts/fake_llm_server.py --port 8088 --latency lognormal:400,0.6
+    GROQ_BASE_URL=http://127.0.0.1:8088 GROQ_API_KEY=fake python run.py
+
+Latency specs (milliseconds, time until the first token):
+    fixed:300           always 300ms
+    uniform:100,900     uniform between 100 and 900ms
+    lognormal:400,0.6   median 400ms, sigma 0.6 (long right tail)
+    exp:300             exponential with mean 300ms
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+WORDS = [
+    "⛓️", "las", "cadenas", "resuenan", "en", "la", "penumbra", "mientras", "la",
+    "vela", "parpadea", "y", "el", "silencio", "del", "calabozo", "espera", "una",
+    "orden", "🔥", "obediencia", "devoción", "castigo", "recompensa", "ritual", "collar",
+    "destino", "🕯️", "sombras", "susurros",
+]
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Build a sampler returning milliseconds from a latency spec."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        low, high = values
+        return lambda: random.uniform(low, high)
+    if kind == "lognormal":
+        median, sigma = values
+        mu = math.log(median)
+        return lambda: random.lognormvariate(mu, sigma)
+    if kind == "exp":
+        mean = values[0]
+        return lambda: random.expovariate(1 / mean)
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+@dataclass
+class FakeLLMStats:
+    """Counters of what the fake server has answered."""
+    requests: int = 0
+    streamed: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    completion_tokens: int = 0
+    by_model: dict[str, int] = field(default_factory=dict)
+
+
+class FakeLLMServer:
+    """
+    Minimal HTTP/1.1 server implementing POST */chat/completions.
+
+    Usage:
+        server = FakeLLMServer(latency="fixed:50")
+        await server.start()
+        service = AIService(api_key="fake", base_url=server.url)
+        ...
+        await server.stop()
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "lognormal:400,0.6",
+        token_ms: float = 15.0,
+        tokens: int = 60,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+    ):
+        self.host = host
+        self.port = port
+        self.sample_latency = parse_latency(latency)
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stats = FakeLLMStats()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set[asyncio.StreamWriter] = set()
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass to the Groq client."""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        # Idle keep-alive connections would otherwise block wait_closed()
+        for writer in list(self._connections):
+            writer.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        print(f"Fake LLM listening on {self.url}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    # -------------------------------------------------------------------------
+    # HTTP plumbing
+    # -------------------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, _, value = line.partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+                    await self._send_json(writer, 404, {"error": {"message": "not found"}})
+                else:
+                    await self._completion(writer, json.loads(body or b"{}"))
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _send_json(
+        self, writer: asyncio.StreamWriter, status: int, payload: dict, extra: str = ""
+    ) -> None:
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n{extra}\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def _send_chunk(self, writer: asyncio.StreamWriter, payload: str) -> None:
+        data = f"data: {payload}\n\n".encode()
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        await writer.drain()
+
+    # -------------------------------------------------------------------------
+    # Chat completions
+    # -------------------------------------------------------------------------
+
+    async def _completion(self, writer: asyncio.StreamWriter, request: dict) -> None:
+        self.stats.requests += 1
+        model = request.get("model", "fake")
+        self.stats.by_model[model] = self.stats.by_model.get(model, 0) + 1
+
+        if random.random() < self.rate_limit_rate:
+            self.stats.rate_limited += 1
+            await self._send_json(
+                writer,
+                429,
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                extra=f"retry-after: {self.retry_after}\r\n",
+            )
+            return
+
+        await asyncio.sleep(self.sample_latency() / 1000)
+
+        if random.random() < self.error_rate:
+            self.stats.errors += 1
+            await self._send_json(
+                writer, 500, {"error": {"message": "Fake upstream error", "type": "server_error"}}
+            )
+            return
+
+        n_tokens = min(self.tokens, request.get("max_tokens") or self.tokens)
+        words = [random.choice(WORDS) for _ in range(n_tokens)]
+        prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+        usage = {
+            "prompt_tokens": prompt_chars // 4 + 1,
+            "completion_tokens": n_tokens,
+            "total_tokens": prompt_chars // 4 + 1 + n_tokens,
+        }
+        self.stats.completion_tokens += n_tokens
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not request.get("stream"):
+            await asyncio.sleep(self.token_ms * n_tokens / 1000)
+            await self._send_json(writer, 200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "length" if n_tokens >= self.tokens else "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        self.stats.streamed += 1
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+
+        def chunk(delta: dict, finish: Optional[str] = None, **extra) -> str:
+            return json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                **extra,
+            })
+
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000)
+            content = word if i == 0 else f" {word}"
+            await self._send_chunk(writer, chunk({"role": "assistant", "content": content}))
+
+        await self._send_chunk(
+            writer, chunk({}, finish="stop", x_groq={"id": completion_id, "usage": usage})
+        )
+        await self._send_chunk(writer, "[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def build_parser(parser: Optional[argparse.ArgumentParser] = None) -> argparse.ArgumentParser:
+    """Add the fake server options to a parser (shared with the benchmark)."""
+    parser = parser or argparse.ArgumentParser(description="Fake chat-completions server")
+    parser.add_argument("--latency", default="lognormal:400,0.6",
+                        help="Time-to-first-token distribution (default: lognormal:400,0.6)")
+    parser.add_argument("--token-ms", type=float, default=15.0,
+                        help="Delay between streamed tokens in ms (default: 15)")
+    parser.add_argument("--tokens", type=int, default=60,
+                        help="Completion length in tokens, capped by max_tokens (default: 60)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="retry-after seconds sent with 429s (default: 1)")
+    return parser
+
+
+def server_from_args(args: argparse.Namespace, port: int = 0) -> FakeLLMServer:
+    """Create a FakeLLMServer from parsed build_parser() options."""
+    return FakeLLMServer(
+        port=port,
+        latency=args.latency,
+        token_ms=args.token_ms,
+        tokens=args.tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+    )
+
+
+def main():
+    """Main entry point."""
+    parser = build_parser()
+    parser.add_argument("--port", type=int, default=8088)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(server_from_args(args, port=args.port).serve_forever())
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,138 +5,37 @@ import html
 import logging
 import traceback
 
-from telegram import BotCommand, Update
+from telegram import BotCommandScopeChat, Update
 from telegram.constants import ParseMode
 from telegram.ext import (
     Application,
     ChatMemberHandler,
-    CommandHandler,
     ContextTypes,
     MessageHandler,
     filters,
 )
 
+from src.bot.commands import CommandRouter, get_command_table
+from src.bot.update_processor import PerUserUpdateProcessor
 from src.config import settings
+from src.database.collar_graph import get_collar_graph
 from src.database.connection import close_database, init_database
+from src.database.ephemeral_store import get_ephemeral_state
+from src.services.ai_fallbacks import get_fallback_corpus
 from src.services.cache import close_cache, init_cache
-from src.handlers.core import (
-    dar_command,
-    help_command,
-    start_command,
-    ver_command,
-)
-from src.handlers.admin import (
-    consultar_command,
-    dar_admin_command,
-    quitar_command,
-    remove_admin_command,
-    set_admin_command,
-)
-from src.handlers.info import (
-    historial_command,
-    ranking_command,
-    stats_command,
-)
+from src.services.economy_batch import get_economy_batch
+from src.services.expiry_sweeper import get_expiry_sweeper
+from src.services.notifications import get_notification_service
+from src.services.timed_events import get_timed_events
 from src.handlers.group import (
     on_bot_added_to_group,
     on_chat_member_update,
-    syncadmins_command,
-)
-from src.handlers.profiles import (
-    configuracion_command,
-    editarperfil_command,
-    perfil_command,
-)
-from src.handlers.excel_import import (
-    exportar_command,
-    handle_excel_document,
-    importar_command,
-)
-from src.handlers.profile_import import (
-    exportar_perfiles_command,
-    handle_profile_excel_document,
-    importar_perfiles_command,
-    plantilla_perfiles_command,
-)
-from src.handlers.testing import (
-    cleandb_command,
-    run_tests_command,
-    test_db_command,
-)
-from src.handlers.health import (
-    health_command,
-    ping_command,
 )
+from src.handlers.excel_import import handle_excel_document
+from src.handlers.profile_import import handle_profile_excel_document
 from src.handlers.conversations import get_profile_edit_conversation
-from src.handlers.help_interactive import (
-    get_help_callback_handler,
-    interactive_help_command,
-)
-from src.handlers.bdsm import (
-    # Collars
-    aceptar_collar_command,
-    amo_command,
-    collar_command,
-    exhibir_command,
-    liberar_command,
-    rechazar_collar_command,
-    suplicar_libertad_command,
-    # Punishments
-    azotar_command,
-    castigar_command,
-    castigos_dados_command,
-    mis_castigos_command,
-    # Dungeon
-    calabozo_command,
-    liberar_calabozo_command,
-    mi_calabozo_command,
-    presos_command,
-    suplicar_libertad_calabozo_command,
-    # Auctions
-    cancelar_subasta_command,
-    mis_subastas_command,
-    pujar_command,
-    subasta_command,
-    subastas_command,
-    ver_subasta_command,
-    # Contracts
-    contrato_command,
-    firmar_contrato_command,
-    mis_contratos_command,
-    rechazar_contrato_command,
-    romper_contrato_command,
-    ver_contrato_command,
-    # Tribute
-    adorar_command,
-    altar_command,
-    devotos_command,
-    mi_altar_command,
-    tributo_command,
-)
-# AI-powered game commands
-from src.handlers.games import (
-    dado_perverso_command,
-    fantasia_command,
-    prediccion_command,
-    ruleta_command,
-    verdad_reto_command,
-)
-# AI-powered task commands
-from src.handlers.ai_tasks import (
-    castigo_creativo_command,
-    protocolo_command,
-    recompensa_command,
-    reto_command,
-    tarea_command,
-)
-# AI-powered roleplay commands
-from src.handlers.roleplay import (
-    compatibilidad_command,
-    descripcion_ai_command,
-    escena_command,
-    ritual_command,
-    titulo_command,
-)
+from src.handlers.help_interactive import get_help_callback_handler
+from src.utils.deadline import IMPORT_BUDGET, with_deadline
 
 logger = logging.getLogger(__name__)
 
@@ -144,157 +43,30 @@ logger = logging.getLogger(__name__)
 def setup_handlers(application: Application) -> None:
     """Register all command handlers."""
 
-    # Core commands
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("ver", ver_command))
-    application.add_handler(CommandHandler("saldo", ver_command))  # Alias
-    application.add_handler(CommandHandler("dar", dar_command))
-    application.add_handler(CommandHandler("enviar", dar_command))  # Alias
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("ayuda", interactive_help_command))  # Interactive version
-    application.add_handler(get_help_callback_handler())  # Help menu navigation
-
-    # Info commands
-    application.add_handler(CommandHandler("ranking", ranking_command))
-    application.add_handler(CommandHandler("top", ranking_command))  # Alias
-    application.add_handler(CommandHandler("historial", historial_command))
-    application.add_handler(CommandHandler("historia", historial_command))  # Alias
-    application.add_handler(CommandHandler("stats", stats_command))
+    # All commands and aliases, dispatched by name from the command table
+    table = get_command_table()
+    application.add_handler(CommandRouter(table))
+    logger.info(f"Command router registered ({len(table)} names)")
 
-    # Admin commands
-    application.add_handler(CommandHandler("dar_admin", dar_admin_command))
-    application.add_handler(CommandHandler("daradmin", dar_admin_command))  # Alias
-    application.add_handler(CommandHandler("quitar", quitar_command))
-    application.add_handler(CommandHandler("consultar", consultar_command))
-    application.add_handler(CommandHandler("setadmin", set_admin_command))
-    application.add_handler(CommandHandler("removeadmin", remove_admin_command))
-    application.add_handler(CommandHandler("syncadmins", syncadmins_command))
-
-    # Profile commands
-    application.add_handler(CommandHandler("perfil", perfil_command))
-    application.add_handler(CommandHandler("editarperfil", editarperfil_command))
-    application.add_handler(CommandHandler("configuracion", configuracion_command))
-    application.add_handler(CommandHandler("config", configuracion_command))  # Alias
+    application.add_handler(get_help_callback_handler())  # Help menu navigation
 
     # ConversationHandlers (multi-step flows)
     application.add_handler(get_profile_edit_conversation())
 
-    # Excel import/export commands (admin only)
-    application.add_handler(CommandHandler("importar", importar_command))
-    application.add_handler(CommandHandler("exportar", exportar_command))
-
-    # Profile import/export commands (admin only)
-    application.add_handler(CommandHandler("plantilla_perfiles", plantilla_perfiles_command))
-    application.add_handler(CommandHandler("plantillaperfiles", plantilla_perfiles_command))  # Alias
-    application.add_handler(CommandHandler("exportar_perfiles", exportar_perfiles_command))
-    application.add_handler(CommandHandler("exportarperfiles", exportar_perfiles_command))  # Alias
-    application.add_handler(CommandHandler("importar_perfiles", importar_perfiles_command))
-    application.add_handler(CommandHandler("importarperfiles", importar_perfiles_command))  # Alias
-
     # Excel document handlers (profile import first, then general)
     application.add_handler(
-        MessageHandler(filters.Document.ALL, handle_profile_excel_document)
+        MessageHandler(
+            filters.Document.ALL,
+            with_deadline(IMPORT_BUDGET)(handle_profile_excel_document),
+        )
     )
     application.add_handler(
-        MessageHandler(filters.Document.ALL, handle_excel_document)
+        MessageHandler(
+            filters.Document.ALL,
+            with_deadline(IMPORT_BUDGET)(handle_excel_document),
+        )
     )
 
-    # Testing commands (admin only)
-    application.add_handler(CommandHandler("runtest", run_tests_command))
-    application.add_handler(CommandHandler("runtests", run_tests_command))  # Alias
-    application.add_handler(CommandHandler("testdb", test_db_command))
-    application.add_handler(CommandHandler("cleandb", cleandb_command))
-    # Health check commands
-    application.add_handler(CommandHandler("health", health_command))
-    application.add_handler(CommandHandler("ping", ping_command))
-
-    # BDSM commands (only if enabled)
-    if settings.enable_bdsm_commands:
-        # Collar commands
-        application.add_handler(CommandHandler("collar", collar_command))
-        application.add_handler(CommandHandler("liberar", liberar_command))
-        application.add_handler(CommandHandler("exhibir", exhibir_command))
-        application.add_handler(CommandHandler("miscollares", exhibir_command))  # Alias
-        application.add_handler(CommandHandler("amo", amo_command))
-        application.add_handler(CommandHandler("ama", amo_command))  # Alias
-        application.add_handler(CommandHandler("aceptar_collar", aceptar_collar_command))
-        application.add_handler(CommandHandler("rechazar_collar", rechazar_collar_command))
-        application.add_handler(CommandHandler("suplicar_libertad", suplicar_libertad_command))
-
-        # Punishment commands
-        application.add_handler(CommandHandler("azotar", azotar_command))
-        application.add_handler(CommandHandler("castigar", castigar_command))
-        application.add_handler(CommandHandler("mis_castigos", mis_castigos_command))
-        application.add_handler(CommandHandler("miscastigos", mis_castigos_command))  # Alias
-        application.add_handler(CommandHandler("castigos_dados", castigos_dados_command))
-
-        # Dungeon commands
-        application.add_handler(CommandHandler("calabozo", calabozo_command))
-        application.add_handler(CommandHandler("encerrar", calabozo_command))  # Alias
-        application.add_handler(CommandHandler("liberar_calabozo", liberar_calabozo_command))
-        application.add_handler(CommandHandler("presos", presos_command))
-        application.add_handler(CommandHandler("mi_calabozo", mi_calabozo_command))
-        application.add_handler(CommandHandler("micalbozo", mi_calabozo_command))  # Alias (typo-friendly)
-        application.add_handler(CommandHandler("suplicar_libertad_calabozo", suplicar_libertad_calabozo_command))
-
-        # Auction commands
-        application.add_handler(CommandHandler("subasta", subasta_command))
-        application.add_handler(CommandHandler("pujar", pujar_command))
-        application.add_handler(CommandHandler("subastas", subastas_command))
-        application.add_handler(CommandHandler("ver_subasta", ver_subasta_command))
-        application.add_handler(CommandHandler("cancelar_subasta", cancelar_subasta_command))
-        application.add_handler(CommandHandler("mis_subastas", mis_subastas_command))
-
-        # Contract commands
-        application.add_handler(CommandHandler("contrato", contrato_command))
-        application.add_handler(CommandHandler("firmar_contrato", firmar_contrato_command))
-        application.add_handler(CommandHandler("rechazar_contrato", rechazar_contrato_command))
-        application.add_handler(CommandHandler("romper_contrato", romper_contrato_command))
-        application.add_handler(CommandHandler("mis_contratos", mis_contratos_command))
-        application.add_handler(CommandHandler("miscontratos", mis_contratos_command))  # Alias
-        application.add_handler(CommandHandler("ver_contrato", ver_contrato_command))
-
-        # Tribute/worship commands
-        application.add_handler(CommandHandler("tributo", tributo_command))
-        application.add_handler(CommandHandler("adorar", adorar_command))
-        application.add_handler(CommandHandler("altar", altar_command))
-        application.add_handler(CommandHandler("mi_altar", mi_altar_command))
-        application.add_handler(CommandHandler("mialtar", mi_altar_command))  # Alias
-        application.add_handler(CommandHandler("devotos", devotos_command))
-
-        logger.info("BDSM commands registered")
-
-    # AI-powered game commands (always available)
-    application.add_handler(CommandHandler("ruleta", ruleta_command))
-    application.add_handler(CommandHandler("dado_perverso", dado_perverso_command))
-    application.add_handler(CommandHandler("dadoperverso", dado_perverso_command))  # Alias
-    application.add_handler(CommandHandler("dado", dado_perverso_command))  # Short alias
-    application.add_handler(CommandHandler("verdad_reto", verdad_reto_command))
-    application.add_handler(CommandHandler("verdadreto", verdad_reto_command))  # Alias
-    application.add_handler(CommandHandler("vor", verdad_reto_command))  # Short alias
-    application.add_handler(CommandHandler("prediccion", prediccion_command))
-    application.add_handler(CommandHandler("oraculo", prediccion_command))  # Alias
-    application.add_handler(CommandHandler("fantasia", fantasia_command))
-
-    # AI-powered task commands
-    application.add_handler(CommandHandler("tarea", tarea_command))
-    application.add_handler(CommandHandler("reto", reto_command))
-    application.add_handler(CommandHandler("castigo_creativo", castigo_creativo_command))
-    application.add_handler(CommandHandler("castigocreativo", castigo_creativo_command))  # Alias
-    application.add_handler(CommandHandler("recompensa", recompensa_command))
-    application.add_handler(CommandHandler("protocolo", protocolo_command))
-
-    # AI-powered roleplay commands
-    application.add_handler(CommandHandler("escena", escena_command))
-    application.add_handler(CommandHandler("ambiente", escena_command))  # Alias
-    application.add_handler(CommandHandler("ritual", ritual_command))
-    application.add_handler(CommandHandler("titulo", titulo_command))
-    application.add_handler(CommandHandler("descripcion_ai", descripcion_ai_command))
-    application.add_handler(CommandHandler("bio", descripcion_ai_command))  # Alias
-    application.add_handler(CommandHandler("compatibilidad", compatibilidad_command))
-
-    logger.info("AI-powered commands registered")
-
     # Group handlers - auto-sync admins
     application.add_handler(
         ChatMemberHandler(on_bot_added_to_group, ChatMemberHandler.MY_CHAT_MEMBER)
@@ -355,50 +127,40 @@ async def post_init(application: Application) -> None:
     logger.info("Database initialized")
     await init_cache()
     logger.info("Cache initialized")
-
-    # Register bot commands with Telegram
-    commands = [
-        BotCommand("start", "Registrarse en el bot"),
-        BotCommand("ver", "Ver tu saldo"),
-        BotCommand("dar", "Enviar monedas a otro usuario"),
-        BotCommand("ranking", "Ver los top usuarios"),
-        BotCommand("historial", "Ver tu historial de transacciones"),
-        BotCommand("perfil", "Ver tu perfil o el de otro usuario"),
-        BotCommand("help", "Ver ayuda"),
-    ]
-
-    # Admin commands (not shown to regular users but available)
-    admin_commands = commands + [
-        BotCommand("dar_admin", "Dar monedas (admin)"),
-        BotCommand("quitar", "Quitar monedas (admin)"),
-        BotCommand("consultar", "Ver saldo de usuario (admin)"),
-        BotCommand("runtest", "Ejecutar tests (admin)"),
-        BotCommand("testdb", "Test de base de datos (admin)"),
-        BotCommand("cleandb", "Limpiar base de datos (admin)"),
-        BotCommand("syncadmins", "Sincronizar admins del grupo"),
-    ]
-
-    # BDSM commands if enabled
-    if settings.enable_bdsm_commands:
-        bdsm_commands = [
-            BotCommand("collar", "Poner collar a alguien"),
-            BotCommand("liberar", "Liberar a alguien"),
-            BotCommand("tributo", "Pagar tributo"),
-            BotCommand("adorar", "Adorar a alguien"),
-            BotCommand("mis_contratos", "Ver tus contratos"),
-        ]
-        commands.extend(bdsm_commands)
-        admin_commands.extend(bdsm_commands)
-
+    harvested = get_fallback_corpus().load_harvest()
+    logger.info(f"AI fallback corpus loaded ({harvested} harvested lines)")
+    get_notification_service().set_bot(application.bot)
+    await get_ephemeral_state().start(application.job_queue)
+    await get_collar_graph().load()
+    await get_timed_events().start(application.job_queue)
+    swept = await get_expiry_sweeper().start(application.job_queue)
+    logger.info(f"Expired rows swept at startup: {swept}")
+    applied = await get_economy_batch().start(application.job_queue)
+    logger.info(f"Economy rules applied at startup: {[r.rule for r in applied if not r.skipped]}")
+
+    # Register bot commands with Telegram; admins also see admin commands
+    table = get_command_table()
     try:
-        await application.bot.set_my_commands(commands)
+        await application.bot.set_my_commands(table.menu())
         logger.info("Bot commands registered with Telegram")
     except Exception as e:
         logger.error(f"Failed to register bot commands: {e}")
 
+    admin_commands = table.menu(admin=True)
+    for admin_id in settings.super_admin_ids:
+        try:
+            await application.bot.set_my_commands(
+                admin_commands, scope=BotCommandScopeChat(admin_id)
+            )
+        except Exception as e:
+            logger.debug(f"Could not register admin commands for {admin_id}: {e}")
+
 
 async def post_shutdown(application: Application) -> None:
     """Cleanup on shutdown."""
+    get_fallback_corpus().save_harvest()
+    get_timed_events().stop()
+    await get_ephemeral_state().stop()
     await close_cache()
     logger.info("Cache stopped")
     await close_database()
@@ -409,13 +171,17 @@ def create_application() -> Application:
     """Create and configure the bot application."""
 
     # Build application
-    application = (
+    builder = (
         Application.builder()
         .token(settings.telegram_bot_token)
+        .concurrent_updates(PerUserUpdateProcessor(max(1, settings.concurrent_updates)))
         .post_init(post_init)
         .post_shutdown(post_shutdown)
-        .build()
     )
+    if settings.bot_mode == "webhook":
+        # Updates arrive through src.bot.webhook instead of the Updater
+        builder = builder.updater(None)
+    application = builder.build()
 
     # Setup handlers
     setup_handlers(application)
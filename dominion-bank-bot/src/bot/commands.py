@@ -0,0 +1,569 @@
+"""
+The Phantom Bot - Command Table
+Single table of bot commands used for routing, update lanes, the Telegram
+command menu and /help.
+"""
+import logging
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from telegram import BotCommand, MessageEntity, Update
+from telegram.ext import BaseHandler, ContextTypes
+
+from src.config import settings
+from src.utils.deadline import AI_BUDGET, ECONOMY_BUDGET, IMPORT_BUDGET, run_with_deadline
+from src.utils.pipeline import Stage, compile_pipeline, dungeon_gate
+from src.handlers.core import dar_command, help_command, start_command, ver_command
+from src.handlers.admin import (
+    consultar_command,
+    dar_admin_command,
+    quitar_command,
+    remove_admin_command,
+    set_admin_command,
+)
+from src.handlers.info import historial_command, ranking_command, stats_command
+from src.handlers.group import syncadmins_command
+from src.handlers.profiles import (
+    configuracion_command,
+    editarperfil_command,
+    perfil_command,
+)
+from src.handlers.excel_import import exportar_command, importar_command
+from src.handlers.profile_import import (
+    exportar_perfiles_command,
+    importar_perfiles_command,
+    plantilla_perfiles_command,
+)
+from src.handlers.testing import (
+    cleandb_command,
+    rebuildstats_command,
+    run_tests_command,
+    test_db_command,
+)
+from src.handlers.health import aistats_command, health_command, ping_command
+from src.handlers.help_interactive import interactive_help_command
+from src.handlers.bdsm import (
+    # Collars
+    aceptar_collar_command,
+    amo_command,
+    collar_command,
+    exhibir_command,
+    jerarquia_command,
+    liberar_command,
+    rechazar_collar_command,
+    suplicar_libertad_command,
+    # Punishments
+    azotar_command,
+    castigar_command,
+    castigos_dados_command,
+    mis_castigos_command,
+    # Dungeon
+    calabozo_command,
+    liberar_calabozo_command,
+    mi_calabozo_command,
+    presos_command,
+    suplicar_libertad_calabozo_command,
+    # Auctions
+    cancelar_subasta_command,
+    mis_subastas_command,
+    pujar_command,
+    subasta_command,
+    subastas_command,
+    ver_subasta_command,
+    # Contracts
+    contrato_command,
+    firmar_contrato_command,
+    mis_contratos_command,
+    rechazar_contrato_command,
+    romper_contrato_command,
+    ver_contrato_command,
+    # Tribute
+    adorar_command,
+    altar_command,
+    devotos_command,
+    mi_altar_command,
+    tributo_command,
+)
+from src.handlers.games import (
+    dado_perverso_command,
+    fantasia_command,
+    prediccion_command,
+    ruleta_command,
+    verdad_reto_command,
+)
+from src.handlers.ai_tasks import (
+    castigo_creativo_command,
+    protocolo_command,
+    recompensa_command,
+    reto_command,
+    tarea_command,
+)
+from src.handlers.roleplay import (
+    compatibilidad_command,
+    descripcion_ai_command,
+    escena_command,
+    ritual_command,
+    titulo_command,
+)
+
+logger = logging.getLogger(__name__)
+
+CommandCallback = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[Any]]
+
+
+# =============================================================================
+# LANES
+# =============================================================================
+
+ECONOMY = "economy"
+ADMIN = "admin"
+AI = "ai"
+INFO = "info"
+
+
+# =============================================================================
+# HELP SECTIONS
+# =============================================================================
+
+# (key, title) in the order /help shows them
+HELP_SECTIONS = [
+    ("basic", "💰 BÁSICOS"),
+    ("profile", "👤 PERFIL"),
+    ("collars", "🔗 COLLARES"),
+    ("punishments", "⚡ CASTIGOS"),
+    ("dungeon", "🏰 CALABOZO"),
+    ("auctions", "🔨 SUBASTAS"),
+    ("contracts", "📜 CONTRATOS"),
+    ("tributes", "🛐 TRIBUTOS"),
+    ("ai_games", "🎲 JUEGOS IA"),
+    ("ai_tasks", "📝 TAREAS IA"),
+    ("ai_roleplay", "🎭 ROLEPLAY IA"),
+    ("admin", "👑 ADMIN"),
+    ("testing", "🧪 TESTING"),
+]
+
+# Sections only shown to admins
+ADMIN_SECTIONS = {"admin", "testing"}
+
+
+@dataclass(frozen=True)
+class Command:
+    """
+    One bot command and everything derived from it.
+
+    Attributes:
+        name: Canonical name, without the leading /
+        callback: Handler coroutine
+        aliases: Other names routed to the same callback
+        usage: Argument hint shown in /help (e.g. "@user cantidad")
+        description: /help text; {currency} is replaced by the currency name
+        section: /help section key, or None to leave it out of /help
+        menu: Description for Telegram's command menu, or None to leave it out
+        lane: Update lane used by the update processor
+        fallback: AI prompt type answered when the command is shed under load
+        bdsm: Only available when ENABLE_BDSM_COMMANDS is on
+        stages: Middleware stages compiled in front of the callback
+        budget: Deadline class; defaults to "ai" for the AI lane, else "economy"
+    """
+    name: str
+    callback: CommandCallback
+    aliases: tuple[str, ...] = ()
+    usage: str = ""
+    description: str = ""
+    section: Optional[str] = None
+    menu: Optional[str] = None
+    lane: str = ECONOMY
+    fallback: Optional[str] = None
+    bdsm: bool = False
+    stages: tuple[Stage, ...] = ()
+    budget: Optional[str] = None
+
+    @property
+    def deadline(self) -> str:
+        if self.budget:
+            return self.budget
+        return AI_BUDGET if self.lane == AI else ECONOMY_BUDGET
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return (self.name, *self.aliases)
+
+    def help_line(self) -> str:
+        usage = f" {self.usage}" if self.usage else ""
+        description = self.description.format(currency=settings.currency_name)
+        return f"/{self.name}{usage} - {description}"
+
+
+# =============================================================================
+# COMMANDS
+# =============================================================================
+
+COMMANDS = [
+    # Core
+    Command("start", start_command, description="Registrarse en el bot",
+            section="basic", menu="Registrarse en el bot"),
+    Command("ver", ver_command, aliases=("saldo",), description="Ver tu saldo actual",
+            section="basic", menu="Ver tu saldo"),
+    Command("dar", dar_command, aliases=("enviar",), usage="@user cantidad",
+            description="Enviar {currency}", section="basic",
+            menu="Enviar monedas a otro usuario"),
+    Command("help", help_command, menu="Ver ayuda", lane=INFO),
+    Command("ayuda", interactive_help_command, lane=INFO),
+
+    # Info
+    Command("ranking", ranking_command, aliases=("top",), description="Top 10 usuarios",
+            section="basic", menu="Ver los top usuarios", lane=INFO),
+    Command("historial", historial_command, aliases=("historia",),
+            description="Tus últimas transacciones", section="basic",
+            menu="Ver tu historial de transacciones", lane=INFO),
+    Command("stats", stats_command, description="Estadísticas generales",
+            section="basic", lane=INFO),
+
+    # Profile
+    Command("perfil", perfil_command, description="Ver tu perfil (o /perfil @user)",
+            section="profile", menu="Ver tu perfil o el de otro usuario", lane=INFO),
+    Command("editarperfil", editarperfil_command, description="Modificar tu perfil",
+            section="profile"),
+    Command("configuracion", configuracion_command, aliases=("config",),
+            description="Ajustes de privacidad", section="profile", lane=INFO),
+
+    # Admin
+    Command("dar_admin", dar_admin_command, aliases=("daradmin",), usage="@user cantidad",
+            description="Dar {currency}", section="admin", menu="Dar monedas (admin)",
+            lane=ADMIN),
+    Command("quitar", quitar_command, usage="@user cantidad", description="Quitar {currency}",
+            section="admin", menu="Quitar monedas (admin)", lane=ADMIN),
+    Command("consultar", consultar_command, usage="@user", description="Ver saldo de usuario",
+            section="admin", menu="Ver saldo de usuario (admin)", lane=ADMIN),
+    Command("setadmin", set_admin_command, usage="@user", description="Hacer admin",
+            section="admin", lane=ADMIN),
+    Command("removeadmin", remove_admin_command, usage="@user", description="Quitar admin",
+            section="admin", lane=ADMIN),
+    Command("syncadmins", syncadmins_command, description="Sincronizar admins del grupo",
+            section="admin", menu="Sincronizar admins del grupo", lane=ADMIN),
+    Command("importar", importar_command, description="Importar datos (Excel)",
+            section="admin", lane=ADMIN, budget=IMPORT_BUDGET),
+    Command("exportar", exportar_command, description="Exportar datos (Excel)",
+            section="admin", lane=ADMIN, budget=IMPORT_BUDGET),
+    Command("plantilla_perfiles", plantilla_perfiles_command, aliases=("plantillaperfiles",),
+            lane=ADMIN, budget=IMPORT_BUDGET),
+    Command("exportar_perfiles", exportar_perfiles_command, aliases=("exportarperfiles",),
+            lane=ADMIN, budget=IMPORT_BUDGET),
+    Command("importar_perfiles", importar_perfiles_command, aliases=("importarperfiles",),
+            lane=ADMIN, budget=IMPORT_BUDGET),
+
+    # Testing and health
+    Command("runtest", run_tests_command, aliases=("runtests",),
+            description="Ejecutar tests automáticos", section="testing",
+            menu="Ejecutar tests (admin)", lane=ADMIN, budget=IMPORT_BUDGET),
+    Command("testdb", test_db_command, description="Test rápido de sistema",
+            section="testing", menu="Test de base de datos (admin)", lane=ADMIN),
+    Command("cleandb", cleandb_command, menu="Limpiar base de datos (admin)", lane=ADMIN,
+            budget=IMPORT_BUDGET),
+    Command("rebuildstats", rebuildstats_command, menu="Recalcular estadísticas (admin)",
+            lane=ADMIN, budget=IMPORT_BUDGET),
+    Command("health", health_command, lane=ADMIN),
+    Command("aistats", aistats_command, lane=ADMIN),
+    Command("ping", ping_command, lane=INFO),
+
+    # Collars
+    Command("collar", collar_command, usage="@user", description="Poner collar (300 💎)",
+            section="collars", menu="Poner collar a alguien", bdsm=True),
+    Command("liberar", liberar_command, usage="@user", description="Liberar sumiso",
+            section="collars", menu="Liberar a alguien", bdsm=True),
+    Command("exhibir", exhibir_command, aliases=("miscollares",),
+            description="Ver tus collares", section="collars", lane=INFO, bdsm=True),
+    Command("amo", amo_command, aliases=("ama",), description="Ver tu Amo/Ama",
+            section="collars", lane=INFO, bdsm=True),
+    Command("jerarquia", jerarquia_command, usage="[@user]", description="Ver árbol de collares",
+            section="collars", lane=INFO, bdsm=True),
+    Command("aceptar_collar", aceptar_collar_command, description="Aceptar collar pendiente",
+            section="collars", bdsm=True),
+    Command("rechazar_collar", rechazar_collar_command, description="Rechazar collar",
+            section="collars", bdsm=True),
+    Command("suplicar_libertad", suplicar_libertad_command, description="Pedir libertad",
+            section="collars", bdsm=True),
+
+    # Punishments
+    Command("azotar", azotar_command, usage="@user [razón]", description="Azotar (50 💎)",
+            section="punishments", bdsm=True),
+    Command("castigar", castigar_command, usage="@user tipo razón", description="Castigar",
+            section="punishments", bdsm=True),
+    Command("mis_castigos", mis_castigos_command, aliases=("miscastigos",),
+            description="Ver castigos recibidos", section="punishments", lane=INFO, bdsm=True),
+    Command("castigos_dados", castigos_dados_command, description="Ver castigos dados",
+            section="punishments", lane=INFO, bdsm=True),
+
+    # Dungeon
+    Command("calabozo", calabozo_command, aliases=("encerrar",), usage="@user [horas]",
+            description="Encerrar (200 💎)", section="dungeon", bdsm=True),
+    Command("liberar_calabozo", liberar_calabozo_command, usage="@user",
+            description="Liberar preso", section="dungeon", bdsm=True),
+    Command("mi_calabozo", mi_calabozo_command, aliases=("micalbozo",),
+            description="Ver tu estado", section="dungeon", lane=INFO, bdsm=True),
+    Command("presos", presos_command, description="Ver presos actuales",
+            section="dungeon", lane=INFO, bdsm=True),
+    Command("suplicar_libertad_calabozo", suplicar_libertad_calabozo_command,
+            description="Pedir salir", section="dungeon", bdsm=True),
+
+    # Auctions
+    Command("subasta", subasta_command, usage="@user precio_inicial", description="Subastar",
+            section="auctions", bdsm=True),
+    Command("pujar", pujar_command, usage="subasta_id cantidad", description="Hacer puja",
+            section="auctions", bdsm=True),
+    Command("subastas", subastas_command, description="Ver subastas activas",
+            section="auctions", lane=INFO, bdsm=True),
+    Command("ver_subasta", ver_subasta_command, usage="id", description="Detalles de subasta",
+            section="auctions", lane=INFO, bdsm=True),
+    Command("mis_subastas", mis_subastas_command, description="Tus subastas",
+            section="auctions", lane=INFO, bdsm=True),
+    Command("cancelar_subasta", cancelar_subasta_command, usage="id", description="Cancelar",
+            section="auctions", bdsm=True),
+
+    # Contracts
+    Command("contrato", contrato_command, usage="@user términos", description="Proponer",
+            section="contracts", bdsm=True),
+    Command("firmar_contrato", firmar_contrato_command, usage="id",
+            description="Firmar contrato", section="contracts", bdsm=True),
+    Command("rechazar_contrato", rechazar_contrato_command, usage="id",
+            description="Rechazar", section="contracts", bdsm=True),
+    Command("romper_contrato", romper_contrato_command, usage="id",
+            description="Romper (500 💎)", section="contracts", bdsm=True),
+    Command("mis_contratos", mis_contratos_command, aliases=("miscontratos",),
+            description="Ver tus contratos", section="contracts", menu="Ver tus contratos",
+            lane=INFO, bdsm=True),
+    Command("ver_contrato", ver_contrato_command, usage="id", description="Detalles",
+            section="contracts", lane=INFO, bdsm=True),
+
+    # Tribute
+    Command("tributo", tributo_command, usage="@user cantidad", description="Dar tributo",
+            section="tributes", menu="Pagar tributo", bdsm=True),
+    Command("adorar", adorar_command, usage="@user", description="Adorar (gratis)",
+            section="tributes", menu="Adorar a alguien", bdsm=True),
+    Command("altar", altar_command, usage="@user", description="Ver altar de alguien",
+            section="tributes", lane=INFO, bdsm=True),
+    Command("mi_altar", mi_altar_command, aliases=("mialtar",), description="Ver tu altar",
+            section="tributes", lane=INFO, bdsm=True),
+    Command("devotos", devotos_command, description="Ver tus devotos",
+            section="tributes", lane=INFO, bdsm=True),
+
+    # AI games
+    Command("ruleta", ruleta_command, description="Ruleta del destino",
+            section="ai_games", lane=AI, fallback="task"),
+    Command("dado_perverso", dado_perverso_command, aliases=("dadoperverso", "dado"),
+            usage="[tipo]", description="Dado con IA", section="ai_games",
+            lane=AI, fallback="dice_interpret"),
+    Command("verdad_reto", verdad_reto_command, aliases=("verdadreto", "vor"),
+            usage="[v/r]", description="Verdad o Reto", section="ai_games",
+            lane=AI, fallback="truth"),
+    Command("prediccion", prediccion_command, aliases=("oraculo",), usage="[@user]",
+            description="Oraculo", section="ai_games", lane=AI, fallback="prediction"),
+    Command("fantasia", fantasia_command, usage="[tema]", description="Escenario fantasia",
+            section="ai_games", lane=AI, fallback="fantasy"),
+
+    # AI tasks
+    Command("tarea", tarea_command, usage="[@user]", description="Generar tarea",
+            section="ai_tasks", lane=AI, fallback="task"),
+    Command("reto", reto_command, usage="@user", description="Lanzar reto",
+            section="ai_tasks", lane=AI, fallback="challenge"),
+    Command("castigo_creativo", castigo_creativo_command, aliases=("castigocreativo",),
+            usage="@user", description="Castigo IA", section="ai_tasks",
+            lane=AI, fallback="punishment"),
+    Command("recompensa", recompensa_command, usage="@user", description="Recompensa IA",
+            section="ai_tasks", lane=AI, fallback="reward"),
+    Command("protocolo", protocolo_command, usage="[@user]", description="Protocolo",
+            section="ai_tasks", lane=AI, fallback="protocol"),
+
+    # AI roleplay
+    Command("escena", escena_command, aliases=("ambiente",), usage="[tema]",
+            description="Ambientacion", section="ai_roleplay", lane=AI, fallback="scene"),
+    Command("ritual", ritual_command, usage="@user [tipo]", description="Ritual/ceremonia",
+            section="ai_roleplay", lane=AI, fallback="ritual"),
+    Command("titulo", titulo_command, usage="[rol]", description="Generar titulo",
+            section="ai_roleplay", lane=AI, fallback="title"),
+    Command("bio", descripcion_ai_command, aliases=("descripcion_ai",), usage="[rol]",
+            description="Bio para perfil", section="ai_roleplay", lane=AI, fallback="bio"),
+    Command("compatibilidad", compatibilidad_command, usage="@user",
+            description="Analisis IA", section="ai_roleplay", lane=AI,
+            fallback="compatibility"),
+]
+
+
+# =============================================================================
+# TABLE
+# =============================================================================
+
+class CommandTable:
+    """
+    Commands available in this deployment, indexed by name and alias.
+
+    Feature flags are applied once when the table is built, so routing is a
+    single dict lookup and disabled commands simply do not exist. Commands
+    with middleware stages (or all of them, with MIDDLEWARE_TIMING on) get
+    their callback compiled into a single pipeline coroutine here too.
+    With dungeon_gate on, every command not in DUNGEON_ALLOWED_COMMANDS
+    gets the dungeon gate as its first stage.
+    """
+
+    def __init__(
+        self,
+        commands: Iterable[Command],
+        enable_bdsm: bool = True,
+        timed: Optional[bool] = None,
+        dungeon_gate: bool = False,
+    ):
+        timed = settings.middleware_timing if timed is None else timed
+        self.commands = [
+            self._compile(self._gate(c) if dungeon_gate else c, timed)
+            for c in commands if enable_bdsm or not c.bdsm
+        ]
+        self._by_name: dict[str, Command] = {}
+        for command in self.commands:
+            for name in command.names:
+                if name in self._by_name:
+                    raise ValueError(f"Duplicate command name: /{name}")
+                self._by_name[name] = command
+
+    @staticmethod
+    def _gate(command: Command) -> Command:
+        stage = dungeon_gate(command.names)
+        if stage.check is None:
+            return command
+        return replace(command, stages=(stage, *command.stages))
+
+    @staticmethod
+    def _compile(command: Command, timed: bool) -> Command:
+        if not command.stages and not timed:
+            return command
+        callback = compile_pipeline(
+            command.callback, command.stages, name=command.name, timed=timed
+        )
+        return replace(command, callback=callback)
+
+    def get(self, name: str) -> Optional[Command]:
+        """Look up a command by name or alias (lowercase, without /)."""
+        return self._by_name.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def menu(self, admin: bool = False) -> list[BotCommand]:
+        """BotCommands for set_my_commands; admin lane entries only if admin."""
+        return [
+            BotCommand(c.name, c.menu)
+            for c in self.commands
+            if c.menu and (admin or c.lane != ADMIN)
+        ]
+
+    def help_sections(self, is_admin: bool = False) -> list[str]:
+        """Rendered /help sections, in HELP_SECTIONS order."""
+        lines: dict[str, list[str]] = {}
+        for command in self.commands:
+            if command.section:
+                lines.setdefault(command.section, []).append(command.help_line())
+
+        return [
+            f"{title}:\n" + "\n".join(lines[key])
+            for key, title in HELP_SECTIONS
+            if key in lines and (is_admin or key not in ADMIN_SECTIONS)
+        ]
+
+
+# Global table instance
+_table: Optional[CommandTable] = None
+
+
+def get_command_table() -> CommandTable:
+    """Get or create the command table for the current settings."""
+    global _table
+    if _table is None:
+        _table = CommandTable(
+            COMMANDS,
+            enable_bdsm=settings.enable_bdsm_commands,
+            dungeon_gate=settings.enable_bdsm_commands and settings.enable_dungeon_gate,
+        )
+    return _table
+
+
+# =============================================================================
+# ROUTER
+# =============================================================================
+
+class CommandRouter(BaseHandler[Update, ContextTypes.DEFAULT_TYPE, Any]):
+    """
+    One handler for every command in a CommandTable.
+
+    A CommandHandler per name means each message is checked against every
+    registered command in turn; the router parses the command once and
+    dispatches with a dict lookup. Matching follows CommandHandler: the
+    message must start with a bot_command entity, "/cmd@OtherBot" is
+    ignored, and context.args holds the whitespace-separated arguments.
+    Unknown commands fall through to the handlers registered after it.
+
+    Each command runs inside a request scope (context.request), so
+    middleware and handler share one session and one user lookup, and
+    within its deadline budget (see src.utils.deadline).
+    """
+
+    __slots__ = ("table",)
+
+    def __init__(self, table: CommandTable, block: bool = True):
+        super().__init__(self._route, block=block)
+        self.table = table
+
+    def check_update(self, update: object) -> Optional[tuple[Command, list[str]]]:
+        if not isinstance(update, Update) or update.effective_message is None:
+            return None
+
+        message = update.effective_message
+        text = message.text
+        if not text or not message.entities:
+            return None
+        entity = message.entities[0]
+        if entity.type != MessageEntity.BOT_COMMAND or entity.offset != 0:
+            return None
+
+        name, _, target = text[1:entity.length].partition("@")
+        if target and target.lower() != (message.get_bot().username or "").lower():
+            return None
+
+        command = self.table.get(name.lower())
+        if command is None:
+            return None
+        return command, text.split()[1:]
+
+    def collect_additional_context(
+        self,
+        context: ContextTypes.DEFAULT_TYPE,
+        update: Update,
+        application: Any,
+        check_result: tuple[Command, list[str]],
+    ) -> None:
+        context.args = check_result[1]
+
+    async def handle_update(
+        self,
+        update: Update,
+        application: Any,
+        check_result: tuple[Command, list[str]],
+        context: ContextTypes.DEFAULT_TYPE,
+    ) -> Any:
+        self.collect_additional_context(context, update, application, check_result)
+        command = check_result[0]
+        return await run_with_deadline(
+            command.callback, update, context, command.deadline, command.name
+        )
+
+    async def _route(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> Any:
+        """Callback form of the router, for callers that invoke .callback directly."""
+        check_result = self.check_update(update)
+        if not check_result:
+            return None
+        context.args = check_result[1]
+        command = check_result[0]
+        return await run_with_deadline(
+            command.callback, update, context, command.deadline, command.name
+        )
@@ -0,0 +1,242 @@
+"""
+The Phantom Bot - Update Processor
+Processes updates concurrently across users while keeping each user's
+updates in order, with separate priority lanes per kind of command.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Optional
+
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import BaseUpdateProcessor
+
+from src.bot.commands import ADMIN, AI, ECONOMY, INFO, get_command_table
+from src.config import settings
+from src.services.ai_fallbacks import get_fallback_corpus
+from src.utils.texts import get_warning
+
+logger = logging.getLogger(__name__)
+
+
+# Lanes whose commands may be answered with a canned reply under load
+SHEDDABLE = {AI, INFO}
+
+
+def command_of(update: object) -> Optional[str]:
+    """Command name of a message update (without / and @botname), if any."""
+    if not isinstance(update, Update) or update.effective_message is None:
+        return None
+    text = update.effective_message.text or update.effective_message.caption
+    if not text or not text.startswith("/"):
+        return None
+    parts = text[1:].split(maxsplit=1)
+    if not parts:
+        return None
+    return parts[0].split("@", 1)[0].lower()
+
+
+def classify_update(update: object) -> str:
+    """
+    Pick the lane of an update.
+
+    Lanes come from the command table. Economy is the default: money
+    commands, callback buttons and plain messages (conversation steps) must
+    never wait behind AI generations.
+    """
+    name = command_of(update)
+    command = get_command_table().get(name) if name else None
+    return command.lane if command else ECONOMY
+
+
+class _Lane:
+    """Concurrency limit and counters of one lane."""
+
+    __slots__ = ("limit", "semaphore", "running", "waiting", "processed", "shed")
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.semaphore = asyncio.Semaphore(self.limit)
+        self.running = 0
+        self.waiting = 0
+        self.processed = 0
+        self.shed = 0
+
+
+class _KeyQueue:
+    """FIFO lock for one (user_id, chat_id) plus how many updates hold or wait on it."""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+# =============================================================================
+# PROCESSOR
+# =============================================================================
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Runs updates from different users and chats in parallel, but updates
+    sharing a (user_id, chat_id) key strictly one after another, in arrival
+    order.
+
+    Two /dar from the same user, or a ConversationHandler step and the next
+    message, therefore behave exactly as with sequential processing, while
+    other users are not held up. Keys are created on first use and dropped
+    as soon as nobody holds or waits on them.
+
+    Each update is classified into a lane (economy, admin, AI, info) with its
+    own concurrency limit, so slow AI generations cannot occupy the slots
+    money commands need. When too many AI or info commands are waiting, new
+    ones are answered immediately with a busy message or an AI fallback.
+
+    Updates without a user or chat (e.g. channel posts) are not serialized.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_updates: int,
+        lane_limits: Optional[dict[str, int]] = None,
+        shed_queue_depth: Optional[int] = None,
+    ):
+        lane_limits = lane_limits or {
+            ECONOMY: max_concurrent_updates,
+            AI: settings.update_lane_ai,
+            INFO: settings.update_lane_info,
+            ADMIN: settings.update_lane_admin,
+        }
+        self._lanes = {name: _Lane(limit) for name, limit in lane_limits.items()}
+        total = sum(lane.limit for lane in self._lanes.values())
+        super().__init__(total if max_concurrent_updates > 1 else 1)
+
+        self.shed_queue_depth = (
+            settings.update_shed_queue_depth if shed_queue_depth is None else shed_queue_depth
+        )
+        self._keys: dict[tuple, _KeyQueue] = {}
+
+    @staticmethod
+    def key_for(update: object) -> Optional[tuple]:
+        """Ordering key of an update, or None if it needs no ordering."""
+        if not isinstance(update, Update):
+            return None
+        user = update.effective_user
+        chat = update.effective_chat
+        if user is None and chat is None:
+            return None
+        return (user.id if user else None, chat.id if chat else None)
+
+    @property
+    def active_keys(self) -> int:
+        """Number of keys with an update running or waiting."""
+        return len(self._keys)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Per-lane running / waiting / processed / shed counters."""
+        return {
+            name: {
+                "limit": lane.limit,
+                "running": lane.running,
+                "waiting": lane.waiting,
+                "processed": lane.processed,
+                "shed": lane.shed,
+            }
+            for name, lane in self._lanes.items()
+        }
+
+    async def process_update(  # type: ignore[misc]
+        self,
+        update: object,
+        coroutine: Awaitable[Any],
+    ) -> None:
+        """
+        Wait for the key's turn, then for a slot in the update's lane.
+
+        BaseUpdateProcessor.process_update takes one global slot first; doing
+        that here would let one user's backlog, or a burst of AI commands,
+        occupy every slot while waiting, stalling everyone else.
+        """
+        lane_name = classify_update(update)
+        lane = self._lanes.get(lane_name) or self._lanes[ECONOMY]
+
+        if lane_name in SHEDDABLE and lane.waiting >= self.shed_queue_depth:
+            self._close(coroutine)
+            lane.shed += 1
+            await self._shed(update, lane_name)
+            return
+
+        key = self.key_for(update)
+        entry = None
+        if key is not None:
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = self._keys[key] = _KeyQueue()
+            entry.users += 1
+
+        # Only updates queued on the lane semaphore count as waiting; a key's
+        # own backlog behind its lock must not shed other users' updates
+        waiting = False
+        try:
+            if entry is not None:
+                await entry.lock.acquire()
+            try:
+                lane.waiting += 1
+                waiting = True
+                async with lane.semaphore:
+                    lane.waiting -= 1
+                    waiting = False
+                    lane.running += 1
+                    try:
+                        await self.do_process_update(update, coroutine)
+                    finally:
+                        lane.running -= 1
+                        lane.processed += 1
+            finally:
+                if entry is not None:
+                    entry.lock.release()
+        except asyncio.CancelledError:
+            self._close(coroutine)
+            raise
+        finally:
+            if waiting:
+                lane.waiting -= 1
+            if entry is not None:
+                entry.users -= 1
+                if not entry.users:
+                    del self._keys[key]
+
+    @staticmethod
+    def _close(coroutine: Awaitable[Any]) -> None:
+        """Close a coroutine that will never run, avoiding 'never awaited' warnings."""
+        if asyncio.iscoroutine(coroutine):
+            coroutine.close()
+
+    async def _shed(self, update: object, lane_name: str) -> None:
+        """Answer a shed command instantly instead of running its handler."""
+        if not isinstance(update, Update) or update.effective_message is None:
+            return
+
+        if lane_name == AI:
+            chat_id = update.effective_chat.id if update.effective_chat else None
+            command = get_command_table().get(command_of(update))
+            text = get_fallback_corpus().pick(command.fallback or "default", chat_id=chat_id)
+        else:
+            text = get_warning("busy")
+
+        logger.info(f"Shed /{command_of(update)} from {lane_name} lane under load")
+        try:
+            await update.effective_message.reply_text(text)
+        except TelegramError as e:
+            logger.debug(f"Could not send busy reply: {e}")
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._keys:
+            logger.debug(f"Update processor shut down with {len(self._keys)} active keys")
@@ -0,0 +1,226 @@
+"""
+The Phantom Bot - Webhook Server
+Receives Telegram updates over HTTPS through an embedded ASGI server.
+"""
+import asyncio
+import hmac
+import json
+import logging
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import Application
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+HEALTH_PATH = "/health"
+
+# Telegram updates are small; anything bigger is not from Telegram
+MAX_BODY_BYTES = 1 << 20
+
+# chat_member updates are only sent when requested; they keep the member
+# status cache and group admins in step with promotions and demotions
+ALLOWED_UPDATES = ["message", "callback_query", "chat_member", "my_chat_member"]
+
+
+class WebhookApp:
+    """
+    Minimal ASGI app that feeds Telegram updates into the application.
+
+    - POST {path}: verifies the secret token header, decodes the update and
+      puts it on application.update_queue, answering 200 immediately.
+    - GET /health: liveness check with the current update queue depth.
+
+    Run it with any ASGI server (uvicorn is used by run_webhook).
+    """
+
+    def __init__(
+        self,
+        application: Application,
+        path: str = "/telegram",
+        secret_token: Optional[str] = None,
+    ):
+        self.application = application
+        self.path = "/" + path.strip("/")
+        self.secret_token = secret_token.encode() if secret_token else None
+        self.accepting = True
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        method = scope["method"]
+        path = scope["path"].rstrip("/") or "/"
+
+        if path == HEALTH_PATH and method == "GET":
+            await self._respond(send, 200, {
+                "status": "ok" if self.accepting else "draining",
+                "pending_updates": self.application.update_queue.qsize(),
+            })
+            return
+
+        if path != self.path:
+            await self._respond(send, 404, {"error": "not found"})
+            return
+        if method != "POST":
+            await self._respond(send, 405, {"error": "method not allowed"})
+            return
+        if not self._check_secret(scope):
+            logger.warning("Webhook request rejected: bad secret token")
+            await self._respond(send, 403, {"error": "forbidden"})
+            return
+        if not self.accepting:
+            # Telegram retries non-2xx deliveries, so nothing is lost
+            await self._respond(send, 503, {"error": "shutting down"})
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            await self._respond(send, 413, {"error": "payload too large"})
+            return
+
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Webhook received invalid update: {e}")
+            await self._respond(send, 400, {"error": "invalid update"})
+            return
+
+        await self.application.update_queue.put(update)
+        await self._respond(send, 200, {"ok": True})
+
+    def _check_secret(self, scope) -> bool:
+        if self.secret_token is None:
+            return True
+        for name, value in scope.get("headers", []):
+            if name == SECRET_HEADER:
+                return hmac.compare_digest(value, self.secret_token)
+        return False
+
+    async def _read_body(self, receive) -> Optional[bytes]:
+        body = bytearray()
+        while True:
+            message = await receive()
+            body.extend(message.get("body", b""))
+            if len(body) > MAX_BODY_BYTES:
+                return None
+            if not message.get("more_body"):
+                return bytes(body)
+
+    async def _respond(self, send, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(data)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.accepting = False
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+async def drain_updates(application: Application, timeout: float) -> bool:
+    """
+    Wait until queued and in-flight updates are processed.
+
+    update_queue.task_done() is only called once an update has been handled,
+    so joining the queue also waits for concurrent handlers. If the timeout
+    expires, updates that have not started yet are dropped so that stopping
+    the application only waits for the handlers already running.
+
+    Returns:
+        True if everything finished within the timeout
+    """
+    queue = application.update_queue
+    if queue.qsize():
+        logger.info(f"Draining {queue.qsize()} pending updates...")
+    try:
+        await asyncio.wait_for(queue.join(), timeout=timeout)
+        return True
+    except asyncio.TimeoutError:
+        dropped = 0
+        while not queue.empty():
+            queue.get_nowait()
+            queue.task_done()
+            dropped += 1
+        logger.warning(f"Shutdown drain timed out after {timeout}s; dropped {dropped} queued updates")
+        return False
+
+
+async def run_webhook(application: Application) -> None:
+    """
+    Serve the bot through a webhook until SIGINT/SIGTERM, then drain and stop.
+
+    Mirrors what Application.run_polling does around the update source:
+    initialize, post_init, start, ..., stop, shutdown, post_shutdown.
+    """
+    try:
+        import uvicorn
+    except ImportError as e:
+        raise RuntimeError(
+            "Webhook mode requires uvicorn. Install it with: pip install uvicorn"
+        ) from e
+
+    if not settings.webhook_url:
+        raise RuntimeError("BOT_MODE=webhook requires WEBHOOK_URL")
+    if not settings.webhook_secret:
+        logger.warning("WEBHOOK_SECRET is not set; webhook requests are not authenticated")
+
+    app = WebhookApp(
+        application,
+        path=settings.webhook_path,
+        secret_token=settings.webhook_secret,
+    )
+    server = uvicorn.Server(uvicorn.Config(
+        app,
+        host=settings.webhook_listen,
+        port=settings.webhook_port,
+        log_level="warning",
+        access_log=False,
+    ))
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+
+    try:
+        await application.bot.set_webhook(
+            url=settings.webhook_url.rstrip("/") + app.path,
+            secret_token=settings.webhook_secret,
+            allowed_updates=ALLOWED_UPDATES,
+            max_connections=settings.webhook_max_connections,
+            drop_pending_updates=True,
+        )
+        await application.start()
+        logger.info(
+            f"Webhook listening on {settings.webhook_listen}:{settings.webhook_port}{app.path}"
+        )
+
+        # Returns once uvicorn has handled SIGINT/SIGTERM and closed the socket
+        await server.serve()
+
+        app.accepting = False
+        await drain_updates(application, settings.shutdown_drain_timeout)
+    finally:
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
@@ -2,12 +2,25 @@
 The Phantom Bot - Configuration
 """
 import os
+from functools import lru_cache
 from pathlib import Path
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from typing import Optional
 
 
+@lru_cache(maxsize=8)
+def _parse_id_list(raw: str) -> frozenset[int]:
+    """Parse a comma-separated list of ids (memoized per string)."""
+    return frozenset(int(id.strip()) for id in raw.split(",") if id.strip())
+
+
+@lru_cache(maxsize=8)
+def _parse_name_list(raw: str) -> frozenset[str]:
+    """Parse a comma-separated list of names, lowercased and without / (memoized)."""
+    return frozenset(name.strip().lstrip("/").lower() for name in raw.split(",") if name.strip())
+
+
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
@@ -20,9 +33,67 @@ class Settings(BaseSettings):
     telegram_api_id: Optional[str] = Field(default=None, alias="TELEGRAM_API_ID")
     telegram_api_hash: Optional[str] = Field(default=None, alias="TELEGRAM_API_HASH")
 
+    # Update delivery: "polling" or "webhook"
+    bot_mode: str = Field(default="polling", alias="BOT_MODE")
+    webhook_url: Optional[str] = Field(default=None, alias="WEBHOOK_URL")
+    webhook_path: str = Field(default="/telegram", alias="WEBHOOK_PATH")
+    webhook_secret: Optional[str] = Field(default=None, alias="WEBHOOK_SECRET")
+    webhook_listen: str = Field(default="0.0.0.0", alias="WEBHOOK_LISTEN")
+    webhook_port: int = Field(default=8443, alias="PORT")
+    webhook_max_connections: int = Field(default=40, alias="WEBHOOK_MAX_CONNECTIONS")
+    # Updates processed at once (1 = sequential) and shutdown drain timeout
+    concurrent_updates: int = Field(default=8, alias="CONCURRENT_UPDATES")
+    # Concurrency of the AI / informational / admin lanes (economy uses
+    # CONCURRENT_UPDATES) and waiting updates before low-priority commands are shed
+    update_lane_ai: int = Field(default=4, alias="UPDATE_LANE_AI")
+    update_lane_info: int = Field(default=4, alias="UPDATE_LANE_INFO")
+    update_lane_admin: int = Field(default=2, alias="UPDATE_LANE_ADMIN")
+    update_shed_queue_depth: int = Field(default=20, alias="UPDATE_SHED_QUEUE_DEPTH")
+    shutdown_drain_timeout: float = Field(default=30.0, alias="SHUTDOWN_DRAIN_TIMEOUT")
+    # Seconds a command may run before it is cancelled and rolled back (0 = no limit)
+    deadline_economy: float = Field(default=20.0, alias="DEADLINE_ECONOMY")
+    deadline_ai: float = Field(default=60.0, alias="DEADLINE_AI")
+    deadline_import: float = Field(default=300.0, alias="DEADLINE_IMPORT")
+    # Deadlines (auction ends, dungeon expiry...) kept in memory ahead of time, seconds
+    timed_events_horizon: int = Field(default=21600, alias="TIMED_EVENTS_HORIZON")
+    # Expired cooldowns/dungeon/requests deleted every interval seconds, chunk rows per DELETE
+    sweeper_interval: int = Field(default=600, alias="SWEEPER_INTERVAL")
+    sweeper_chunk: int = Field(default=1000, alias="SWEEPER_CHUNK")
+    # Periodic economy rules (checked every interval seconds, applied once per day)
+    economy_batch_interval: int = Field(default=3600, alias="ECONOMY_BATCH_INTERVAL")
+    enable_altar_income: bool = Field(default=True, alias="ENABLE_ALTAR_INCOME")
+    # Daily share of the balance above the threshold (0 = off)
+    wealth_tax_rate: float = Field(default=0.0, alias="WEALTH_TAX_RATE")
+    wealth_tax_threshold: int = Field(default=100000, alias="WEALTH_TAX_THRESHOLD")
+    # Daily share of the balance lost after N days without sending anything (0 = off)
+    inactivity_decay_rate: float = Field(default=0.0, alias="INACTIVITY_DECAY_RATE")
+    inactivity_decay_days: int = Field(default=30, alias="INACTIVITY_DECAY_DAYS")
+    # Seconds between writes of in-memory cooldowns to the database
+    ephemeral_snapshot_interval: int = Field(default=30, alias="EPHEMERAL_SNAPSHOT_INTERVAL")
+
     # AI Service (Groq)
     groq_api_key: Optional[str] = Field(default=None, alias="GROQ_API_KEY")
+    groq_base_url: Optional[str] = Field(default=None, alias="GROQ_BASE_URL")
     enable_ai_features: bool = Field(default=True, alias="ENABLE_AI_FEATURES")
+    enable_ai_streaming: bool = Field(default=True, alias="ENABLE_AI_STREAMING")
+    ai_stream_edit_interval: float = Field(default=1.0, alias="AI_STREAM_EDIT_INTERVAL")
+    ai_max_concurrent: int = Field(default=4, alias="AI_MAX_CONCURRENT")
+    ai_max_pending_per_user: int = Field(default=2, alias="AI_MAX_PENDING_PER_USER")
+    ai_max_pending: int = Field(default=50, alias="AI_MAX_PENDING")
+    ai_daily_token_quota: int = Field(default=20000, alias="AI_DAILY_TOKEN_QUOTA")
+    ai_private_weight: int = Field(default=2, alias="AI_PRIVATE_WEIGHT")
+    # Comma-separated Telegram IDs that, like super admins, get AI_VIP_WEIGHT
+    # consecutive turns in the AI round-robin
+    ai_vip_users: str = Field(default="", alias="AI_VIP_USERS")
+    ai_vip_weight: int = Field(default=2, alias="AI_VIP_WEIGHT")
+    # USD per million tokens, used for the cost estimate in /aistats
+    ai_cost_prompt_per_mtok: float = Field(default=0.05, alias="AI_COST_PROMPT_PER_MTOK")
+    ai_cost_completion_per_mtok: float = Field(default=0.08, alias="AI_COST_COMPLETION_PER_MTOK")
+    # Fallback corpus: recent picks per chat to avoid repeating, and harvesting
+    # of good AI outputs into data/ai_harvest.yaml
+    ai_fallback_history: int = Field(default=5, alias="AI_FALLBACK_HISTORY")
+    enable_ai_harvest: bool = Field(default=True, alias="ENABLE_AI_HARVEST")
+    ai_harvest_max_per_type: int = Field(default=100, alias="AI_HARVEST_MAX_PER_TYPE")
 
     # Bot Identity
     bot_name: str = Field(default="The Phantom", alias="BOT_NAME")
@@ -48,6 +119,10 @@ class Settings(BaseSettings):
     transfer_cooldown: int = Field(default=5, alias="TRANSFER_COOLDOWN")
     rate_limit_commands: int = Field(default=30, alias="RATE_LIMIT_COMMANDS")
     ranking_cache_ttl: int = Field(default=60, alias="RANKING_CACHE_TTL")
+    identity_cache_size: int = Field(default=10000, alias="IDENTITY_CACHE_SIZE")
+    identity_cache_ttl: int = Field(default=300, alias="IDENTITY_CACHE_TTL")
+    auth_cache_ttl: int = Field(default=300, alias="AUTH_CACHE_TTL")
+    chat_member_cache_ttl: int = Field(default=60, alias="CHAT_MEMBER_CACHE_TTL")
 
     # Display & Pagination
     ranking_limit: int = Field(default=10, alias="RANKING_LIMIT")
@@ -59,6 +134,16 @@ class Settings(BaseSettings):
     default_dungeon_hours: int = Field(default=24, alias="DEFAULT_DUNGEON_HOURS")
     max_dungeon_hours: int = Field(default=168, alias="MAX_DUNGEON_HOURS")
     default_auction_hours: int = Field(default=24, alias="DEFAULT_AUCTION_HOURS")
+    # A bid this close to the end (seconds, 0 = off) pushes ends_at out to now + extension
+    auction_snipe_window: int = Field(default=300, alias="AUCTION_SNIPE_WINDOW")
+    auction_snipe_extension: int = Field(default=300, alias="AUCTION_SNIPE_EXTENSION")
+    # Auctions closed per settlement transaction
+    auction_settle_batch: int = Field(default=500, alias="AUCTION_SETTLE_BATCH")
+    # Commands a user locked in the dungeon may still run (names or aliases)
+    dungeon_allowed_commands: str = Field(
+        default="start,help,ayuda,ver,ping,mi_calabozo,suplicar_libertad_calabozo",
+        alias="DUNGEON_ALLOWED_COMMANDS",
+    )
 
     # Costs (in currency units)
     collar_cost: int = Field(default=300, alias="COLLAR_COST")
@@ -71,6 +156,8 @@ class Settings(BaseSettings):
     enable_ranking: bool = Field(default=True, alias="ENABLE_RANKING")
     enable_history: bool = Field(default=True, alias="ENABLE_HISTORY")
     enable_bdsm_commands: bool = Field(default=False, alias="ENABLE_BDSM_COMMANDS")
+    # Locked users may only run DUNGEON_ALLOWED_COMMANDS (needs BDSM commands)
+    enable_dungeon_gate: bool = Field(default=True, alias="ENABLE_DUNGEON_GATE")
     enable_excel_import: bool = Field(default=True, alias="ENABLE_EXCEL_IMPORT")
 
     # Security
@@ -80,6 +167,7 @@ class Settings(BaseSettings):
     # Logging
     log_level: str = Field(default="DEBUG", alias="LOG_LEVEL")
     log_format: str = Field(default="text", alias="LOG_FORMAT")
+    middleware_timing: bool = Field(default=False, alias="MIDDLEWARE_TIMING")
 
     # Localization
     default_language: str = Field(default="es", alias="DEFAULT_LANGUAGE")
@@ -92,11 +180,19 @@ class Settings(BaseSettings):
     }
 
     @property
-    def super_admin_ids(self) -> list[int]:
-        """Parse super admin IDs from comma-separated string."""
-        if not self.super_admins:
-            return []
-        return [int(id.strip()) for id in self.super_admins.split(",") if id.strip()]
+    def super_admin_ids(self) -> frozenset[int]:
+        """Super admin IDs from the comma-separated string, parsed once."""
+        return _parse_id_list(self.super_admins)
+
+    @property
+    def ai_vip_user_ids(self) -> frozenset[int]:
+        """AI VIP user IDs from the comma-separated string, parsed once."""
+        return _parse_id_list(self.ai_vip_users)
+
+    @property
+    def dungeon_allowed_command_set(self) -> frozenset[str]:
+        """Command names from DUNGEON_ALLOWED_COMMANDS, parsed once."""
+        return _parse_name_list(self.dungeon_allowed_commands)
 
     def is_super_admin(self, user_id: int) -> bool:
         """Check if user is a super admin."""
@@ -0,0 +1,99 @@
+"""
+The Phantom Bot - Authorization Cache
+In-process group admin sets and memoized Telegram chat member statuses.
+"""
+import logging
+import time
+from typing import Optional
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AuthorizationCache:
+    """
+    Admin decisions that would otherwise need a query or an API call.
+
+    - Group admins: the set of user ids in the Admin table for a group,
+      loaded by AdminRepository.is_admin and dropped by add_admin /
+      remove_admin.
+    - Chat members: the status Telegram returned for get_chat_member,
+      dropped when a chat_member update reports a change.
+
+    Global admin flags live in the identity cache (UserSnapshot.is_admin)
+    and super admins are a frozenset on settings. Entries also expire
+    after a TTL, since Telegram does not tell us about every change.
+
+    Usage:
+        cache = get_auth_cache()
+        admins = cache.get_group_admins(group_id)
+        cache.put_group_admins(group_id, user_ids)
+        cache.invalidate_group(group_id)
+    """
+
+    def __init__(self, ttl: Optional[float] = None, member_ttl: Optional[float] = None):
+        self.ttl = settings.auth_cache_ttl if ttl is None else ttl
+        self.member_ttl = settings.chat_member_cache_ttl if member_ttl is None else member_ttl
+        self._group_admins: dict[int, tuple[frozenset[int], float]] = {}
+        self._members: dict[tuple[int, int], tuple[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_group_admins(self, group_id: int) -> Optional[frozenset[int]]:
+        """Cached admin user ids for a group, or None."""
+        return self._lookup(self._group_admins, group_id)
+
+    def put_group_admins(self, group_id: int, user_ids) -> frozenset[int]:
+        admins = frozenset(user_ids)
+        self._group_admins[group_id] = (admins, time.monotonic() + self.ttl)
+        return admins
+
+    def invalidate_group(self, group_id: int) -> None:
+        self._group_admins.pop(group_id, None)
+
+    def get_member_status(self, chat_id: int, telegram_id: int) -> Optional[str]:
+        """Cached Telegram status (e.g. "administrator") of a chat member, or None."""
+        return self._lookup(self._members, (chat_id, telegram_id))
+
+    def put_member_status(self, chat_id: int, telegram_id: int, status: str) -> None:
+        self._members[(chat_id, telegram_id)] = (status, time.monotonic() + self.member_ttl)
+
+    def invalidate_member(self, chat_id: int, telegram_id: int) -> None:
+        self._members.pop((chat_id, telegram_id), None)
+
+    def clear(self) -> None:
+        self._group_admins.clear()
+        self._members.clear()
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "groups": len(self._group_admins),
+            "members": len(self._members),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def _lookup(self, entries: dict, key):
+        entry = entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del entries[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+
+# Global authorization cache instance
+_auth_cache: Optional[AuthorizationCache] = None
+
+
+def get_auth_cache() -> AuthorizationCache:
+    """Get or create the authorization cache singleton."""
+    global _auth_cache
+    if _auth_cache is None:
+        _auth_cache = AuthorizationCache()
+    return _auth_cache
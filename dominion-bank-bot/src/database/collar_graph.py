@@ -0,0 +1,164 @@
+"""
+The Phantom Bot - Collar Graph
+In-memory ownership graph (owner -> subs, sub -> owner) built from the
+collars table, for direct relations and hierarchy walks without queries.
+"""
+import logging
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.connection import after_commit, get_session
+from src.database.models import Collar
+
+logger = logging.getLogger(__name__)
+
+# Hierarchy walks stop this many levels below (or above) the starting user
+MAX_DEPTH = 32
+
+
+def walk(
+    root_id: int,
+    children: Callable[[int], Iterable[int]],
+    max_depth: int = MAX_DEPTH,
+) -> list[tuple[int, int, int]]:
+    """
+    Depth-first walk below root_id, in display order.
+
+    Returns (user_id, owner_id, depth) per descendant, depth 1 being the
+    root's own subs. A user is visited once, so a cycle cannot loop.
+    """
+    visited = {root_id}
+    result = []
+    stack = [(sub_id, root_id, 1) for sub_id in sorted(children(root_id), reverse=True)]
+    while stack:
+        user_id, owner_id, depth = stack.pop()
+        if user_id in visited:
+            continue
+        visited.add(user_id)
+        result.append((user_id, owner_id, depth))
+        if depth < max_depth:
+            stack.extend((sub_id, user_id, depth + 1) for sub_id in sorted(children(user_id), reverse=True))
+    return result
+
+
+class CollarGraph:
+    """
+    Adjacency maps of collar ownership, mirrored from the collars table.
+
+    A sub has at most one owner (collars.sub_id is unique), so the graph
+    is a forest unless someone collars their own owner; would_cycle()
+    lets the collar commands refuse that. CollarRepository keeps the maps
+    in step: create/remove register an update that runs when their
+    transaction commits, so a rolled back collar never shows up here.
+
+    Until load() has run (scripts, tests) repositories use the database.
+
+    Usage:
+        graph = get_collar_graph()
+        await graph.load()
+        graph.owner_of(user_id)
+        graph.hierarchy(user_id)
+    """
+
+    def __init__(self):
+        self._owner: dict[int, int] = {}
+        self._subs: dict[int, set[int]] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._owner)
+
+    async def load(self) -> int:
+        """Build the maps from the collars table. Returns the number of collars."""
+        async with get_session() as session:
+            edges = (await session.execute(select(Collar.owner_id, Collar.sub_id))).all()
+
+        self.clear()
+        for owner_id, sub_id in edges:
+            self.add(owner_id, sub_id)
+        self.loaded = True
+        logger.info(f"Collar graph loaded ({len(edges)} collars)")
+        return len(edges)
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+
+    def add(self, owner_id: int, sub_id: int) -> None:
+        self.remove(sub_id)
+        self._owner[sub_id] = owner_id
+        self._subs.setdefault(owner_id, set()).add(sub_id)
+
+    def remove(self, sub_id: int) -> None:
+        owner_id = self._owner.pop(sub_id, None)
+        if owner_id is None:
+            return
+        subs = self._subs[owner_id]
+        subs.discard(sub_id)
+        if not subs:
+            del self._subs[owner_id]
+
+    def on_commit(self, session: AsyncSession, callback: Callable[[], None]) -> None:
+        """Run callback once the session's transaction commits, while the graph is loaded."""
+        if self.loaded:
+            after_commit(session, callback)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def owner_of(self, sub_id: int) -> Optional[int]:
+        return self._owner.get(sub_id)
+
+    def subs_of(self, owner_id: int) -> list[int]:
+        return sorted(self._subs.get(owner_id, ()))
+
+    def count_subs(self, owner_id: int) -> int:
+        return len(self._subs.get(owner_id, ()))
+
+    def owner_chain(self, sub_id: int, max_depth: Optional[int] = MAX_DEPTH) -> list[int]:
+        """Owners above sub_id, nearest first (max_depth=None walks to the top)."""
+        chain = []
+        seen = {sub_id}
+        owner_id = self._owner.get(sub_id)
+        while owner_id is not None and owner_id not in seen:
+            if max_depth is not None and len(chain) >= max_depth:
+                break
+            chain.append(owner_id)
+            seen.add(owner_id)
+            owner_id = self._owner.get(owner_id)
+        return chain
+
+    def hierarchy(self, root_id: int, max_depth: int = MAX_DEPTH) -> list[tuple[int, int, int]]:
+        """Everyone below root_id as (user_id, owner_id, depth), see walk()."""
+        return walk(root_id, lambda user_id: self._subs.get(user_id, ()), max_depth)
+
+    def would_cycle(self, owner_id: int, sub_id: int) -> bool:
+        """True if owner_id collaring sub_id would close a loop."""
+        return owner_id == sub_id or sub_id in self.owner_chain(owner_id, max_depth=None)
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def clear(self) -> None:
+        self._owner.clear()
+        self._subs.clear()
+        self.loaded = False
+
+    def stats(self) -> dict[str, int]:
+        return {"collars": len(self._owner), "owners": len(self._subs)}
+
+
+# Global graph instance
+_graph: Optional[CollarGraph] = None
+
+
+def get_collar_graph() -> CollarGraph:
+    """Get or create the collar graph singleton."""
+    global _graph
+    if _graph is None:
+        _graph = CollarGraph()
+    return _graph
@@ -3,8 +3,9 @@ The Phantom Bot - Database Connection
 """
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Callable
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -13,6 +14,7 @@ from sqlalchemy.ext.asyncio import (
 )
 
 from src.config import settings
+from src.database.migrations import run_migrations
 from src.database.models import Base
 
 logger = logging.getLogger(__name__)
@@ -63,11 +65,17 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         await session.close()
 
 
+def after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Run callback once the session's transaction commits (skipped on rollback)."""
+    event.listen(session.sync_session, "after_commit", lambda _: callback(), once=True)
+
+
 async def init_database() -> None:
     """Initialize the database and create all tables."""
     engine = get_engine()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
     logger.info("Database tables created successfully")
 
 
@@ -0,0 +1,319 @@
+"""
+The Phantom Bot - Ephemeral State Store
+Short-lived state (cooldowns, pending collar/contract requests, dungeon
+locks) kept in memory with TTLs, so checks on the hot paths need no query.
+"""
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Hashable, Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database.connection import after_commit, get_session
+from src.database.models import CollarType, Cooldown, Dungeon, PendingRequest, RequestType
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "ephemeral_snapshot"
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _ttl(expires_at: datetime) -> float:
+    return (_utc(expires_at) - datetime.now(timezone.utc)).total_seconds()
+
+
+class EphemeralStore:
+    """
+    Dict of values with a TTL on the monotonic clock, plus an expiry heap.
+
+    Reads drop an expired entry lazily; purge() pops everything expired
+    from the heap so entries nobody reads again do not pile up. Keys set
+    with dirty=True are remembered until take_dirty() for snapshotting.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._entries: dict[Hashable, tuple[Any, float]] = {}
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._seq = itertools.count()
+        self._dirty: set[Hashable] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float, dirty: bool = False) -> None:
+        """Store a value for ttl seconds (nothing is stored if ttl <= 0)."""
+        if ttl <= 0:
+            self._entries.pop(key, None)
+            return
+        deadline = time.monotonic() + ttl
+        self._entries[key] = (value, deadline)
+        heapq.heappush(self._heap, (deadline, next(self._seq), key))
+        if dirty:
+            self._dirty.add(key)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    def purge(self) -> int:
+        """Drop expired entries. Returns how many were removed."""
+        now = time.monotonic()
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == deadline:
+                del self._entries[key]
+                removed += 1
+        return removed
+
+    def take_dirty(self) -> dict[Hashable, Any]:
+        """Live values set with dirty=True since the last call."""
+        dirty, self._dirty = self._dirty, set()
+        values = {}
+        for key in dirty:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def mark_dirty(self, keys) -> None:
+        """Put keys back for the next take_dirty() (e.g. after a failed write)."""
+        self._dirty.update(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._heap.clear()
+        self._dirty.clear()
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "dirty": len(self._dirty),
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+@dataclass(frozen=True)
+class PendingRequestSnapshot:
+    """Detached copy of a PendingRequest row."""
+    id: int
+    request_type: RequestType
+    from_user_id: int
+    to_user_id: int
+    collar_type: Optional[CollarType]
+    terms: Optional[str]
+    duration_days: Optional[int]
+    expires_at: datetime
+
+    @classmethod
+    def from_request(cls, request: PendingRequest) -> "PendingRequestSnapshot":
+        return cls(
+            id=request.id,
+            request_type=request.request_type,
+            from_user_id=request.from_user_id,
+            to_user_id=request.to_user_id,
+            collar_type=request.collar_type,
+            terms=request.terms,
+            duration_days=request.duration_days,
+            expires_at=_utc(request.expires_at),
+        )
+
+
+# =============================================================================
+# STATE
+# =============================================================================
+
+class EphemeralState:
+    """
+    Cooldowns, pending requests and dungeon locks served from memory once
+    loaded.
+
+    Cooldowns are write-behind: set_cooldown only touches memory and the
+    changed keys are written to the cooldowns table every
+    EPHEMERAL_SNAPSHOT_INTERVAL seconds and at shutdown, so a restart
+    loses at most that window. Pending requests are written to the
+    database as before (their id and terms live there) and mirrored here
+    when the transaction commits, keyed by (to_user_id, request_type);
+    the newest request per key wins. Dungeon locks are mirrored the same
+    way as user_id -> expires_at and drop out when they expire.
+
+    Until load() has run (scripts, tests) repositories use the database.
+
+    Usage:
+        state = get_ephemeral_state()
+        await state.start(application.job_queue)
+        state.cooldowns.get((user_id, "transfer"))
+    """
+
+    def __init__(self):
+        self.cooldowns = EphemeralStore("cooldowns")
+        self.requests = EphemeralStore("pending_requests")
+        self.dungeon = EphemeralStore("dungeon")
+        self.loaded = False
+        self.snapshots = 0
+
+    async def load(self) -> int:
+        """Fill the stores with the live cooldowns, pending requests and dungeon locks."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        async with get_session() as session:
+            cooldowns = (await session.execute(
+                select(Cooldown.user_id, Cooldown.action, Cooldown.expires_at)
+                .where(Cooldown.expires_at > now)
+            )).all()
+            requests = (await session.execute(
+                select(PendingRequest)
+                .where(PendingRequest.expires_at > now)
+                .order_by(PendingRequest.id)
+            )).scalars().all()
+            locks = (await session.execute(
+                select(Dungeon.user_id, Dungeon.expires_at).where(Dungeon.expires_at > now)
+            )).all()
+
+        for user_id, action, expires_at in cooldowns:
+            self.cooldowns.set((user_id, action), _utc(expires_at), _ttl(expires_at))
+        for request in requests:
+            self.put_request(PendingRequestSnapshot.from_request(request))
+        for user_id, expires_at in locks:
+            self.lock_user(user_id, expires_at)
+        self.loaded = True
+        return len(cooldowns) + len(requests) + len(locks)
+
+    async def snapshot(self) -> int:
+        """Write cooldowns changed since the last snapshot. Returns rows written."""
+        changed = self.cooldowns.take_dirty()
+        self.cooldowns.purge()
+        self.requests.purge()
+        self.dungeon.purge()
+        if not changed:
+            return 0
+
+        keys = list(changed)
+        try:
+            async with get_session() as session:
+                result = await session.execute(
+                    select(Cooldown).where(tuple_(Cooldown.user_id, Cooldown.action).in_(keys))
+                )
+                for cooldown in result.scalars():
+                    cooldown.expires_at = changed.pop((cooldown.user_id, cooldown.action))
+                session.add_all(
+                    Cooldown(user_id=user_id, action=action, expires_at=expires_at)
+                    for (user_id, action), expires_at in changed.items()
+                )
+        except Exception:
+            self.cooldowns.mark_dirty(keys)
+            raise
+        self.snapshots += 1
+        return len(keys)
+
+    # -------------------------------------------------------------------------
+    # Pending requests
+    # -------------------------------------------------------------------------
+
+    def put_request(self, request: PendingRequestSnapshot) -> None:
+        key = (request.to_user_id, request.request_type)
+        self.requests.set(key, request, _ttl(request.expires_at))
+
+    def get_request(self, to_user_id: int, request_type: RequestType) -> Optional[PendingRequestSnapshot]:
+        return self.requests.get((to_user_id, request_type))
+
+    def drop_request(self, request: PendingRequest) -> None:
+        """Forget a deleted request unless a newer one replaced it."""
+        key = (request.to_user_id, request.request_type)
+        cached = self.requests.get(key)
+        if cached is not None and cached.id == request.id:
+            self.requests.pop(key)
+
+    # -------------------------------------------------------------------------
+    # Dungeon locks
+    # -------------------------------------------------------------------------
+
+    def lock_user(self, user_id: int, expires_at: datetime) -> None:
+        self.dungeon.set(user_id, _utc(expires_at), _ttl(expires_at))
+
+    def locked_until(self, user_id: int) -> Optional[datetime]:
+        return self.dungeon.get(user_id)
+
+    def release_user(self, user_id: int) -> None:
+        self.dungeon.pop(user_id)
+
+    # -------------------------------------------------------------------------
+    # Transactions
+    # -------------------------------------------------------------------------
+
+    def on_commit(self, session: AsyncSession, callback: Callable[[], None]) -> None:
+        """Run callback once the session's transaction commits, while the state is loaded."""
+        if self.loaded:
+            after_commit(session, callback)
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def _on_timer(self, context) -> None:
+        try:
+            await self.snapshot()
+        except Exception as e:
+            logger.error(f"Ephemeral state snapshot failed: {e}")
+
+    async def start(self, job_queue=None) -> int:
+        loaded = await self.load()
+        if job_queue is not None:
+            interval = settings.ephemeral_snapshot_interval
+            job_queue.run_repeating(self._on_timer, interval=interval, first=interval, name=JOB_NAME)
+        logger.info(f"Ephemeral state loaded ({loaded} live entries)")
+        return loaded
+
+    async def stop(self) -> None:
+        """Write pending cooldowns before the database closes."""
+        if self.loaded:
+            await self.snapshot()
+
+    def clear(self) -> None:
+        self.cooldowns.clear()
+        self.requests.clear()
+        self.dungeon.clear()
+        self.loaded = False
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "cooldowns": self.cooldowns.stats(),
+            "requests": self.requests.stats(),
+            "dungeon": self.dungeon.stats(),
+            "snapshots": self.snapshots,
+        }
+
+
+# Global state instance
+_state: Optional[EphemeralState] = None
+
+
+def get_ephemeral_state() -> EphemeralState:
+    """Get or create the ephemeral state singleton."""
+    global _state
+    if _state is None:
+        _state = EphemeralState()
+    return _state
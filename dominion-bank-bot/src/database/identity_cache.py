@@ -0,0 +1,182 @@
+"""
+The Phantom Bot - Identity Cache
+In-process map of telegram_id / username to a compact user snapshot.
+"""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from src.config import settings
+from src.database.models import User, UserStatus, normalize_username
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """
+    Identity fields of a user, safe to keep across sessions.
+
+    Deliberately has no balance: balances always come from the database.
+    """
+    id: int
+    telegram_id: int
+    username: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    is_admin: bool
+    status: UserStatus
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            is_admin=bool(user.is_admin),
+            status=user.status,
+        )
+
+    @property
+    def display_name(self) -> str:
+        if self.username:
+            return f"@{self.username}"
+        elif self.first_name:
+            return self.first_name
+        return f"User#{self.telegram_id}"
+
+    def same_names(self, username: Optional[str], first_name: Optional[str]) -> bool:
+        """True if Telegram still reports the names stored in the database."""
+        return (not username or username == self.username) and (
+            not first_name or first_name == self.first_name
+        )
+
+
+class IdentityCache:
+    """
+    LRU of user snapshots keyed by telegram_id, with username and user id
+    indexes.
+
+    Filled on reads by UserRepository and invalidated by its writes
+    (get_or_create name changes, set_admin, placeholders), so identity
+    checks at the start of a command usually need no query. Entries also
+    expire after a TTL to bound staleness from writes made elsewhere.
+
+    Usage:
+        cache = get_identity_cache()
+        snapshot = cache.get(telegram_id)
+        cache.put(user)
+        cache.invalidate(user_id=user.id)
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_size = settings.identity_cache_size if max_size is None else max_size
+        self.ttl = settings.identity_cache_ttl if ttl is None else ttl
+        self._entries: OrderedDict[int, tuple[UserSnapshot, float]] = OrderedDict()
+        self._by_username: dict[str, int] = {}
+        self._by_id: dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, telegram_id: int) -> Optional[UserSnapshot]:
+        """Cached snapshot for a Telegram user, or None."""
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        snapshot, expires = entry
+        if expires <= time.monotonic():
+            self._remove(telegram_id)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        return snapshot
+
+    def get_by_username(self, username: str) -> Optional[UserSnapshot]:
+        """Cached snapshot for a username (case-insensitive, @ optional)."""
+        telegram_id = self._by_username.get(normalize_username(username) or "")
+        if telegram_id is None:
+            self.misses += 1
+            return None
+        return self.get(telegram_id)
+
+    def put(self, user: User) -> Optional[UserSnapshot]:
+        """Store a snapshot of a user. Placeholders (telegram_id 0) are skipped."""
+        if not user.telegram_id or self.max_size <= 0:
+            return None
+
+        snapshot = UserSnapshot.from_user(user)
+        self._remove(snapshot.telegram_id)
+        self._entries[snapshot.telegram_id] = (snapshot, time.monotonic() + self.ttl)
+        self._by_id[snapshot.id] = snapshot.telegram_id
+        username = normalize_username(snapshot.username)
+        if username:
+            self._by_username[username] = snapshot.telegram_id
+
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+        return snapshot
+
+    def invalidate(
+        self,
+        telegram_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        username: Optional[str] = None,
+    ) -> None:
+        """Drop whatever entries match any of the given keys."""
+        if user_id is not None and telegram_id is None:
+            telegram_id = self._by_id.get(user_id)
+        if telegram_id is not None:
+            self._remove(telegram_id)
+        if username:
+            key = normalize_username(username)
+            cached = self._by_username.get(key)
+            if cached is not None:
+                self._remove(cached)
+            self._by_username.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_username.clear()
+        self._by_id.clear()
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def _remove(self, telegram_id: int) -> None:
+        entry = self._entries.pop(telegram_id, None)
+        if entry is None:
+            return
+        snapshot = entry[0]
+        self._by_id.pop(snapshot.id, None)
+        username = normalize_username(snapshot.username)
+        if username and self._by_username.get(username) == telegram_id:
+            del self._by_username[username]
+
+
+# Global identity cache instance
+_identity_cache: Optional[IdentityCache] = None
+
+
+def get_identity_cache() -> IdentityCache:
+    """Get or create the identity cache singleton."""
+    global _identity_cache
+    if _identity_cache is None:
+        _identity_cache = IdentityCache()
+    return _identity_cache
@@ -0,0 +1,207 @@
+"""
+The Phantom Bot - Schema Migrations
+Small versioned upgrades for databases created before a column or index
+existed. create_all only creates missing tables, so changes to existing
+tables are applied here, once, and recorded in schema_migrations.
+"""
+import logging
+from typing import Awaitable, Callable
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.database.models import normalize_username
+
+logger = logging.getLogger(__name__)
+
+Migration = Callable[[AsyncConnection], Awaitable[None]]
+
+
+async def _column_names(conn: AsyncConnection, table: str) -> set[str]:
+    return await conn.run_sync(
+        lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns(table)}
+    )
+
+
+async def _table_names(conn: AsyncConnection) -> set[str]:
+    return await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+
+
+# =============================================================================
+# MIGRATIONS
+# =============================================================================
+
+async def _username_normalized(conn: AsyncConnection) -> None:
+    """
+    Add users.username_normalized, backfill it and index it uniquely.
+
+    When several rows normalize to the same username, a registered user
+    (telegram_id != 0) keeps it over import placeholders, then the oldest
+    row wins; the rest are left without a normalized username.
+    """
+    if "username_normalized" not in await _column_names(conn, "users"):
+        await conn.execute(text("ALTER TABLE users ADD COLUMN username_normalized VARCHAR(255)"))
+
+    rows = (await conn.execute(text(
+        "SELECT id, telegram_id, username FROM users "
+        "WHERE username IS NOT NULL ORDER BY (telegram_id = 0), id"
+    ))).all()
+
+    taken: set[str] = set()
+    updates = []
+    for user_id, _telegram_id, username in rows:
+        normalized = normalize_username(username)
+        if normalized in taken:
+            logger.warning(f"Username @{normalized} duplicated by user id {user_id}, not indexed")
+            normalized = None
+        elif normalized:
+            taken.add(normalized)
+        updates.append({"id": user_id, "normalized": normalized})
+
+    if updates:
+        await conn.execute(text("UPDATE users SET username_normalized = NULL"))
+        await conn.execute(
+            text("UPDATE users SET username_normalized = :normalized WHERE id = :id"),
+            updates,
+        )
+
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username_normalized "
+        "ON users (username_normalized)"
+    ))
+
+
+async def _deadline_indexes(conn: AsyncConnection) -> None:
+    """Index the deadline columns scanned by the timed event engine."""
+    await _create_indexes(conn, [
+        ("ix_dungeon_expires_at", "dungeon", "expires_at"),
+        ("ix_pending_requests_expires_at", "pending_requests", "expires_at"),
+        ("ix_contracts_status_ends_at", "contracts", "status, ends_at"),
+    ])
+
+
+async def _auction_indexes(conn: AsyncConnection) -> None:
+    """Index auction deadlines for settlement and the ending notice."""
+    await _create_indexes(conn, [
+        ("ix_auctions_status_ends_at", "auctions", "status, ends_at"),
+    ])
+
+
+async def _bid_escrow(conn: AsyncConnection) -> None:
+    """Hold the leading bids of active auctions placed before bid_escrow existed."""
+    if not {"auctions", "bid_escrow"} <= await _table_names(conn):
+        return
+    await conn.execute(text(
+        "INSERT INTO bid_escrow (auction_id, bidder_id, amount, held_at) "
+        "SELECT id, current_bidder_id, current_bid, CURRENT_TIMESTAMP FROM auctions "
+        "WHERE status = 'ACTIVE' AND current_bidder_id IS NOT NULL AND current_bid > 0 "
+        "AND id NOT IN (SELECT auction_id FROM bid_escrow)"
+    ))
+
+
+async def _expiry_indexes(conn: AsyncConnection) -> None:
+    """Index expires_at on punishments (active checks filter on it)."""
+    await _create_indexes(conn, [
+        ("ix_punishments_expires_at", "punishments", "expires_at"),
+    ])
+
+
+async def _ledger_stats(conn: AsyncConnection) -> None:
+    """Fill user_ledger_stats and tribute_pairs from the existing transactions."""
+    if not {"transactions", "user_ledger_stats", "tribute_pairs"} <= await _table_names(conn):
+        return
+    await conn.execute(text(
+        "INSERT INTO user_ledger_stats "
+        "(user_id, transaction_type, received, received_count, sent, sent_count) "
+        "SELECT recipient_id, transaction_type, SUM(amount), COUNT(*), 0, 0 FROM transactions "
+        "WHERE recipient_id IS NOT NULL GROUP BY recipient_id, transaction_type "
+        "ON CONFLICT (user_id, transaction_type) DO NOTHING"
+    ))
+    await conn.execute(text(
+        "INSERT INTO user_ledger_stats "
+        "(user_id, transaction_type, received, received_count, sent, sent_count) "
+        "SELECT sender_id, transaction_type, 0, 0, SUM(amount), COUNT(*) FROM transactions "
+        "WHERE sender_id IS NOT NULL GROUP BY sender_id, transaction_type "
+        "ON CONFLICT (user_id, transaction_type) DO UPDATE SET "
+        "sent = excluded.sent, sent_count = excluded.sent_count"
+    ))
+    await conn.execute(text(
+        "INSERT INTO tribute_pairs (recipient_id, sender_id, total, count) "
+        "SELECT recipient_id, sender_id, SUM(amount), COUNT(*) FROM transactions "
+        "WHERE transaction_type = 'TRIBUTE' AND sender_id IS NOT NULL "
+        "GROUP BY recipient_id, sender_id "
+        "ON CONFLICT (recipient_id, sender_id) DO NOTHING"
+    ))
+
+
+async def _economy_transaction_types(conn: AsyncConnection) -> None:
+    """
+    Add the economy rule transaction types to the PostgreSQL enum.
+
+    create_all does not alter an existing enum type; SQLite stores the
+    enum as VARCHAR and needs nothing.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    for name in ("ALTAR_INCOME", "WEALTH_TAX", "INACTIVITY_DECAY"):
+        await conn.execute(text(f"ALTER TYPE transactiontype ADD VALUE IF NOT EXISTS '{name}'"))
+
+
+async def _contract_reminded_at(conn: AsyncConnection) -> None:
+    """Add contracts.reminded_at (expiry reminder sent)."""
+    if "contracts" not in await _table_names(conn):
+        return
+    if "reminded_at" not in await _column_names(conn, "contracts"):
+        await conn.execute(text("ALTER TABLE contracts ADD COLUMN reminded_at TIMESTAMP"))
+
+
+async def _create_indexes(conn: AsyncConnection, indexes: list[tuple[str, str, str]]) -> None:
+    """Create (name, table, columns) indexes; tables not created yet are skipped."""
+    tables = await _table_names(conn)
+    for name, table, columns in indexes:
+        if table in tables:
+            await conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+# Applied in order; never rename or reorder an entry once released
+MIGRATIONS: list[tuple[str, Migration]] = [
+    ("001_username_normalized", _username_normalized),
+    ("002_deadline_indexes", _deadline_indexes),
+    ("003_auction_indexes", _auction_indexes),
+    ("004_bid_escrow", _bid_escrow),
+    ("005_expiry_indexes", _expiry_indexes),
+    ("006_ledger_stats", _ledger_stats),
+    ("007_contract_reminded_at", _contract_reminded_at),
+    ("008_economy_transaction_types", _economy_transaction_types),
+]
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+async def run_migrations(conn: AsyncConnection) -> list[str]:
+    """
+    Apply pending migrations inside the given transaction.
+
+    Returns:
+        Names of the migrations applied
+    """
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "name VARCHAR(100) PRIMARY KEY, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    done = set((await conn.execute(text("SELECT name FROM schema_migrations"))).scalars())
+
+    applied = []
+    for name, migration in MIGRATIONS:
+        if name in done:
+            continue
+        await migration(conn)
+        await conn.execute(
+            text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name}
+        )
+        applied.append(name)
+        logger.info(f"Applied migration {name}")
+    return applied
@@ -10,13 +10,14 @@ from sqlalchemy import (
     DateTime,
     Enum as SQLEnum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
     func,
 )
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, validates
 
 
 class Base(DeclarativeBase):
@@ -24,6 +25,13 @@ class Base(DeclarativeBase):
     pass
 
 
+def normalize_username(username: Optional[str]) -> Optional[str]:
+    """Lowercase a username and strip the leading @ (None if empty)."""
+    if not username:
+        return None
+    return username.strip().lstrip("@").lower() or None
+
+
 # =============================================================================
 # ENUMS
 # =============================================================================
@@ -40,6 +48,9 @@ class TransactionType(str, Enum):
     COLLAR = "collar"
     TRIBUTE = "tribute"
     DUNGEON = "dungeon"
+    ALTAR_INCOME = "altar_income"
+    WEALTH_TAX = "wealth_tax"
+    INACTIVITY_DECAY = "inactivity_decay"
 
 
 class UserStatus(str, Enum):
@@ -134,6 +145,10 @@ class User(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False, index=True)
     username: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, index=True)
+    # Lowercase username without @, kept in sync by _sync_username_normalized
+    username_normalized: Mapped[Optional[str]] = mapped_column(
+        String(255), nullable=True, unique=True, index=True
+    )
     first_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     last_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     balance: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
@@ -179,6 +194,12 @@ class User(Base):
         uselist=False
     )
 
+    @validates("username")
+    def _sync_username_normalized(self, key: str, username: Optional[str]) -> Optional[str]:
+        """Keep username_normalized in sync on insert and every assignment."""
+        self.username_normalized = normalize_username(username)
+        return username
+
     @property
     def display_name(self) -> str:
         """Get user display name."""
@@ -300,7 +321,7 @@ class Cooldown(Base):
         index=True
     )
     action: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=func.now(),
@@ -386,7 +407,7 @@ class PendingRequest(Base):
     terms: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     duration_days: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=func.now(),
@@ -423,7 +444,7 @@ class Punishment(Base):
     )
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     cost: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
-    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
     completed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
@@ -476,6 +497,10 @@ class Dungeon(Base):
 class Auction(Base):
     """Auction model - users auctioning other users or services."""
     __tablename__ = "auctions"
+    __table_args__ = (
+        # Range scans for auctions reaching their end
+        Index("ix_auctions_status_ends_at", "status", "ends_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     seller_id: Mapped[int] = mapped_column(
@@ -551,9 +576,39 @@ class Bid(Base):
         return f"<Bid(id={self.id}, auction_id={self.auction_id}, amount={self.amount})>"
 
 
+class BidEscrow(Base):
+    """Funds held for the leading bid of an active auction (one row per auction)."""
+    __tablename__ = "bid_escrow"
+
+    auction_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("auctions.id"),
+        primary_key=True
+    )
+    bidder_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("users.id"),
+        nullable=False,
+        index=True
+    )
+    amount: Mapped[int] = mapped_column(Integer, nullable=False)
+    held_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<BidEscrow(auction_id={self.auction_id}, bidder_id={self.bidder_id}, amount={self.amount})>"
+
+
 class Contract(Base):
     """Contract model - formal agreements between users."""
     __tablename__ = "contracts"
+    __table_args__ = (
+        # Range scans for contracts reaching their end
+        Index("ix_contracts_status_ends_at", "status", "ends_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     dom_id: Mapped[int] = mapped_column(
@@ -576,6 +631,8 @@ class Contract(Base):
     )
     starts_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     ends_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # Set when both parties were told the contract is about to expire
+    reminded_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     broken_by: Mapped[Optional[int]] = mapped_column(
         Integer,
         ForeignKey("users.id"),
@@ -627,6 +684,76 @@ class Altar(Base):
         return f"<Altar(for_user_id={self.for_user_id}, daily_amount={self.daily_amount})>"
 
 
+class EconomyRun(Base):
+    """Ledger of periodic economy rules applied (one row per rule and period)."""
+    __tablename__ = "economy_runs"
+    __table_args__ = (
+        UniqueConstraint("rule", "period", name="uq_economy_runs_rule_period"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    rule: Mapped[str] = mapped_column(String(50), nullable=False)
+    period: Mapped[str] = mapped_column(String(20), nullable=False)
+    users_affected: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_amount: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    ran_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<EconomyRun(rule={self.rule}, period={self.period}, users={self.users_affected})>"
+
+
+class UserLedgerStats(Base):
+    """Running totals of the transactions of a user, per transaction type."""
+    __tablename__ = "user_ledger_stats"
+    __table_args__ = (
+        Index("ix_user_ledger_stats_type_received", "transaction_type", "received"),
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("users.id"),
+        primary_key=True
+    )
+    transaction_type: Mapped[TransactionType] = mapped_column(
+        SQLEnum(TransactionType),
+        primary_key=True
+    )
+    received: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    received_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sent: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    sent_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<UserLedgerStats(user_id={self.user_id}, type={self.transaction_type}, "
+            f"received={self.received}, sent={self.sent})>"
+        )
+
+
+class TributePair(Base):
+    """Running total of the tributes one user paid to another."""
+    __tablename__ = "tribute_pairs"
+    __table_args__ = (
+        Index("ix_tribute_pairs_recipient_total", "recipient_id", "total"),
+    )
+
+    recipient_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("users.id"),
+        primary_key=True
+    )
+    sender_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("users.id"),
+        primary_key=True
+    )
+    total: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<TributePair(recipient_id={self.recipient_id}, sender_id={self.sender_id}, total={self.total})>"
+
+
 # =============================================================================
 # PROFILE MODELS
 # =============================================================================
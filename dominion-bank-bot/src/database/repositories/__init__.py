@@ -13,6 +13,8 @@ from src.database.repositories.collar import CollarRepository
 from src.database.repositories.contract import ContractRepository
 from src.database.repositories.cooldown import CooldownRepository
 from src.database.repositories.dungeon import DungeonRepository
+from src.database.repositories.escrow import EscrowRepository
+from src.database.repositories.ledger_stats import LedgerStatsRepository
 from src.database.repositories.pending_request import PendingRequestRepository
 from src.database.repositories.profile import ProfileRepository, UserSettingsRepository
 from src.database.repositories.punishment import PunishmentRepository
@@ -33,10 +35,12 @@ __all__ = [
     "PunishmentRepository",
     "DungeonRepository",
     "AuctionRepository",
+    "EscrowRepository",
     "ContractRepository",
     # Profile
     "ProfileRepository",
     "UserSettingsRepository",
     # Economy
     "AltarRepository",
+    "LedgerStatsRepository",
 ]
@@ -5,6 +5,7 @@ from typing import Optional
 
 from sqlalchemy import and_, select
 
+from src.database.auth_cache import get_auth_cache
 from src.database.models import Admin
 from src.database.repositories.base import BaseRepository
 
@@ -16,12 +17,18 @@ class AdminRepository(BaseRepository[Admin]):
 
     async def is_admin(self, user_id: int, group_id: int) -> bool:
         """Check if user is admin in a group."""
-        result = await self.session.execute(
-            select(Admin).where(
-                and_(Admin.user_id == user_id, Admin.group_id == group_id)
+        return user_id in await self.get_group_admin_ids(group_id)
+
+    async def get_group_admin_ids(self, group_id: int) -> frozenset[int]:
+        """User ids of a group's admins, cached until the group's admins change."""
+        cache = get_auth_cache()
+        admins = cache.get_group_admins(group_id)
+        if admins is None:
+            result = await self.session.execute(
+                select(Admin.user_id).where(Admin.group_id == group_id)
             )
-        )
-        return result.scalar_one_or_none() is not None
+            admins = cache.put_group_admins(group_id, result.scalars().all())
+        return admins
 
     async def add_admin(
         self,
@@ -37,6 +44,7 @@ class AdminRepository(BaseRepository[Admin]):
         )
         self.session.add(admin)
         await self.session.flush()
+        get_auth_cache().invalidate_group(group_id)
         return admin
 
     async def remove_admin(self, user_id: int, group_id: int) -> bool:
@@ -50,5 +58,6 @@ class AdminRepository(BaseRepository[Admin]):
         if admin:
             await self.session.delete(admin)
             await self.session.flush()
+            get_auth_cache().invalidate_group(group_id)
             return True
         return False
@@ -4,12 +4,30 @@ The Phantom Bot - Auction Repository
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Sequence
 
-from sqlalchemy import and_, desc, func, select
+from sqlalchemy import and_, desc, func, insert, select, update
 
+from src.config import settings
 from src.database.models import Auction, AuctionStatus, Bid
 from src.database.repositories.base import BaseRepository
 
 
+def snipe_deadline(ends_at: datetime, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    New ends_at for a bid placed at now, or None if it does not extend.
+
+    A bid in the last AUCTION_SNIPE_WINDOW seconds moves ends_at to
+    AUCTION_SNIPE_EXTENSION seconds from now, so other bidders can answer.
+    """
+    if settings.auction_snipe_window <= 0:
+        return None
+    now = now or datetime.now(timezone.utc)
+    if ends_at.tzinfo is None:
+        ends_at = ends_at.replace(tzinfo=timezone.utc)
+    if ends_at - now < timedelta(seconds=settings.auction_snipe_window):
+        return now + timedelta(seconds=settings.auction_snipe_extension)
+    return None
+
+
 class AuctionRepository(BaseRepository[Auction]):
     """Repository for Auction operations."""
 
@@ -76,7 +94,7 @@ class AuctionRepository(BaseRepository[Auction]):
         bidder_id: int,
         amount: int,
     ) -> Optional[Bid]:
-        """Place a bid on an auction."""
+        """Place a bid on an auction (late bids extend it, see snipe_deadline)."""
         auction = await self.get_by_id(auction_id)
         if not auction or auction.status != AuctionStatus.ACTIVE:
             return None
@@ -91,9 +109,56 @@ class AuctionRepository(BaseRepository[Auction]):
         auction.current_bid = amount
         auction.current_bidder_id = bidder_id
 
+        extended = snipe_deadline(auction.ends_at)
+        if extended:
+            auction.ends_at = extended
+
         await self.session.flush()
         return bid
 
+    async def record_bid(
+        self,
+        auction_id: int,
+        bidder_id: int,
+        amount: int,
+        expected_bid: Optional[int],
+        ends_at: Optional[datetime] = None,
+    ) -> bool:
+        """
+        Make a bid the leading one if the auction is still as the caller saw it.
+
+        The UPDATE only matches an active, unexpired auction whose
+        current_bid is still expected_bid, so a bid decided on stale state
+        changes nothing and returns False.
+
+        Args:
+            ends_at: New end of the auction (anti-sniping), if it moves
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        values = {"current_bid": amount, "current_bidder_id": bidder_id}
+        if ends_at is not None:
+            values["ends_at"] = ends_at
+        result = await self.session.execute(
+            update(Auction)
+            .where(
+                and_(
+                    Auction.id == auction_id,
+                    Auction.status == AuctionStatus.ACTIVE,
+                    Auction.ends_at > now,
+                    Auction.current_bid.is_(None) if expected_bid is None
+                    else Auction.current_bid == expected_bid,
+                )
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return False
+        await self.session.execute(
+            insert(Bid).values(auction_id=auction_id, bidder_id=bidder_id, amount=amount)
+        )
+        return True
+
     async def complete(self, auction_id: int) -> bool:
         """Mark auction as completed."""
         auction = await self.get_by_id(auction_id)
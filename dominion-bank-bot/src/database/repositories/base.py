@@ -4,7 +4,7 @@ Common patterns and abstractions for repository classes.
 """
 from typing import Generic, Optional, Sequence, Type, TypeVar
 
-from sqlalchemy import select
+from sqlalchemy import delete, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import Base
@@ -68,3 +68,23 @@ class BaseRepository(Generic[T]):
             select(func.count()).select_from(self.model)
         )
         return result.scalar_one()
+
+    async def delete_where(self, *criteria, limit: Optional[int] = None) -> int:
+        """
+        Delete matching rows with one set-based DELETE, without loading them.
+
+        Args:
+            limit: Delete at most this many rows (by primary key), to keep
+                each statement and its locks short
+
+        Returns:
+            Number of rows deleted
+        """
+        stmt = delete(self.model)
+        if limit is None:
+            stmt = stmt.where(*criteria)
+        else:
+            (key,) = inspect(self.model).primary_key
+            stmt = stmt.where(key.in_(select(key).where(*criteria).limit(limit)))
+        result = await self.session.execute(stmt.execution_options(synchronize_session=False))
+        return result.rowcount
@@ -3,28 +3,44 @@ The Phantom Bot - Collar Repository
 """
 from typing import Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import literal, select
+from sqlalchemy.orm import joinedload
 
+from src.database.collar_graph import MAX_DEPTH, get_collar_graph, walk
 from src.database.models import Collar, CollarType
 from src.database.repositories.base import BaseRepository
 
 
 class CollarRepository(BaseRepository[Collar]):
-    """Repository for Collar operations."""
+    """
+    Repository for Collar operations.
+
+    Who owns whom is answered from the collar graph once it is loaded;
+    rows are only read when the caller needs collar details. Cold (before
+    the graph is loaded) hierarchy queries use recursive CTEs instead.
+    """
 
     model = Collar
 
     async def get_by_sub(self, sub_id: int) -> Optional[Collar]:
         """Get collar by sub's user ID."""
+        graph = get_collar_graph()
+        if graph.loaded and graph.owner_of(sub_id) is None:
+            return None
+
         result = await self.session.execute(
-            select(Collar).where(Collar.sub_id == sub_id)
+            select(Collar).options(joinedload(Collar.owner)).where(Collar.sub_id == sub_id)
         )
         return result.scalar_one_or_none()
 
     async def get_by_owner(self, owner_id: int) -> Sequence[Collar]:
         """Get all collars owned by a user."""
+        graph = get_collar_graph()
+        if graph.loaded and not graph.count_subs(owner_id):
+            return []
+
         result = await self.session.execute(
-            select(Collar).where(Collar.owner_id == owner_id)
+            select(Collar).options(joinedload(Collar.sub)).where(Collar.owner_id == owner_id)
         )
         return result.scalars().all()
 
@@ -44,6 +60,8 @@ class CollarRepository(BaseRepository[Collar]):
         )
         self.session.add(collar)
         await self.session.flush()
+        graph = get_collar_graph()
+        graph.on_commit(self.session, lambda: graph.add(owner_id, sub_id))
         return collar
 
     async def remove(self, collar_id: int) -> bool:
@@ -51,6 +69,7 @@ class CollarRepository(BaseRepository[Collar]):
         collar = await self.session.get(Collar, collar_id)
         if collar:
             await self.session.delete(collar)
+            self._forget(collar.sub_id)
             return True
         return False
 
@@ -60,10 +79,111 @@ class CollarRepository(BaseRepository[Collar]):
         if collar:
             await self.session.delete(collar)
             await self.session.flush()
+            self._forget(sub_id)
             return True
         return False
 
+    def _forget(self, sub_id: int) -> None:
+        graph = get_collar_graph()
+        graph.on_commit(self.session, lambda: graph.remove(sub_id))
+
     async def is_collared(self, sub_id: int) -> bool:
         """Check if user is collared."""
-        collar = await self.get_by_sub(sub_id)
-        return collar is not None
+        return await self.get_owner_id(sub_id) is not None
+
+    # =========================================================================
+    # OWNERSHIP GRAPH
+    # =========================================================================
+
+    async def get_owner_id(self, sub_id: int) -> Optional[int]:
+        """User ID of the sub's owner, or None if the sub is free."""
+        graph = get_collar_graph()
+        if graph.loaded:
+            return graph.owner_of(sub_id)
+
+        result = await self.session.execute(
+            select(Collar.owner_id).where(Collar.sub_id == sub_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_sub_ids(self, owner_id: int) -> list[int]:
+        """User IDs of the subs wearing owner_id's collar."""
+        graph = get_collar_graph()
+        if graph.loaded:
+            return graph.subs_of(owner_id)
+
+        result = await self.session.execute(
+            select(Collar.sub_id).where(Collar.owner_id == owner_id).order_by(Collar.sub_id)
+        )
+        return list(result.scalars().all())
+
+    async def count_subs(self, owner_id: int) -> int:
+        """Number of subs wearing owner_id's collar."""
+        graph = get_collar_graph()
+        if graph.loaded:
+            return graph.count_subs(owner_id)
+        return len(await self.get_sub_ids(owner_id))
+
+    async def get_owner_chain(self, sub_id: int, max_depth: Optional[int] = MAX_DEPTH) -> list[int]:
+        """
+        Owners above a sub, nearest first.
+
+        Args:
+            max_depth: Stop after this many owners (None walks to the top)
+        """
+        graph = get_collar_graph()
+        if graph.loaded:
+            return graph.owner_chain(sub_id, max_depth)
+
+        if max_depth is None:
+            max_depth = await self.count()
+        chain = (
+            select(Collar.owner_id, literal(1).label("depth"))
+            .where(Collar.sub_id == sub_id)
+            .cte("chain", recursive=True)
+        )
+        chain = chain.union_all(
+            select(Collar.owner_id, chain.c.depth + 1)
+            .join(chain, Collar.sub_id == chain.c.owner_id)
+            .where(chain.c.depth < max_depth)
+        )
+        result = await self.session.execute(select(chain.c.owner_id).order_by(chain.c.depth))
+
+        owners = []
+        for owner_id in result.scalars():
+            if owner_id == sub_id or owner_id in owners:
+                break
+            owners.append(owner_id)
+        return owners
+
+    async def get_hierarchy(self, root_id: int, max_depth: int = MAX_DEPTH) -> list[tuple[int, int, int]]:
+        """
+        Everyone below a user, depth-first in display order.
+
+        Returns:
+            (user_id, owner_id, depth) tuples, depth 1 being root's own subs
+        """
+        graph = get_collar_graph()
+        if graph.loaded:
+            return graph.hierarchy(root_id, max_depth)
+
+        tree = (
+            select(Collar.sub_id, Collar.owner_id, literal(1).label("depth"))
+            .where(Collar.owner_id == root_id)
+            .cte("tree", recursive=True)
+        )
+        tree = tree.union_all(
+            select(Collar.sub_id, Collar.owner_id, tree.c.depth + 1)
+            .join(tree, Collar.owner_id == tree.c.sub_id)
+            .where(tree.c.depth < max_depth)
+        )
+        result = await self.session.execute(select(tree.c.sub_id, tree.c.owner_id).distinct())
+
+        children: dict[int, list[int]] = {}
+        for sub_id, owner_id in result.all():
+            children.setdefault(owner_id, []).append(sub_id)
+        return walk(root_id, lambda user_id: children.get(user_id, ()), max_depth)
+
+    async def would_cycle(self, owner_id: int, sub_id: int) -> bool:
+        """True if owner_id collaring sub_id would make someone their own owner."""
+        return owner_id == sub_id or sub_id in await self.get_owner_chain(owner_id, max_depth=None)
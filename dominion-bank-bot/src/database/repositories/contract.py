@@ -4,7 +4,7 @@ The Phantom Bot - Contract Repository
 from datetime import datetime, timezone
 from typing import Optional, Sequence
 
-from sqlalchemy import and_, desc, or_, select
+from sqlalchemy import and_, desc, func, or_, select
 
 from src.database.models import Contract, ContractStatus
 from src.database.repositories.base import BaseRepository
@@ -71,6 +71,18 @@ class ContractRepository(BaseRepository[Contract]):
         )
         return result.scalars().all()
 
+    async def count_active_by_user(self, user_id: int) -> int:
+        """Count active contracts for a user (expired ones are closed at ends_at)."""
+        result = await self.session.execute(
+            select(func.count()).where(
+                and_(
+                    or_(Contract.dom_id == user_id, Contract.sub_id == user_id),
+                    Contract.status == ContractStatus.ACTIVE,
+                )
+            )
+        )
+        return result.scalar_one()
+
     async def sign(self, contract_id: int) -> bool:
         """Sign (activate) a contract."""
         contract = await self.get_by_id(contract_id)
@@ -6,6 +6,7 @@ from typing import Optional
 
 from sqlalchemy import and_, func, select
 
+from src.database.ephemeral_store import get_ephemeral_state
 from src.database.models import Cooldown
 from src.database.repositories.base import BaseRepository
 
@@ -17,6 +18,10 @@ class CooldownRepository(BaseRepository[Cooldown]):
 
     async def is_on_cooldown(self, user_id: int, action: str) -> Optional[datetime]:
         """Check if user is on cooldown. Returns expiry time if on cooldown."""
+        state = get_ephemeral_state()
+        if state.loaded:
+            return state.cooldowns.get((user_id, action))
+
         result = await self.session.execute(
             select(Cooldown).where(
                 and_(
@@ -38,6 +43,12 @@ class CooldownRepository(BaseRepository[Cooldown]):
         """Set a cooldown for a user action."""
         expires_at = datetime.now(timezone.utc) + timedelta(seconds=duration_seconds)
 
+        # Kept in memory and written by the next snapshot
+        state = get_ephemeral_state()
+        if state.loaded:
+            state.cooldowns.set((user_id, action), expires_at, duration_seconds, dirty=True)
+            return Cooldown(user_id=user_id, action=action, expires_at=expires_at)
+
         result = await self.session.execute(
             select(Cooldown).where(
                 and_(Cooldown.user_id == user_id, Cooldown.action == action)
@@ -58,12 +69,6 @@ class CooldownRepository(BaseRepository[Cooldown]):
         await self.session.flush()
         return cooldown
 
-    async def clear_expired(self) -> int:
-        """Clear expired cooldowns. Returns count of cleared."""
-        result = await self.session.execute(
-            select(Cooldown).where(Cooldown.expires_at <= func.now())
-        )
-        cooldowns = result.scalars().all()
-        for cd in cooldowns:
-            await self.session.delete(cd)
-        return len(cooldowns)
+    async def clear_expired(self, limit: Optional[int] = None) -> int:
+        """Clear expired cooldowns (at most limit). Returns count of cleared."""
+        return await self.delete_where(Cooldown.expires_at <= func.now(), limit=limit)
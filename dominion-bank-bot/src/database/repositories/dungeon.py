@@ -6,6 +6,7 @@ from typing import Optional, Sequence
 
 from sqlalchemy import and_, func, select
 
+from src.database.ephemeral_store import get_ephemeral_state
 from src.database.models import Dungeon, DungeonType
 from src.database.repositories.base import BaseRepository
 
@@ -34,6 +35,8 @@ class DungeonRepository(BaseRepository[Dungeon]):
         )
         self.session.add(dungeon)
         await self.session.flush()
+        state = get_ephemeral_state()
+        state.on_commit(self.session, lambda: state.lock_user(user_id, expires_at))
         return dungeon
 
     async def get_by_user(self, user_id: int) -> Optional[Dungeon]:
@@ -50,6 +53,10 @@ class DungeonRepository(BaseRepository[Dungeon]):
 
     async def is_locked(self, user_id: int) -> bool:
         """Check if user is locked in dungeon."""
+        state = get_ephemeral_state()
+        if state.loaded:
+            return state.locked_until(user_id) is not None
+
         dungeon = await self.get_by_user(user_id)
         return dungeon is not None
 
@@ -62,6 +69,8 @@ class DungeonRepository(BaseRepository[Dungeon]):
         if dungeon:
             await self.session.delete(dungeon)
             await self.session.flush()
+            state = get_ephemeral_state()
+            state.on_commit(self.session, lambda: state.release_user(user_id))
             return True
         return False
 
@@ -72,12 +81,6 @@ class DungeonRepository(BaseRepository[Dungeon]):
         )
         return result.scalars().all()
 
-    async def clear_expired(self) -> int:
-        """Release all users with expired dungeon time."""
-        result = await self.session.execute(
-            select(Dungeon).where(Dungeon.expires_at <= func.now())
-        )
-        dungeons = result.scalars().all()
-        for d in dungeons:
-            await self.session.delete(d)
-        return len(dungeons)
+    async def clear_expired(self, limit: Optional[int] = None) -> int:
+        """Release all users with expired dungeon time. At most limit rows per call."""
+        return await self.delete_where(Dungeon.expires_at <= func.now(), limit=limit)
@@ -0,0 +1,82 @@
+"""
+The Phantom Bot - Bid Escrow Repository
+"""
+from typing import Optional
+
+from sqlalchemy import and_, delete, func, insert, update
+
+from src.database.models import BidEscrow, User
+from src.database.repositories.base import BaseRepository
+
+
+class EscrowRepository(BaseRepository[BidEscrow]):
+    """
+    Repository for funds held by auction bids.
+
+    Every change is a conditional UPDATE/INSERT/DELETE, so callers never
+    read a balance and write it back.
+    """
+
+    model = BidEscrow
+
+    async def hold(
+        self,
+        auction_id: int,
+        bidder_id: int,
+        amount: int,
+        previous: Optional[tuple[int, int]] = None,
+    ) -> bool:
+        """
+        Make (bidder_id, amount) the hold of an auction.
+
+        The previous hold, given as (bidder_id, amount), is refunded first,
+        so a bidder raising their own bid only needs the difference.
+
+        Returns:
+            False if the bidder cannot cover the amount; the caller must
+            roll back, since the refund was already applied
+        """
+        if previous:
+            await self._credit(previous[0], previous[1])
+
+        result = await self.session.execute(
+            update(User)
+            .where(and_(User.id == bidder_id, User.balance >= amount))
+            .values(balance=User.balance - amount)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return False
+
+        if previous:
+            await self.session.execute(
+                update(BidEscrow)
+                .where(BidEscrow.auction_id == auction_id)
+                .values(bidder_id=bidder_id, amount=amount, held_at=func.now())
+            )
+        else:
+            await self.session.execute(
+                insert(BidEscrow).values(auction_id=auction_id, bidder_id=bidder_id, amount=amount)
+            )
+        return True
+
+    async def release(self, auction_id: int) -> Optional[tuple[int, int]]:
+        """Refund and drop the hold of an auction. Returns (bidder_id, amount) refunded."""
+        result = await self.session.execute(
+            delete(BidEscrow)
+            .where(BidEscrow.auction_id == auction_id)
+            .returning(BidEscrow.bidder_id, BidEscrow.amount)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        await self._credit(row.bidder_id, row.amount)
+        return row.bidder_id, row.amount
+
+    async def _credit(self, user_id: int, amount: int) -> None:
+        await self.session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(balance=User.balance + amount)
+            .execution_options(synchronize_session=False)
+        )
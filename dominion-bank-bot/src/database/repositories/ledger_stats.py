@@ -0,0 +1,159 @@
+"""
+The Phantom Bot - Ledger Stats Repository
+"""
+from typing import Any, Iterable, Mapping, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.database.models import Transaction, TransactionType, TributePair, UserLedgerStats
+from src.database.repositories.base import BaseRepository
+
+# Transaction column of each side -> (total, count) columns of UserLedgerStats
+_SIDES = {
+    "recipient_id": ("received", "received_count"),
+    "sender_id": ("sent", "sent_count"),
+}
+
+# INSERT ... ON CONFLICT constructs per supported dialect
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+class LedgerStatsRepository(BaseRepository[UserLedgerStats]):
+    """
+    Repository for the running totals derived from the transactions table.
+
+    user_ledger_stats keeps, per user and transaction type, what the user
+    received and sent; tribute_pairs keeps what each sender paid each
+    recipient in tributes. Both are incremented in the same session as
+    the transactions they count (TransactionRepository.create and the
+    batch writers), so they commit or roll back together. rebuild()
+    recomputes them from scratch.
+    """
+
+    model = UserLedgerStats
+
+    @property
+    def _insert(self):
+        return _INSERTS[self.session.bind.dialect.name]
+
+    async def record(
+        self,
+        recipient_id: int,
+        amount: int,
+        transaction_type: TransactionType,
+        sender_id: Optional[int] = None,
+    ) -> None:
+        """Count one transaction."""
+        await self.record_many([{
+            "sender_id": sender_id,
+            "recipient_id": recipient_id,
+            "amount": amount,
+            "transaction_type": transaction_type,
+        }])
+
+    async def record_many(self, transactions: Iterable[Mapping[str, Any]]) -> None:
+        """Count transactions given as dicts with the Transaction column names."""
+        sides: dict[str, dict[tuple, list[int]]] = {side: {} for side in _SIDES}
+        pairs: dict[tuple[int, int], list[int]] = {}
+        for tx in transactions:
+            for side, totals in sides.items():
+                if tx.get(side) is not None:
+                    _add(totals, (tx[side], tx["transaction_type"]), tx["amount"])
+            if tx["transaction_type"] == TransactionType.TRIBUTE and tx.get("sender_id") is not None:
+                _add(pairs, (tx["recipient_id"], tx["sender_id"]), tx["amount"])
+
+        for side, totals in sides.items():
+            if not totals:
+                continue
+            total, count = _SIDES[side]
+            await self.session.execute(
+                _stats_upsert(self._insert, total, count),
+                [
+                    {"user_id": user_id, "transaction_type": tx_type, total: amount, count: n}
+                    for (user_id, tx_type), (amount, n) in totals.items()
+                ],
+            )
+        if pairs:
+            await self.session.execute(
+                _pairs_upsert(self._insert),
+                [
+                    {"recipient_id": recipient_id, "sender_id": sender_id, "total": amount, "count": n}
+                    for (recipient_id, sender_id), (amount, n) in pairs.items()
+                ],
+            )
+
+    async def record_where(self, *criteria) -> None:
+        """Count the transactions matching criteria with set-based INSERT ... SELECT."""
+        for side, (total, count) in _SIDES.items():
+            column = getattr(Transaction, side)
+            source = (
+                select(column, Transaction.transaction_type, func.sum(Transaction.amount), func.count())
+                .where(column.is_not(None), *criteria)
+                .group_by(column, Transaction.transaction_type)
+            )
+            await self.session.execute(_stats_upsert(self._insert, total, count, source))
+
+        source = (
+            select(
+                Transaction.recipient_id,
+                Transaction.sender_id,
+                func.sum(Transaction.amount),
+                func.count(),
+            )
+            .where(
+                Transaction.transaction_type == TransactionType.TRIBUTE,
+                Transaction.sender_id.is_not(None),
+                *criteria,
+            )
+            .group_by(Transaction.recipient_id, Transaction.sender_id)
+        )
+        await self.session.execute(_pairs_upsert(self._insert, source))
+
+    async def rebuild(self) -> tuple[int, int]:
+        """Recompute both tables from the transactions table. Returns (stats rows, pairs)."""
+        await self.session.execute(delete(TributePair))
+        await self.session.execute(delete(UserLedgerStats))
+        await self.record_where()
+        stats = await self.session.execute(select(func.count()).select_from(UserLedgerStats))
+        pairs = await self.session.execute(select(func.count()).select_from(TributePair))
+        return stats.scalar_one(), pairs.scalar_one()
+
+    async def get(self, user_id: int, transaction_type: TransactionType) -> Optional[UserLedgerStats]:
+        return await self.session.get(UserLedgerStats, (user_id, transaction_type))
+
+
+def _add(totals: dict, key: tuple, amount: int) -> None:
+    entry = totals.setdefault(key, [0, 0])
+    entry[0] += amount
+    entry[1] += 1
+
+
+def _stats_upsert(insert, total: str, count: str, source=None):
+    """Add (total, count) to a user's row, creating it if missing."""
+    stmt = insert(UserLedgerStats)
+    if source is not None:
+        stmt = stmt.from_select(["user_id", "transaction_type", total, count], source)
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "transaction_type"],
+        set_={
+            total: getattr(UserLedgerStats, total) + getattr(stmt.excluded, total),
+            count: getattr(UserLedgerStats, count) + getattr(stmt.excluded, count),
+        },
+    )
+
+
+def _pairs_upsert(insert, source=None):
+    stmt = insert(TributePair)
+    if source is not None:
+        stmt = stmt.from_select(["recipient_id", "sender_id", "total", "count"], source)
+    return stmt.on_conflict_do_update(
+        index_elements=["recipient_id", "sender_id"],
+        set_={
+            "total": TributePair.total + stmt.excluded.total,
+            "count": TributePair.count + stmt.excluded.count,
+        },
+    )
@@ -2,19 +2,51 @@
 The Phantom Bot - Pending Request Repository
 """
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Union
 
 from sqlalchemy import and_, func, select
 
+from src.database.ephemeral_store import PendingRequestSnapshot, get_ephemeral_state
 from src.database.models import CollarType, PendingRequest, RequestType
 from src.database.repositories.base import BaseRepository
 
 
 class PendingRequestRepository(BaseRepository[PendingRequest]):
-    """Repository for PendingRequest operations."""
+    """
+    Repository for PendingRequest operations.
+
+    Once the ephemeral state is loaded, lookups are answered from memory
+    with a PendingRequestSnapshot; creations and deletions still go to the
+    database and are mirrored in memory on commit.
+    """
 
     model = PendingRequest
 
+    def _remember(self, request: PendingRequest) -> None:
+        state = get_ephemeral_state()
+        snapshot = PendingRequestSnapshot.from_request(request)
+        state.on_commit(self.session, lambda: state.put_request(snapshot))
+
+    async def _get_pending(
+        self,
+        to_user_id: int,
+        request_type: RequestType,
+    ) -> Optional[Union[PendingRequest, PendingRequestSnapshot]]:
+        state = get_ephemeral_state()
+        if state.loaded:
+            return state.get_request(to_user_id, request_type)
+
+        result = await self.session.execute(
+            select(PendingRequest).where(
+                and_(
+                    PendingRequest.to_user_id == to_user_id,
+                    PendingRequest.request_type == request_type,
+                    PendingRequest.expires_at > func.now(),
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+
     async def create_collar_request(
         self,
         from_user_id: int,
@@ -33,20 +65,14 @@ class PendingRequestRepository(BaseRepository[PendingRequest]):
         )
         self.session.add(request)
         await self.session.flush()
+        self._remember(request)
         return request
 
-    async def get_pending_collar(self, to_user_id: int) -> Optional[PendingRequest]:
+    async def get_pending_collar(
+        self, to_user_id: int
+    ) -> Optional[Union[PendingRequest, PendingRequestSnapshot]]:
         """Get pending collar request for a user."""
-        result = await self.session.execute(
-            select(PendingRequest).where(
-                and_(
-                    PendingRequest.to_user_id == to_user_id,
-                    PendingRequest.request_type == RequestType.COLLAR,
-                    PendingRequest.expires_at > func.now(),
-                )
-            )
-        )
-        return result.scalar_one_or_none()
+        return await self._get_pending(to_user_id, RequestType.COLLAR)
 
     async def delete(self, request_id: int) -> bool:
         """Delete a pending request."""
@@ -54,19 +80,14 @@ class PendingRequestRepository(BaseRepository[PendingRequest]):
         if request:
             await self.session.delete(request)
             await self.session.flush()
+            state = get_ephemeral_state()
+            state.on_commit(self.session, lambda: state.drop_request(request))
             return True
         return False
 
-    async def clear_expired(self) -> int:
-        """Clear expired requests."""
-        result = await self.session.execute(
-            select(PendingRequest).where(PendingRequest.expires_at <= func.now())
-        )
-        requests = result.scalars().all()
-        for req in requests:
-            await self.session.delete(req)
-        await self.session.flush()
-        return len(requests)
+    async def clear_expired(self, limit: Optional[int] = None) -> int:
+        """Clear expired requests. At most limit rows per call."""
+        return await self.delete_where(PendingRequest.expires_at <= func.now(), limit=limit)
 
     async def create_contract_request(
         self,
@@ -88,17 +109,11 @@ class PendingRequestRepository(BaseRepository[PendingRequest]):
         )
         self.session.add(request)
         await self.session.flush()
+        self._remember(request)
         return request
 
-    async def get_pending_contract(self, to_user_id: int) -> Optional[PendingRequest]:
+    async def get_pending_contract(
+        self, to_user_id: int
+    ) -> Optional[Union[PendingRequest, PendingRequestSnapshot]]:
         """Get pending contract request for a user."""
-        result = await self.session.execute(
-            select(PendingRequest).where(
-                and_(
-                    PendingRequest.to_user_id == to_user_id,
-                    PendingRequest.request_type == RequestType.CONTRACT,
-                    PendingRequest.expires_at > func.now(),
-                )
-            )
-        )
-        return result.scalar_one_or_none()
+        return await self._get_pending(to_user_id, RequestType.CONTRACT)
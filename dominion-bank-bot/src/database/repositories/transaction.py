@@ -7,6 +7,7 @@ from sqlalchemy import desc, func, or_, select
 
 from src.database.models import Transaction, TransactionType
 from src.database.repositories.base import BaseRepository
+from src.database.repositories.ledger_stats import LedgerStatsRepository
 
 
 class TransactionRepository(BaseRepository[Transaction]):
@@ -23,7 +24,7 @@ class TransactionRepository(BaseRepository[Transaction]):
         admin_id: Optional[int] = None,
         description: Optional[str] = None,
     ) -> Transaction:
-        """Create a new transaction record."""
+        """Create a new transaction record and count it in the ledger stats."""
         transaction = Transaction(
             sender_id=sender_id,
             recipient_id=recipient_id,
@@ -34,6 +35,9 @@ class TransactionRepository(BaseRepository[Transaction]):
         )
         self.session.add(transaction)
         await self.session.flush()
+        await LedgerStatsRepository(self.session).record(
+            recipient_id, amount, transaction_type, sender_id=sender_id
+        )
         return transaction
 
     async def get_user_history(
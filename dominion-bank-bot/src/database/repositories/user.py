@@ -6,8 +6,9 @@ from typing import Optional, Sequence
 
 from sqlalchemy import desc, func, select, update
 
-from src.database.models import User, UserStatus
+from src.database.models import User, UserStatus, normalize_username
 from src.database.repositories.base import BaseRepository
+from src.database.identity_cache import get_identity_cache
 
 logger = logging.getLogger(__name__)
 
@@ -22,15 +23,64 @@ class UserRepository(BaseRepository[User]):
         result = await self.session.execute(
             select(User).where(User.telegram_id == telegram_id)
         )
-        return result.scalar_one_or_none()
+        user = result.scalar_one_or_none()
+        if user:
+            get_identity_cache().put(user)
+        return user
 
     async def get_by_username(self, username: str) -> Optional[User]:
-        """Get user by username (case-insensitive)."""
-        username = username.lstrip("@").lower()
+        """
+        Get user by username (case-insensitive).
+
+        Uses the unique username_normalized index; a cached identity turns
+        it into a primary key lookup (often already in the session).
+        """
+        username = normalize_username(username)
+        if not username:
+            return None
+
+        cached = get_identity_cache().get_by_username(username)
+        if cached:
+            user = await self.session.get(User, cached.id)
+            if user and user.username_normalized == username:
+                return user
+            get_identity_cache().invalidate(telegram_id=cached.telegram_id)
+
         result = await self.session.execute(
-            select(User).where(func.lower(User.username) == username)
+            select(User).where(User.username_normalized == username)
         )
-        return result.scalar_one_or_none()
+        user = result.scalar_one_or_none()
+        if user:
+            get_identity_cache().put(user)
+        return user
+
+    async def _take_username(self, username: Optional[str], user_id: Optional[int]) -> Optional[User]:
+        """
+        Free a username for another user.
+
+        Telegram usernames are unique at any moment, so a different row still
+        holding this one is stale (the name changed hands) and loses it.
+        Import placeholders (telegram_id 0) are returned instead so the real
+        user can claim them.
+        """
+        normalized = normalize_username(username)
+        if not normalized:
+            return None
+
+        result = await self.session.execute(
+            select(User).where(User.username_normalized == normalized)
+        )
+        holder = result.scalar_one_or_none()
+        if holder is None or holder.id == user_id:
+            return None
+        if not holder.telegram_id:
+            return holder
+
+        logger.info(f"Username @{normalized} moved away from user {holder.telegram_id}")
+        holder.username = None
+        await self.session.flush()
+        get_identity_cache().invalidate(telegram_id=holder.telegram_id)
+        return None
 
     async def get_or_create(
         self,
@@ -40,13 +90,30 @@ class UserRepository(BaseRepository[User]):
         last_name: Optional[str] = None,
         default_balance: int = 0,
     ) -> tuple[User, bool]:
-        """Get existing user or create new one. Returns (user, created)."""
+        """
+        Get existing user or create new one. Returns (user, created).
+
+        A new user whose username matches an imported placeholder takes
+        over that placeholder, keeping its imported balance and profile. A
+        registered user renamed to a placeholder's username keeps the old
+        one: the placeholder is left for an admin to resolve, with a warning.
+        """
         user = await self.get_by_telegram_id(telegram_id)
         if user:
             updated = False
             if username and user.username != username:
-                user.username = username
-                updated = True
+                placeholder = None
+                if normalize_username(username) != user.username_normalized:
+                    placeholder = await self._take_username(username, user.id)
+                if placeholder is None:
+                    user.username = username
+                    updated = True
+                else:
+                    logger.warning(
+                        f"User {telegram_id} is now @{placeholder.username_normalized}, held by "
+                        f"imported placeholder id {placeholder.id} (balance {placeholder.balance}); "
+                        f"username not updated until an admin resolves it"
+                    )
             if first_name and user.first_name != first_name:
                 user.first_name = first_name
                 updated = True
@@ -55,8 +122,20 @@ class UserRepository(BaseRepository[User]):
                 updated = True
             if updated:
                 await self.session.flush()
+                get_identity_cache().invalidate(telegram_id=telegram_id)
             return user, False
 
+        placeholder = await self._take_username(username, None)
+        if placeholder is not None:
+            placeholder.telegram_id = telegram_id
+            placeholder.username = username
+            placeholder.first_name = first_name or placeholder.first_name
+            placeholder.last_name = last_name or placeholder.last_name
+            await self.session.flush()
+            get_identity_cache().invalidate(telegram_id=telegram_id, username=username)
+            logger.info(f"User {telegram_id} claimed imported placeholder @{placeholder.username}")
+            return placeholder, True
+
         user = User(
             telegram_id=telegram_id,
             username=username,
@@ -66,6 +145,7 @@ class UserRepository(BaseRepository[User]):
         )
         self.session.add(user)
         await self.session.flush()
+        get_identity_cache().invalidate(telegram_id=telegram_id, username=username)
         logger.info(f"Created new user: {user}")
         return user, True
 
@@ -133,8 +213,16 @@ class UserRepository(BaseRepository[User]):
         result = await self.session.execute(
             update(User).where(User.id == user_id).values(is_admin=is_admin)
         )
+        get_identity_cache().invalidate(user_id=user_id)
         return result.rowcount > 0
 
+    async def get_by_ids(self, user_ids) -> dict[int, User]:
+        """Get several users by ID in one query, keyed by ID."""
+        if not user_ids:
+            return {}
+        result = await self.session.execute(select(User).where(User.id.in_(set(user_ids))))
+        return {user.id: user for user in result.scalars()}
+
     async def get_all(self) -> Sequence[User]:
         """Get all users."""
         result = await self.session.execute(
@@ -157,4 +245,5 @@ class UserRepository(BaseRepository[User]):
         )
         self.session.add(user)
         await self.session.flush()
+        get_identity_cache().invalidate(username=username)
         return user
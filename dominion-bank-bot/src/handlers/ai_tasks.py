@@ -11,10 +11,12 @@ from src.database.connection import get_session
 from src.database.repositories import UserRepository, CollarRepository
 from src.services.ai_service import get_ai_service
 from src.utils.helpers import get_user_info, extract_username
+from src.utils.middleware import ai_requester
 
 logger = logging.getLogger(__name__)
 
 
+@ai_requester
 async def tarea_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /tarea command - Generate AI task for a sub."""
     if not update.effective_user or not update.message:
@@ -40,12 +42,11 @@ async def tarea_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
         # If no target specified, check if they have subs
         if not target_name:
-            collars = await collar_repo.get_dom_collars(dom.id)
-            if collars:
+            sub_ids = await collar_repo.get_sub_ids(dom.id)
+            if sub_ids:
                 # Pick a random sub to assign task
                 import random
-                collar = random.choice(collars)
-                sub = await user_repo.get_by_id(collar.sub_id)
+                sub = await user_repo.get_by_id(random.choice(sub_ids))
                 target_name = sub.display_name if sub else "sumis@"
             else:
                 target_name = "sumis@"
@@ -65,6 +66,7 @@ async def tarea_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     await update.message.reply_text(response, parse_mode="Markdown")
 
 
+@ai_requester
 async def reto_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /reto command - Generate AI challenge between users."""
     if not update.effective_user or not update.message:
@@ -93,6 +95,7 @@ async def reto_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await update.message.reply_text(response, parse_mode="Markdown")
 
 
+@ai_requester
 async def castigo_creativo_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /castigo_creativo command - Generate creative AI punishment."""
     if not update.effective_user or not update.message:
@@ -131,6 +134,7 @@ async def castigo_creativo_command(update: Update, context: ContextTypes.DEFAULT
     await update.message.reply_text(response, parse_mode="Markdown")
 
 
+@ai_requester
 async def recompensa_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /recompensa command - Generate AI reward for good behavior."""
     if not update.effective_user or not update.message:
@@ -159,6 +163,7 @@ async def recompensa_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await update.message.reply_text(response, parse_mode="Markdown")
 
 
+@ai_requester
 async def protocolo_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /protocolo command - Generate AI protocol rules for a sub."""
     if not update.effective_user or not update.message:
@@ -6,6 +6,7 @@ from src.handlers.bdsm.collars import (
     amo_command,
     collar_command,
     exhibir_command,
+    jerarquia_command,
     liberar_command,
     rechazar_collar_command,
     suplicar_libertad_command,
@@ -53,6 +54,7 @@ __all__ = [
     "liberar_command",
     "exhibir_command",
     "amo_command",
+    "jerarquia_command",
     "aceptar_collar_command",
     "rechazar_collar_command",
     "suplicar_libertad_command",
@@ -15,6 +15,7 @@ from src.database.repositories import (
     TransactionRepository,
     UserRepository,
 )
+from src.services.bid_engine import BidError, get_bid_engine
 from src.utils.helpers import extract_username, parse_amount
 from src.utils.messages import (
     DIVIDER,
@@ -40,6 +41,14 @@ AUCTION_FEE = 50  # Fee to start an auction
 DEFAULT_AUCTION_HOURS = 24  # Default auction duration
 MIN_BID = 10  # Minimum bid amount
 
+BID_ERRORS = {
+    BidError.NOT_FOUND: f"{EMOJI_ERROR} Subasta no encontrada.",
+    BidError.NOT_ACTIVE: f"{EMOJI_ERROR} Esta subasta ya no esta activa.",
+    BidError.ENDED: f"{EMOJI_ERROR} Esta subasta ya termino.",
+    BidError.OWN_AUCTION: f"{EMOJI_ERROR} No puedes pujar en tu propia subasta.",
+    BidError.CONFLICT: f"{EMOJI_ERROR} La subasta acaba de cambiar, intenta de nuevo.",
+}
+
 
 async def subasta_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /subasta command - start an auction."""
@@ -219,77 +228,46 @@ async def pujar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
     async with get_session() as session:
         user_repo = UserRepository(session)
-        auction_repo = AuctionRepository(session)
 
         # Get bidder
         bidder = await user_repo.get_by_telegram_id(update.effective_user.id)
         if not bidder:
             await update.message.reply_text(f"{EMOJI_ERROR} Debes registrarte primero con /start")
             return
+        bidder_id = bidder.id
+        bidder_name = bidder.display_name
 
-        # Get auction
-        auction = await auction_repo.get_by_id(auction_id)
-        if not auction:
-            await update.message.reply_text(f"{EMOJI_ERROR} Subasta no encontrada.")
-            return
-
-        # Check if auction is still active
-        if auction.status != AuctionStatus.ACTIVE:
-            await update.message.reply_text(f"{EMOJI_ERROR} Esta subasta ya no esta activa.")
-            return
-
-        # Check if expired
-        if auction.ends_at < datetime.utcnow():
-            await update.message.reply_text(f"{EMOJI_ERROR} Esta subasta ya termino.")
-            return
-
-        # Check if bidding on own auction
-        if auction.seller_id == bidder.id:
-            await update.message.reply_text(f"{EMOJI_ERROR} No puedes pujar en tu propia subasta.")
-            return
+    # Bids on one auction are decided one at a time; funds move into escrow
+    result = await get_bid_engine().bid(auction_id, bidder_id, bid_amount)
 
-        # Check balance
-        if bidder.balance < bid_amount:
+    if not result.success:
+        if result.error == BidError.INSUFFICIENT_BALANCE:
             await update.message.reply_text(
                 f"""{EMOJI_ERROR} **Saldo Insuficiente**
 
 {DIVIDER_LIGHT}
 
-{EMOJI_BALANCE} Tu saldo: {format_currency(bidder.balance)}
+{EMOJI_BALANCE} Tu saldo: {format_currency(result.balance or 0)}
 {EMOJI_BID} Puja: {format_currency(bid_amount)}"""
             )
-            return
-
-        # Check if bid is higher than current
-        min_required = max(auction.starting_price, (auction.current_bid or 0) + 1)
-        if bid_amount < min_required:
+        elif result.error == BidError.BID_TOO_LOW:
             await update.message.reply_text(
-                f"{EMOJI_ERROR} Tu puja debe ser al menos {format_currency(min_required)}."
+                f"{EMOJI_ERROR} Tu puja debe ser al menos {format_currency(result.min_required)}."
             )
-            return
-
-        # Refund previous bidder if any
-        if auction.current_bidder_id:
-            prev_bidder = await user_repo.get_by_id(auction.current_bidder_id)
-            if prev_bidder and auction.current_bid:
-                await user_repo.update_balance(prev_bidder.id, auction.current_bid)
-
-        # Deduct from new bidder
-        await user_repo.update_balance(bidder.id, -bid_amount)
-
-        # Place bid
-        await auction_repo.place_bid(auction.id, bidder.id, bid_amount)
-
-        # Capture info before leaving session
-        bidder_name = bidder.display_name
-        target_name = auction.target.display_name if auction.target else None
-        description = auction.description
+        else:
+            await update.message.reply_text(BID_ERRORS.get(result.error, BID_ERRORS[BidError.CONFLICT]))
+        return
 
-        logger.info(f"Bid: {bidder_name} bid {bid_amount} on auction #{auction.id}")
+    logger.info(f"Bid: {bidder_name} bid {bid_amount} on auction #{auction_id}")
 
     # Build target line
-    target_line = f"\n{EMOJI_TARGET} **Subastado:** {target_name}" if target_name else ""
-    desc_line = f"\n📝 _{description}_" if description else ""
+    target_line = f"\n{EMOJI_TARGET} **Subastado:** {result.target_name}" if result.target_name else ""
+    desc_line = f"\n📝 _{result.description}_" if result.description else ""
+    extension_line = (
+        f"\n{EMOJI_INFO} Puja de ultimo momento: la subasta se alarga "
+        f"{settings.auction_snipe_extension // 60} minutos."
+        if result.extended else ""
+    )
 
     await update.message.reply_text(
         f"""{EMOJI_AUCTION} **Puja Realizada** {EMOJI_SUCCESS}
@@ -304,7 +282,7 @@ async def pujar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 {DIVIDER_LIGHT}
 
-{EMOJI_CROWN} Eres el pujador mas alto!"""
+{EMOJI_CROWN} Eres el pujador mas alto!{extension_line}"""
     )
 
 
@@ -481,14 +459,14 @@ async def cancelar_subasta_command(update: Update, context: ContextTypes.DEFAULT
         target_name = auction.target.display_name if auction.target else None
         user_name = user.display_name
 
-        # Refund current bidder if any
-        if auction.current_bidder_id and auction.current_bid:
-            await user_repo.update_balance(auction.current_bidder_id, auction.current_bid)
-
-        # Cancel auction
-        await auction_repo.cancel(auction.id)
+    # Cancel through the bid engine so it cannot interleave with a bid;
+    # the leading bid is refunded from escrow
+    result = await get_bid_engine().cancel(auction_id)
+    if not result.success:
+        await update.message.reply_text(BID_ERRORS[BidError.NOT_ACTIVE])
+        return
 
-        logger.info(f"Auction cancelled: #{auction_id} by {user_name}")
+    logger.info(f"Auction cancelled: #{auction_id} by {user_name}")
 
     # Build target line
     target_line = f"\n{EMOJI_TARGET} **Subastado:** {target_name}" if target_name else ""
@@ -1,6 +1,6 @@
 """
 The Phantom Bot - Collar Command Handlers
-/collar, /liberar, /exhibir, /amo, /aceptar_collar, /rechazar_collar
+/collar, /liberar, /exhibir, /amo, /jerarquia, /aceptar_collar, /rechazar_collar
 """
 import logging
 from datetime import datetime
@@ -21,6 +21,7 @@ from src.utils.helpers import extract_username, format_time_ago
 logger = logging.getLogger(__name__)
 
 COLLAR_COST = 300  # Cost to collar someone
+HIERARCHY_LINES = 40  # Users listed by /jerarquia before it summarizes the rest
 
 
 async def collar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -76,6 +77,13 @@ async def collar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await update.message.reply_text("❌ No puedes ponerte un collar a ti mismo.")
             return
 
+        # Check the target is not above the owner
+        if await collar_repo.would_cycle(owner.id, target.id):
+            await update.message.reply_text(
+                f"❌ {target.display_name} está por encima de ti en la jerarquía."
+            )
+            return
+
         # Create pending request
         await request_repo.create_collar_request(
             from_user_id=owner.id,
@@ -126,7 +134,7 @@ async def aceptar_collar_command(update: Update, context: ContextTypes.DEFAULT_T
             return
 
         # Get owner
-        owner = await user_repo.get_by_telegram_id(request.from_user.telegram_id)
+        owner = await user_repo.get_by_id(request.from_user_id)
         if not owner:
             await update.message.reply_text("❌ Error: Usuario no encontrado.")
             return
@@ -139,6 +147,14 @@ async def aceptar_collar_command(update: Update, context: ContextTypes.DEFAULT_T
             )
             return
 
+        # The hierarchy may have changed since the request
+        if await collar_repo.would_cycle(owner.id, user.id):
+            await request_repo.delete(request.id)
+            await update.message.reply_text(
+                f"❌ Estás por encima de {owner.display_name} en la jerarquía."
+            )
+            return
+
         # Deduct cost from owner
         await user_repo.update_balance(owner.id, -COLLAR_COST)
 
@@ -196,7 +212,8 @@ async def rechazar_collar_command(update: Update, context: ContextTypes.DEFAULT_
             await update.message.reply_text("❌ No tienes solicitudes de collar pendientes.")
             return
 
-        owner_name = request.from_user.display_name
+        owner = await user_repo.get_by_id(request.from_user_id)
+        owner_name = owner.display_name if owner else "?"
 
         # Delete request
         await request_repo.delete(request.id)
@@ -342,6 +359,69 @@ Llevas el collar de {collar.owner.display_name} desde hace {time_ago}."""
     )
 
 
+async def jerarquia_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /jerarquia command - show the collar tree above and below a user."""
+    if not settings.enable_bdsm_commands:
+        return
+
+    if not update.effective_user or not update.message:
+        return
+
+    args_text = " ".join(context.args) if context.args else ""
+    target_username = extract_username(args_text) if args_text else None
+
+    async with get_session() as session:
+        user_repo = UserRepository(session)
+        collar_repo = CollarRepository(session)
+
+        # Get target (self or specified user)
+        if target_username:
+            target = await user_repo.get_by_username(target_username)
+        else:
+            target = await user_repo.get_by_telegram_id(update.effective_user.id)
+        if not target:
+            await update.message.reply_text(
+                "❌ Usuario no encontrado." if target_username
+                else "❌ Debes registrarte primero con /start"
+            )
+            return
+
+        chain = await collar_repo.get_owner_chain(target.id)
+        below = await collar_repo.get_hierarchy(target.id)
+        shown = below[:HIERARCHY_LINES]
+        users = await user_repo.get_by_ids(chain + [user_id for user_id, _, _ in shown])
+
+        def name(user_id: int) -> str:
+            user = users.get(user_id)
+            return user.display_name if user else f"User#{user_id}"
+
+        target_name = target.display_name
+
+    if not chain and not below:
+        await update.message.reply_text(
+            f"⛓️ {target_name} no lleva collar ni tiene a nadie bajo el suyo."
+        )
+        return
+
+    lines = [f"⛓️ **Jerarquía de {target_name}**", ""]
+    if chain:
+        lineage = " › ".join(name(owner_id) for owner_id in reversed(chain))
+        lines.append(f"👑 {lineage} › {target_name}")
+        lines.append("")
+
+    lines.append(target_name)
+    for user_id, _, depth in shown:
+        lines.append(f"{'    ' * (depth - 1)}└ {name(user_id)}")
+    if len(below) > len(shown):
+        lines.append(f"… y {len(below) - len(shown)} más")
+
+    direct = sum(1 for _, _, depth in below if depth == 1)
+    lines.append("")
+    lines.append(f"Total: {len(below)} bajo su collar ({direct} directos)")
+
+    await update.message.reply_text("\n".join(lines))
+
+
 async def suplicar_libertad_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /suplicar_libertad command - request to be freed."""
     if not settings.enable_bdsm_commands:
@@ -195,7 +195,8 @@ async def rechazar_contrato_command(update: Update, context: ContextTypes.DEFAUL
             await update.message.reply_text("❌ No tienes propuestas de contrato pendientes.")
             return
 
-        dom_name = request.from_user.display_name
+        dom = await user_repo.get_by_id(request.from_user_id)
+        dom_name = dom.display_name if dom else "?"
 
         # Delete request
         await request_repo.delete(request.id)
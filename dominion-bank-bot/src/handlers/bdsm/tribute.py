@@ -76,7 +76,6 @@ async def tributo_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     async with get_session() as session:
         user_repo = UserRepository(session)
-        altar_repo = AltarRepository(session)
         tx_repo = TransactionRepository(session)
 
         # Get tribute payer
@@ -126,9 +125,6 @@ async def tributo_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             description=f"Tributo de {payer_name}",
         )
 
-        # Update altar stats
-        await altar_repo.add_tribute(recipient.id, payer.id, amount)
-
         logger.info(f"Tribute: {payer_name} paid {amount} to {recipient_name}")
 
     await update.message.reply_text(
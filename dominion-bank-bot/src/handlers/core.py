@@ -18,9 +18,9 @@ from src.database.repositories import (
 )
 from src.utils.helpers import (
     format_time_ago,
-    get_user_info,
     parse_transfer_args,
 )
+from src.utils.request_context import request_scope
 from src.utils.messages import (
     ERROR_COOLDOWN,
     ERROR_INSUFFICIENT_BALANCE,
@@ -45,26 +45,14 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if not update.effective_user or not update.message:
         return
 
-    user_info = get_user_info(update.effective_user)
-
-    async with get_session() as session:
-        user_repo = UserRepository(session)
-        user, created = await user_repo.get_or_create(
-            telegram_id=user_info["telegram_id"],
-            username=user_info["username"],
-            first_name=user_info["first_name"],
-            last_name=user_info["last_name"],
-            default_balance=settings.default_balance,
-        )
+    async with request_scope(update, context) as request:
+        user = await request.ensure_user()
 
         message = welcome_message(
             balance=user.balance,
             username=user.display_name,
         )
 
-        if created:
-            logger.info(f"New user registered: {user}")
-
     await update.message.reply_text(message)
 
 
@@ -73,9 +61,8 @@ async def ver_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     if not update.effective_user or not update.message:
         return
 
-    async with get_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(update.effective_user.id)
+    async with request_scope(update, context) as request:
+        user = await request.user()
 
         if not user:
             await update.message.reply_text(ERROR_NOT_REGISTERED)
@@ -196,122 +183,17 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     if not update.message or not update.effective_user:
         return
 
-    # Check if user is admin
-    is_admin = False
-    async with get_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(update.effective_user.id)
-        if user:
-            is_admin = user.is_admin
+    async with request_scope(update, context) as request:
+        is_admin = await request.is_admin()
 
-    # Build help text based on enabled features and user role
-    help_sections = []
+    # Build help text from the command table (feature flags already applied)
+    from src.bot.commands import get_command_table
 
-    # Header
     if is_admin:
-        help_sections.append(f"🎭 {settings.bot_name} - Comandos (Admin)\n")
+        header = f"🎭 {settings.bot_name} - Comandos (Admin)\n"
     else:
-        help_sections.append(f"🎭 {settings.bot_name} - Comandos\n")
-
-    # Basic commands
-    help_sections.append(f"""💰 BÁSICOS:
-/start - Registrarse en el bot
-/ver - Ver tu saldo actual
-/dar @user cantidad - Enviar {settings.currency_name}
-/ranking - Top 10 usuarios
-/historial - Tus últimas transacciones
-/stats - Estadísticas generales""")
-
-    # Profile commands
-    help_sections.append("""👤 PERFIL:
-/perfil - Ver tu perfil (o /perfil @user)
-/editarperfil - Modificar tu perfil
-/configuracion - Ajustes de privacidad""")
-
-    # BDSM commands (only if enabled)
-    if settings.enable_bdsm_commands:
-        help_sections.append("""🔗 COLLARES:
-/collar @user - Poner collar (300 💎)
-/liberar @user - Liberar sumiso
-/exhibir - Ver tus collares
-/amo - Ver tu Amo/Ama
-/aceptar_collar - Aceptar collar pendiente
-/rechazar_collar - Rechazar collar
-/suplicar_libertad - Pedir libertad""")
-
-        help_sections.append("""⚡ CASTIGOS:
-/azotar @user [razón] - Azotar (50 💎)
-/castigar @user tipo razón - Castigar
-/mis_castigos - Ver castigos recibidos
-/castigos_dados - Ver castigos dados""")
-
-        help_sections.append("""🏰 CALABOZO:
-/calabozo @user [horas] - Encerrar (200 💎)
-/liberar_calabozo @user - Liberar preso
-/mi_calabozo - Ver tu estado
-/presos - Ver presos actuales
-/suplicar_libertad_calabozo - Pedir salir""")
-
-        help_sections.append("""🔨 SUBASTAS:
-/subasta @user precio_inicial - Subastar
-/pujar subasta_id cantidad - Hacer puja
-/subastas - Ver subastas activas
-/ver_subasta id - Detalles de subasta
-/mis_subastas - Tus subastas
-/cancelar_subasta id - Cancelar""")
-
-        help_sections.append("""📜 CONTRATOS:
-/contrato @user términos - Proponer
-/firmar_contrato id - Firmar contrato
-/rechazar_contrato id - Rechazar
-/romper_contrato id - Romper (500 💎)
-/mis_contratos - Ver tus contratos
-/ver_contrato id - Detalles""")
-
-        help_sections.append("""🛐 TRIBUTOS:
-/tributo @user cantidad - Dar tributo
-/adorar @user - Adorar (gratis)
-/altar @user - Ver altar de alguien
-/mi_altar - Ver tu altar
-/devotos - Ver tus devotos""")
-
-    # AI-powered commands (always available)
-    help_sections.append("""🎲 JUEGOS IA:
-/ruleta - Ruleta del destino
-/dado_perverso [tipo] - Dado con IA
-/verdad_reto [v/r] - Verdad o Reto
-/prediccion [@user] - Oraculo
-/fantasia [tema] - Escenario fantasia""")
-
-    help_sections.append("""📝 TAREAS IA:
-/tarea [@user] - Generar tarea
-/reto @user - Lanzar reto
-/castigo_creativo @user - Castigo IA
-/recompensa @user - Recompensa IA
-/protocolo [@user] - Protocolo""")
-
-    help_sections.append("""🎭 ROLEPLAY IA:
-/escena [tema] - Ambientacion
-/ritual @user [tipo] - Ritual/ceremonia
-/titulo [rol] - Generar titulo
-/bio [rol] - Bio para perfil
-/compatibilidad @user - Analisis IA""")
-
-    # Admin commands - only show to admins
-    if is_admin:
-        help_sections.append(f"""👑 ADMIN:
-/dar_admin @user cantidad - Dar {settings.currency_name}
-/quitar @user cantidad - Quitar {settings.currency_name}
-/consultar @user - Ver saldo de usuario
-/setadmin @user - Hacer admin
-/removeadmin @user - Quitar admin
-/syncadmins - Sincronizar admins del grupo
-/importar - Importar datos (Excel)
-/exportar - Exportar datos (Excel)
-
-🧪 TESTING:
-/runtest - Ejecutar tests automáticos
-/testdb - Test rápido de sistema""")
+        header = f"🎭 {settings.bot_name} - Comandos\n"
+    help_sections = [header] + get_command_table().help_sections(is_admin=is_admin)
 
     help_text = "\n\n".join(help_sections)
     await update.message.reply_text(help_text)
@@ -12,10 +12,13 @@ from src.database.connection import get_session
 from src.database.repositories import UserRepository
 from src.services.ai_service import get_ai_service
 from src.utils.helpers import get_user_info
+from src.utils.message_stream import stream_to_message
+from src.utils.middleware import ai_requester
 
 logger = logging.getLogger(__name__)
 
 
+@ai_requester
 async def ruleta_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /ruleta command - BDSM roulette with random consequences."""
     if not update.effective_user or not update.message:
@@ -42,20 +45,21 @@ async def ruleta_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Spinning animation message
     spin_msg = await update.message.reply_text("🎰 La ruleta gira...")
 
-    # Generate AI content based on result
-    ai = get_ai_service()
+    # Pick the AI prompt based on result
+    prompt_type = None
+    content = ""
 
     if category == "reward":
-        content = await ai.generate("reward", f"El usuario {user_name} ha ganado en la ruleta.")
+        prompt_type, ai_context = "reward", f"El usuario {user_name} ha ganado en la ruleta."
         emoji = "🌟"
     elif category == "punishment":
-        content = await ai.generate("punishment", f"El usuario {user_name} ha perdido en la ruleta.")
+        prompt_type, ai_context = "punishment", f"El usuario {user_name} ha perdido en la ruleta."
         emoji = "⚡"
     elif category == "task":
-        content = await ai.generate("task", f"Genera una tarea para {user_name} que perdio en la ruleta.")
+        prompt_type, ai_context = "task", f"Genera una tarea para {user_name} que perdio en la ruleta."
         emoji = "📝"
     elif category == "dare":
-        content = await ai.generate("dare", f"Genera un reto para {user_name}.")
+        prompt_type, ai_context = "dare", f"Genera un reto para {user_name}."
         emoji = "🔥"
     elif category == "skip":
         content = "La ruleta se detiene justo antes de caer en un castigo. Has tenido suerte... esta vez."
@@ -64,27 +68,39 @@ async def ruleta_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Double or nothing - spin again with higher stakes
         second_spin = random.choice(["big_win", "big_loss"])
         if second_spin == "big_win":
-            content = await ai.generate("reward", f"{user_name} apostó doble y GANÓ.")
+            prompt_type, ai_context = "reward", f"{user_name} apostó doble y GANÓ."
             emoji = "🎉"
         else:
-            content = await ai.generate("punishment", f"{user_name} apostó doble y PERDIÓ.")
+            prompt_type, ai_context = "punishment", f"{user_name} apostó doble y PERDIÓ."
             emoji = "💀"
     else:  # mystery
-        mystery_type = random.choice(["prediction", "truth", "fantasy"])
-        content = await ai.generate(mystery_type, f"Para {user_name}.")
+        prompt_type = random.choice(["prediction", "truth", "fantasy"])
+        ai_context = f"Para {user_name}."
         emoji = "🔮"
 
-    # Build response
-    response = f"""🎰 *RULETA DEL DESTINO* 🎰
+    def render(text: str) -> str:
+        return f"""🎰 *RULETA DEL DESTINO* 🎰
 
 {emoji} *{user_name}*, {description}!
 
-{content}
+{text}
 """
 
-    await spin_msg.edit_text(response, parse_mode="Markdown")
+    if prompt_type is None:
+        await spin_msg.edit_text(render(content), parse_mode="Markdown")
+        return
 
+    # Stream AI content into the spinning message
+    ai = get_ai_service()
+    await stream_to_message(
+        spin_msg,
+        ai.generate_stream(prompt_type, ai_context),
+        render=render,
+        parse_mode="Markdown",
+    )
 
+
+@ai_requester
 async def dado_perverso_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /dado_perverso command - Perverse dice with AI interpretation."""
     if not update.effective_user or not update.message:
@@ -142,6 +158,7 @@ _Usa: /dado_perverso [tipo]_
     await rolling_msg.edit_text(response, parse_mode="Markdown")
 
 
+@ai_requester
 async def verdad_reto_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /verdad_reto command - Truth or Dare BDSM edition."""
     if not update.effective_user or not update.message:
@@ -186,6 +203,7 @@ async def verdad_reto_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     await update.message.reply_text(response, parse_mode="Markdown")
 
 
+@ai_requester
 async def prediccion_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /prediccion command - AI fortune telling."""
     if not update.effective_user or not update.message:
@@ -202,14 +220,12 @@ async def prediccion_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Crystal ball animation
     crystal_msg = await update.message.reply_text("🔮 Consultando el oraculo...")
 
-    ai = get_ai_service()
-    prediction = await ai.generate_prediction(target_name)
-
     # Random mystical elements
     mystical_symbols = ["✨", "🌙", "⭐", "🌟", "💫"]
     symbols = " ".join(random.sample(mystical_symbols, 3))
 
-    response = f"""🔮 *EL ORACULO HABLA* 🔮
+    def render(prediction: str) -> str:
+        return f"""🔮 *EL ORACULO HABLA* 🔮
 
 {symbols}
 
@@ -222,9 +238,16 @@ async def prediccion_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 _El destino esta escrito en las estrellas..._
 """
 
-    await crystal_msg.edit_text(response, parse_mode="Markdown")
+    ai = get_ai_service()
+    await stream_to_message(
+        crystal_msg,
+        ai.stream_prediction(target_name),
+        render=render,
+        parse_mode="Markdown",
+    )
 
 
+@ai_requester
 async def fantasia_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /fantasia command - Generate fantasy roleplay scenarios."""
     if not update.effective_user or not update.message:
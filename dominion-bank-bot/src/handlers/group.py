@@ -7,8 +7,10 @@ from telegram import Update, ChatMember
 from telegram.ext import ContextTypes
 
 from src.config import settings
+from src.database.auth_cache import get_auth_cache
 from src.database.connection import get_session
 from src.database.repositories import AdminRepository, UserRepository
+from src.services.authorization import get_member_status
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +76,9 @@ async def on_chat_member_update(update: Update, context: ContextTypes.DEFAULT_TY
 
     admin_statuses = (ChatMember.ADMINISTRATOR, ChatMember.OWNER)
 
+    # Telegram just told us the new status; no need to ask again
+    get_auth_cache().put_member_status(chat_id, user.id, new_status)
+
     async with get_session() as session:
         user_repo = UserRepository(session)
         admin_repo = AdminRepository(session)
@@ -151,16 +156,14 @@ async def syncadmins_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = update.effective_user.id
     chat_id = update.effective_chat.id
 
-    try:
-        member = await context.bot.get_chat_member(chat_id, user_id)
-        if member.status not in (ChatMember.ADMINISTRATOR, ChatMember.OWNER):
-            # Also check if super admin
-            if not settings.is_super_admin(user_id):
-                await update.message.reply_text("❌ Solo los administradores pueden sincronizar.")
-                return
-    except Exception as e:
-        logger.error(f"Error checking admin status: {e}")
+    status = await get_member_status(context.bot, chat_id, user_id)
+    if status is None:
         return
+    if status not in (ChatMember.ADMINISTRATOR, ChatMember.OWNER):
+        # Also check if super admin
+        if not settings.is_super_admin(user_id):
+            await update.message.reply_text("❌ Solo los administradores pueden sincronizar.")
+            return
 
     await update.message.reply_text("🔄 Sincronizando administradores...")
 
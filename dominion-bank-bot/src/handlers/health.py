@@ -2,6 +2,8 @@
 The Phantom Bot - Health Check Handler
 System health and diagnostics endpoints.
 """
+import io
+import json
 import logging
 from datetime import datetime, timezone
 
@@ -10,8 +12,19 @@ from telegram.ext import ContextTypes
 
 from src.config import settings
 from src.database.connection import get_session
+from src.database.auth_cache import get_auth_cache
+from src.database.collar_graph import get_collar_graph
+from src.database.ephemeral_store import get_ephemeral_state
+from src.database.identity_cache import get_identity_cache
 from src.database.repositories import UserRepository
+from src.services.ai_metrics import get_ai_metrics
+from src.services.bid_engine import get_bid_engine
 from src.services.cache import get_cache
+from src.services.economy_batch import get_economy_batch
+from src.services.expiry_sweeper import get_expiry_sweeper
+from src.services.timed_events import get_timed_events
+from src.utils.deadline import get_deadline_stats
+from src.utils.pipeline import get_stage_timings
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +72,73 @@ async def health_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     cache_status = "✅" if cache else "❌"
     cache_size = cache.size if cache else 0
     health_status.append(f"{cache_status} Cache ({cache_size} entradas)")
+    identity = get_identity_cache().stats()
+    health_status.append(
+        f"✅ Identidades ({identity['size']} en cache, "
+        f"{identity['hit_rate']:.0%} aciertos)"
+    )
+    timed = get_timed_events().stats()
+    health_status.append(
+        f"✅ Eventos programados ({timed['pending']} pendientes, "
+        f"{sum(timed['fired'].values())} ejecutados)"
+    )
+    ephemeral = get_ephemeral_state().stats()
+    health_status.append(
+        f"✅ Estado efimero ({ephemeral['cooldowns']['size']} cooldowns, "
+        f"{ephemeral['requests']['size']} solicitudes, "
+        f"{ephemeral['dungeon']['size']} presos, "
+        f"{ephemeral['cooldowns']['dirty']} por guardar)"
+    )
+    graph = get_collar_graph().stats()
+    health_status.append(
+        f"✅ Grafo de collares ({graph['collars']} collares, {graph['owners']} dueños)"
+    )
+    swept = get_expiry_sweeper().stats()
+    swept_tables = ", ".join(f"{table} {s['deleted']}" for table, s in swept.items())
+    health_status.append(f"✅ Limpieza de expirados ({swept_tables or 'sin ejecutar'})")
+    economy = get_economy_batch().stats()
+    economy_rules = ", ".join(f"{rule} {r['period']}: {r['users']}" for rule, r in economy.items())
+    health_status.append(f"✅ Reglas economicas ({economy_rules or 'sin ejecutar'})")
+    bids = get_bid_engine().stats()
+    health_status.append(
+        f"✅ Pujas ({bids['actors']} subastas activas, {bids['queued']} en cola, "
+        f"{bids['conflicts']} conflictos)"
+    )
+    auth = get_auth_cache().stats()
+    health_status.append(
+        f"✅ Permisos ({auth['groups']} grupos, {auth['members']} miembros, "
+        f"{auth['hit_rate']:.0%} aciertos)"
+    )
+
+    # Update lanes
+    processor = context.application.update_processor
+    if hasattr(processor, "stats"):
+        health_status.append(f"\n🚦 **Carriles:**")
+        for name, lane in processor.stats().items():
+            health_status.append(
+                f"• {name}: {lane['running']}/{lane['limit']} activos, "
+                f"{lane['waiting']} en cola, {lane['shed']} rechazados"
+            )
+
+    # Handler deadlines
+    deadlines = get_deadline_stats()
+    if deadlines.exceeded:
+        health_status.append(f"\n⌛ **Plazos excedidos:**")
+        for budget, stats in deadlines.snapshot().items():
+            health_status.append(f"• {budget}: {stats['exceeded']}/{stats['started']}")
+        worst = sorted(deadlines.by_command.items(), key=lambda item: item[1], reverse=True)
+        health_status.append("• " + ", ".join(f"/{name} ({count})" for name, count in worst[:5]))
+
+    # Middleware timings (MIDDLEWARE_TIMING=true)
+    if settings.middleware_timing:
+        timings = get_stage_timings().snapshot()
+        slowest = sorted(timings.items(), key=lambda item: item[1]["avg_ms"], reverse=True)
+        health_status.append(f"\n⏱️ **Middleware:**")
+        for name, stats in slowest[:8]:
+            health_status.append(
+                f"• {name}: {stats['avg_ms']:.1f}ms prom, "
+                f"{stats['max_ms']:.1f}ms max ({stats['count']})"
+            )
 
     # Configuration summary
     health_status.append(f"\n⚙️ **Configuración:**")
@@ -77,6 +157,90 @@ async def health_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await update.message.reply_text("\n".join(health_status))
 
 
+def _fmt_ms(value) -> str:
+    """Format a latency value for display."""
+    return "-" if value is None else f"{value:,.0f}"
+
+
+async def aistats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Handle /aistats command - show AI latency, token and fallback telemetry.
+
+    Usage:
+        /aistats        - Summary per prompt type
+        /aistats json   - Full machine-readable dump as a file
+        /aistats reset  - Reset all counters
+
+    Only available to super admins.
+    """
+    if not update.message or not update.effective_user:
+        return
+
+    if not settings.is_super_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Este comando es solo para super admins.")
+        return
+
+    metrics = get_ai_metrics()
+    action = context.args[0].lower() if context.args else ""
+
+    if action == "reset":
+        metrics.reset()
+        await update.message.reply_text("🧹 Métricas de IA reiniciadas.")
+        return
+
+    snapshot = metrics.snapshot()
+
+    if action == "json":
+        payload = json.dumps(snapshot, indent=2, ensure_ascii=False).encode("utf-8")
+        await update.message.reply_document(
+            document=io.BytesIO(payload),
+            filename="ai_metrics.json",
+            caption="📈 Métricas de IA",
+        )
+        return
+
+    totals = snapshot["totals"]
+    scheduler = snapshot["scheduler"]
+    hit_rate = scheduler["slot_hit_rate"]
+
+    lines = ["📈 **Métricas de IA**\n"]
+    lines.append(f"⏱️ Desde hace {snapshot['uptime_s'] / 3600:.1f}h")
+    lines.append(
+        f"• Peticiones: {totals['requests']} | Errores: {totals['errors']} | "
+        f"Fallbacks: {totals['fallbacks']}"
+    )
+    lines.append(
+        f"• Tokens: {totals['prompt_tokens']:,} prompt / {totals['completion_tokens']:,} "
+        f"respuesta (+{totals['estimated_tokens']:,} estimados)"
+    )
+    lines.append(f"• Coste estimado: ${totals['cost_usd']:.4f}")
+    lines.append(
+        f"• Cola: {scheduler['in_flight']} activas, {scheduler['pending']} esperando, "
+        f"slot inmediato {'-' if hit_rate is None else f'{hit_rate:.0%}'}"
+    )
+    if scheduler["rejected"]:
+        rejected = ", ".join(f"{k}={v}" for k, v in scheduler["rejected"].items())
+        lines.append(f"• Rechazadas: {rejected}")
+
+    if snapshot["prompts"]:
+        lines.append("\n🧩 **Por tipo** (p50/p95/p99 ms):")
+    for name, stats in snapshot["prompts"].items():
+        latency = stats["latency"]
+        fallbacks = sum(stats["fallbacks"].values())
+        avg_tokens = (
+            (stats["completion_tokens"] + stats["estimated_tokens"]) // stats["completed"]
+            if stats["completed"] else 0
+        )
+        lines.append(
+            f"• {name}: {stats['requests']} req, "
+            f"{_fmt_ms(latency['p50_ms'])}/{_fmt_ms(latency['p95_ms'])}/{_fmt_ms(latency['p99_ms'])}, "
+            f"~{avg_tokens} tok, tope {stats['max_tokens_hit']}, "
+            f"err {stats['errors']}, fb {fallbacks}"
+        )
+
+    await update.message.reply_text("\n".join(lines))
+
+
 async def ping_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle /ping command - simple availability check.
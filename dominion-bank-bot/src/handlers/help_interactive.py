@@ -10,8 +10,7 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CallbackQueryHandler, ContextTypes
 
 from src.config import settings
-from src.database.connection import get_session
-from src.database.repositories import UserRepository
+from src.utils.request_context import request_scope
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +71,7 @@ biografia, y otros datos personales."""
 /miscollares - (alias de /exhibir)
 /amo - Ver quien es tu Amo/Ama
 /ama - (alias de /amo)
+/jerarquia [@usuario] - Ver el arbol de collares
 /aceptar_collar - Aceptar collar pendiente
 /rechazar_collar - Rechazar collar pendiente
 /suplicar_libertad - Pedir libertad a tu Amo
@@ -209,11 +209,13 @@ Crea escenas y contenido inmersivo."""
 /importar - Importar datos (Excel)
 /exportar - Exportar datos (Excel)
 /cleandb - Limpiar base de datos
+/rebuildstats - Recalcular estadisticas
 
 Testing:
 /runtest - Ejecutar tests automaticos
 /testdb - Test rapido de conexion
 /health - Estado del bot
+/aistats - Metricas de IA (json/reset)
 /ping - Verificar respuesta"""
     },
 }
@@ -342,13 +344,8 @@ async def interactive_help_command(
     if not update.message or not update.effective_user:
         return
 
-    # Check if user is admin
-    is_admin = False
-    async with get_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(update.effective_user.id)
-        if user:
-            is_admin = user.is_admin or settings.is_super_admin(update.effective_user.id)
+    async with request_scope(update, context) as request:
+        is_admin = await request.is_admin()
 
     await update.message.reply_text(
         get_main_help_text(is_admin),
@@ -370,13 +367,8 @@ async def handle_help_callback(
     category = query.data
 
     # Check admin status for proper menu
-    is_admin = False
-    if update.effective_user:
-        async with get_session() as session:
-            user_repo = UserRepository(session)
-            user = await user_repo.get_by_telegram_id(update.effective_user.id)
-            if user:
-                is_admin = user.is_admin or settings.is_super_admin(update.effective_user.id)
+    async with request_scope(update, context) as request:
+        is_admin = await request.is_admin()
 
     if category == HelpCategory.MAIN:
         await query.edit_message_text(
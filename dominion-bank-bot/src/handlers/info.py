@@ -11,6 +11,7 @@ from src.database.connection import get_session
 from src.database.models import TransactionType
 from src.database.repositories import TransactionRepository, UserRepository
 from src.utils.helpers import format_time_ago
+from src.utils.request_context import request_scope
 from src.utils.messages import (
     ERROR_NOT_REGISTERED,
     history_message,
@@ -25,11 +26,11 @@ async def ranking_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if not update.effective_user or not update.message:
         return
 
-    async with get_session() as session:
-        user_repo = UserRepository(session)
+    async with request_scope(update, context) as request:
+        user_repo = UserRepository(await request.session())
 
         # Get requesting user
-        user = await user_repo.get_by_telegram_id(update.effective_user.id)
+        user = await request.user()
 
         # Get top 10 users
         top_users = await user_repo.get_ranking(limit=10)
@@ -57,12 +58,11 @@ async def historial_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not update.effective_user or not update.message:
         return
 
-    async with get_session() as session:
-        user_repo = UserRepository(session)
-        tx_repo = TransactionRepository(session)
+    async with request_scope(update, context) as request:
+        tx_repo = TransactionRepository(await request.session())
 
         # Get user
-        user = await user_repo.get_by_telegram_id(update.effective_user.id)
+        user = await request.user()
         if not user:
             await update.message.reply_text(ERROR_NOT_REGISTERED)
             return
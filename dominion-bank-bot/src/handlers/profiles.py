@@ -103,19 +103,18 @@ async def perfil_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         profile = await profile_repo.get_or_create(target.id)
 
         # Get collar status
-        collar = await collar_repo.get_by_sub(target.id)
-        if collar:
-            collar_status = f"{EMOJI_COLLAR} Lleva el collar de **{collar.owner.display_name}**"
+        owner_id = await collar_repo.get_owner_id(target.id)
+        owner = await user_repo.get_by_id(owner_id) if owner_id else None
+        if owner:
+            collar_status = f"{EMOJI_COLLAR} Lleva el collar de **{owner.display_name}**"
         else:
             collar_status = f"{EMOJI_PUBLIC} Libre"
 
         # Get collared subs
-        subs = await collar_repo.get_by_owner(target.id)
-        subs_count = len(subs) if subs else 0
+        subs_count = await collar_repo.count_subs(target.id)
 
         # Get active contracts
-        contracts = await contract_repo.get_active_by_user(target.id)
-        contracts_count = len(contracts) if contracts else 0
+        contracts_count = await contract_repo.count_active_by_user(target.id)
 
         # Format role with emoji
         role = ROLE_DISPLAY.get(profile.main_role, "❓ Sin definir")
@@ -11,10 +11,13 @@ from src.database.connection import get_session
 from src.database.repositories import UserRepository
 from src.services.ai_service import get_ai_service
 from src.utils.helpers import get_user_info, extract_username
+from src.utils.message_stream import stream_to_message
+from src.utils.middleware import ai_requester
 
 logger = logging.getLogger(__name__)
 
 
+@ai_requester
 async def escena_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /escena command - Generate atmospheric scene description."""
     if not update.effective_user or not update.message:
@@ -38,10 +41,10 @@ async def escena_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         import random
         theme = random.choice(default_themes)
 
-    ai = get_ai_service()
-    scene = await ai.generate_scene(theme)
+    scene_msg = await update.message.reply_text("🏰 Preparando la escena...")
 
-    response = f"""🏰 *AMBIENTACION* 🏰
+    def render(scene: str) -> str:
+        return f"""🏰 *AMBIENTACION* 🏰
 
 📍 _{theme.title()}_
 
@@ -50,9 +53,16 @@ async def escena_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 💡 _Usa /escena [tema] para especificar_
 """
 
-    await update.message.reply_text(response, parse_mode="Markdown")
+    ai = get_ai_service()
+    await stream_to_message(
+        scene_msg,
+        ai.stream_scene(theme),
+        render=render,
+        parse_mode="Markdown",
+    )
 
 
+@ai_requester
 async def ritual_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /ritual command - Generate ritual/ceremony description."""
     if not update.effective_user or not update.message:
@@ -77,8 +87,7 @@ async def ritual_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         if args:
             sub_name = extract_username(args)
 
-    ai = get_ai_service()
-    ritual = await ai.generate_ritual(dom_name, sub_name, ritual_type)
+    ritual_msg = await update.message.reply_text("🕯️ Preparando el ritual...")
 
     # Ritual type emojis
     ritual_emojis = {
@@ -91,7 +100,8 @@ async def ritual_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     }
     emoji = ritual_emojis.get(ritual_type, "🕯️")
 
-    response = f"""{emoji} *RITUAL DE {ritual_type.upper()}* {emoji}
+    def render(ritual: str) -> str:
+        return f"""{emoji} *RITUAL DE {ritual_type.upper()}* {emoji}
 
 👑 *{dom_name}* y 🧎 *{sub_name}*
 
@@ -100,9 +110,16 @@ async def ritual_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 🕯️ _El ritual ha sido completado..._
 """
 
-    await update.message.reply_text(response, parse_mode="Markdown")
+    ai = get_ai_service()
+    await stream_to_message(
+        ritual_msg,
+        ai.stream_ritual(dom_name, sub_name, ritual_type),
+        render=render,
+        parse_mode="Markdown",
+    )
 
 
+@ai_requester
 async def titulo_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /titulo command - Generate noble/BDSM title for user."""
     if not update.effective_user or not update.message:
@@ -137,6 +154,7 @@ async def titulo_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await update.message.reply_text(response, parse_mode="Markdown")
 
 
+@ai_requester
 async def descripcion_ai_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /descripcion_ai command - Generate AI bio for profile."""
     if not update.effective_user or not update.message:
@@ -165,6 +183,7 @@ Para: *{user_name}* ({role})
     await update.message.reply_text(response, parse_mode="Markdown")
 
 
+@ai_requester
 async def compatibilidad_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /compatibilidad command - Analyze compatibility between two users."""
     if not update.effective_user or not update.message:
@@ -195,10 +214,8 @@ async def compatibilidad_command(update: Update, context: ContextTypes.DEFAULT_T
     # Loading message
     loading_msg = await update.message.reply_text("💕 Analizando compatibilidad...")
 
-    ai = get_ai_service()
-    analysis = await ai.analyze_compatibility(user1_name, user1_role, user2_name, user2_role)
-
-    response = f"""💕 *ANALISIS DE COMPATIBILIDAD* 💕
+    def render(analysis: str) -> str:
+        return f"""💕 *ANALISIS DE COMPATIBILIDAD* 💕
 
 👤 *{user1_name}* ({user1_role})
      ❤️
@@ -209,4 +226,10 @@ async def compatibilidad_command(update: Update, context: ContextTypes.DEFAULT_T
 ✨ _Los astros han hablado..._
 """
 
-    await loading_msg.edit_text(response, parse_mode="Markdown")
+    ai = get_ai_service()
+    await stream_to_message(
+        loading_msg,
+        ai.stream_compatibility(user1_name, user1_role, user2_name, user2_role),
+        render=render,
+        parse_mode="Markdown",
+    )
@@ -14,7 +14,12 @@ from telegram.ext import ContextTypes
 
 from src.config import settings
 from src.database.connection import get_session
-from src.database.repositories import AdminRepository, UserRepository
+from src.database.auth_cache import get_auth_cache
+from src.database.collar_graph import get_collar_graph
+from src.database.ephemeral_store import get_ephemeral_state
+from src.database.identity_cache import get_identity_cache
+from src.database.repositories import LedgerStatsRepository, UserRepository
+from src.services.authorization import AuthorizationService, get_member_status
 
 # Database path for cleaning
 DATABASE_PATH = Path(__file__).parent.parent.parent / "data" / "phantom.db"
@@ -26,36 +31,20 @@ async def is_user_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> b
         return False
 
     user_id = update.effective_user.id
+    chat = update.effective_chat
+    group_id = chat.id if chat and chat.type in ("group", "supergroup") else None
 
-    # Check super admin first
-    if settings.is_super_admin(user_id):
-        return True
-
+    # Super admin, global is_admin flag, or admin in this group (bot database)
     async with get_session() as session:
-        user_repo = UserRepository(session)
-        user = await user_repo.get_by_telegram_id(user_id)
-
-        if user:
-            # Check global is_admin flag
-            if user.is_admin:
-                return True
-
-            # Check if admin in current group (from bot database)
-            if update.effective_chat and update.effective_chat.type in ("group", "supergroup"):
-                admin_repo = AdminRepository(session)
-                if await admin_repo.is_admin(user.id, update.effective_chat.id):
-                    return True
+        result = await AuthorizationService(session).check_admin(user_id, group_id)
+    if result.is_authorized:
+        return True
 
     # Also check Telegram admin status directly
-    if update.effective_chat and update.effective_chat.type in ("group", "supergroup"):
-        try:
-            member = await context.bot.get_chat_member(
-                update.effective_chat.id, user_id
-            )
-            if member.status in (ChatMember.ADMINISTRATOR, ChatMember.OWNER):
-                return True
-        except Exception:
-            pass
+    if group_id is not None:
+        status = await get_member_status(context.bot, group_id, user_id)
+        if status in (ChatMember.ADMINISTRATOR, ChatMember.OWNER):
+            return True
 
     return False
 
@@ -274,6 +263,13 @@ async def cleandb_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         # Reinitialize database
         from src.database.connection import init_database
         await init_database()
+        get_identity_cache().clear()
+        get_auth_cache().clear()
+        if get_ephemeral_state().loaded:
+            get_ephemeral_state().clear()
+            await get_ephemeral_state().load()
+        if get_collar_graph().loaded:
+            await get_collar_graph().load()
 
         # Re-register the super admin who cleaned the database
         admin_count = 0
@@ -308,3 +304,30 @@ async def cleandb_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     except Exception as e:
         logger.error(f"Error cleaning database: {e}")
         await update.message.reply_text(f"❌ Error al limpiar la base de datos: {str(e)[:100]}")
+
+
+async def rebuildstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /rebuildstats command - recompute ledger stats from the transactions."""
+    if not update.message or not update.effective_user:
+        return
+
+    if not settings.is_super_admin(update.effective_user.id):
+        await update.message.reply_text("❌ Solo super administradores pueden recalcular estadísticas.")
+        return
+
+    try:
+        async with get_session() as session:
+            stats, pairs = await LedgerStatsRepository(session).rebuild()
+
+        await update.message.reply_text(
+            f"""📊 **Estadísticas Recalculadas**
+
+✅ Totales por usuario: {stats}
+✅ Parejas de tributo: {pairs}"""
+        )
+
+        logger.info(f"Ledger stats rebuilt by {update.effective_user.id}: {stats} rows, {pairs} pairs")
+
+    except Exception as e:
+        logger.error(f"Error rebuilding ledger stats: {e}")
+        await update.message.reply_text(f"❌ Error al recalcular estadísticas: {str(e)[:100]}")
@@ -11,6 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.config import settings, LOGS_DIR
 from src.bot.application import create_application
+from src.bot.webhook import ALLOWED_UPDATES, run_webhook
 
 
 def setup_logging() -> None:
@@ -67,11 +68,15 @@ def main() -> None:
     application = create_application()
 
     # Run the bot
-    logger.info("Starting bot polling...")
-    application.run_polling(
-        allowed_updates=["message", "callback_query"],
-        drop_pending_updates=True,
-    )
+    if settings.bot_mode == "webhook":
+        logger.info("Starting bot webhook...")
+        asyncio.run(run_webhook(application))
+    else:
+        logger.info("Starting bot polling...")
+        application.run_polling(
+            allowed_updates=ALLOWED_UPDATES,
+            drop_pending_updates=True,
+        )
 
 
 if __name__ == "__main__":
@@ -2,7 +2,11 @@
 The Phantom Bot - Services Module
 Business logic and application services.
 """
-from src.services.authorization import AuthorizationResult, AuthorizationService
+from src.services.authorization import (
+    AuthorizationResult,
+    AuthorizationService,
+    get_member_status,
+)
 from src.services.cache import (
     CacheService,
     close_cache,
@@ -19,6 +23,7 @@ __all__ = [
     # Authorization
     "AuthorizationService",
     "AuthorizationResult",
+    "get_member_status",
     # Cache
     "CacheService",
     "get_cache",
@@ -0,0 +1,218 @@
+"""
+The Phantom Bot - AI Fallback Corpus
+Weighted, non-repeating fallback content for when the AI is unavailable.
+"""
+import bisect
+import logging
+import random
+from array import array
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Optional
+
+import yaml
+
+from src.config import DATA_DIR, settings
+from src.utils.texts import texts
+
+logger = logging.getLogger(__name__)
+
+HARVEST_FILE = DATA_DIR / "ai_harvest.yaml"
+
+# Harvested AI outputs are picked less often than curated lines
+HARVEST_WEIGHT = 0.5
+HARVEST_MIN_CHARS = 15
+HARVEST_MAX_CHARS = 600
+
+# Maximum (chat, prompt type) histories kept before evicting the oldest
+MAX_HISTORIES = 2048
+
+DEFAULT_TEXT = "🎲 El destino ha hablado..."
+
+
+class _Pool:
+    """Texts of one prompt type with cumulative weights for bisect sampling."""
+
+    __slots__ = ("texts", "cum_weights", "harvested", "_seen")
+
+    def __init__(self):
+        self.texts: list[str] = []
+        self.cum_weights = array("d")
+        self.harvested = 0
+        self._seen: set[int] = set()
+
+    def add(self, text: str, weight: float = 1.0) -> bool:
+        """Append a text unless it is already in the pool."""
+        key = hash(text)
+        if weight <= 0 or key in self._seen:
+            return False
+        self._seen.add(key)
+        total = self.cum_weights[-1] if self.cum_weights else 0.0
+        self.texts.append(text)
+        self.cum_weights.append(total + weight)
+        return True
+
+    def _sample(self, rng: random.Random) -> int:
+        return bisect.bisect_right(self.cum_weights, rng.random() * self.cum_weights[-1])
+
+    def pick(self, rng: random.Random, exclude: deque) -> int:
+        """Weighted pick of an index not in `exclude`."""
+        if len(exclude) >= len(self.texts):
+            return self._sample(rng)
+
+        # Histories are short compared to pools, so rejection rarely loops
+        for _ in range(8):
+            index = self._sample(rng)
+            if index not in exclude:
+                return index
+
+        candidates = [i for i in range(len(self.texts)) if i not in exclude]
+        weights = [self.weight(i) for i in candidates]
+        return rng.choices(candidates, weights=weights, k=1)[0]
+
+    def weight(self, index: int) -> float:
+        previous = self.cum_weights[index - 1] if index else 0.0
+        return self.cum_weights[index] - previous
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+
+class FallbackCorpus:
+    """
+    Fallback lines for each AI prompt type.
+
+    Loaded once from the `fallbacks` section of utils/texts/ai_responses.yaml
+    plus any harvested AI outputs. Picks are weighted, and the last few picks
+    per chat and prompt type are remembered so the same line is not repeated.
+
+    Usage:
+        corpus = get_fallback_corpus()
+        text = corpus.pick("task", chat_id=update.effective_chat.id)
+        corpus.harvest("task", ai_text)
+    """
+
+    def __init__(
+        self,
+        data: Optional[dict[str, Any]] = None,
+        history: Optional[int] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self.history = settings.ai_fallback_history if history is None else history
+        self._rng = rng or random.Random()
+        self._pools: dict[str, _Pool] = {}
+        self._recent: OrderedDict[tuple, deque] = OrderedDict()
+        self._harvest_dirty = False
+
+        if data is None:
+            data = texts.ai_responses.get("fallbacks", {})
+        for prompt_type, entries in data.items():
+            pool = self._pools.setdefault(prompt_type, _Pool())
+            for entry in entries or []:
+                if isinstance(entry, dict):
+                    pool.add(str(entry.get("text", "")).strip(), float(entry.get("weight", 1)))
+                else:
+                    pool.add(str(entry).strip())
+
+    @property
+    def prompt_types(self) -> list[str]:
+        return [name for name in self._pools if name != "default"]
+
+    def size(self, prompt_type: str) -> int:
+        """Number of lines available for a prompt type."""
+        pool = self._pools.get(prompt_type)
+        return len(pool) if pool else 0
+
+    def pick(self, prompt_type: str, chat_id: Optional[int] = None) -> str:
+        """Pick a fallback line, avoiding the chat's recent picks."""
+        pool = self._pools.get(prompt_type) or self._pools.get("default")
+        if not pool:
+            return DEFAULT_TEXT
+        if prompt_type not in self._pools:
+            prompt_type = "default"
+
+        key = (chat_id, prompt_type)
+        recent = self._recent.get(key)
+        if recent is None:
+            recent = deque(maxlen=max(0, min(self.history, len(pool) - 1)))
+            self._recent[key] = recent
+            if len(self._recent) > MAX_HISTORIES:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(key)
+
+        index = pool.pick(self._rng, recent)
+        if recent.maxlen:
+            recent.append(index)
+        return pool.texts[index]
+
+    # -------------------------------------------------------------------------
+    # Harvesting
+    # -------------------------------------------------------------------------
+
+    def harvest(self, prompt_type: str, text: str) -> bool:
+        """Add a good AI output to the corpus. Returns True if it was kept."""
+        text = (text or "").strip()
+        if not HARVEST_MIN_CHARS <= len(text) <= HARVEST_MAX_CHARS:
+            return False
+
+        pool = self._pools.setdefault(prompt_type, _Pool())
+        if pool.harvested >= settings.ai_harvest_max_per_type:
+            return False
+        if not pool.add(text, HARVEST_WEIGHT):
+            return False
+
+        pool.harvested += 1
+        self._harvest_dirty = True
+        return True
+
+    def load_harvest(self, path: Path = HARVEST_FILE) -> int:
+        """Load previously harvested outputs. Returns how many were added."""
+        if not path.exists():
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = yaml.safe_load(f) or {}
+        except (OSError, yaml.YAMLError) as e:
+            logger.warning(f"Could not load AI harvest file {path}: {e}")
+            return 0
+
+        added = sum(
+            self.harvest(prompt_type, text)
+            for prompt_type, entries in data.items()
+            for text in entries or []
+        )
+        self._harvest_dirty = False
+        return added
+
+    def save_harvest(self, path: Path = HARVEST_FILE) -> bool:
+        """Write harvested outputs so they survive restarts."""
+        if not self._harvest_dirty:
+            return False
+
+        data = {
+            prompt_type: pool.texts[len(pool) - pool.harvested:]
+            for prompt_type, pool in self._pools.items()
+            if pool.harvested
+        }
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                yaml.safe_dump(data, f, allow_unicode=True, sort_keys=True)
+        except OSError as e:
+            logger.warning(f"Could not save AI harvest file {path}: {e}")
+            return False
+
+        self._harvest_dirty = False
+        return True
+
+
+# Global corpus instance
+_corpus: Optional[FallbackCorpus] = None
+
+
+def get_fallback_corpus() -> FallbackCorpus:
+    """Get or create the fallback corpus singleton."""
+    global _corpus
+    if _corpus is None:
+        _corpus = FallbackCorpus()
+    return _corpus
@@ -0,0 +1,198 @@
+"""
+The Phantom Bot - AI Telemetry
+Per prompt-type latency, token, cost and fallback counters for AI generation.
+"""
+import bisect
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from src.config import settings
+
+# Latency histogram bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (
+    50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000, 13000, 20000,
+)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with percentile estimates."""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        # One extra bucket for samples above the last bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        """Record one sample."""
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(self.buckets[i]) if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+@dataclass
+class PromptStats:
+    """Counters for a single prompt type."""
+    requests: int = 0
+    completed: int = 0
+    errors: int = 0
+    fallbacks: dict[str, int] = field(default_factory=dict)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated_tokens: int = 0
+    max_tokens_hit: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    first_chunk: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def fallback_total(self) -> int:
+        return sum(self.fallbacks.values())
+
+    def cost(self) -> float:
+        """Estimated spend in USD from the configured per-million prices."""
+        return (
+            self.prompt_tokens * settings.ai_cost_prompt_per_mtok
+            + (self.completion_tokens + self.estimated_tokens) * settings.ai_cost_completion_per_mtok
+        ) / 1_000_000
+
+    def to_dict(self) -> dict[str, Any]:
+        data = {
+            "requests": self.requests,
+            "completed": self.completed,
+            "errors": self.errors,
+            "fallbacks": dict(self.fallbacks),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_tokens": self.estimated_tokens,
+            "max_tokens_hit": self.max_tokens_hit,
+            "cost_usd": round(self.cost(), 6),
+            "latency": self.latency.to_dict(),
+        }
+        if self.first_chunk.count:
+            data["first_chunk"] = self.first_chunk.to_dict()
+        return data
+
+
+class AIMetrics:
+    """
+    In-process telemetry for AI generation.
+
+    Everything is kept per prompt type so `max_tokens` and the model can be
+    tuned command by command. Counters reset with the process or reset().
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._prompts: dict[str, PromptStats] = {}
+
+    def _stats(self, prompt_type: str) -> PromptStats:
+        stats = self._prompts.get(prompt_type)
+        if stats is None:
+            stats = self._prompts[prompt_type] = PromptStats()
+        return stats
+
+    def record_request(self, prompt_type: str) -> None:
+        """Count a generation request, whatever its outcome."""
+        self._stats(prompt_type).requests += 1
+
+    def record_success(
+        self,
+        prompt_type: str,
+        latency_ms: float,
+        usage: Any = None,
+        text: str = "",
+        max_tokens: Optional[int] = None,
+        first_chunk_ms: Optional[float] = None,
+    ) -> None:
+        """Record a completed generation and its token usage."""
+        stats = self._stats(prompt_type)
+        stats.completed += 1
+        stats.latency.observe(latency_ms)
+        if first_chunk_ms is not None:
+            stats.first_chunk.observe(first_chunk_ms)
+
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if isinstance(prompt_tokens, int) and isinstance(completion_tokens, int):
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+        else:
+            completion_tokens = len(text) // 4 + 1
+            stats.estimated_tokens += completion_tokens
+
+        if max_tokens and completion_tokens >= max_tokens:
+            stats.max_tokens_hit += 1
+
+    def record_error(self, prompt_type: str) -> None:
+        """Count a failed API call."""
+        self._stats(prompt_type).errors += 1
+
+    def record_fallback(self, prompt_type: str, reason: str) -> None:
+        """Count an answer served from fallback content, by reason."""
+        fallbacks = self._stats(prompt_type).fallbacks
+        fallbacks[reason] = fallbacks.get(reason, 0) + 1
+
+    def reset(self) -> None:
+        """Drop all counters."""
+        self.started_at = time.time()
+        self._prompts.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Machine-readable dump of all counters."""
+        from src.services.ai_scheduler import get_ai_scheduler
+
+        prompts = {name: stats.to_dict() for name, stats in sorted(self._prompts.items())}
+        totals = {
+            "requests": sum(s.requests for s in self._prompts.values()),
+            "errors": sum(s.errors for s in self._prompts.values()),
+            "fallbacks": sum(s.fallback_total for s in self._prompts.values()),
+            "prompt_tokens": sum(s.prompt_tokens for s in self._prompts.values()),
+            "completion_tokens": sum(s.completion_tokens for s in self._prompts.values()),
+            "estimated_tokens": sum(s.estimated_tokens for s in self._prompts.values()),
+            "cost_usd": round(sum(s.cost() for s in self._prompts.values()), 6),
+        }
+        return {
+            "started_at": self.started_at,
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "totals": totals,
+            "scheduler": get_ai_scheduler().stats(),
+            "prompts": prompts,
+        }
+
+
+# Global metrics instance
+_metrics: Optional[AIMetrics] = None
+
+
+def get_ai_metrics() -> AIMetrics:
+    """Get or create the AI metrics singleton."""
+    global _metrics
+    if _metrics is None:
+        _metrics = AIMetrics()
+    return _metrics
@@ -0,0 +1,319 @@
+"""
+The Phantom Bot - AI Fair-Queue Scheduler
+Shares AI generation capacity fairly between users.
+"""
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import date
+from typing import AsyncIterator, Optional
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AIRequester:
+    """Who is asking for an AI generation."""
+    user_id: int
+    private: bool = False
+    chat_id: Optional[int] = None
+
+
+class AIRequestRejectedError(Exception):
+    """Raised when a request is not admitted; callers answer from fallbacks."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+# Requester of the AI call currently running in this task
+_current_requester: ContextVar[Optional[AIRequester]] = ContextVar(
+    "ai_requester", default=None
+)
+
+
+def get_current_requester() -> Optional[AIRequester]:
+    """Get the requester bound to the current task, if any."""
+    return _current_requester.get()
+
+
+def set_current_requester(requester: Optional[AIRequester]):
+    """Bind a requester to the current task. Returns a reset token."""
+    return _current_requester.set(requester)
+
+
+def reset_current_requester(token) -> None:
+    """Restore the requester that was bound before set_current_requester."""
+    _current_requester.reset(token)
+
+
+class _Lane:
+    """Round-robin ring of users, each with a FIFO of waiting requests."""
+
+    def __init__(self):
+        # user_id -> (waiters, remaining credits in the current turn)
+        self.users: OrderedDict[Optional[int], list] = OrderedDict()
+
+    def push(self, user_id: Optional[int], waiter: asyncio.Future, weight: int) -> None:
+        entry = self.users.get(user_id)
+        if entry is None:
+            self.users[user_id] = [deque([waiter]), weight]
+        else:
+            entry[0].append(waiter)
+
+    def pop(self, weight_of) -> Optional[asyncio.Future]:
+        """Pop the next waiter using weighted round-robin across users."""
+        while self.users:
+            user_id, entry = next(iter(self.users.items()))
+            waiters, credits = entry
+            waiter = waiters.popleft()
+
+            if not waiters:
+                del self.users[user_id]
+            elif credits > 1:
+                entry[1] = credits - 1
+            else:
+                entry[1] = weight_of(user_id)
+                self.users.move_to_end(user_id)
+
+            if not waiter.done():
+                return waiter
+        return None
+
+    def remove(self, user_id: Optional[int], waiter: asyncio.Future) -> None:
+        entry = self.users.get(user_id)
+        if entry is None:
+            return
+        try:
+            entry[0].remove(waiter)
+        except ValueError:
+            return
+        if not entry[0]:
+            del self.users[user_id]
+
+    def __bool__(self) -> bool:
+        return bool(self.users)
+
+
+class AIScheduler:
+    """
+    Fair-queue scheduler in front of AI generation.
+
+    - At most `max_concurrent` generations run at once.
+    - Waiting requests are served per user in weighted round-robin, so one
+      user spamming commands cannot starve the rest of the group.
+    - Private-chat requests get `private_weight` turns per group turn.
+    - set_weight() gives a user several consecutive turns; get_ai_scheduler()
+      applies AI_VIP_WEIGHT to super admins and AI_VIP_USERS.
+    - Each user has a daily token quota; requests over quota, or beyond the
+      per-user / global queue limits, are rejected immediately.
+
+    Usage:
+        async with scheduler.slot(requester):
+            result = await generate()
+        scheduler.record_usage(requester, tokens)
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_pending_per_user: int = 2,
+        max_pending: int = 50,
+        daily_token_quota: int = 0,
+        private_weight: int = 2,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_pending_per_user = max_pending_per_user
+        self.max_pending = max_pending
+        self.daily_token_quota = daily_token_quota
+        self.private_weight = private_weight
+
+        self._private = _Lane()
+        self._group = _Lane()
+        self._private_credits = private_weight
+        self._in_flight = 0
+        self._pending: dict[Optional[int], int] = {}
+        self._weights: dict[int, int] = {}
+
+        # Admission counters for telemetry
+        self._admitted_immediately = 0
+        self._admitted_queued = 0
+        self._rejected: dict[str, int] = {}
+
+        # Daily usage: one int per user that asked today, reset at day roll
+        self._usage_day = date.today().toordinal()
+        self._usage: dict[int, int] = {}
+
+    # -------------------------------------------------------------------------
+    # Quotas
+    # -------------------------------------------------------------------------
+
+    def _roll_day(self) -> None:
+        today = date.today().toordinal()
+        if today != self._usage_day:
+            self._usage_day = today
+            self._usage.clear()
+
+    def tokens_used(self, user_id: int) -> int:
+        """Tokens consumed by a user today."""
+        self._roll_day()
+        return self._usage.get(user_id, 0)
+
+    def record_usage(self, requester: Optional[AIRequester], tokens: int) -> None:
+        """Charge tokens against the requester's daily quota."""
+        if requester is None or tokens <= 0:
+            return
+        self._roll_day()
+        self._usage[requester.user_id] = self._usage.get(requester.user_id, 0) + tokens
+
+    def set_weight(self, user_id: int, weight: int) -> None:
+        """Give a user more (or fewer) consecutive turns in the round-robin."""
+        if weight <= 1:
+            self._weights.pop(user_id, None)
+        else:
+            self._weights[user_id] = weight
+
+    def _weight_of(self, user_id: Optional[int]) -> int:
+        return self._weights.get(user_id, 1)
+
+    # -------------------------------------------------------------------------
+    # Admission and dispatch
+    # -------------------------------------------------------------------------
+
+    @property
+    def in_flight(self) -> int:
+        """Number of generations currently running."""
+        return self._in_flight
+
+    @property
+    def pending(self) -> int:
+        """Number of requests waiting for a slot."""
+        return sum(self._pending.values())
+
+    def stats(self) -> dict:
+        """Admission counters and current load."""
+        admitted = self._admitted_immediately + self._admitted_queued
+        return {
+            "in_flight": self._in_flight,
+            "pending": self.pending,
+            "admitted_immediately": self._admitted_immediately,
+            "admitted_queued": self._admitted_queued,
+            "slot_hit_rate": round(self._admitted_immediately / admitted, 3) if admitted else None,
+            "rejected": dict(self._rejected),
+        }
+
+    def _admit(self, requester: Optional[AIRequester]) -> None:
+        """Raise AIRequestRejectedError if the request must be answered from fallbacks."""
+        try:
+            self._check_admission(requester)
+        except AIRequestRejectedError as e:
+            self._rejected[e.reason] = self._rejected.get(e.reason, 0) + 1
+            raise
+
+    def _check_admission(self, requester: Optional[AIRequester]) -> None:
+        if requester is None:
+            return
+
+        if self.daily_token_quota and self.tokens_used(requester.user_id) >= self.daily_token_quota:
+            raise AIRequestRejectedError("quota")
+
+        if self._in_flight < self.max_concurrent and not self.pending:
+            return
+
+        if self._pending.get(requester.user_id, 0) >= self.max_pending_per_user:
+            raise AIRequestRejectedError("user_queue_full")
+        if self.pending >= self.max_pending:
+            raise AIRequestRejectedError("queue_full")
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """Pick the next waiter, favouring private chats by lane weight."""
+        if self._private and (self._private_credits > 0 or not self._group):
+            if self._group:
+                self._private_credits -= 1
+            waiter = self._private.pop(self._weight_of)
+            if waiter is not None:
+                return waiter
+
+        waiter = self._group.pop(self._weight_of)
+        if waiter is not None:
+            self._private_credits = self.private_weight
+            return waiter
+        return self._private.pop(self._weight_of)
+
+    def _dispatch(self) -> None:
+        while self._in_flight < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    async def _acquire(self, requester: Optional[AIRequester]) -> None:
+        self._admit(requester)
+
+        if self._in_flight < self.max_concurrent and not self.pending:
+            self._in_flight += 1
+            self._admitted_immediately += 1
+            return
+
+        user_id = requester.user_id if requester else None
+        lane = self._private if requester and requester.private else self._group
+        waiter = asyncio.get_running_loop().create_future()
+        lane.push(user_id, waiter, self._weight_of(user_id))
+        self._pending[user_id] = self._pending.get(user_id, 0) + 1
+
+        try:
+            await waiter
+            self._admitted_queued += 1
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was granted just before cancellation; hand it back
+                self._release()
+            else:
+                lane.remove(user_id, waiter)
+            raise
+        finally:
+            remaining = self._pending.get(user_id, 1) - 1
+            if remaining:
+                self._pending[user_id] = remaining
+            else:
+                self._pending.pop(user_id, None)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, requester: Optional[AIRequester]) -> AsyncIterator[None]:
+        """Wait for a fair share of AI capacity, then hold it for the block."""
+        await self._acquire(requester)
+        try:
+            yield
+        finally:
+            self._release()
+
+
+# Global scheduler instance
+_scheduler: Optional[AIScheduler] = None
+
+
+def get_ai_scheduler() -> AIScheduler:
+    """Get or create the AI scheduler singleton."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AIScheduler(
+            max_concurrent=settings.ai_max_concurrent,
+            max_pending_per_user=settings.ai_max_pending_per_user,
+            max_pending=settings.ai_max_pending,
+            daily_token_quota=settings.ai_daily_token_quota,
+            private_weight=settings.ai_private_weight,
+        )
+        for user_id in settings.super_admin_ids | settings.ai_vip_user_ids:
+            _scheduler.set_weight(user_id, settings.ai_vip_weight)
+    return _scheduler
@@ -3,9 +3,18 @@ AI Service using Groq API for generating creative content.
 """
 import os
 import logging
-import random
-from typing import Optional
-from groq import Groq
+import time
+from typing import AsyncGenerator, Optional
+from groq import AsyncGroq
+
+from src.config import settings
+from src.services.ai_fallbacks import get_fallback_corpus
+from src.services.ai_metrics import get_ai_metrics
+from src.services.ai_scheduler import (
+    AIRequestRejectedError,
+    get_ai_scheduler,
+    get_current_requester,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -134,19 +143,45 @@ Máximo 2-3 oraciones. Usa emojis.""",
 }
 
 
+def _response_usage(response):
+    """Usage block of a response or final stream chunk, if reported.
+
+    Streaming responses report usage on the last chunk under x_groq.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        usage = getattr(getattr(response, "x_groq", None), "usage", None)
+    return usage
+
+
+def _usage_tokens(usage, text: str) -> int:
+    """Total tokens from a usage block, or roughly four characters per token."""
+    total = getattr(usage, "total_tokens", None)
+    if isinstance(total, int):
+        return total
+    return len(text) // 4 + 1
+
+
 class AIService:
     """Service for AI-generated content using Groq."""
 
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the AI service."""
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        """Initialize the AI service.
+
+        Args:
+            api_key: Groq API key (defaults to GROQ_API_KEY)
+            base_url: API base URL (defaults to GROQ_BASE_URL), e.g. a local
+                scripts/fake_llm_server.py for benchmarks
+        """
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.base_url = base_url or settings.groq_base_url
         self.client = None
         self.model = "llama-3.1-8b-instant"  # Fast and efficient
         self._enabled = False
 
         if self.api_key:
             try:
-                self.client = Groq(api_key=self.api_key)
+                self.client = AsyncGroq(api_key=self.api_key, base_url=self.base_url)
                 self._enabled = True
                 logger.info("AI Service initialized with Groq")
             except Exception as e:
@@ -177,92 +212,179 @@ class AIService:
         Returns:
             Generated text or None if failed
         """
+        metrics = get_ai_metrics()
+        metrics.record_request(prompt_type)
+
         if not self.is_enabled:
-            return self._get_fallback(prompt_type, context)
+            return self._fallback(prompt_type, context, "disabled")
 
         system_prompt = SYSTEM_PROMPTS.get(prompt_type)
         if not system_prompt:
             logger.error(f"Unknown prompt type: {prompt_type}")
+            metrics.record_error(prompt_type)
             return None
 
+        requester = get_current_requester()
+        scheduler = get_ai_scheduler()
+
         try:
             user_message = context if context else "Genera contenido creativo."
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
+            async with scheduler.slot(requester):
+                started = time.perf_counter()
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_message}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                )
+
+                latency_ms = (time.perf_counter() - started) * 1000
 
             result = response.choices[0].message.content.strip()
+            usage = _response_usage(response)
+            scheduler.record_usage(requester, _usage_tokens(usage, result))
+            metrics.record_success(
+                prompt_type, latency_ms, usage=usage, text=result, max_tokens=max_tokens
+            )
+            self._harvest(prompt_type, result, response.choices[0].finish_reason)
             logger.debug(f"AI generated [{prompt_type}]: {result[:50]}...")
             return result
 
+        except AIRequestRejectedError as e:
+            logger.info(f"AI request answered from fallback ({e.reason}): {prompt_type}")
+            return self._fallback(prompt_type, context, e.reason)
+
         except Exception as e:
             logger.error(f"AI generation error: {e}")
-            return self._get_fallback(prompt_type, context)
+            metrics.record_error(prompt_type)
+            return self._fallback(prompt_type, context, "error")
+
+    async def generate_stream(
+        self,
+        prompt_type: str,
+        context: str = "",
+        max_tokens: int = 200,
+        temperature: float = 0.8
+    ) -> AsyncGenerator[str, None]:
+        """Generate content using AI, yielding text chunks as they arrive.
+
+        Falls back to a single fallback chunk when the AI is disabled or the
+        request fails before any content was produced. If the stream breaks
+        after content has been yielded, it simply ends early.
+
+        Args:
+            prompt_type: Type of content to generate (task, punishment, etc.)
+            context: Additional context for the generation
+            max_tokens: Maximum tokens in response
+            temperature: Creativity level (0.0-1.0)
+
+        Yields:
+            Text chunks in generation order
+        """
+        metrics = get_ai_metrics()
+        metrics.record_request(prompt_type)
+
+        if not self.is_enabled:
+            yield self._fallback(prompt_type, context, "disabled")
+            return
+
+        system_prompt = SYSTEM_PROMPTS.get(prompt_type)
+        if not system_prompt:
+            logger.error(f"Unknown prompt type: {prompt_type}")
+            metrics.record_error(prompt_type)
+            return
+
+        requester = get_current_requester()
+        scheduler = get_ai_scheduler()
+        produced = False
+        parts: list[str] = []
+        pending = None
+        last_chunk = None
+        finish_reason = None
+        first_chunk_ms = None
+        try:
+            user_message = context if context else "Genera contenido creativo."
+
+            async with scheduler.slot(requester):
+                started = time.perf_counter()
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_message}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                )
+
+                async for chunk in stream:
+                    last_chunk = chunk
+                    if not chunk.choices:
+                        continue
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if not produced:
+                            first_chunk_ms = (time.perf_counter() - started) * 1000
+                        produced = True
+                        parts.append(delta)
+                        # Held back one chunk so the last one goes out after
+                        # the provider is done and the timing is taken
+                        if pending is not None:
+                            yield pending
+                        pending = delta
+
+                latency_ms = (time.perf_counter() - started) * 1000
+
+            text = "".join(parts)
+            usage = _response_usage(last_chunk)
+            scheduler.record_usage(requester, _usage_tokens(usage, text))
+            metrics.record_success(
+                prompt_type,
+                latency_ms,
+                usage=usage,
+                text=text,
+                max_tokens=max_tokens,
+                first_chunk_ms=first_chunk_ms,
+            )
+            self._harvest(prompt_type, text, finish_reason)
+
+        except AIRequestRejectedError as e:
+            logger.info(f"AI request answered from fallback ({e.reason}): {prompt_type}")
+            yield self._fallback(prompt_type, context, e.reason)
+
+        except Exception as e:
+            logger.error(f"AI streaming error: {e}")
+            metrics.record_error(prompt_type)
+            if pending is not None:
+                yield pending
+            else:
+                yield self._fallback(prompt_type, context, "error")
+
+        else:
+            if pending is not None:
+                yield pending
+
+    def _fallback(self, prompt_type: str, context: str, reason: str) -> str:
+        """Get fallback content and count why it was needed."""
+        get_ai_metrics().record_fallback(prompt_type, reason)
+        return self._get_fallback(prompt_type, context)
 
     def _get_fallback(self, prompt_type: str, context: str = "") -> str:
         """Get fallback content when AI is unavailable."""
-        fallbacks = {
-            "task": [
-                "📝 Escribe 3 razones por las que mereces servir.",
-                "🧎 Practica tu postura de sumisión por 5 minutos.",
-                "✍️ Escribe un poema de devoción para tu Dom.",
-                "🎭 Cuenta una fantasía que nunca hayas compartido.",
-                "📸 Describe tu lugar favorito para servir.",
-            ],
-            "challenge": [
-                "⚔️ Mantén silencio por los próximos 10 mensajes.",
-                "🎯 Haz 3 cumplidos sinceros a otros miembros.",
-                "🔥 Confiesa algo que nunca hayas dicho en el grupo.",
-                "💪 Demuestra tu obediencia siguiendo la próxima orden sin preguntar.",
-            ],
-            "punishment": [
-                "⚡ El látigo deja su marca... una lección que no olvidarás.",
-                "🔥 Las consecuencias de la desobediencia son claras.",
-                "⛓️ El castigo ha sido aplicado. Que sirva de recordatorio.",
-            ],
-            "reward": [
-                "🌟 Has demostrado ser digno/a de reconocimiento especial.",
-                "👑 Tu servicio ha sido ejemplar. Mereces alabanza.",
-                "💎 Una recompensa por tu devoción inquebrantable.",
-            ],
-            "scene": [
-                "🕯️ Las velas parpadean, proyectando sombras danzantes...",
-                "🏰 El silencio del calabozo es roto solo por respiraciones...",
-                "⛓️ El sonido metálico de las cadenas resuena en la oscuridad...",
-            ],
-            "prediction": [
-                "🔮 Las estrellas auguran... cambios interesantes en tu destino.",
-                "✨ El oráculo ve sumisión en tu futuro... o dominación.",
-                "🌙 La luna revela que una conexión intensa te aguarda.",
-            ],
-            "title": [
-                "👑 Señor/a de las Sombras Eternas",
-                "⛓️ Guardián/a del Calabozo Carmesí",
-                "🔥 Domador/a de Voluntades",
-                "💎 Joya Devota del Reino",
-                "🌙 Servidor/a de la Luna Oscura",
-            ],
-            "truth": [
-                "¿Cuál es tu fantasía más secreta que nunca has confesado?",
-                "¿Qué límite te gustaría explorar pero te da miedo?",
-                "¿Cuál fue tu experiencia más intensa en el mundo BDSM?",
-            ],
-            "dare": [
-                "Envía un mensaje de sumisión/dominación al último usuario que habló.",
-                "Describe tu escena ideal en 3 emojis.",
-                "Haz una reverencia virtual al Dom más cercano.",
-            ],
-        }
-
-        options = fallbacks.get(prompt_type, ["🎲 El destino ha hablado..."])
-        return random.choice(options)
+        requester = get_current_requester()
+        chat_id = requester.chat_id if requester else None
+        return get_fallback_corpus().pick(prompt_type, chat_id=chat_id)
+
+    def _harvest(self, prompt_type: str, text: str, finish_reason: Optional[str]) -> None:
+        """Keep complete AI outputs as future fallback content."""
+        if settings.enable_ai_harvest and finish_reason == "stop":
+            get_fallback_corpus().harvest(prompt_type, text)
 
     # Convenience methods for specific content types
 
@@ -295,11 +417,21 @@ class AIService:
         context = f"Describe una escena de: {theme}" if theme else "Describe una escena atmosférica de mazmorra."
         return await self.generate("scene", context)
 
+    def stream_scene(self, theme: str = None) -> AsyncGenerator[str, None]:
+        """Stream a scene description."""
+        context = f"Describe una escena de: {theme}" if theme else "Describe una escena atmosférica de mazmorra."
+        return self.generate_stream("scene", context)
+
     async def generate_ritual(self, dom: str, sub: str, ritual_type: str = "sumisión") -> str:
         """Generate a ritual description."""
         context = f"Describe un ritual de {ritual_type} entre {dom} (Dom) y {sub} (sub)."
         return await self.generate("ritual", context)
 
+    def stream_ritual(self, dom: str, sub: str, ritual_type: str = "sumisión") -> AsyncGenerator[str, None]:
+        """Stream a ritual description."""
+        context = f"Describe un ritual de {ritual_type} entre {dom} (Dom) y {sub} (sub)."
+        return self.generate_stream("ritual", context)
+
     async def generate_protocol(self, sub_name: str) -> str:
         """Generate protocol rules for a sub."""
         context = f"Genera un protocolo de comportamiento para {sub_name}."
@@ -323,6 +455,11 @@ class AIService:
         context = f"Predice el destino de {user_name} en el mundo BDSM."
         return await self.generate("prediction", context)
 
+    def stream_prediction(self, user_name: str) -> AsyncGenerator[str, None]:
+        """Stream a fortune prediction."""
+        context = f"Predice el destino de {user_name} en el mundo BDSM."
+        return self.generate_stream("prediction", context)
+
     async def generate_title(self, user_name: str, role: str) -> str:
         """Generate a noble/BDSM title."""
         context = f"Genera un título para {user_name} que es {role}."
@@ -338,6 +475,11 @@ class AIService:
         context = f"Analiza la compatibilidad entre {user1} ({role1}) y {user2} ({role2})."
         return await self.generate("compatibility", context, max_tokens=300)
 
+    def stream_compatibility(self, user1: str, role1: str, user2: str, role2: str) -> AsyncGenerator[str, None]:
+        """Stream a compatibility analysis between two users."""
+        context = f"Analiza la compatibilidad entre {user1} ({role1}) y {user2} ({role2})."
+        return self.generate_stream("compatibility", context, max_tokens=300)
+
     async def flavor_whip(self, dom: str, sub: str, reason: str = None) -> str:
         """Generate flavor text for whipping."""
         context = f"{dom} azota a {sub}"
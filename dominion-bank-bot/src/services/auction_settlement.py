@@ -0,0 +1,217 @@
+"""
+The Phantom Bot - Auction Settlement
+Closes auctions at ends_at: pays the escrowed winning bid to the seller,
+records the transactions and notifies every bidder.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import and_, case, delete, insert, select, update
+
+from src.config import settings
+from src.database.connection import get_session
+from src.database.models import (
+    Auction,
+    AuctionStatus,
+    Bid,
+    BidEscrow,
+    Transaction,
+    TransactionType,
+    User,
+)
+from src.database.repositories import LedgerStatsRepository
+from src.services.notifications import NotificationType, get_notification_service
+
+logger = logging.getLogger(__name__)
+
+# Bidders are warned this long before an auction ends
+ENDING_NOTICE = timedelta(hours=1)
+# Late warnings (restart, anti-sniping extension) are skipped past this
+ENDING_NOTICE_GRACE = timedelta(minutes=5)
+
+
+@dataclass(frozen=True)
+class SettledAuction:
+    """Outcome of one settled auction."""
+    auction_id: int
+    seller_id: int
+    winner_id: Optional[int]
+    amount: int
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _chunks(items: Sequence[int], size: int) -> Iterable[Sequence[int]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# =============================================================================
+# SETTLEMENT
+# =============================================================================
+
+async def settle_auctions(auction_ids: Optional[Sequence[int]] = None) -> list[SettledAuction]:
+    """
+    Settle active auctions past ends_at.
+
+    Each batch of AUCTION_SETTLE_BATCH auctions costs a fixed number of
+    statements whatever its size: one UPDATE ... RETURNING that closes them
+    (so an auction is only ever settled once), one UPDATE crediting all
+    sellers, one bulk INSERT of transactions and one query for the bidders
+    to notify. The winning bid was already taken from the winner into
+    bid_escrow when it was placed, so the hold is dropped and paid to the
+    seller.
+
+    Args:
+        auction_ids: Auctions to settle, or None for every expired one
+    """
+    if auction_ids is None:
+        async with get_session() as session:
+            result = await session.execute(
+                select(Auction.id).where(
+                    and_(Auction.status == AuctionStatus.ACTIVE, Auction.ends_at <= _now())
+                )
+            )
+            auction_ids = result.scalars().all()
+
+    settled: list[SettledAuction] = []
+    for batch in _chunks(list(auction_ids), max(1, settings.auction_settle_batch)):
+        async with get_session() as session:
+            closed = await _settle_batch(session, batch)
+            notices = await _outcome_notices(session, closed) if closed else []
+        settled.extend(closed)
+        await get_notification_service().send_many(notices)
+
+    if settled:
+        logger.info(f"Settled {len(settled)} auctions")
+    return settled
+
+
+async def _settle_batch(session, auction_ids: Sequence[int]) -> list[SettledAuction]:
+    result = await session.execute(
+        update(Auction)
+        .where(
+            and_(
+                Auction.id.in_(auction_ids),
+                Auction.status == AuctionStatus.ACTIVE,
+                Auction.ends_at <= _now(),
+            )
+        )
+        .values(status=AuctionStatus.COMPLETED)
+        .returning(Auction.id, Auction.seller_id, Auction.current_bidder_id, Auction.current_bid)
+        .execution_options(synchronize_session=False)
+    )
+    closed = [
+        SettledAuction(auction_id, seller_id, winner_id if bid else None, bid or 0)
+        for auction_id, seller_id, winner_id, bid in result.all()
+    ]
+
+    if closed:
+        await session.execute(
+            delete(BidEscrow).where(BidEscrow.auction_id.in_([s.auction_id for s in closed]))
+        )
+
+    sold = [s for s in closed if s.winner_id is not None and s.amount > 0]
+    if sold:
+        payouts: dict[int, int] = {}
+        for s in sold:
+            payouts[s.seller_id] = payouts.get(s.seller_id, 0) + s.amount
+
+        await session.execute(
+            update(User)
+            .where(User.id.in_(payouts))
+            .values(balance=User.balance + case(payouts, value=User.id, else_=0))
+            .execution_options(synchronize_session=False)
+        )
+        transactions = [
+            {
+                "sender_id": s.winner_id,
+                "recipient_id": s.seller_id,
+                "amount": s.amount,
+                "transaction_type": TransactionType.AUCTION,
+                "description": f"Subasta #{s.auction_id} ganada",
+            }
+            for s in sold
+        ]
+        await session.execute(insert(Transaction), transactions)
+        await LedgerStatsRepository(session).record_many(transactions)
+    return closed
+
+
+async def _outcome_notices(session, closed: list[SettledAuction]) -> list[tuple]:
+    """(telegram_id, type, kwargs) for every distinct bidder of the closed auctions."""
+    winners = {s.auction_id: s for s in closed}
+    bidders = await _bidders(session, list(winners))
+    names = await _target_names(session, list(winners))
+
+    notices = []
+    for auction_id, bidder_id, telegram_id in bidders:
+        settled = winners[auction_id]
+        kwargs = {"target_name": names.get(auction_id, f"#{auction_id}")}
+        if bidder_id == settled.winner_id:
+            notices.append((telegram_id, NotificationType.AUCTION_WON,
+                            {**kwargs, "amount": settled.amount}))
+        else:
+            notices.append((telegram_id, NotificationType.AUCTION_LOST, kwargs))
+    return notices
+
+
+async def _bidders(session, auction_ids: list[int]) -> list[tuple[int, int, int]]:
+    """Distinct (auction_id, user_id, telegram_id) from the Bid table."""
+    result = await session.execute(
+        select(Bid.auction_id, Bid.bidder_id, User.telegram_id)
+        .join(User, User.id == Bid.bidder_id)
+        .where(and_(Bid.auction_id.in_(auction_ids), User.telegram_id != 0))
+        .distinct()
+    )
+    return result.all()
+
+
+async def _target_names(session, auction_ids: list[int]) -> dict[int, str]:
+    result = await session.execute(
+        select(Auction.id, User)
+        .join(User, User.id == Auction.target_id)
+        .where(Auction.id.in_(auction_ids))
+    )
+    return {auction_id: user.display_name for auction_id, user in result.all()}
+
+
+# =============================================================================
+# ENDING NOTICE
+# =============================================================================
+
+async def notify_auctions_ending(auction_ids: Sequence[int]) -> int:
+    """
+    Warn the bidders of auctions entering their last hour.
+
+    Auctions that are already closer to the end than the notice (the bot
+    was down, or anti-sniping moved ends_at) are skipped.
+    """
+    latest = _now() + ENDING_NOTICE - ENDING_NOTICE_GRACE
+    async with get_session() as session:
+        result = await session.execute(
+            select(Auction.id).where(
+                and_(
+                    Auction.id.in_(auction_ids),
+                    Auction.status == AuctionStatus.ACTIVE,
+                    Auction.ends_at > latest,
+                )
+            )
+        )
+        ending = result.scalars().all()
+        if not ending:
+            return 0
+        bidders = await _bidders(session, ending)
+        names = await _target_names(session, ending)
+
+    notices = [
+        (telegram_id, NotificationType.AUCTION_ENDING,
+         {"target_name": names.get(auction_id, f"#{auction_id}")})
+        for auction_id, _, telegram_id in bidders
+    ]
+    await get_notification_service().send_many(notices)
+    return len(notices)
@@ -9,6 +9,8 @@ from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import settings
+from src.database.auth_cache import get_auth_cache
+from src.database.identity_cache import get_identity_cache
 from src.database.repositories import AdminRepository, UserRepository
 
 logger = logging.getLogger(__name__)
@@ -61,8 +63,10 @@ class AuthorizationService:
                 is_global_admin=True,
             )
 
-        # Get user from database
-        user = await self.user_repo.get_by_telegram_id(telegram_id)
+        # Cached identity, else the database (which fills the cache)
+        user = get_identity_cache().get(telegram_id)
+        if user is None:
+            user = await self.user_repo.get_by_telegram_id(telegram_id)
         if not user:
             return AuthorizationResult(
                 is_authorized=False,
@@ -152,3 +156,22 @@ class AuthorizationService:
         """Get internal user ID from Telegram ID."""
         user = await self.user_repo.get_by_telegram_id(telegram_id)
         return user.id if user else None
+
+
+async def get_member_status(bot, chat_id: int, telegram_id: int) -> Optional[str]:
+    """
+    Telegram status of a chat member, memoized for CHAT_MEMBER_CACHE_TTL.
+
+    Returns None if Telegram could not be asked (the failure is not cached).
+    """
+    cache = get_auth_cache()
+    status = cache.get_member_status(chat_id, telegram_id)
+    if status is None:
+        try:
+            member = await bot.get_chat_member(chat_id, telegram_id)
+        except Exception as e:
+            logger.warning(f"get_chat_member failed for {telegram_id} in {chat_id}: {e}")
+            return None
+        status = member.status
+        cache.put_member_status(chat_id, telegram_id, status)
+    return status
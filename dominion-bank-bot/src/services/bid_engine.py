@@ -0,0 +1,303 @@
+"""
+The Phantom Bot - Bid Engine
+Serializes bids per auction: each auction with bidding activity gets an
+in-memory queue worked by one task, against a cached copy of its state.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from src.database.connection import get_session
+from src.database.models import Auction, AuctionStatus, User
+from src.database.repositories import AuctionRepository, EscrowRepository
+from src.database.repositories.auction import snipe_deadline
+from src.services.timed_events import get_timed_events, utc
+
+logger = logging.getLogger(__name__)
+
+
+class BidError(Enum):
+    """Bid operation error types."""
+    NOT_FOUND = "not_found"
+    NOT_ACTIVE = "not_active"
+    ENDED = "ended"
+    OWN_AUCTION = "own_auction"
+    BID_TOO_LOW = "bid_too_low"
+    INSUFFICIENT_BALANCE = "insufficient_balance"
+    CONFLICT = "conflict"
+
+
+@dataclass
+class BidResult:
+    """Result of a bid or cancellation."""
+    success: bool
+    error: Optional[BidError] = None
+    min_required: Optional[int] = None
+    balance: Optional[int] = None
+    # Data for success case
+    refunded: Optional[int] = None
+    extended: bool = False
+    ends_at: Optional[datetime] = None
+    target_name: Optional[str] = None
+    description: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class AuctionState:
+    """What the bid engine knows about one auction."""
+    auction_id: int
+    seller_id: int
+    starting_price: int
+    status: AuctionStatus
+    ends_at: datetime
+    current_bid: Optional[int]
+    current_bidder_id: Optional[int]
+    target_name: Optional[str]
+    description: Optional[str]
+
+    @property
+    def min_bid(self) -> int:
+        return max(self.starting_price, (self.current_bid or 0) + 1)
+
+
+class _StaleStateError(Exception):
+    """The auction changed outside the engine; reload and decide again."""
+
+
+class _InsufficientFundsError(Exception):
+    """The bidder could not cover the bid; roll the bid back."""
+
+
+class _AuctionActor:
+    """Queue of pending operations and cached state of one auction."""
+
+    __slots__ = ("queue", "state", "worker")
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.state: Optional[AuctionState] = None
+        self.worker: Optional[asyncio.Task] = None
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+class BidEngine:
+    """
+    One actor per auction with bids in flight.
+
+    Operations on an auction (bids, cancellation) are queued and run one at
+    a time by that auction's worker, so two bids are never decided on the
+    same current_bid. Validation uses the cached state; the decision is
+    then written in one transaction (guarded auction UPDATE, bid INSERT and
+    the escrow move of funds). If the auction changed elsewhere (settled,
+    edited) the guard fails, the state is reloaded and the bid decided
+    again once.
+
+    Settlement and cancellation release or pay out the escrow row, so
+    balances are never read and written back by handlers.
+
+    Usage:
+        result = await get_bid_engine().bid(auction_id, bidder.id, amount)
+    """
+
+    def __init__(self):
+        self._actors: dict[int, _AuctionActor] = {}
+        self.processed = 0
+        self.conflicts = 0
+
+    def __len__(self) -> int:
+        return len(self._actors)
+
+    async def bid(self, auction_id: int, bidder_id: int, amount: int) -> BidResult:
+        """Queue a bid and wait for its outcome."""
+        return await self._submit(auction_id, self._place, bidder_id, amount)
+
+    async def cancel(self, auction_id: int) -> BidResult:
+        """Queue the cancellation of an auction, refunding the leading bid."""
+        return await self._submit(auction_id, self._cancel)
+
+    # -------------------------------------------------------------------------
+    # Actors
+    # -------------------------------------------------------------------------
+
+    async def _submit(
+        self,
+        auction_id: int,
+        operation: Callable[..., Awaitable[BidResult]],
+        *args: Any,
+    ) -> BidResult:
+        actor = self._actors.get(auction_id)
+        if actor is None:
+            self._prune()
+            actor = self._actors[auction_id] = _AuctionActor()
+
+        future = asyncio.get_running_loop().create_future()
+        actor.queue.put_nowait((operation, args, future))
+        if actor.worker is None:
+            actor.worker = asyncio.create_task(self._drain(auction_id, actor))
+        return await future
+
+    async def _drain(self, auction_id: int, actor: _AuctionActor) -> None:
+        """Run queued operations in order; the task ends when the queue is empty."""
+        while not actor.queue.empty():
+            operation, args, future = actor.queue.get_nowait()
+            try:
+                result = await operation(actor, auction_id, *args)
+            except Exception as e:
+                actor.state = None
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            self.processed += 1
+        actor.worker = None
+        if actor.state is None or not self._live(actor.state):
+            self._actors.pop(auction_id, None)
+
+    def _prune(self) -> None:
+        """Forget idle actors of auctions that already ended."""
+        for auction_id, actor in list(self._actors.items()):
+            if actor.worker is None and (actor.state is None or not self._live(actor.state)):
+                del self._actors[auction_id]
+
+    @staticmethod
+    def _live(state: AuctionState) -> bool:
+        return state.status == AuctionStatus.ACTIVE and utc(state.ends_at) > datetime.now(timezone.utc)
+
+    async def _load(self, auction_id: int) -> Optional[AuctionState]:
+        target = aliased(User)
+        async with get_session() as session:
+            result = await session.execute(
+                select(Auction, target)
+                .outerjoin(target, target.id == Auction.target_id)
+                .where(Auction.id == auction_id)
+            )
+            row = result.first()
+        if row is None:
+            return None
+        auction, target_user = row
+        return AuctionState(
+            auction_id=auction.id,
+            seller_id=auction.seller_id,
+            starting_price=auction.starting_price,
+            status=auction.status,
+            ends_at=utc(auction.ends_at),
+            current_bid=auction.current_bid,
+            current_bidder_id=auction.current_bidder_id,
+            target_name=target_user.display_name if target_user else None,
+            description=auction.description,
+        )
+
+    # -------------------------------------------------------------------------
+    # Operations (run by the actor's worker only)
+    # -------------------------------------------------------------------------
+
+    async def _place(self, actor: _AuctionActor, auction_id: int, bidder_id: int, amount: int) -> BidResult:
+        for _ in range(2):
+            if actor.state is None:
+                actor.state = await self._load(auction_id)
+            state = actor.state
+
+            error = self._check(state, bidder_id, amount)
+            if error:
+                return error
+
+            now = datetime.now(timezone.utc)
+            extended = snipe_deadline(state.ends_at, now)
+            previous = (
+                (state.current_bidder_id, state.current_bid)
+                if state.current_bidder_id and state.current_bid else None
+            )
+            try:
+                async with get_session() as session:
+                    if not await AuctionRepository(session).record_bid(
+                        auction_id, bidder_id, amount, state.current_bid, extended
+                    ):
+                        raise _StaleStateError()
+                    if not await EscrowRepository(session).hold(auction_id, bidder_id, amount, previous):
+                        raise _InsufficientFundsError()
+            except _StaleStateError:
+                self.conflicts += 1
+                actor.state = None
+                continue
+            except _InsufficientFundsError:
+                return BidResult(
+                    success=False,
+                    error=BidError.INSUFFICIENT_BALANCE,
+                    balance=await self._balance(bidder_id),
+                )
+
+            actor.state = replace(
+                state,
+                current_bid=amount,
+                current_bidder_id=bidder_id,
+                ends_at=extended or state.ends_at,
+            )
+            if extended:
+                get_timed_events().reschedule(Auction, auction_id, extended)
+            logger.info(f"Bid: user {bidder_id} bid {amount} on auction #{auction_id}")
+            return BidResult(
+                success=True,
+                extended=extended is not None,
+                ends_at=actor.state.ends_at,
+                target_name=state.target_name,
+                description=state.description,
+            )
+
+        return BidResult(success=False, error=BidError.CONFLICT)
+
+    @staticmethod
+    def _check(state: Optional[AuctionState], bidder_id: int, amount: int) -> Optional[BidResult]:
+        if state is None:
+            return BidResult(success=False, error=BidError.NOT_FOUND)
+        if state.status != AuctionStatus.ACTIVE:
+            return BidResult(success=False, error=BidError.NOT_ACTIVE)
+        if utc(state.ends_at) <= datetime.now(timezone.utc):
+            return BidResult(success=False, error=BidError.ENDED)
+        if state.seller_id == bidder_id:
+            return BidResult(success=False, error=BidError.OWN_AUCTION)
+        if amount < state.min_bid:
+            return BidResult(success=False, error=BidError.BID_TOO_LOW, min_required=state.min_bid)
+        return None
+
+    async def _cancel(self, actor: _AuctionActor, auction_id: int) -> BidResult:
+        async with get_session() as session:
+            if not await AuctionRepository(session).cancel(auction_id):
+                return BidResult(success=False, error=BidError.NOT_ACTIVE)
+            refunded = await EscrowRepository(session).release(auction_id)
+        actor.state = None
+        return BidResult(success=True, refunded=refunded[1] if refunded else None)
+
+    async def _balance(self, user_id: int) -> Optional[int]:
+        async with get_session() as session:
+            user = await session.get(User, user_id)
+            return user.balance if user else None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "actors": len(self._actors),
+            "queued": sum(actor.queue.qsize() for actor in self._actors.values()),
+            "processed": self.processed,
+            "conflicts": self.conflicts,
+        }
+
+
+# Global engine instance
+_engine: Optional[BidEngine] = None
+
+
+def get_bid_engine() -> BidEngine:
+    """Get or create the bid engine."""
+    global _engine
+    if _engine is None:
+        _engine = BidEngine()
+    return _engine
@@ -0,0 +1,167 @@
+"""
+The Phantom Bot - Contract Lifecycle
+Expires active contracts at ends_at and reminds both parties 24 hours
+before, with set-based updates and one bulk notification per batch.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import and_, select, update
+
+from src.database.connection import get_session
+from src.database.models import Contract, ContractStatus, User
+from src.services.notifications import NotificationType, get_notification_service
+
+logger = logging.getLogger(__name__)
+
+# Both parties are reminded this long before a contract ends
+EXPIRY_NOTICE = timedelta(hours=24)
+
+# Contracts updated per statement
+BATCH_SIZE = 500
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _chunks(items: Sequence[int], size: int) -> Iterable[Sequence[int]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def _due_ids(*criteria) -> list[int]:
+    """Active contracts matching criteria (a range scan on status, ends_at)."""
+    async with get_session() as session:
+        result = await session.execute(
+            select(Contract.id).where(
+                and_(Contract.status == ContractStatus.ACTIVE, Contract.ends_at.is_not(None), *criteria)
+            )
+        )
+        return list(result.scalars().all())
+
+
+async def _party_notices(
+    session,
+    contracts: Sequence[tuple[int, int, int]],
+    notification_type: NotificationType,
+) -> list[tuple]:
+    """One notice per party of each (contract_id, dom_id, sub_id), naming the other party."""
+    user_ids = {user_id for _, dom_id, sub_id in contracts for user_id in (dom_id, sub_id)}
+    result = await session.execute(select(User).where(User.id.in_(user_ids)))
+    users = {user.id: user for user in result.scalars()}
+
+    notices = []
+    for _, dom_id, sub_id in contracts:
+        for user_id, other_id in ((dom_id, sub_id), (sub_id, dom_id)):
+            user, other = users.get(user_id), users.get(other_id)
+            if user is None or other is None or user.telegram_id == 0:
+                continue
+            notices.append(
+                (user.telegram_id, notification_type, {"target_name": other.display_name})
+            )
+    return notices
+
+
+# =============================================================================
+# EXPIRY
+# =============================================================================
+
+async def expire_contracts(contract_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Mark active contracts past ends_at as expired and tell both parties.
+
+    Each batch is one UPDATE ... RETURNING, so a contract expires (and is
+    announced) only once however often it is passed in.
+
+    Args:
+        contract_ids: Contracts to check, or None for every overdue one
+
+    Returns:
+        Number of contracts expired
+    """
+    if contract_ids is None:
+        contract_ids = await _due_ids(Contract.ends_at <= _now())
+
+    expired = 0
+    for batch in _chunks(list(contract_ids), BATCH_SIZE):
+        async with get_session() as session:
+            result = await session.execute(
+                update(Contract)
+                .where(
+                    and_(
+                        Contract.id.in_(batch),
+                        Contract.status == ContractStatus.ACTIVE,
+                        Contract.ends_at <= _now(),
+                    )
+                )
+                .values(status=ContractStatus.EXPIRED)
+                .returning(Contract.id, Contract.dom_id, Contract.sub_id)
+                .execution_options(synchronize_session=False)
+            )
+            closed = result.all()
+            notices = await _party_notices(session, closed, NotificationType.CONTRACT_EXPIRED)
+        expired += len(closed)
+        await get_notification_service().send_many(notices)
+
+    if expired:
+        logger.info(f"Expired {expired} contracts")
+    return expired
+
+
+# =============================================================================
+# REMINDER
+# =============================================================================
+
+async def remind_contracts_expiring(contract_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Remind both parties of active contracts entering their last 24 hours.
+
+    reminded_at is set in the same UPDATE that selects the contracts, so a
+    reminder is sent once even across restarts. Contracts that were signed
+    for less than the notice period are marked without a reminder.
+
+    Args:
+        contract_ids: Contracts to check, or None for every one in the window
+
+    Returns:
+        Number of contracts whose parties were reminded
+    """
+    if contract_ids is None:
+        contract_ids = await _due_ids(
+            Contract.reminded_at.is_(None),
+            Contract.ends_at <= _now() + EXPIRY_NOTICE,
+        )
+
+    reminded = 0
+    for batch in _chunks(list(contract_ids), BATCH_SIZE):
+        now = _now()
+        async with get_session() as session:
+            result = await session.execute(
+                update(Contract)
+                .where(
+                    and_(
+                        Contract.id.in_(batch),
+                        Contract.status == ContractStatus.ACTIVE,
+                        Contract.reminded_at.is_(None),
+                        Contract.ends_at > now,
+                        Contract.ends_at <= now + EXPIRY_NOTICE,
+                    )
+                )
+                .values(reminded_at=now)
+                .returning(Contract.id, Contract.dom_id, Contract.sub_id, Contract.starts_at, Contract.ends_at)
+                .execution_options(synchronize_session=False)
+            )
+            due = [
+                (contract_id, dom_id, sub_id)
+                for contract_id, dom_id, sub_id, starts_at, ends_at in result.all()
+                if starts_at is None or ends_at - starts_at.replace(tzinfo=None) > EXPIRY_NOTICE
+            ]
+            notices = await _party_notices(session, due, NotificationType.CONTRACT_EXPIRING)
+        reminded += len(due)
+        await get_notification_service().send_many(notices)
+
+    if reminded:
+        logger.info(f"Reminded the parties of {reminded} expiring contracts")
+    return reminded
@@ -0,0 +1,287 @@
+"""
+The Phantom Bot - Economy Batch Engine
+Periodic balance rules (altar income, wealth tax, inactivity decay)
+applied to every user at once with set-based statements.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import Integer, and_, cast, exists, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import Select
+
+from src.config import settings
+from src.database.connection import get_session
+from src.database.models import (
+    Altar,
+    EconomyRun,
+    Transaction,
+    TransactionType,
+    User,
+    UserStatus,
+)
+from src.database.repositories import LedgerStatsRepository
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "economy_batch"
+
+
+@dataclass(frozen=True)
+class EconomyRule:
+    """
+    A balance change applied to many users once per period.
+
+    Attributes:
+        name: Key in the run ledger
+        transaction_type: Type of the Transaction rows recorded
+        sign: +1 to credit the amounts, -1 to debit them
+        description: Transaction description (the period is appended)
+        source: Builds SELECT (user_id, amount) of the users affected at now
+        enabled: Whether the rule runs with the current settings
+    """
+    name: str
+    transaction_type: TransactionType
+    sign: int
+    description: str
+    source: Callable[[datetime], Select]
+    enabled: Callable[[], bool] = lambda: True
+
+
+@dataclass
+class RuleResult:
+    """Outcome of one rule for one period."""
+    rule: str
+    period: str
+    users: int = 0
+    total: int = 0
+    skipped: bool = False
+    duration_ms: float = 0.0
+
+
+# =============================================================================
+# RULES
+# =============================================================================
+
+def altar_income(now: datetime) -> Select:
+    """Every altar pays its daily_amount to the user it honours."""
+    return (
+        select(Altar.for_user_id.label("user_id"), func.sum(Altar.daily_amount).label("amount"))
+        .group_by(Altar.for_user_id)
+    )
+
+
+def wealth_tax(now: datetime) -> Select:
+    """Active users pay WEALTH_TAX_RATE of their balance above WEALTH_TAX_THRESHOLD."""
+    threshold = settings.wealth_tax_threshold
+    return (
+        select(
+            User.id.label("user_id"),
+            cast((User.balance - threshold) * settings.wealth_tax_rate, Integer).label("amount"),
+        )
+        .where(and_(User.status == UserStatus.ACTIVE, User.balance > threshold))
+    )
+
+
+def inactivity_decay(now: datetime) -> Select:
+    """Users who sent nothing for INACTIVITY_DECAY_DAYS lose INACTIVITY_DECAY_RATE of their balance."""
+    cutoff = (now - timedelta(days=settings.inactivity_decay_days)).replace(tzinfo=None)
+    recent = exists().where(
+        and_(Transaction.sender_id == User.id, Transaction.created_at > cutoff)
+    )
+    return (
+        select(
+            User.id.label("user_id"),
+            cast(User.balance * settings.inactivity_decay_rate, Integer).label("amount"),
+        )
+        .where(
+            and_(
+                User.status == UserStatus.ACTIVE,
+                User.telegram_id != 0,
+                User.balance > 0,
+                User.created_at <= cutoff,
+                ~recent,
+            )
+        )
+    )
+
+
+DEFAULT_RULES: tuple[EconomyRule, ...] = (
+    EconomyRule(
+        "altar_income", TransactionType.ALTAR_INCOME, +1, "Ingreso del altar", altar_income,
+        enabled=lambda: settings.enable_altar_income,
+    ),
+    EconomyRule(
+        "wealth_tax", TransactionType.WEALTH_TAX, -1, "Impuesto a la riqueza", wealth_tax,
+        enabled=lambda: settings.wealth_tax_rate > 0,
+    ),
+    EconomyRule(
+        "inactivity_decay", TransactionType.INACTIVITY_DECAY, -1, "Inactividad", inactivity_decay,
+        enabled=lambda: settings.inactivity_decay_rate > 0,
+    ),
+)
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+class EconomyBatchEngine:
+    """
+    Applies each enabled rule at most once per period (a UTC day).
+
+    A rule run is one transaction of a fixed number of statements whatever
+    the number of users:
+
+        1. INSERT the (rule, period) row into economy_runs; the unique
+           constraint makes a second run of the same period fail here
+        2. INSERT ... SELECT the Transaction rows from the rule's source
+        3. UPDATE users ... FROM those transactions (matched by type and
+           the run timestamp), so balances move exactly by what was recorded
+        4. UPDATE the ledger row with the totals
+
+    The recorded transactions are also added to the ledger stats with one
+    INSERT ... SELECT per side.
+
+    Usage:
+        await get_economy_batch().start(application.job_queue)
+    """
+
+    def __init__(self, rules: Iterable[EconomyRule] = DEFAULT_RULES):
+        self.rules = tuple(rules)
+        self.last_results: dict[str, RuleResult] = {}
+
+    @staticmethod
+    def period_of(now: datetime) -> str:
+        return now.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+    async def run(self, now: Optional[datetime] = None) -> list[RuleResult]:
+        """Apply every enabled rule not yet applied for the current period."""
+        now = now or datetime.now(timezone.utc)
+        results = []
+        for rule in self.rules:
+            if not rule.enabled():
+                continue
+            try:
+                result = await self.apply(rule, now)
+            except Exception as e:
+                logger.error(f"Economy rule {rule.name} failed: {e}")
+                continue
+            self.last_results[rule.name] = result
+            results.append(result)
+        return results
+
+    async def apply(self, rule: EconomyRule, now: datetime) -> RuleResult:
+        period = self.period_of(now)
+        result = RuleResult(rule.name, period)
+        started = time.perf_counter()
+        # Naive UTC, as stored; also tags this run's transactions
+        ran_at = now.astimezone(timezone.utc).replace(tzinfo=None)
+
+        try:
+            async with get_session() as session:
+                done = await session.execute(
+                    select(EconomyRun.id).where(
+                        and_(EconomyRun.rule == rule.name, EconomyRun.period == period)
+                    )
+                )
+                if done.first() is not None:
+                    result.skipped = True
+                    return result
+
+                run = EconomyRun(rule=rule.name, period=period, ran_at=ran_at)
+                session.add(run)
+                await session.flush()
+
+                await session.execute(self._record(rule, period, ran_at))
+                this_run = and_(
+                    Transaction.transaction_type == rule.transaction_type,
+                    Transaction.created_at == ran_at,
+                )
+                await LedgerStatsRepository(session).record_where(this_run)
+                recorded = (
+                    select(
+                        Transaction.recipient_id.label("user_id"),
+                        func.sum(Transaction.amount).label("amount"),
+                    )
+                    .where(this_run)
+                    .group_by(Transaction.recipient_id)
+                    .subquery()
+                )
+                totals = await session.execute(
+                    select(func.count(), func.coalesce(func.sum(recorded.c.amount), 0))
+                )
+                result.users, result.total = totals.one()
+
+                if result.users:
+                    await session.execute(
+                        update(User)
+                        .where(User.id == recorded.c.user_id)
+                        .values(balance=User.balance + rule.sign * recorded.c.amount)
+                        .execution_options(synchronize_session=False)
+                    )
+                run.users_affected = result.users
+                run.total_amount = result.total
+        except IntegrityError:
+            # Another worker applied this period first
+            result.skipped = True
+            return result
+
+        result.duration_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"Economy rule {rule.name} ({period}): {result.users} users, "
+            f"{result.total} total in {result.duration_ms:.0f} ms"
+        )
+        return result
+
+    @staticmethod
+    def _record(rule: EconomyRule, period: str, ran_at: datetime):
+        """INSERT ... SELECT of one Transaction per affected user."""
+        source = rule.source(ran_at.replace(tzinfo=timezone.utc)).subquery()
+        type_column = Transaction.__table__.c.transaction_type
+        return insert(Transaction).from_select(
+            ["recipient_id", "amount", "transaction_type", "description", "created_at"],
+            select(
+                source.c.user_id,
+                source.c.amount,
+                literal(rule.transaction_type, type_column.type),
+                literal(f"{rule.description} {period}"),
+                literal(ran_at, Transaction.__table__.c.created_at.type),
+            ).where(source.c.amount > 0),
+        )
+
+    async def _on_timer(self, context) -> None:
+        await self.run()
+
+    async def start(self, job_queue=None) -> list[RuleResult]:
+        """Catch up on the current period now, then check every ECONOMY_BATCH_INTERVAL seconds."""
+        results = await self.run()
+        if job_queue is not None and settings.economy_batch_interval > 0:
+            job_queue.run_repeating(
+                self._on_timer,
+                interval=settings.economy_batch_interval,
+                first=settings.economy_batch_interval,
+                name=JOB_NAME,
+            )
+        return results
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            name: {"period": r.period, "users": r.users, "total": r.total, "skipped": r.skipped}
+            for name, r in self.last_results.items()
+        }
+
+
+# Global engine instance
+_engine: Optional[EconomyBatchEngine] = None
+
+
+def get_economy_batch() -> EconomyBatchEngine:
+    """Get or create the economy batch engine."""
+    global _engine
+    if _engine is None:
+        _engine = EconomyBatchEngine()
+    return _engine
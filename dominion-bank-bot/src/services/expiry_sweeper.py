@@ -0,0 +1,135 @@
+"""
+The Phantom Bot - Expiry Sweeper
+Periodically deletes expired cooldowns, dungeon entries and pending
+requests so those tables (and their indexes) stay small.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+from src.config import settings
+from src.database.connection import get_session
+from src.database.repositories import (
+    CooldownRepository,
+    DungeonRepository,
+    PendingRequestRepository,
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "expiry_sweeper"
+
+
+@dataclass
+class SweepStats:
+    """Counters of one swept table."""
+    runs: int = 0
+    deleted: int = 0
+    last_deleted: int = 0
+    last_duration_ms: float = 0.0
+    last_run: Optional[datetime] = None
+    errors: int = 0
+
+
+@dataclass(frozen=True)
+class SweepTarget:
+    """A table with expiring rows: its name and repository (with clear_expired)."""
+    table: str
+    repository: type
+
+
+DEFAULT_TARGETS: tuple[SweepTarget, ...] = (
+    SweepTarget("cooldowns", CooldownRepository),
+    SweepTarget("dungeon", DungeonRepository),
+    SweepTarget("pending_requests", PendingRequestRepository),
+)
+
+
+class ExpirySweeper:
+    """
+    Runs clear_expired on every target in chunks of SWEEPER_CHUNK rows.
+
+    Each chunk is its own DELETE and transaction, so a large backlog never
+    holds the write lock for long; a table is swept until a chunk comes
+    back short.
+
+    Usage:
+        await get_expiry_sweeper().start(application.job_queue)
+    """
+
+    def __init__(
+        self,
+        targets: Iterable[SweepTarget] = DEFAULT_TARGETS,
+        chunk: Optional[int] = None,
+        interval: Optional[float] = None,
+    ):
+        self.targets = tuple(targets)
+        self.chunk = max(1, settings.sweeper_chunk if chunk is None else chunk)
+        self.interval = settings.sweeper_interval if interval is None else interval
+        self.tables: dict[str, SweepStats] = {}
+
+    async def sweep(self) -> dict[str, int]:
+        """Sweep every table once. Returns rows deleted per table."""
+        return {target.table: await self.sweep_table(target) for target in self.targets}
+
+    async def sweep_table(self, target: SweepTarget) -> int:
+        stats = self.tables.setdefault(target.table, SweepStats())
+        started = time.perf_counter()
+        deleted = 0
+        try:
+            while True:
+                async with get_session() as session:
+                    count = await target.repository(session).clear_expired(limit=self.chunk)
+                deleted += count
+                if count < self.chunk:
+                    break
+        except Exception as e:
+            stats.errors += 1
+            logger.error(f"Sweeping {target.table} failed after {deleted} rows: {e}")
+
+        stats.runs += 1
+        stats.deleted += deleted
+        stats.last_deleted = deleted
+        stats.last_duration_ms = (time.perf_counter() - started) * 1000
+        stats.last_run = datetime.now(timezone.utc)
+        if deleted:
+            logger.info(f"Swept {deleted} expired rows from {target.table}")
+        return deleted
+
+    async def _on_timer(self, context) -> None:
+        await self.sweep()
+
+    async def start(self, job_queue=None) -> dict[str, int]:
+        """Sweep once now and then every SWEEPER_INTERVAL seconds."""
+        swept = await self.sweep()
+        if job_queue is not None and self.interval > 0:
+            job_queue.run_repeating(
+                self._on_timer, interval=self.interval, first=self.interval, name=JOB_NAME
+            )
+        return swept
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            table: {
+                "runs": s.runs,
+                "deleted": s.deleted,
+                "last_deleted": s.last_deleted,
+                "last_duration_ms": round(s.last_duration_ms, 1),
+                "errors": s.errors,
+            }
+            for table, s in self.tables.items()
+        }
+
+
+# Global sweeper instance
+_sweeper: Optional[ExpirySweeper] = None
+
+
+def get_expiry_sweeper() -> ExpirySweeper:
+    """Get or create the expiry sweeper."""
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = ExpirySweeper()
+    return _sweeper
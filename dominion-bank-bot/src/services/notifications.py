@@ -15,6 +15,9 @@ from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Notifications sent at once by send_many
+NOTIFY_CONCURRENCY = 20
+
 
 class NotificationType(str, Enum):
     """Types of notifications."""
@@ -31,6 +34,7 @@ class NotificationType(str, Enum):
     CONTRACT_REJECTED = "contract_rejected"
     CONTRACT_BROKEN = "contract_broken"
     CONTRACT_EXPIRING = "contract_expiring"
+    CONTRACT_EXPIRED = "contract_expired"
 
     # Auction notifications
     AUCTION_OUTBID = "auction_outbid"
@@ -88,6 +92,9 @@ TEMPLATES = {
     NotificationType.CONTRACT_EXPIRING: (
         "Tu contrato con {target_name} expira en 24 horas."
     ),
+    NotificationType.CONTRACT_EXPIRED: (
+        "Tu contrato con {target_name} ha expirado."
+    ),
 
     NotificationType.AUCTION_OUTBID: (
         "Has sido superado en la subasta de {target_name}.\n"
@@ -197,6 +204,28 @@ class NotificationService:
             logger.error(f"Failed to send notification to {user_id}: {e}")
             return False
 
+    async def send_many(self, notices: list[tuple]) -> int:
+        """
+        Send (user_id, notification_type, kwargs) notices concurrently.
+
+        Returns:
+            int: Number of notifications sent
+        """
+        if not notices:
+            return 0
+        if not self.bot:
+            logger.debug(f"Notification bot not set; {len(notices)} notices not sent")
+            return 0
+
+        semaphore = asyncio.Semaphore(NOTIFY_CONCURRENCY)
+
+        async def send(user_id, notification_type, kwargs):
+            async with semaphore:
+                return await self.send(user_id, notification_type, **kwargs)
+
+        results = await asyncio.gather(*(send(*notice) for notice in notices))
+        return sum(results)
+
     async def send_to_admins(
         self,
         message: str,
@@ -0,0 +1,388 @@
+"""
+The Phantom Bot - Timed Event Engine
+Runs work when rows reach their deadline (auction ends, dungeon expiry,
+contract end, pending request expiry) instead of re-filtering on reads.
+"""
+import heapq
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from sqlalchemy import and_, delete, event, select
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.database.connection import get_session
+from src.database.ephemeral_store import get_ephemeral_state
+from src.database.models import (
+    Auction,
+    AuctionStatus,
+    Contract,
+    ContractStatus,
+    Dungeon,
+    PendingRequest,
+    User,
+)
+from src.services.auction_settlement import (
+    ENDING_NOTICE,
+    notify_auctions_ending,
+    settle_auctions,
+)
+from src.services.contract_lifecycle import (
+    EXPIRY_NOTICE,
+    expire_contracts,
+    remind_contracts_expiring,
+)
+from src.services.notifications import NotificationType, get_notification_service
+
+logger = logging.getLogger(__name__)
+
+# Receives the keys (primary keys) of the rows whose deadline passed
+EventHandler = Callable[[list[Any]], Awaitable[None]]
+
+JOB_NAME = "timed_events"
+
+
+def utc(value: datetime) -> datetime:
+    """Treat naive datetimes (as SQLite returns them) as UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+@dataclass(frozen=True)
+class TimedEventType:
+    """
+    One kind of deadline and what to do when it passes.
+
+    Attributes:
+        kind: Name of the event type (e.g. "auction")
+        model: ORM model holding the deadline
+        column: Name of the deadline column (e.g. "ends_at")
+        handler: Called with the keys of rows whose deadline passed
+        key: Primary key attribute passed to the handler
+        where: Extra filters for loading pending rows (e.g. status == ACTIVE)
+        pending: Whether a flushed row still waits for its deadline
+        offset: Fire this long after the column value (negative = before)
+    """
+    kind: str
+    model: type
+    column: str
+    handler: EventHandler
+    key: str = "id"
+    where: tuple = ()
+    pending: Optional[Callable[[Any], bool]] = None
+    offset: timedelta = timedelta(0)
+
+
+class TimedEventEngine:
+    """
+    Min-heap of upcoming deadlines with one JobQueue timer for the earliest.
+
+    Deadlines within TIMED_EVENTS_HORIZON are loaded with an indexed range
+    query per event type at startup (and refilled periodically); rows
+    created or changed later are picked up from the ORM flush, so
+    repositories need no extra calls. When the timer fires, every due entry
+    is popped and handlers get their keys in one batch per kind.
+
+    Handlers must re-check the row state: a deadline can also be scheduled
+    by a flush whose transaction is later rolled back.
+
+    Usage:
+        engine = get_timed_events()
+        engine.register(TimedEventType("dungeon", Dungeon, "expires_at", release, key="user_id"))
+        await engine.start(application.job_queue)
+    """
+
+    def __init__(self, horizon: Optional[float] = None):
+        self.horizon = timedelta(
+            seconds=settings.timed_events_horizon if horizon is None else horizon
+        )
+        self._types: dict[str, TimedEventType] = {}
+        self._by_model: dict[type, list[TimedEventType]] = {}
+        self._heap: list[tuple[datetime, int, str, Any]] = []
+        self._due: dict[tuple[str, Any], datetime] = {}
+        self._seq = 0
+        self._loaded_until: Optional[datetime] = None
+        self._job_queue = None
+        self._job = None
+        self._armed_at: Optional[datetime] = None
+        self.fired: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    # -------------------------------------------------------------------------
+    # Registration and scheduling
+    # -------------------------------------------------------------------------
+
+    def register(self, event_type: TimedEventType) -> None:
+        if event_type.kind in self._types:
+            raise ValueError(f"Duplicate timed event type: {event_type.kind}")
+        self._types[event_type.kind] = event_type
+        self._by_model.setdefault(event_type.model, []).append(event_type)
+
+    def schedule(self, kind: str, key: Any, due: datetime) -> None:
+        """Schedule (or move) the deadline of one row."""
+        due = utc(due)
+        if self._loaded_until is not None and due > self._loaded_until:
+            # Beyond the loaded window: the next refill picks it up
+            self._due.pop((kind, key), None)
+            return
+        if self._due.get((kind, key)) == due:
+            return
+
+        self._due[(kind, key)] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, kind, key))
+        if self._armed_at is None or due < self._armed_at:
+            self._arm()
+
+    def reschedule(self, model: type, key: Any, due: datetime) -> None:
+        """Move every deadline of a row changed outside the ORM (bulk UPDATE)."""
+        for event_type in self._by_model.get(model, ()):
+            self.schedule(event_type.kind, key, utc(due) + event_type.offset)
+
+    def cancel(self, kind: str, key: Any) -> None:
+        """Forget a deadline; its heap entry is skipped when popped."""
+        self._due.pop((kind, key), None)
+
+    def next_due(self) -> Optional[datetime]:
+        """Earliest live deadline, or None."""
+        while self._heap:
+            due, _, kind, key = self._heap[0]
+            if self._due.get((kind, key)) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
+    async def load(self, now: Optional[datetime] = None) -> int:
+        """Load every deadline up to now + horizon (overdue ones included)."""
+        until = (now or datetime.now(timezone.utc)) + self.horizon
+        loaded = 0
+        async with get_session() as session:
+            for event_type in self._types.values():
+                column = getattr(event_type.model, event_type.column)
+                key = getattr(event_type.model, event_type.key)
+                last = (until - event_type.offset).replace(tzinfo=None)
+                result = await session.execute(
+                    select(key, column).where(
+                        and_(column.is_not(None), column <= last, *event_type.where)
+                    )
+                )
+                for row_key, due in result.all():
+                    self._schedule_loaded(event_type.kind, row_key, utc(due) + event_type.offset)
+                    loaded += 1
+        self._loaded_until = until
+        return loaded
+
+    def _schedule_loaded(self, kind: str, key: Any, due: datetime) -> None:
+        saved, self._loaded_until = self._loaded_until, None
+        try:
+            self.schedule(kind, key, due)
+        finally:
+            self._loaded_until = saved
+
+    # -------------------------------------------------------------------------
+    # Firing
+    # -------------------------------------------------------------------------
+
+    async def run_due(self, now: Optional[datetime] = None) -> dict[str, int]:
+        """Pop every due deadline and run the handlers, one batch per kind."""
+        now = now or datetime.now(timezone.utc)
+        batches: dict[str, list[Any]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            due, _, kind, key = heapq.heappop(self._heap)
+            if self._due.get((kind, key)) != due:
+                continue
+            del self._due[(kind, key)]
+            batches.setdefault(kind, []).append(key)
+
+        for kind, keys in batches.items():
+            try:
+                await self._types[kind].handler(keys)
+            except Exception as e:
+                logger.error(f"Timed event handler {kind} failed for {len(keys)} rows: {e}")
+                continue
+            self.fired[kind] = self.fired.get(kind, 0) + len(keys)
+            logger.debug(f"Timed events: {kind} x{len(keys)}")
+        return {kind: len(keys) for kind, keys in batches.items()}
+
+    def _arm(self) -> None:
+        """Point the single timer at the earliest deadline."""
+        if self._job_queue is None:
+            return
+        due = self.next_due()
+        if self._job is not None:
+            self._job.schedule_removal()
+            self._job = None
+        self._armed_at = due
+        if due is not None:
+            # A past time would be dropped by the scheduler as a misfire
+            when = max(due, datetime.now(timezone.utc))
+            self._job = self._job_queue.run_once(self._on_timer, when=when, name=JOB_NAME)
+
+    async def _on_timer(self, context) -> None:
+        self._job = None
+        self._armed_at = None
+        await self.run_due()
+        self._arm()
+
+    async def _on_refill(self, context) -> None:
+        await self.load()
+        self._arm()
+
+    # -------------------------------------------------------------------------
+    # ORM hook
+    # -------------------------------------------------------------------------
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        for obj in session.new | session.dirty:
+            for event_type in self._by_model.get(type(obj), ()):
+                key = getattr(obj, event_type.key)
+                due = getattr(obj, event_type.column)
+                if due is None or (event_type.pending and not event_type.pending(obj)):
+                    self.cancel(event_type.kind, key)
+                else:
+                    self.schedule(event_type.kind, key, utc(due) + event_type.offset)
+        for obj in session.deleted:
+            for event_type in self._by_model.get(type(obj), ()):
+                self.cancel(event_type.kind, getattr(obj, event_type.key))
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    async def start(self, job_queue=None) -> int:
+        """Load pending deadlines, hook ORM flushes and arm the timer."""
+        if not event.contains(Session, "after_flush", self._after_flush):
+            event.listen(Session, "after_flush", self._after_flush)
+        loaded = await self.load()
+        self._job_queue = job_queue
+        if job_queue is not None:
+            job_queue.run_repeating(
+                self._on_refill,
+                interval=self.horizon.total_seconds() / 2,
+                first=self.horizon.total_seconds() / 2,
+                name=f"{JOB_NAME}_refill",
+            )
+        self._arm()
+        logger.info(f"Timed events started ({loaded} pending deadlines)")
+        return loaded
+
+    def stop(self) -> None:
+        if event.contains(Session, "after_flush", self._after_flush):
+            event.remove(Session, "after_flush", self._after_flush)
+        if self._job is not None:
+            self._job.schedule_removal()
+        self._job = None
+        self._job_queue = None
+        self._armed_at = None
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._due.clear()
+        self._loaded_until = None
+
+    def stats(self) -> dict[str, Any]:
+        next_due = self.next_due()
+        return {
+            "pending": len(self._due),
+            "next_due": next_due.isoformat() if next_due else None,
+            "fired": dict(self.fired),
+        }
+
+
+# =============================================================================
+# EXPIRY HANDLERS
+# =============================================================================
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def release_expired_dungeons(user_ids: list[int]) -> None:
+    """Delete dungeon entries that reached expires_at and tell the prisoners."""
+    async with get_session() as session:
+        result = await session.execute(
+            delete(Dungeon)
+            .where(and_(Dungeon.user_id.in_(user_ids), Dungeon.expires_at <= _now()))
+            .returning(Dungeon.user_id)
+        )
+        released = result.scalars().all()
+        if not released:
+            return
+        result = await session.execute(
+            select(User.telegram_id).where(and_(User.id.in_(released), User.telegram_id != 0))
+        )
+        telegram_ids = result.scalars().all()
+
+    state = get_ephemeral_state()
+    for user_id in released:
+        state.release_user(user_id)
+    await get_notification_service().send_many(
+        [(telegram_id, NotificationType.DUNGEON_RELEASED, {}) for telegram_id in telegram_ids]
+    )
+
+
+async def drop_expired_requests(request_ids: list[int]) -> None:
+    """Delete pending collar/contract requests that were never answered."""
+    async with get_session() as session:
+        await session.execute(
+            delete(PendingRequest).where(
+                and_(PendingRequest.id.in_(request_ids), PendingRequest.expires_at <= _now())
+            )
+        )
+
+
+def _auction_active(auction: Auction) -> bool:
+    return auction.status == AuctionStatus.ACTIVE
+
+
+def _contract_active(contract: Contract) -> bool:
+    return contract.status == ContractStatus.ACTIVE
+
+
+DEFAULT_EVENTS: Iterable[TimedEventType] = (
+    TimedEventType(
+        "auction", Auction, "ends_at", settle_auctions,
+        where=(Auction.status == AuctionStatus.ACTIVE,),
+        pending=_auction_active,
+    ),
+    TimedEventType(
+        "auction_ending", Auction, "ends_at", notify_auctions_ending,
+        where=(Auction.status == AuctionStatus.ACTIVE,),
+        pending=_auction_active,
+        offset=-ENDING_NOTICE,
+    ),
+    TimedEventType("dungeon", Dungeon, "expires_at", release_expired_dungeons, key="user_id"),
+    TimedEventType("pending_request", PendingRequest, "expires_at", drop_expired_requests),
+    TimedEventType(
+        "contract", Contract, "ends_at", expire_contracts,
+        where=(Contract.status == ContractStatus.ACTIVE,),
+        pending=_contract_active,
+    ),
+    TimedEventType(
+        "contract_expiring", Contract, "ends_at", remind_contracts_expiring,
+        where=(Contract.status == ContractStatus.ACTIVE, Contract.reminded_at.is_(None)),
+        pending=lambda c: _contract_active(c) and c.reminded_at is None,
+        offset=-EXPIRY_NOTICE,
+    ),
+)
+
+
+# Global engine instance
+_engine: Optional[TimedEventEngine] = None
+
+
+def get_timed_events() -> TimedEventEngine:
+    """Get or create the timed event engine with the default event types."""
+    global _engine
+    if _engine is None:
+        _engine = TimedEventEngine()
+        for event_type in DEFAULT_EVENTS:
+            _engine.register(event_type)
+    return _engine
@@ -0,0 +1,132 @@
+"""
+The Phantom Bot - Handler Deadlines
+Time budgets per command class. A handler that runs past its budget is
+cancelled, its request rolled back and the user told to try again.
+"""
+import asyncio
+import logging
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional
+
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes
+
+from src.config import settings
+from src.utils.request_context import request_scope
+from src.utils.texts import get_warning
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[Any]]
+
+# Budget classes
+ECONOMY_BUDGET = "economy"
+AI_BUDGET = "ai"
+IMPORT_BUDGET = "import"
+
+
+def budget_seconds(budget: str) -> Optional[float]:
+    """Seconds allowed for a budget class, or None if unbounded (0 or unknown)."""
+    seconds = {
+        ECONOMY_BUDGET: settings.deadline_economy,
+        AI_BUDGET: settings.deadline_ai,
+        IMPORT_BUDGET: settings.deadline_import,
+    }.get(budget)
+    return seconds if seconds and seconds > 0 else None
+
+
+class DeadlineStats:
+    """Handlers started and deadlines exceeded, per budget class and command."""
+
+    def __init__(self):
+        self.started: dict[str, int] = {}
+        self.exceeded: dict[str, int] = {}
+        self.by_command: dict[str, int] = {}
+
+    def record_start(self, budget: str) -> None:
+        self.started[budget] = self.started.get(budget, 0) + 1
+
+    def record_exceeded(self, budget: str, name: str) -> None:
+        self.exceeded[budget] = self.exceeded.get(budget, 0) + 1
+        self.by_command[name] = self.by_command.get(name, 0) + 1
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        return {
+            budget: {"started": count, "exceeded": self.exceeded.get(budget, 0)}
+            for budget, count in sorted(self.started.items())
+        }
+
+    def reset(self) -> None:
+        self.started.clear()
+        self.exceeded.clear()
+        self.by_command.clear()
+
+
+# Global stats instance
+_stats: Optional[DeadlineStats] = None
+
+
+def get_deadline_stats() -> DeadlineStats:
+    """Get or create the deadline stats singleton."""
+    global _stats
+    if _stats is None:
+        _stats = DeadlineStats()
+    return _stats
+
+
+async def run_with_deadline(
+    handler: Handler,
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    budget: str,
+    name: Optional[str] = None,
+) -> Any:
+    """
+    Run a handler in its own request scope, bounded by a budget class.
+
+    The handler is cancelled when the budget runs out: the cancellation
+    unwinds it through its awaits (DB, Telegram, AI), the request scope
+    rolls the session back, and a timeout reply is sent. A TimeoutError
+    raised by the handler itself is not mistaken for the deadline.
+
+    When a request scope is already open (the caller owns the session),
+    the caller's scope decides commit or rollback instead.
+    """
+    seconds = budget_seconds(budget)
+    name = name or handler.__name__
+    stats = get_deadline_stats()
+    stats.record_start(budget)
+
+    deadline = asyncio.timeout(seconds)
+    try:
+        async with deadline, request_scope(update, context):
+            return await handler(update, context)
+    except TimeoutError:
+        if not deadline.expired():
+            raise
+
+    stats.record_exceeded(budget, name)
+    user_id = update.effective_user.id if update.effective_user else None
+    logger.warning(f"Deadline exceeded: {name} | user={user_id} | budget={budget} ({seconds}s)")
+    await _reply_timeout(update)
+    return None
+
+
+def with_deadline(budget: str, name: Optional[str] = None):
+    """Decorator form of run_with_deadline, for handlers outside the command table."""
+    def decorator(func: Handler) -> Handler:
+        @wraps(func)
+        async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Any:
+            return await run_with_deadline(func, update, context, budget, name or func.__name__)
+        return wrapper
+    return decorator
+
+
+async def _reply_timeout(update: Update) -> None:
+    if not update.message:
+        return
+    try:
+        await update.message.reply_text(get_warning("timeout"))
+    except TelegramError as e:
+        logger.debug(f"Could not send timeout reply: {e}")
@@ -136,12 +136,18 @@ async def is_admin(user_id: int) -> bool:
     """
     from src.config import settings
     from src.database.connection import get_session
+    from src.database.identity_cache import get_identity_cache
     from src.database.repositories import UserRepository
 
     # Check super_admin_ids first (fast check)
     if user_id in settings.super_admin_ids:
         return True
 
+    # Cached identity carries the admin flag
+    cached = get_identity_cache().get(user_id)
+    if cached is not None:
+        return cached.is_admin
+
     # Check database admin flag
     async with get_session() as session:
         user_repo = UserRepository(session)
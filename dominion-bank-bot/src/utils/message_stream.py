@@ -0,0 +1,141 @@
+"""
+Message Stream Utility
+Progressively renders streamed text into a Telegram message via edits.
+"""
+import asyncio
+import logging
+import time
+from contextlib import aclosing
+from typing import AsyncGenerator, Callable, Optional
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Times finish() waits out Telegram flood control before giving up
+FINAL_EDIT_RETRIES = 3
+
+
+class ThrottledMessageEditor:
+    """
+    Edits a placeholder message as text accumulates, at most once per interval.
+
+    Telegram rate-limits message edits, so intermediate updates are dropped
+    when they arrive too fast. The final text is always written by finish(),
+    which waits out flood control (RetryAfter) instead of dropping the edit.
+
+    Usage:
+        msg = await update.message.reply_text("Cargando...")
+        editor = ThrottledMessageEditor(msg, render=lambda text: f"*{text}*")
+        await editor.update("parcial")
+        await editor.finish("texto completo")
+    """
+
+    def __init__(
+        self,
+        message: Message,
+        render: Optional[Callable[[str], str]] = None,
+        parse_mode: Optional[str] = None,
+        min_interval: Optional[float] = None,
+    ):
+        self.message = message
+        self.render = render or (lambda text: text)
+        self.parse_mode = parse_mode
+        self.min_interval = (
+            settings.ai_stream_edit_interval if min_interval is None else min_interval
+        )
+        self._last_edit = 0.0
+        # (text, parse_mode) of the last successful edit
+        self._last: Optional[tuple[str, Optional[str]]] = None
+        self.edit_count = 0
+
+    async def update(self, text: str) -> bool:
+        """Edit the message with partial text if the interval has elapsed."""
+        if time.monotonic() - self._last_edit < self.min_interval:
+            return False
+        # Partial Markdown is often unbalanced, so intermediate edits are plain
+        return await self._edit(self.render(text), parse_mode=None)
+
+    async def finish(self, text: str) -> bool:
+        """Write the final text, falling back to plain text if parsing fails."""
+        rendered = self.render(text)
+        if await self._edit(rendered, parse_mode=self.parse_mode, retries=FINAL_EDIT_RETRIES):
+            return True
+        if self.parse_mode and self._last != (rendered, None):
+            return await self._edit(rendered, parse_mode=None, retries=FINAL_EDIT_RETRIES)
+        return False
+
+    async def _edit(self, text: str, parse_mode: Optional[str], retries: int = 0) -> bool:
+        """
+        Perform a single edit, swallowing non-fatal Telegram errors.
+
+        Args:
+            retries: Times to wait out RetryAfter and try again (0 drops the edit)
+        """
+        if not text or (text, parse_mode) == self._last:
+            return False
+
+        self._last_edit = time.monotonic()
+        try:
+            await self.message.edit_text(text, parse_mode=parse_mode)
+        except RetryAfter as e:
+            if retries <= 0:
+                logger.debug(f"Stream edit throttled by Telegram: retry in {e.retry_after}s")
+                return False
+            logger.info(f"Final stream edit throttled by Telegram, waiting {e.retry_after}s")
+            await asyncio.sleep(e.retry_after)
+            return await self._edit(text, parse_mode, retries - 1)
+        except BadRequest as e:
+            logger.debug(f"Stream edit rejected: {e}")
+            return False
+
+        self._last = (text, parse_mode)
+        self.edit_count += 1
+        return True
+
+
+async def stream_to_message(
+    message: Message,
+    chunks: AsyncGenerator[str, None],
+    render: Optional[Callable[[str], str]] = None,
+    parse_mode: Optional[str] = None,
+    min_interval: Optional[float] = None,
+) -> str:
+    """
+    Consume a text stream, progressively editing a message as it arrives.
+
+    The first chunk is shown immediately; later chunks are throttled. With
+    ENABLE_AI_STREAMING off, only the final text is written. The stream is
+    closed on the way out, so an edit that fails mid-stream does not keep
+    the generator (and its AI scheduler slot) alive.
+
+    Args:
+        message: Placeholder message to edit
+        chunks: Async generator of text chunks
+        render: Function turning the accumulated text into the message body
+        parse_mode: Parse mode for the final edit
+        min_interval: Minimum seconds between intermediate edits
+
+    Returns:
+        The full accumulated text
+    """
+    editor = ThrottledMessageEditor(
+        message,
+        render=render,
+        parse_mode=parse_mode,
+        min_interval=min_interval,
+    )
+
+    parts: list[str] = []
+    async with aclosing(chunks):
+        async for chunk in chunks:
+            parts.append(chunk)
+            if settings.enable_ai_streaming:
+                await editor.update("".join(parts))
+
+    text = "".join(parts).strip()
+    await editor.finish(text)
+    return text
@@ -11,9 +11,20 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from src.config import settings
-from src.database.connection import get_session
-from src.database.repositories import UserRepository
+from src.services.ai_scheduler import (
+    AIRequester,
+    reset_current_requester,
+    set_current_requester,
+)
+from src.utils.pipeline import (
+    admin,
+    compile_pipeline,
+    rate_limited,
+    registered,
+    super_admin,
+)
 from src.utils.rate_limiter import rate_limiter, flood_protection
+from src.utils.request_context import request_scope
 from src.utils.validators import ValidationError
 
 logger = logging.getLogger(__name__)
@@ -35,25 +46,14 @@ def require_registration(func: Callable):
         if not update.effective_user:
             return None
 
-        user_id = update.effective_user.id
-
-        async with get_session() as session:
-            user_repo = UserRepository(session)
-            user, created = await user_repo.get_or_create(
-                telegram_id=user_id,
-                username=update.effective_user.username,
-                first_name=update.effective_user.first_name or "Usuario",
-                default_balance=settings.default_balance,
-            )
-
-            if created:
-                logger.info(f"Auto-registered user: {user_id}")
+        async with request_scope(update, context) as request:
+            user = await request.ensure_user()
 
             # Store user in context for handler access
             context.user_data["db_user"] = user
             context.user_data["db_user_id"] = user.id
 
-        return await func(update, context, *args, **kwargs)
+            return await func(update, context, *args, **kwargs)
 
     return wrapper
 
@@ -74,18 +74,8 @@ def require_admin(func: Callable):
         if not update.effective_user:
             return None
 
-        user_id = update.effective_user.id
-
-        # Check super admin
-        if settings.is_super_admin(user_id):
-            return await func(update, context, *args, **kwargs)
-
-        # Check database admin status
-        async with get_session() as session:
-            user_repo = UserRepository(session)
-            user = await user_repo.get_by_telegram_id(user_id)
-
-            if user and user.is_admin:
+        async with request_scope(update, context) as request:
+            if await request.is_admin():
                 return await func(update, context, *args, **kwargs)
 
         # Not an admin
@@ -264,6 +254,40 @@ def with_typing(func: Callable):
     return wrapper
 
 
+def ai_requester(func: Callable):
+    """
+    Decorator to tag AI generations made by a handler with who asked.
+
+    The AI scheduler uses this to share capacity fairly between users and
+    to apply daily quotas. Private chats get priority over group requests.
+    """
+    @wraps(func)
+    async def wrapper(
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        *args,
+        **kwargs
+    ):
+        requester = None
+        if update.effective_user:
+            requester = AIRequester(
+                user_id=update.effective_user.id,
+                private=bool(
+                    update.effective_chat
+                    and update.effective_chat.type == "private"
+                ),
+                chat_id=update.effective_chat.id if update.effective_chat else None,
+            )
+
+        token = set_current_requester(requester)
+        try:
+            return await func(update, context, *args, **kwargs)
+        finally:
+            reset_current_requester(token)
+
+    return wrapper
+
+
 def feature_flag(flag_name: str, message: Optional[str] = None):
     """
     Decorator to check if a feature is enabled.
@@ -311,56 +335,39 @@ def combine_decorators(*decorators):
     return decorator
 
 
-# Pre-built decorator combinations for common patterns
+# Pre-built combinations for common patterns, compiled into one coroutine
 def standard_command(rate_calls: int = 10, rate_period: int = 60):
     """
-    Standard command decorator stack.
+    Standard command pipeline.
 
     Includes: registration, logging, rate limiting, validation handling.
     """
-    from src.utils.rate_limiter import rate_limit
-
     def decorator(func):
-        @require_registration
-        @log_command
-        @rate_limit(max_calls=rate_calls, period=rate_period)
-        @handle_validation_errors
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            return await func(*args, **kwargs)
-        return wrapper
+        return compile_pipeline(
+            func,
+            [registered(), rate_limited(rate_calls, rate_period, scope=func.__name__)],
+            log=True,
+        )
     return decorator
 
 
 def admin_command():
     """
-    Admin command decorator stack.
+    Admin command pipeline.
 
     Includes: admin check, logging, validation handling.
     """
     def decorator(func):
-        @require_admin
-        @log_command
-        @handle_validation_errors
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            return await func(*args, **kwargs)
-        return wrapper
+        return compile_pipeline(func, [admin()], log=True)
     return decorator
 
 
 def super_admin_command():
     """
-    Super admin command decorator stack.
+    Super admin command pipeline.
 
     Includes: super admin check, logging, validation handling.
     """
     def decorator(func):
-        @require_super_admin
-        @log_command
-        @handle_validation_errors
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            return await func(*args, **kwargs)
-        return wrapper
+        return compile_pipeline(func, [super_admin()], log=True)
     return decorator
@@ -0,0 +1,333 @@
+"""
+The Phantom Bot - Middleware Pipeline
+Command middleware declared as a list of stages and compiled into a single
+coroutine when the command is registered.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from src.config import settings
+from src.database.ephemeral_store import get_ephemeral_state
+from src.database.repositories import DungeonRepository
+from src.utils.rate_limiter import rate_limiter
+from src.utils.request_context import RequestContext, request_scope
+from src.utils.validators import ValidationError
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class Halt:
+    """
+    Result of a stage that stops the pipeline.
+
+    Attributes:
+        reason: Short machine-readable reason (e.g. "not_admin")
+        reply: Message sent to the user, if any
+    """
+    reason: str
+    reply: Optional[str] = None
+
+
+StageCheck = Callable[
+    [Update, ContextTypes.DEFAULT_TYPE, RequestContext],
+    Awaitable[Optional[Halt]],
+]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One middleware step: returns None to continue or a Halt to stop.
+
+    A stage whose check is None always passes and is dropped when the
+    pipeline is compiled (e.g. a feature flag that is on).
+    """
+    name: str
+    check: Optional[StageCheck]
+
+
+# =============================================================================
+# TIMINGS
+# =============================================================================
+
+class StageTimings:
+    """Call counts and time spent per stage and handler, when timing is on."""
+
+    def __init__(self):
+        self._stats: dict[str, list[float]] = {}
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = [1, elapsed_ms, elapsed_ms]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed_ms
+            stats[2] = max(stats[2], elapsed_ms)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {
+                "count": int(count),
+                "total_ms": round(total, 3),
+                "avg_ms": round(total / count, 3),
+                "max_ms": round(peak, 3),
+            }
+            for name, (count, total, peak) in sorted(self._stats.items())
+        }
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+
+# Global timings instance
+_timings: Optional[StageTimings] = None
+
+
+def get_stage_timings() -> StageTimings:
+    """Get or create the stage timings singleton."""
+    global _timings
+    if _timings is None:
+        _timings = StageTimings()
+    return _timings
+
+
+# =============================================================================
+# STAGES
+# =============================================================================
+
+def registered() -> Stage:
+    """
+    Register the caller if needed.
+
+    Exposes their identity snapshot (no balance) as
+    context.user_data['db_user'].
+    """
+    async def check(update, context, request):
+        identity = await request.identity(register=True)
+        context.user_data["db_user"] = identity
+        context.user_data["db_user_id"] = identity.id
+        return None
+    return Stage("registered", check)
+
+
+def admin() -> Stage:
+    """Only super admins and database admins may continue."""
+    async def check(update, context, request):
+        if await request.is_admin():
+            return None
+        return Halt("not_admin", "Solo los administradores pueden usar este comando.")
+    return Stage("admin", check)
+
+
+def super_admin() -> Stage:
+    """Only super admins from settings may continue."""
+    async def check(update, context, request):
+        if settings.is_super_admin(request.telegram_id):
+            return None
+        return Halt("not_super_admin", "Solo los super administradores pueden usar este comando.")
+    return Stage("super_admin", check)
+
+
+def group_only() -> Stage:
+    """Only group and supergroup chats may continue."""
+    async def check(update, context, request):
+        chat = update.effective_chat
+        if chat and chat.type in ("group", "supergroup"):
+            return None
+        return Halt("not_group", "Este comando solo funciona en grupos.")
+    return Stage("group_only", check)
+
+
+def private_only() -> Stage:
+    """Only private chats may continue."""
+    async def check(update, context, request):
+        chat = update.effective_chat
+        if chat and chat.type == "private":
+            return None
+        return Halt("not_private", "Este comando solo funciona en chat privado.")
+    return Stage("private_only", check)
+
+
+def feature(flag_name: str, message: Optional[str] = None) -> Stage:
+    """
+    Stop when a settings flag is off.
+
+    The flag is read once, when the stage is declared, instead of on every
+    call; an enabled flag costs nothing at runtime.
+    """
+    if getattr(settings, flag_name, False):
+        return Stage(f"feature:{flag_name}", None)
+
+    halt = Halt("feature_disabled", message or "Esta funcion no esta disponible.")
+
+    async def check(update, context, request):
+        return halt
+    return Stage(f"feature:{flag_name}", check)
+
+
+def rate_limited(
+    max_calls: int,
+    period: int,
+    scope: str,
+    per_chat: bool = False,
+    admin_bypass: bool = True,
+    message: Optional[str] = None,
+) -> Stage:
+    """
+    Limit how often a user may run a command.
+
+    Args:
+        max_calls: Maximum number of calls allowed in the period
+        period: Time period in seconds
+        scope: Name the limit is counted under (usually the handler name)
+        per_chat: If True, count per user per chat
+        admin_bypass: If True, super admins are not limited
+        message: Custom message when rate limited
+    """
+    async def check(update, context, request):
+        user_id = request.telegram_id
+        if admin_bypass and settings.is_super_admin(user_id):
+            return None
+
+        chat_id = update.effective_chat.id if per_chat and update.effective_chat else None
+        key = rate_limiter.get_key(user_id, chat_id, scope)
+        allowed, wait_time = await rate_limiter.is_allowed(key, max_calls, period)
+        if allowed:
+            return None
+
+        logger.warning(f"Rate limited: user={user_id}, command={scope}, wait={wait_time}s")
+        return Halt(
+            "rate_limited",
+            message or f"Demasiadas solicitudes. Espera {wait_time} segundos.",
+        )
+    return Stage("rate_limited", check)
+
+
+def dungeon_gate(names: Iterable[str]) -> Stage:
+    """
+    Stop users locked in the dungeon, unless the command is allowlisted.
+
+    The allowlist (DUNGEON_ALLOWED_COMMANDS) is checked once, when the
+    stage is declared, against the command's names. At runtime the lock
+    is a lookup in the in-memory dungeon store; while nobody is locked
+    the caller is not even resolved.
+    """
+    if settings.dungeon_allowed_command_set & set(names):
+        return Stage("dungeon_gate", None)
+
+    allowed = ", ".join(f"/{name}" for name in sorted(settings.dungeon_allowed_command_set))
+    halt = Halt(
+        "dungeon_locked",
+        f"Estas encerrado en el calabozo. Mientras tanto solo puedes usar: {allowed}",
+    )
+
+    async def check(update, context, request):
+        state = get_ephemeral_state()
+        if state.loaded and not state.dungeon:
+            return None
+        if settings.is_super_admin(request.telegram_id):
+            return None
+        identity = await request.identity()
+        if identity is None:
+            return None
+        if await DungeonRepository(await request.session()).is_locked(identity.id):
+            return halt
+        return None
+    return Stage("dungeon_gate", check)
+
+
+# =============================================================================
+# COMPILER
+# =============================================================================
+
+async def _reply_halt(update: Update, halt: Halt) -> None:
+    if halt.reply and update.message:
+        await update.message.reply_text(halt.reply)
+
+
+def compile_pipeline(
+    handler: Handler,
+    stages: Iterable[Stage] = (),
+    name: Optional[str] = None,
+    log: bool = False,
+    timed: Optional[bool] = None,
+) -> Handler:
+    """
+    Compile stages and a handler into one coroutine function.
+
+    Stages run in order inside the update's request scope; the first Halt
+    stops the pipeline and its reply is sent. ValidationError raised by the
+    handler is answered with its message.
+
+    Args:
+        handler: Command handler to run after the stages
+        stages: Stages to run first
+        name: Name used in logs and timings (defaults to the handler name)
+        log: Log each call with its duration
+        timed: Record per-stage timings (defaults to MIDDLEWARE_TIMING)
+
+    Returns:
+        Coroutine function with the handler's (update, context) signature
+    """
+    name = name or handler.__name__
+    checks = tuple((s.name, s.check) for s in stages if s.check is not None)
+    timings = get_stage_timings() if (settings.middleware_timing if timed is None else timed) else None
+    handler_key = f"handler:{name}"
+    clock = time.perf_counter
+
+    async def pipeline(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Any:
+        if update.effective_user is None:
+            return None
+        started = clock()
+
+        async with request_scope(update, context) as request:
+            for stage_name, check in checks:
+                if timings is None:
+                    halt = await check(update, context, request)
+                else:
+                    t0 = clock()
+                    halt = await check(update, context, request)
+                    timings.record(stage_name, (clock() - t0) * 1000)
+                if halt is not None:
+                    logger.debug(f"Pipeline {name} halted at {stage_name}: {halt.reason}")
+                    await _reply_halt(update, halt)
+                    return None
+
+            t0 = clock()
+            try:
+                result = await handler(update, context)
+            except ValidationError as e:
+                await _reply_halt(update, Halt("validation", e.message))
+                result = None
+            except Exception as e:
+                if log:
+                    logger.error(
+                        f"Command error: {name} | user={request.telegram_id} | "
+                        f"time={clock() - started:.3f}s | error={e}"
+                    )
+                raise
+            finally:
+                if timings is not None:
+                    timings.record(handler_key, (clock() - t0) * 1000)
+
+        if log:
+            logger.info(
+                f"Command done: {name} | user={request.telegram_id} | "
+                f"time={clock() - started:.3f}s"
+            )
+        return result
+
+    pipeline.__name__ = name
+    pipeline.__qualname__ = name
+    pipeline.__doc__ = handler.__doc__
+    pipeline.__wrapped__ = handler
+    return pipeline
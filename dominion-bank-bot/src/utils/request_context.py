@@ -0,0 +1,177 @@
+"""
+The Phantom Bot - Request Context
+Per-update state shared by middleware and handlers: one lazily opened
+database session and the calling user, resolved once.
+"""
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from src.config import settings
+from src.database.connection import get_session_factory
+from src.database.identity_cache import UserSnapshot, get_identity_cache
+from src.database.models import User
+from src.database.repositories import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+class RequestContext:
+    """
+    State of the update being handled.
+
+    The session is opened on first use and committed once when the request
+    scope ends (rolled back if the handler raised). The calling user and
+    their admin status are looked up at most once, whichever of middleware
+    or handler asks first. Identity checks (registration, admin) are
+    answered from the identity cache when possible and only open a session
+    on a miss; anything involving balances must use user().
+
+    Usage:
+        async with request_scope(update, context) as request:
+            user = await request.user()
+            session = await request.session()
+    """
+
+    __slots__ = ("update", "_session", "_user", "_user_loaded", "_identity", "_is_admin")
+
+    def __init__(self, update: Update):
+        self.update = update
+        self._session: Optional[AsyncSession] = None
+        self._user: Optional[User] = None
+        self._user_loaded = False
+        self._identity: Optional[UserSnapshot] = None
+        self._is_admin: Optional[bool] = None
+
+    @property
+    def telegram_id(self) -> Optional[int]:
+        user = self.update.effective_user if self.update else None
+        return user.id if user else None
+
+    async def session(self) -> AsyncSession:
+        """Shared session of this update, opened on first use."""
+        if self._session is None:
+            self._session = get_session_factory()()
+        return self._session
+
+    async def user(self) -> Optional[User]:
+        """The calling user, or None if they are not registered."""
+        if not self._user_loaded:
+            telegram_id = self.telegram_id
+            if telegram_id is not None:
+                user_repo = UserRepository(await self.session())
+                self._user = await user_repo.get_by_telegram_id(telegram_id)
+            self._user_loaded = True
+        return self._user
+
+    async def ensure_user(self) -> Optional[User]:
+        """The calling user, registering them (or refreshing their names) first."""
+        if self._user is not None or self.telegram_id is None:
+            return self._user
+
+        tg_user = self.update.effective_user
+        user_repo = UserRepository(await self.session())
+        user, created = await user_repo.get_or_create(
+            telegram_id=tg_user.id,
+            username=tg_user.username,
+            first_name=tg_user.first_name or "Usuario",
+            last_name=tg_user.last_name,
+            default_balance=settings.default_balance,
+        )
+        if created:
+            logger.info(f"Auto-registered user: {tg_user.id}")
+        self._user = user
+        self._user_loaded = True
+        self._identity = None
+        self._is_admin = None
+        return user
+
+    async def identity(self, register: bool = False) -> Optional[UserSnapshot]:
+        """
+        Identity snapshot of the caller, from the identity cache if possible.
+
+        With register=True unknown users are registered first, and a cached
+        snapshot is only trusted while Telegram reports the same names.
+        """
+        if self._identity is None:
+            tg_user = self.update.effective_user if self.update else None
+            if tg_user is None:
+                return None
+
+            cache = get_identity_cache()
+            snapshot = cache.get(tg_user.id)
+            if snapshot is not None and (
+                not register or snapshot.same_names(tg_user.username, tg_user.first_name)
+            ):
+                self._identity = snapshot
+            else:
+                user = await (self.ensure_user() if register else self.user())
+                self._identity = cache.put(user) if user else None
+        return self._identity
+
+    async def is_admin(self) -> bool:
+        """Super admin from settings, or admin flag in the database."""
+        if self._is_admin is None:
+            telegram_id = self.telegram_id
+            if telegram_id is None:
+                self._is_admin = False
+            elif settings.is_super_admin(telegram_id):
+                self._is_admin = True
+            else:
+                identity = await self.identity()
+                self._is_admin = bool(identity and identity.is_admin)
+        return self._is_admin
+
+    async def close(self, commit: bool = True) -> None:
+        """Commit (or roll back) and close the session, if one was opened."""
+        session, self._session = self._session, None
+        if session is None:
+            return
+        try:
+            if commit:
+                await session.commit()
+            else:
+                await session.rollback()
+        finally:
+            await session.close()
+
+
+def current_request(context: ContextTypes.DEFAULT_TYPE) -> Optional[RequestContext]:
+    """Request context attached to a callback context, if any."""
+    request = getattr(context, "request", None)
+    return request if isinstance(request, RequestContext) else None
+
+
+@asynccontextmanager
+async def request_scope(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+) -> AsyncGenerator[RequestContext, None]:
+    """
+    Enter the request context of an update.
+
+    The outermost scope (the command router) creates the context, attaches
+    it as context.request and commits when done; nested scopes opened by
+    middleware or handlers reuse it. Handlers called outside the router get
+    their own scope, so they work the same either way.
+    """
+    request = current_request(context)
+    if request is not None:
+        yield request
+        return
+
+    request = RequestContext(update)
+    context.request = request
+    try:
+        yield request
+    except BaseException:
+        await request.close(commit=False)
+        raise
+    else:
+        await request.close()
+    finally:
+        context.request = None
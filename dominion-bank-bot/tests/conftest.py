@@ -5,7 +5,8 @@ Uses an in-memory SQLite database to ensure test isolation.
 import os
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, MagicMock
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
 
 # Set test database URL BEFORE importing the database module
 os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
@@ -32,6 +33,16 @@ async def setup_test_database():
     # Initialize fresh database
     await init_database()
 
+    # Cached identities refer to users of the previous test's database
+    from src.database.auth_cache import get_auth_cache
+    from src.database.collar_graph import get_collar_graph
+    from src.database.ephemeral_store import get_ephemeral_state
+    from src.database.identity_cache import get_identity_cache
+    get_identity_cache().clear()
+    get_auth_cache().clear()
+    get_ephemeral_state().clear()
+    get_collar_graph().clear()
+
     yield
 
     # Cleanup
@@ -71,3 +82,37 @@ def create_mock_context(args: list = None):
     context.bot.get_chat_member = AsyncMock()
     context.bot.send_message = AsyncMock()
     return context
+
+
+def mock_notifications(module: str):
+    """Patch get_notification_service in module with a service whose send() is mocked."""
+    from src.services.notifications import NotificationService
+    service = NotificationService(bot=MagicMock())
+    service.send = AsyncMock(return_value=True)
+    return patch(f"{module}.get_notification_service", return_value=service)
+
+
+# =============================================================================
+# DATA HELPERS
+# =============================================================================
+
+def utc_now() -> datetime:
+    """Current time as an aware UTC datetime."""
+    return datetime.now(timezone.utc)
+
+
+async def make_users(*telegram_ids, balance: int = None, created_at: datetime = None):
+    """Register users named u<telegram_id>, optionally setting balance and created_at."""
+    from src.database.connection import get_session
+    from src.database.repositories import UserRepository
+    users = []
+    async with get_session() as session:
+        repo = UserRepository(session)
+        for telegram_id in telegram_ids:
+            user, _ = await repo.get_or_create(telegram_id=telegram_id, username=f"u{telegram_id}")
+            if balance is not None:
+                user.balance = balance
+            if created_at is not None:
+                user.created_at = created_at.replace(tzinfo=None)
+            users.append(user)
+    return users
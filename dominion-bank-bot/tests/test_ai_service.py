@@ -0,0 +1,494 @@
+"""
+Tests for the AI service and AI response delivery helpers.
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.config import settings
+from src.services.ai_service import AIService
+
+
+def make_chunk(text):
+    """Build a fake streaming chunk with the given delta text."""
+    delta = SimpleNamespace(content=text)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)])
+
+
+async def fake_stream(*texts):
+    """Yield fake streaming chunks."""
+    for text in texts:
+        yield make_chunk(text)
+
+
+def make_enabled_service(create):
+    """Create an AIService with a fake client whose create() is given."""
+    service = AIService(api_key=None)
+    service.client = MagicMock()
+    service.client.chat.completions.create = create
+    service._enabled = True
+    return service
+
+
+# =============================================================================
+# STREAMING TESTS
+# =============================================================================
+
+class TestAIStreaming:
+    """Test streaming generation and progressive message edits."""
+
+    @pytest.mark.asyncio
+    async def test_stream_disabled_yields_fallback(self):
+        """Test that a disabled service streams a single fallback chunk."""
+        service = AIService(api_key=None)
+        chunks = [c async for c in service.generate_stream("task", "x")]
+        assert len(chunks) == 1
+        assert chunks[0]
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_deltas(self):
+        """Test that deltas are yielded in order."""
+        create = AsyncMock(return_value=fake_stream("Hola", " ", "mundo"))
+        service = make_enabled_service(create)
+
+        chunks = [c async for c in service.generate_stream("scene", "x")]
+        assert "".join(chunks) == "Hola mundo"
+        assert create.call_args.kwargs["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_stream_error_before_content_falls_back(self):
+        """Test that a failing request still produces fallback content."""
+        create = AsyncMock(side_effect=RuntimeError("boom"))
+        service = make_enabled_service(create)
+
+        chunks = [c async for c in service.generate_stream("prediction", "x")]
+        assert len(chunks) == 1
+
+    @pytest.mark.asyncio
+    async def test_editor_throttles_intermediate_edits(self):
+        """Test that edits inside the interval are dropped but finish() writes."""
+        from src.utils.message_stream import ThrottledMessageEditor
+
+        message = MagicMock()
+        message.edit_text = AsyncMock()
+        editor = ThrottledMessageEditor(message, min_interval=60)
+
+        assert await editor.update("a") is True
+        assert await editor.update("ab") is False
+        assert await editor.finish("abc") is True
+        assert message.edit_text.await_count == 2
+        assert message.edit_text.call_args.args[0] == "abc"
+
+    @pytest.mark.asyncio
+    async def test_single_chunk_gets_formatted_edit(self):
+        """Test that the final edit applies parse_mode even when the text was already shown."""
+        from src.utils.message_stream import stream_to_message
+
+        async def chunks():
+            yield "*hola*"
+
+        message = MagicMock()
+        message.edit_text = AsyncMock()
+
+        with patch.object(settings, "enable_ai_streaming", True):
+            await stream_to_message(message, chunks(), parse_mode="Markdown", min_interval=60)
+        assert [c.kwargs["parse_mode"] for c in message.edit_text.await_args_list] == [None, "Markdown"]
+
+    @pytest.mark.asyncio
+    async def test_final_edit_waits_out_flood_control(self):
+        """Test that finish() retries after RetryAfter instead of leaving partial text."""
+        from telegram.error import RetryAfter
+        from src.utils.message_stream import stream_to_message
+
+        async def chunks():
+            for text in ("Hola ", "mundo ", "final"):
+                yield text
+
+        message = MagicMock()
+        message.edit_text = AsyncMock(side_effect=[None, RetryAfter(0), RetryAfter(0), None])
+
+        with patch.object(settings, "enable_ai_streaming", True):
+            text = await stream_to_message(message, chunks(), min_interval=60)
+        assert text == "Hola mundo final"
+        assert message.edit_text.await_count == 4
+        assert message.edit_text.await_args.args[0] == "Hola mundo final"
+
+    @pytest.mark.asyncio
+    async def test_stream_to_message_renders_final_text(self):
+        """Test that the accumulated text is rendered into the message."""
+        from src.utils.message_stream import stream_to_message
+
+        async def chunks():
+            for text in ("uno ", "dos"):
+                yield text
+
+        message = MagicMock()
+        message.edit_text = AsyncMock()
+
+        text = await stream_to_message(
+            message, chunks(), render=lambda t: f"[{t}]", min_interval=60
+        )
+        assert text == "uno dos"
+        assert message.edit_text.call_args.args[0] == "[uno dos]"
+
+    @pytest.mark.asyncio
+    async def test_failed_edit_frees_scheduler_slot(self):
+        """Test that the AI slot is released as soon as the consumer gives up."""
+        from src.services import ai_scheduler
+        from src.services.ai_scheduler import AIScheduler
+        from src.utils.message_stream import stream_to_message
+
+        service = make_enabled_service(AsyncMock(return_value=fake_stream("uno ", "dos ", "tres")))
+        message = MagicMock()
+        message.edit_text = AsyncMock(side_effect=RuntimeError("edit failed"))
+        scheduler = AIScheduler(max_concurrent=1)
+
+        previous = ai_scheduler._scheduler
+        ai_scheduler._scheduler = scheduler
+        try:
+            with patch.object(settings, "enable_ai_streaming", True), pytest.raises(RuntimeError):
+                await stream_to_message(message, service.generate_stream("scene", "x"))
+            assert scheduler.in_flight == 0
+        finally:
+            ai_scheduler._scheduler = previous
+
+
+# =============================================================================
+# FAIR-QUEUE SCHEDULER TESTS
+# =============================================================================
+
+class TestAIScheduler:
+    """Test the per-user fair-queue scheduler."""
+
+    @pytest.mark.asyncio
+    async def test_round_robin_between_users(self):
+        """Test that a second user is served before the first user's backlog."""
+        import asyncio
+        from src.services.ai_scheduler import AIRequester, AIScheduler
+
+        scheduler = AIScheduler(max_concurrent=1, max_pending_per_user=5)
+        spammer = AIRequester(user_id=1)
+        other = AIRequester(user_id=2)
+        order = []
+        gate = asyncio.Event()
+
+        async def job(requester, label):
+            async with scheduler.slot(requester):
+                order.append(label)
+                await gate.wait()
+
+        tasks = [asyncio.create_task(job(spammer, "a1"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(job(spammer, "a2")))
+        tasks.append(asyncio.create_task(job(spammer, "a3")))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(job(other, "b1")))
+        await asyncio.sleep(0)
+
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert order == ["a1", "a2", "b1", "a3"]
+
+    @pytest.mark.asyncio
+    async def test_private_requests_get_priority(self):
+        """Test that private chats are served ahead of queued group requests."""
+        import asyncio
+        from src.services.ai_scheduler import AIRequester, AIScheduler
+
+        scheduler = AIScheduler(max_concurrent=1, private_weight=2)
+        order = []
+        gate = asyncio.Event()
+
+        async def job(requester, label):
+            async with scheduler.slot(requester):
+                order.append(label)
+                await gate.wait()
+
+        tasks = [asyncio.create_task(job(AIRequester(1), "busy"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(job(AIRequester(2), "group")))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(job(AIRequester(3, private=True), "private")))
+        await asyncio.sleep(0)
+
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert order == ["busy", "private", "group"]
+
+    @pytest.mark.asyncio
+    async def test_vip_users_get_weighted_turns(self):
+        """Test that configured VIP users are weighted and served consecutive turns."""
+        import asyncio
+        from src.services import ai_scheduler
+        from src.services.ai_scheduler import AIRequester
+
+        previous = ai_scheduler._scheduler
+        ai_scheduler._scheduler = None
+        try:
+            with patch.multiple(
+                settings,
+                super_admins="1",
+                ai_vip_users="2",
+                ai_vip_weight=2,
+                ai_max_concurrent=1,
+                ai_max_pending_per_user=5,
+            ):
+                scheduler = ai_scheduler.get_ai_scheduler()
+        finally:
+            ai_scheduler._scheduler = previous
+
+        order = []
+        gate = asyncio.Event()
+
+        async def job(user_id, label):
+            async with scheduler.slot(AIRequester(user_id)):
+                order.append(label)
+                await gate.wait()
+
+        tasks = [asyncio.create_task(job(3, "busy"))]
+        await asyncio.sleep(0)
+        for user_id, label in ((2, "vip1"), (2, "vip2"), (3, "user"), (2, "vip3")):
+            tasks.append(asyncio.create_task(job(user_id, label)))
+        await asyncio.sleep(0)
+
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert order == ["busy", "vip1", "vip2", "user", "vip3"]
+
+    @pytest.mark.asyncio
+    async def test_excess_requests_rejected(self):
+        """Test that per-user queue overflow is rejected immediately."""
+        import asyncio
+        from src.services.ai_scheduler import AIRequestRejectedError, AIRequester, AIScheduler
+
+        scheduler = AIScheduler(max_concurrent=1, max_pending_per_user=1)
+        user = AIRequester(user_id=1)
+        gate = asyncio.Event()
+
+        async def job():
+            async with scheduler.slot(user):
+                await gate.wait()
+
+        first = asyncio.create_task(job())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(job())
+        await asyncio.sleep(0)
+
+        with pytest.raises(AIRequestRejectedError):
+            async with scheduler.slot(user):
+                pass
+
+        gate.set()
+        await asyncio.gather(first, second)
+        assert scheduler.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_quota_exhausted_answers_from_fallback(self):
+        """Test that a user over quota gets fallback content without an API call."""
+        from src.services import ai_scheduler
+        from src.services.ai_scheduler import (
+            AIRequester, AIScheduler, reset_current_requester, set_current_requester,
+        )
+
+        create = AsyncMock()
+        service = make_enabled_service(create)
+        scheduler = AIScheduler(daily_token_quota=100)
+        scheduler.record_usage(AIRequester(7), 150)
+
+        previous = ai_scheduler._scheduler
+        ai_scheduler._scheduler = scheduler
+        token = set_current_requester(AIRequester(7))
+        try:
+            result = await service.generate("task", "x")
+        finally:
+            reset_current_requester(token)
+            ai_scheduler._scheduler = previous
+
+        assert result
+        create.assert_not_awaited()
+
+
+# =============================================================================
+# TELEMETRY TESTS
+# =============================================================================
+
+@pytest.fixture
+def fresh_metrics():
+    """Swap in an empty AIMetrics instance for the duration of a test."""
+    from src.services import ai_metrics
+
+    previous = ai_metrics._metrics
+    ai_metrics._metrics = ai_metrics.AIMetrics()
+    yield ai_metrics._metrics
+    ai_metrics._metrics = previous
+
+
+class TestAIMetrics:
+    """Test per prompt-type AI telemetry."""
+
+    def test_histogram_percentiles(self):
+        """Test that percentiles land in the expected buckets."""
+        from src.services.ai_metrics import LatencyHistogram
+
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.observe(80)
+        for _ in range(10):
+            histogram.observe(2500)
+
+        assert histogram.percentile(50) == 100
+        assert histogram.percentile(95) == 3000
+        assert histogram.to_dict()["count"] == 100
+
+    @pytest.mark.asyncio
+    async def test_generate_records_usage(self, fresh_metrics):
+        """Test that token usage from the response is counted per prompt type."""
+        usage = SimpleNamespace(prompt_tokens=40, completion_tokens=200, total_tokens=240)
+        message = SimpleNamespace(content="Una tarea")
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="length")], usage=usage
+        )
+        service = make_enabled_service(AsyncMock(return_value=response))
+
+        await service.generate("task", "x", max_tokens=200)
+
+        stats = fresh_metrics.snapshot()["prompts"]["task"]
+        assert stats["requests"] == 1
+        assert stats["completed"] == 1
+        assert stats["prompt_tokens"] == 40
+        assert stats["completion_tokens"] == 200
+        assert stats["max_tokens_hit"] == 1
+        assert stats["latency"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_latency_excludes_consumer(self, fresh_metrics):
+        """Test that the stream is timed before the last chunk reaches the consumer."""
+        service = make_enabled_service(AsyncMock(return_value=fake_stream("uno ", "dos")))
+
+        completed = []
+        async for _ in service.generate_stream("scene", "x"):
+            completed.append(fresh_metrics.snapshot()["prompts"]["scene"]["completed"])
+        assert completed == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_errors_and_fallbacks_counted(self, fresh_metrics):
+        """Test that API errors and fallback reasons are counted."""
+        service = make_enabled_service(AsyncMock(side_effect=RuntimeError("boom")))
+        await service.generate("dare", "x")
+        await AIService(api_key=None).generate("dare", "x")
+
+        stats = fresh_metrics.snapshot()["prompts"]["dare"]
+        assert stats["errors"] == 1
+        assert stats["fallbacks"] == {"error": 1, "disabled": 1}
+
+
+# =============================================================================
+# FAKE LLM SERVER TESTS
+# =============================================================================
+
+class TestFakeLLMServer:
+    """Test AIService end to end against the local fake chat-completions server."""
+
+    @pytest.mark.asyncio
+    async def test_generate_and_stream(self, fresh_metrics):
+        """Test that plain and streamed completions round-trip through the SDK."""
+        from scripts.fake_llm_server import FakeLLMServer
+
+        server = FakeLLMServer(latency="fixed:1", token_ms=0, tokens=5)
+        await server.start()
+        service = AIService(api_key="fake", base_url=server.url)
+        try:
+            text = await service.generate("task", "x")
+            chunks = [c async for c in service.generate_stream("scene", "x")]
+        finally:
+            await service.client.close()
+            await server.stop()
+
+        assert len(text.split()) == 5
+        assert len("".join(chunks).split()) == 5
+        assert server.stats.requests == 2
+        assert server.stats.streamed == 1
+        prompts = fresh_metrics.snapshot()["prompts"]
+        assert prompts["task"]["completion_tokens"] == 5
+        assert prompts["scene"]["completion_tokens"] == 5
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_requests_fall_back(self, fresh_metrics):
+        """Test that persistent 429s end in an error fallback after SDK retries."""
+        from scripts.fake_llm_server import FakeLLMServer
+
+        server = FakeLLMServer(latency="fixed:1", rate_limit_rate=1.0, retry_after=0.01)
+        await server.start()
+        service = AIService(api_key="fake", base_url=server.url)
+        try:
+            text = await service.generate("dare", "x")
+        finally:
+            await service.client.close()
+            await server.stop()
+
+        assert text
+        assert server.stats.rate_limited == server.stats.requests > 1
+        assert fresh_metrics.snapshot()["prompts"]["dare"]["fallbacks"] == {"error": 1}
+
+
+# =============================================================================
+# FALLBACK CORPUS TESTS
+# =============================================================================
+
+class TestFallbackCorpus:
+    """Test the YAML-backed fallback corpus."""
+
+    def test_every_prompt_type_has_fallbacks(self):
+        """Test that each system prompt type has several fallback lines."""
+        from src.services.ai_fallbacks import FallbackCorpus
+        from src.services.ai_service import SYSTEM_PROMPTS
+
+        corpus = FallbackCorpus()
+        for prompt_type in SYSTEM_PROMPTS:
+            assert corpus.size(prompt_type) >= 5, prompt_type
+
+    def test_no_repeats_within_history(self):
+        """Test that a chat does not see the same line within its history window."""
+        import random
+        from src.services.ai_fallbacks import FallbackCorpus
+
+        data = {"task": [f"linea {i}" for i in range(6)]}
+        corpus = FallbackCorpus(data=data, history=3, rng=random.Random(1))
+
+        picks = [corpus.pick("task", chat_id=1) for _ in range(50)]
+        for i in range(3, len(picks)):
+            assert picks[i] not in picks[i - 3:i]
+
+    def test_weights_bias_selection(self):
+        """Test that heavier entries are picked more often."""
+        import random
+        from src.services.ai_fallbacks import FallbackCorpus
+
+        data = {"dare": [{"text": "pesado", "weight": 9}, "ligero"]}
+        corpus = FallbackCorpus(data=data, history=0, rng=random.Random(2))
+
+        picks = [corpus.pick("dare") for _ in range(500)]
+        assert picks.count("pesado") > picks.count("ligero") * 4
+
+    def test_unknown_type_uses_default(self):
+        """Test that unknown prompt types fall back to the default pool."""
+        from src.services.ai_fallbacks import FallbackCorpus
+
+        corpus = FallbackCorpus(data={"default": ["genérico"]})
+        assert corpus.pick("nope") == "genérico"
+
+    def test_harvest_round_trip(self, tmp_path):
+        """Test that harvested outputs are deduplicated, saved and reloaded."""
+        from src.services.ai_fallbacks import FallbackCorpus
+
+        corpus = FallbackCorpus(data={"title": ["👑 Título base"]})
+        assert corpus.harvest("title", "🔥 Duquesa de las Llamas Eternas") is True
+        assert corpus.harvest("title", "🔥 Duquesa de las Llamas Eternas") is False
+        assert corpus.harvest("title", "corto") is False
+
+        path = tmp_path / "harvest.yaml"
+        assert corpus.save_harvest(path) is True
+
+        reloaded = FallbackCorpus(data={"title": ["👑 Título base"]})
+        assert reloaded.load_harvest(path) == 1
+        assert reloaded.size("title") == 2
@@ -0,0 +1,121 @@
+"""
+Tests for auction settlement and anti-sniping.
+"""
+from datetime import timedelta
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy import select
+
+from src.database.connection import get_session
+from src.database.models import Auction, AuctionStatus, Transaction, TransactionType, User
+from src.database.repositories import AuctionRepository
+from src.services.auction_settlement import notify_auctions_ending, settle_auctions
+from src.services.notifications import NotificationType
+
+from conftest import make_users, mock_notifications, utc_now
+
+
+async def make_auction(seller, target, bids=(), ends_in=timedelta(minutes=-1)):
+    """Auction with the given (bidder, amount) bids, ending at now + ends_in."""
+    async with get_session() as session:
+        repo = AuctionRepository(session)
+        auction = await repo.create(seller.id, 100, hours=24, target_id=target.id)
+        for bidder, amount in bids:
+            await repo.place_bid(auction.id, bidder.id, amount)
+        auction.ends_at = utc_now() + ends_in
+        return auction.id
+
+
+class TestSettlement:
+    """Test set-based settlement of expired auctions."""
+
+    @pytest.mark.asyncio
+    async def test_pays_sellers_and_records_transactions(self):
+        """Test that every expired auction in a batch is closed and paid once."""
+        s1, s2, target, b1, b2 = await make_users(9501, 9502, 9503, 9504, 9505)
+        a1 = await make_auction(s1, target, [(b1, 150), (b2, 200)])
+        a2 = await make_auction(s2, target, [(b1, 300)])
+        a3 = await make_auction(s1, target, [(b2, 120)])
+        running = await make_auction(s2, target, [(b2, 500)], ends_in=timedelta(hours=2))
+
+        with mock_notifications("src.services.auction_settlement"), patch("src.services.auction_settlement.settings") as cfg:
+            cfg.auction_settle_batch = 2
+            settled = await settle_auctions([a1, a2, a3, running])
+            assert await settle_auctions([a1, a2, a3]) == []
+
+        assert {s.auction_id: s.amount for s in settled} == {a1: 200, a2: 300, a3: 120}
+        async with get_session() as session:
+            assert (await session.get(User, s1.id)).balance == s1.balance + 320
+            assert (await session.get(User, s2.id)).balance == s2.balance + 300
+            assert (await session.get(Auction, running)).status == AuctionStatus.ACTIVE
+            result = await session.execute(
+                select(Transaction).where(Transaction.transaction_type == TransactionType.AUCTION)
+            )
+            assert sorted(t.amount for t in result.scalars()) == [120, 200, 300]
+
+    @pytest.mark.asyncio
+    async def test_notifies_distinct_bidders(self):
+        """Test one notice per bidder: won for the winner, lost for the rest."""
+        seller, target, b1, b2 = await make_users(9506, 9507, 9508, 9509)
+        auction_id = await make_auction(seller, target, [(b1, 150), (b2, 200), (b1, 250)])
+
+        with mock_notifications("src.services.auction_settlement") as get_service:
+            await settle_auctions([auction_id])
+            send = get_service.return_value.send
+
+        calls = {(c.args[0], c.args[1]) for c in send.call_args_list}
+        assert send.await_count == 2
+        assert calls == {
+            (9508, NotificationType.AUCTION_WON),
+            (9509, NotificationType.AUCTION_LOST),
+        }
+
+    @pytest.mark.asyncio
+    async def test_without_bids(self):
+        """Test that an auction nobody bid on is closed without a payout."""
+        seller, target = await make_users(9510, 9511)
+        auction_id = await make_auction(seller, target)
+
+        settled = await settle_auctions()
+
+        assert [(s.auction_id, s.winner_id) for s in settled if s.auction_id == auction_id] == [
+            (auction_id, None)
+        ]
+        async with get_session() as session:
+            assert (await session.get(User, seller.id)).balance == seller.balance
+
+
+class TestEndingNotice:
+    """Test the last-hour warning."""
+
+    @pytest.mark.asyncio
+    async def test_skips_late_notice(self):
+        """Test that only auctions still about an hour away are announced."""
+        seller, target, bidder = await make_users(9512, 9513, 9514)
+        on_time = await make_auction(seller, target, [(bidder, 150)], ends_in=timedelta(minutes=59))
+        late = await make_auction(seller, target, [(bidder, 150)], ends_in=timedelta(minutes=3))
+
+        with mock_notifications("src.services.auction_settlement"):
+            assert await notify_auctions_ending([on_time, late]) == 1
+
+
+class TestAntiSniping:
+    """Test that late bids extend the auction."""
+
+    @pytest.mark.asyncio
+    async def test_late_bid_extends(self):
+        """Test the extension inside the window and no change outside it."""
+        seller, target, bidder = await make_users(9515, 9516, 9517)
+        async with get_session() as session:
+            repo = AuctionRepository(session)
+            early = await repo.create(seller.id, 100, hours=2, target_id=target.id)
+            late = await repo.create(seller.id, 100, hours=2, target_id=target.id)
+            late.ends_at = utc_now() + timedelta(seconds=30)
+            early_end = early.ends_at
+
+            await repo.place_bid(early.id, bidder.id, 150)
+            await repo.place_bid(late.id, bidder.id, 150)
+
+            assert early.ends_at == early_end
+            assert late.ends_at > utc_now() + timedelta(seconds=240)
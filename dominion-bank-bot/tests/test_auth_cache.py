@@ -0,0 +1,110 @@
+"""
+Tests for the authorization cache and its invalidation.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from telegram import ChatMember
+
+from src.config import Settings, settings
+from src.database.auth_cache import AuthorizationCache, get_auth_cache
+from src.database.connection import get_session
+from src.database.repositories import AdminRepository, UserRepository
+from src.handlers.group import on_chat_member_update
+from src.services.authorization import AuthorizationService, get_member_status
+
+
+class TestSuperAdmins:
+    """Test that super admins are parsed once."""
+
+    def test_frozenset_reused(self):
+        """Test that repeated calls return the same parsed set."""
+        config = Settings(TELEGRAM_BOT_TOKEN="x", SUPER_ADMINS="1, 2,,3")
+        assert config.super_admin_ids == frozenset({1, 2, 3})
+        assert config.super_admin_ids is config.super_admin_ids
+        assert config.is_super_admin(2)
+        assert not config.is_super_admin(4)
+
+
+class TestAuthorizationCache:
+    """Test the in-process cache on its own."""
+
+    def test_group_admins_and_ttl(self):
+        """Test group admin sets and expiry."""
+        cache = AuthorizationCache(ttl=60, member_ttl=0)
+        cache.put_group_admins(-100, [1, 2])
+        cache.put_member_status(-100, 500, "administrator")
+
+        assert cache.get_group_admins(-100) == frozenset({1, 2})
+        assert cache.get_member_status(-100, 500) is None
+
+        cache.invalidate_group(-100)
+        assert cache.get_group_admins(-100) is None
+
+
+class TestRepositoryIntegration:
+    """Test that admin writes keep cached decisions correct."""
+
+    @pytest.mark.asyncio
+    async def test_group_admin_add_and_remove(self):
+        """Test that group admin changes are visible to the next check."""
+        async with get_session() as session:
+            user, _ = await UserRepository(session).get_or_create(telegram_id=9201, username="ana")
+            repo = AdminRepository(session)
+            assert await repo.is_admin(user.id, -100) is False
+
+            await repo.add_admin(user.id, -100)
+            assert await repo.is_admin(user.id, -100) is True
+
+            await repo.remove_admin(user.id, -100)
+            assert await repo.is_admin(user.id, -100) is False
+
+    @pytest.mark.asyncio
+    async def test_warm_check_admin_skips_queries(self):
+        """Test that a repeated group admin check is answered from memory."""
+        async with get_session() as session:
+            user, _ = await UserRepository(session).get_or_create(telegram_id=9202, username="bea")
+            await AdminRepository(session).add_admin(user.id, -200)
+            assert (await AuthorizationService(session).check_admin(9202, -200)).is_group_admin
+
+        async with get_session() as session:
+            with patch.object(session, "execute", AsyncMock()) as execute:
+                result = await AuthorizationService(session).check_admin(9202, -200)
+            execute.assert_not_awaited()
+        assert result.is_group_admin is True
+
+
+class TestChatMemberStatus:
+    """Test memoized get_chat_member calls."""
+
+    @pytest.mark.asyncio
+    async def test_memoized_and_refreshed_by_update(self):
+        """Test that statuses are cached and replaced by chat_member updates."""
+        bot = MagicMock()
+        bot.get_chat_member = AsyncMock(return_value=MagicMock(status=ChatMember.MEMBER))
+
+        assert await get_member_status(bot, -300, 9203) == ChatMember.MEMBER
+        assert await get_member_status(bot, -300, 9203) == ChatMember.MEMBER
+        bot.get_chat_member.assert_awaited_once()
+
+        update = MagicMock()
+        update.effective_chat.id = -300
+        update.chat_member.new_chat_member.user = MagicMock(
+            id=9203, is_bot=False, username="cris", first_name="Cris", last_name=None
+        )
+        update.chat_member.old_chat_member.status = ChatMember.MEMBER
+        update.chat_member.new_chat_member.status = ChatMember.ADMINISTRATOR
+        with patch.object(settings, "default_balance", 0):
+            await on_chat_member_update(update, MagicMock())
+
+        assert await get_member_status(bot, -300, 9203) == ChatMember.ADMINISTRATOR
+        bot.get_chat_member.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failures_not_cached(self):
+        """Test that API errors are retried on the next check."""
+        bot = MagicMock()
+        bot.get_chat_member = AsyncMock(side_effect=RuntimeError("down"))
+
+        assert await get_member_status(bot, -400, 9204) is None
+        assert get_auth_cache().get_member_status(-400, 9204) is None
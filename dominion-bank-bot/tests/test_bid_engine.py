@@ -0,0 +1,132 @@
+"""
+Tests for the per-auction bid engine and the escrow ledger.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from src.database.connection import get_session
+from src.database.models import Auction, AuctionStatus, Bid, BidEscrow, User
+from src.database.repositories import AuctionRepository
+from src.services.auction_settlement import settle_auctions
+from src.services.bid_engine import BidEngine, BidError
+
+from conftest import make_users
+
+
+async def make_auction(seller, target, hours=2):
+    async with get_session() as session:
+        auction = await AuctionRepository(session).create(
+            seller.id, 100, hours=hours, target_id=target.id
+        )
+        return auction.id
+
+
+async def balances(*users):
+    async with get_session() as session:
+        return [(await session.get(User, u.id)).balance for u in users]
+
+
+async def escrow(auction_id):
+    async with get_session() as session:
+        hold = await session.get(BidEscrow, auction_id)
+        return (hold.bidder_id, hold.amount) if hold else None
+
+
+class TestBids:
+    """Test bids decided through the per-auction actor."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_bids_serialized(self):
+        """Test a burst of bids: one leader, one hold, everyone else refunded."""
+        seller, target, *bidders = await make_users(9601, 9602, 9603, 9604, 9605, 9606, balance=1000)
+        auction_id = await make_auction(seller, target)
+        engine = BidEngine()
+
+        amounts = [150, 150, 200, 180, 300]
+        results = await asyncio.gather(*(
+            engine.bid(auction_id, bidder.id, amount)
+            for bidder, amount in zip(bidders + bidders[:1], amounts, strict=True)
+        ))
+
+        accepted = [r.success for r in results]
+        assert accepted == [True, False, True, False, True]
+        assert results[1].error == BidError.BID_TOO_LOW
+        assert await escrow(auction_id) == (bidders[0].id, 300)
+        # bidders[0] raised its own 150 hold to 300
+        assert await balances(*bidders) == [700, 1000, 1000, 1000]
+        async with get_session() as session:
+            auction = await session.get(Auction, auction_id)
+            assert (auction.current_bid, auction.current_bidder_id) == (300, bidders[0].id)
+            bids = (await session.execute(select(Bid).where(Bid.auction_id == auction_id))).scalars()
+            assert sorted(b.amount for b in bids) == [150, 200, 300]
+
+    @pytest.mark.asyncio
+    async def test_insufficient_balance_rolls_back(self):
+        """Test that a bid the bidder cannot cover leaves the leader in place."""
+        seller, target, rich = await make_users(9607, 9608, 9609, balance=1000)
+        (poor,) = await make_users(9610, balance=120)
+        auction_id = await make_auction(seller, target)
+        engine = BidEngine()
+
+        assert (await engine.bid(auction_id, rich.id, 110)).success
+        result = await engine.bid(auction_id, poor.id, 200)
+
+        assert result.error == BidError.INSUFFICIENT_BALANCE
+        assert result.balance == 120
+        assert await escrow(auction_id) == (rich.id, 110)
+        assert await balances(rich, poor) == [890, 120]
+
+    @pytest.mark.asyncio
+    async def test_stale_state_reloaded(self):
+        """Test that an auction closed outside the engine rejects cached bids."""
+        seller, target, bidder = await make_users(9611, 9612, 9613, balance=1000)
+        auction_id = await make_auction(seller, target)
+        engine = BidEngine()
+        assert (await engine.bid(auction_id, bidder.id, 150)).success
+
+        async with get_session() as session:
+            await AuctionRepository(session).complete(auction_id)
+
+        result = await engine.bid(auction_id, bidder.id, 200)
+        assert result.error == BidError.NOT_ACTIVE
+        assert engine.conflicts == 1
+        assert len(engine) == 0
+
+
+class TestEscrow:
+    """Test that the held funds end up with the seller or back with the bidder."""
+
+    @pytest.mark.asyncio
+    async def test_cancel_refunds_hold(self):
+        """Test cancellation through the engine."""
+        seller, target, bidder = await make_users(9614, 9615, 9616, balance=1000)
+        auction_id = await make_auction(seller, target)
+        engine = BidEngine()
+        await engine.bid(auction_id, bidder.id, 250)
+
+        result = await engine.cancel(auction_id)
+
+        assert result.success and result.refunded == 250
+        assert await escrow(auction_id) is None
+        assert await balances(bidder) == [1000]
+        assert not (await engine.cancel(auction_id)).success
+
+    @pytest.mark.asyncio
+    async def test_settlement_pays_hold(self):
+        """Test that settlement drops the hold and pays the seller."""
+        seller, target, bidder = await make_users(9617, 9618, 9619, balance=1000)
+        auction_id = await make_auction(seller, target)
+        await BidEngine().bid(auction_id, bidder.id, 400)
+
+        async with get_session() as session:
+            auction = await session.get(Auction, auction_id)
+            auction.ends_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await settle_auctions([auction_id])
+
+        assert await escrow(auction_id) is None
+        assert await balances(seller, bidder) == [1400, 600]
+        async with get_session() as session:
+            assert (await session.get(Auction, auction_id)).status == AuctionStatus.COMPLETED
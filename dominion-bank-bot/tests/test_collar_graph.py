@@ -0,0 +1,115 @@
+"""
+Tests for the in-memory collar graph and the hierarchy queries.
+"""
+import pytest
+from unittest.mock import patch
+
+from src.config import settings
+from src.database.collar_graph import get_collar_graph
+from src.database.connection import get_session
+from src.database.repositories import CollarRepository
+from src.handlers.bdsm.collars import jerarquia_command
+
+from conftest import create_mock_context, create_mock_update, make_users
+
+
+async def collar(owner, sub):
+    async with get_session() as session:
+        await CollarRepository(session).create(owner.id, sub.id)
+
+
+async def make_tree():
+    """top -> (mid, side), mid -> low, low -> leaf"""
+    top, mid, side, low, leaf = await make_users(9801, 9802, 9803, 9804, 9805)
+    await collar(top, mid)
+    await collar(top, side)
+    await collar(mid, low)
+    await collar(low, leaf)
+    return top, mid, side, low, leaf
+
+
+async def queries(top, mid, leaf):
+    async with get_session() as session:
+        repo = CollarRepository(session)
+        return (
+            await repo.get_hierarchy(top.id),
+            await repo.get_hierarchy(top.id, max_depth=2),
+            await repo.get_owner_chain(leaf.id),
+            await repo.get_sub_ids(top.id),
+            await repo.get_owner_id(mid.id),
+            await repo.would_cycle(leaf.id, top.id),
+            await repo.would_cycle(top.id, leaf.id),
+        )
+
+
+class TestHierarchy:
+    """Test that the graph and the recursive CTEs agree."""
+
+    @pytest.mark.asyncio
+    async def test_cold_and_loaded_match(self):
+        """Test the hierarchy, lineage and cycle checks with and without the graph."""
+        top, mid, side, low, leaf = await make_tree()
+
+        cold = await queries(top, mid, leaf)
+        assert cold[0] == [
+            (mid.id, top.id, 1),
+            (low.id, mid.id, 2),
+            (leaf.id, low.id, 3),
+            (side.id, top.id, 1),
+        ]
+        assert cold[1] == [(mid.id, top.id, 1), (low.id, mid.id, 2), (side.id, top.id, 1)]
+        assert cold[2] == [low.id, mid.id, top.id]
+        assert cold[3] == [mid.id, side.id]
+        assert cold[4] == top.id
+        assert cold[5] is True
+        assert cold[6] is False
+
+        assert await get_collar_graph().load() == 4
+        assert await queries(top, mid, leaf) == cold
+
+
+class TestGraphMaintenance:
+    """Test that collar writes reach the graph on commit."""
+
+    @pytest.mark.asyncio
+    async def test_create_and_remove(self):
+        """Test that commits update the graph and rollbacks do not."""
+        owner, sub, other = await make_users(9806, 9807, 9808)
+        graph = get_collar_graph()
+        await graph.load()
+
+        await collar(owner, sub)
+        assert graph.owner_of(sub.id) == owner.id
+
+        with pytest.raises(RuntimeError):
+            async with get_session() as session:
+                await CollarRepository(session).create(owner.id, other.id)
+                raise RuntimeError("abort")
+        assert graph.subs_of(owner.id) == [sub.id]
+
+        async with get_session() as session:
+            assert await CollarRepository(session).remove_by_sub(sub.id)
+        assert graph.owner_of(sub.id) is None
+        assert graph.count_subs(owner.id) == 0
+        async with get_session() as session:
+            assert await CollarRepository(session).get_by_sub(sub.id) is None
+
+
+class TestJerarquiaCommand:
+    """Test the /jerarquia view."""
+
+    @pytest.mark.asyncio
+    async def test_renders_lineage_and_tree(self):
+        """Test that the tree is drawn below the user and the owners above."""
+        top, mid, side, low, leaf = await make_tree()
+        await get_collar_graph().load()
+
+        update = create_mock_update(9802, "u9802")
+        with patch.object(settings, "enable_bdsm_commands", True):
+            await jerarquia_command(update, create_mock_context())
+
+        text = update.message.reply_text.await_args.args[0]
+        assert "👑 @u9801 › @u9802" in text
+        assert "└ @u9804\n    └ @u9805" in text
+        assert "@u9803" not in text
+        assert "Total: 2 bajo su collar (1 directos)" in text
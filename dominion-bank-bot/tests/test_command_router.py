@@ -0,0 +1,111 @@
+"""
+Tests for the command table and router.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from telegram import Chat, Message, MessageEntity, Update, User
+
+from src.bot.commands import ADMIN, COMMANDS, Command, CommandRouter, CommandTable
+
+
+def make_command_update(text: str, bot_username: str = "PhantomBot") -> Update:
+    """Build a message update with a bot_command entity like Telegram sends."""
+    user = User(id=1, is_bot=False, first_name="Ana")
+    chat = Chat(id=1, type="group")
+    length = len(text.split()[0]) if text.startswith("/") else 0
+    entities = [MessageEntity(MessageEntity.BOT_COMMAND, 0, length)] if length else None
+    message = Message(
+        message_id=1, date=None, chat=chat, from_user=user, text=text, entities=entities
+    )
+    bot = MagicMock()
+    bot.username = bot_username
+    message.set_bot(bot)
+    return Update(update_id=1, message=message)
+
+
+class TestCommandTable:
+    """Test building and querying the command table."""
+
+    def test_aliases_resolve_to_canonical(self):
+        """Test that aliases map to the same command as the canonical name."""
+        table = CommandTable(COMMANDS)
+        assert table.get("saldo") is table.get("ver")
+        assert table.get("dado").name == "dado_perverso"
+        assert table.get("nope") is None
+
+    def test_bdsm_gated_at_build_time(self):
+        """Test that BDSM commands do not exist when the feature is off."""
+        table = CommandTable(COMMANDS, enable_bdsm=False)
+        assert "collar" not in table
+        assert "ama" not in table
+        assert "ruleta" in table
+        assert all(c.command != "collar" for c in table.menu())
+
+    def test_duplicate_names_rejected(self):
+        """Test that two commands cannot claim the same name."""
+        callback = AsyncMock()
+        with pytest.raises(ValueError):
+            CommandTable([Command("a", callback), Command("b", callback, aliases=("a",))])
+
+    def test_menu_hides_admin_commands(self):
+        """Test that the public menu excludes admin lane commands."""
+        table = CommandTable(COMMANDS)
+        public = {c.command for c in table.menu()}
+        admin = {c.command for c in table.menu(admin=True)}
+
+        assert "ver" in public and "quitar" not in public
+        assert "quitar" in admin and public < admin
+        assert all(table.get(name).lane == ADMIN for name in admin - public)
+
+    def test_help_sections(self):
+        """Test that /help sections follow the table and the user's role."""
+        table = CommandTable(COMMANDS)
+        user_help = "\n\n".join(table.help_sections())
+        admin_help = "\n\n".join(table.help_sections(is_admin=True))
+
+        assert user_help.startswith("💰 BÁSICOS:\n/start - Registrarse en el bot")
+        assert "/dar @user cantidad - Enviar" in user_help
+        assert "/bio [rol] - Bio para perfil" in user_help
+        assert "👑 ADMIN" not in user_help
+        assert "👑 ADMIN" in admin_help
+        assert "/ayuda" not in admin_help
+
+
+class TestCommandRouter:
+    """Test command parsing and dispatch."""
+
+    def make_router(self):
+        ver = AsyncMock()
+        dar = AsyncMock()
+        table = CommandTable([
+            Command("ver", ver, aliases=("saldo",)),
+            Command("dar", dar),
+        ])
+        return CommandRouter(table), ver, dar
+
+    def test_check_update(self):
+        """Test matching rules mirror CommandHandler."""
+        router, ver, dar = self.make_router()
+
+        command, args = router.check_update(make_command_update("/dar @ana 10"))
+        assert command.callback is dar
+        assert args == ["@ana", "10"]
+        assert router.check_update(make_command_update("/SALDO@phantombot"))[0].callback is ver
+        assert router.check_update(make_command_update("/ver@OtherBot")) is None
+        assert router.check_update(make_command_update("/cancelar")) is None
+        assert router.check_update(make_command_update("ver")) is None
+        assert router.check_update(object()) is None
+
+    @pytest.mark.asyncio
+    async def test_handle_update_dispatches_with_args(self):
+        """Test that the matched callback runs with context.args set."""
+        router, ver, dar = self.make_router()
+        update = make_command_update("/dar @ana 10")
+        context = MagicMock()
+
+        await router.handle_update(update, MagicMock(), router.check_update(update), context)
+
+        dar.assert_awaited_once_with(update, context)
+        ver.assert_not_awaited()
+        assert context.args == ["@ana", "10"]
@@ -0,0 +1,72 @@
+"""
+Tests for contract expiry and expiry reminders.
+"""
+from datetime import timedelta
+
+import pytest
+
+from src.database.connection import get_session
+from src.database.models import Contract, ContractStatus
+from src.database.repositories import ContractRepository
+from src.services.contract_lifecycle import expire_contracts, remind_contracts_expiring
+from src.services.notifications import NotificationType
+
+from conftest import make_users, mock_notifications, utc_now
+
+
+async def make_contract(dom, sub, ends_in, started=timedelta(days=10)):
+    async with get_session() as session:
+        contract = await ContractRepository(session).create(
+            dom.id, sub.id, "t", ends_at=utc_now() + ends_in
+        )
+        contract.starts_at = utc_now() - started
+        return contract.id
+
+
+class TestReminder:
+    """Test the 24 hour reminder."""
+
+    @pytest.mark.asyncio
+    async def test_reminds_both_parties_once(self):
+        """Test that contracts in the window are announced to both parties once."""
+        dom, sub, other = await make_users(9451, 9452, 9453)
+        ending = await make_contract(dom, sub, timedelta(hours=12))
+        short = await make_contract(dom, other, timedelta(hours=12), started=timedelta(hours=1))
+        later = await make_contract(sub, other, timedelta(days=3))
+
+        with mock_notifications("src.services.contract_lifecycle") as get_service:
+            assert await remind_contracts_expiring() == 1
+            assert await remind_contracts_expiring([ending, short, later]) == 0
+
+        send = get_service.return_value.send
+        calls = {(c.args[0], c.args[1], c.kwargs["target_name"]) for c in send.call_args_list}
+        assert calls == {
+            (9451, NotificationType.CONTRACT_EXPIRING, "@u9452"),
+            (9452, NotificationType.CONTRACT_EXPIRING, "@u9451"),
+        }
+        async with get_session() as session:
+            assert (await session.get(Contract, short)).reminded_at is not None
+            assert (await session.get(Contract, later)).reminded_at is None
+
+
+class TestExpiry:
+    """Test the set-based expiry."""
+
+    @pytest.mark.asyncio
+    async def test_expires_overdue_contracts(self):
+        """Test that overdue contracts close and drop out of the active counts."""
+        dom, sub, other = await make_users(9454, 9455, 9456)
+        overdue = await make_contract(dom, sub, -timedelta(minutes=1))
+        running = await make_contract(dom, other, timedelta(days=3))
+
+        with mock_notifications("src.services.contract_lifecycle") as get_service:
+            assert await expire_contracts() == 1
+            assert await expire_contracts([overdue]) == 0
+
+        assert get_service.return_value.send.await_count == 2
+        async with get_session() as session:
+            repo = ContractRepository(session)
+            assert (await repo.get_by_id(overdue)).status == ContractStatus.EXPIRED
+            assert (await repo.get_by_id(running)).status == ContractStatus.ACTIVE
+            assert await repo.count_active_by_user(dom.id) == 1
+            assert await repo.count_active_by_user(sub.id) == 0
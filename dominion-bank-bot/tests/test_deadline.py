@@ -0,0 +1,107 @@
+"""
+Tests for handler deadline budgets.
+"""
+import asyncio
+
+import pytest
+from unittest.mock import patch
+
+from src.bot.commands import AI, COMMANDS, Command, CommandTable
+from src.config import settings
+from src.database.connection import get_session
+from src.database.repositories import UserRepository
+from src.utils.deadline import (
+    AI_BUDGET,
+    ECONOMY_BUDGET,
+    IMPORT_BUDGET,
+    get_deadline_stats,
+    run_with_deadline,
+)
+from src.utils.request_context import current_request
+
+from conftest import create_mock_context, create_mock_update
+
+
+class TestRunWithDeadline:
+    """Test cancellation, rollback and counters."""
+
+    @pytest.mark.asyncio
+    async def test_expired_handler_cancelled_and_rolled_back(self):
+        """Test that a slow handler is cancelled, its writes discarded and the user told."""
+        stats = get_deadline_stats()
+        stats.reset()
+        update = create_mock_update(9301, "ana")
+        context = create_mock_context()
+        steps = []
+
+        async def slow(update, context):
+            await current_request(context).ensure_user()
+            steps.append("written")
+            # Never set: the handler can only end by being cancelled
+            await asyncio.Event().wait()
+            steps.append("end")
+
+        # Ample for the write above, so the cancel lands on the wait, not mid-query
+        with patch.object(settings, "deadline_economy", 0.5):
+            result = await run_with_deadline(slow, update, context, ECONOMY_BUDGET, "slow")
+
+        assert result is None
+        assert steps == ["written"]
+        assert context.request is None
+        update.message.reply_text.assert_awaited_once()
+        assert stats.snapshot()[ECONOMY_BUDGET] == {"started": 1, "exceeded": 1}
+        assert stats.by_command == {"slow": 1}
+
+        async with get_session() as session:
+            assert await UserRepository(session).get_by_telegram_id(9301) is None
+        stats.reset()
+
+    @pytest.mark.asyncio
+    async def test_fast_handler_commits(self):
+        """Test that a handler within budget commits normally."""
+        update = create_mock_update(9302, "bea")
+
+        async def fast(update, context):
+            await current_request(context).ensure_user()
+            return "ok"
+
+        assert await run_with_deadline(fast, update, create_mock_context(), ECONOMY_BUDGET) == "ok"
+
+        async with get_session() as session:
+            assert await UserRepository(session).get_by_telegram_id(9302) is not None
+
+    @pytest.mark.asyncio
+    async def test_handler_timeout_error_propagates(self):
+        """Test that a TimeoutError from the handler is not counted as the deadline."""
+        async def failing(update, context):
+            raise TimeoutError("upstream")
+
+        with pytest.raises(TimeoutError):
+            await run_with_deadline(
+                failing, create_mock_update(9303, "cris"), create_mock_context(), AI_BUDGET
+            )
+
+    @pytest.mark.asyncio
+    async def test_zero_budget_is_unbounded(self):
+        """Test that a budget of 0 disables the deadline."""
+        async def handler(update, context):
+            await asyncio.sleep(0.01)
+            return "done"
+
+        with patch.object(settings, "deadline_import", 0):
+            result = await run_with_deadline(
+                handler, create_mock_update(9304, "dani"), create_mock_context(), IMPORT_BUDGET
+            )
+        assert result == "done"
+
+
+class TestCommandBudgets:
+    """Test how commands are assigned to budget classes."""
+
+    def test_defaults_follow_lane(self):
+        """Test the default class per lane and explicit overrides."""
+        table = CommandTable(COMMANDS, timed=False)
+        assert table.get("dar").deadline == ECONOMY_BUDGET
+        assert table.get("ruleta").deadline == AI_BUDGET
+        assert table.get("exportar").deadline == IMPORT_BUDGET
+        assert Command("x", None, lane=AI, budget=IMPORT_BUDGET).deadline == IMPORT_BUDGET
@@ -0,0 +1,107 @@
+"""
+Tests for the dungeon gate and the in-memory dungeon locks.
+"""
+from datetime import timedelta
+
+import pytest
+from unittest.mock import AsyncMock
+
+from src.bot.commands import Command, CommandTable
+from src.database.connection import get_session
+from src.database.ephemeral_store import get_ephemeral_state
+from src.database.models import Dungeon, DungeonType
+from src.database.repositories import DungeonRepository
+from src.services.notifications import NotificationType
+from src.services.timed_events import release_expired_dungeons
+from src.utils.pipeline import dungeon_gate
+
+from conftest import create_mock_context, create_mock_update, make_users, mock_notifications, utc_now
+
+
+async def lock(prisoner, jailer, hours=1):
+    async with get_session() as session:
+        await DungeonRepository(session).lock(prisoner.id, jailer.id, DungeonType.CALABOZO, hours=hours)
+
+
+class TestDungeonGate:
+    """Test enforcement through the command table."""
+
+    def make_table(self):
+        calls = AsyncMock()
+        table = CommandTable(
+            [Command("dar", calls), Command("mi_calabozo", calls)],
+            timed=False,
+            dungeon_gate=True,
+        )
+        return table, calls
+
+    def test_allowlisted_commands_not_wrapped(self):
+        """Test that allowlisted commands skip the gate entirely."""
+        table, calls = self.make_table()
+        assert table.get("mi_calabozo").callback is calls
+        assert dungeon_gate(["calabozo", "encerrar"]).check is not None
+
+    @pytest.mark.asyncio
+    async def test_locked_user_halted_until_release(self):
+        """Test that the store follows lock and release commits."""
+        prisoner, jailer = await make_users(9751, 9752)
+        state = get_ephemeral_state()
+        await state.load()
+        table, calls = self.make_table()
+
+        await lock(prisoner, jailer)
+        assert state.locked_until(prisoner.id) is not None
+
+        update = create_mock_update(9751, "u9751")
+        await table.get("dar").callback(update, create_mock_context())
+        calls.assert_not_awaited()
+        assert "calabozo" in update.message.reply_text.await_args.args[0]
+
+        await table.get("mi_calabozo").callback(update, create_mock_context())
+        await table.get("dar").callback(create_mock_update(9752, "u9752"), create_mock_context())
+        assert calls.await_count == 2
+
+        async with get_session() as session:
+            assert await DungeonRepository(session).release(prisoner.id)
+        assert state.locked_until(prisoner.id) is None
+        await table.get("dar").callback(update, create_mock_context())
+        assert calls.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_lock_not_enforced(self):
+        """Test that a lock whose transaction fails never reaches the store."""
+        prisoner, jailer = await make_users(9753, 9754)
+        state = get_ephemeral_state()
+        await state.load()
+
+        with pytest.raises(RuntimeError):
+            async with get_session() as session:
+                await DungeonRepository(session).lock(prisoner.id, jailer.id, DungeonType.JAULA, hours=1)
+                raise RuntimeError("abort")
+
+        assert state.locked_until(prisoner.id) is None
+
+
+class TestAutoRelease:
+    """Test the timed release of expired locks."""
+
+    @pytest.mark.asyncio
+    async def test_release_notifies_prisoner(self):
+        """Test that expired locks are deleted, forgotten and announced."""
+        prisoner, jailer, other = await make_users(9755, 9756, 9757)
+        await lock(prisoner, jailer)
+        await lock(other, jailer)
+        state = get_ephemeral_state()
+        await state.load()
+        async with get_session() as session:
+            dungeon = await session.get(Dungeon, prisoner.id)
+            dungeon.expires_at = utc_now() - timedelta(seconds=1)
+
+        with mock_notifications("src.services.timed_events") as get_service:
+            await release_expired_dungeons([prisoner.id, other.id])
+
+        get_service.return_value.send.assert_awaited_once_with(9755, NotificationType.DUNGEON_RELEASED)
+        assert state.locked_until(prisoner.id) is None
+        assert state.locked_until(other.id) is not None
+        async with get_session() as session:
+            assert await session.get(Dungeon, prisoner.id) is None
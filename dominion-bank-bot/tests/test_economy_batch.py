@@ -0,0 +1,158 @@
+"""
+Tests for the set-based economy batch engine.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import func, insert, select
+
+from src.config import settings
+from src.database.connection import get_session
+from src.database.migrations import _economy_transaction_types
+from src.database.models import Altar, EconomyRun, Transaction, TransactionType, User
+from src.database.repositories import LedgerStatsRepository
+from src.services.economy_batch import (
+    DEFAULT_RULES,
+    EconomyBatchEngine,
+)
+
+from conftest import make_users
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def rule(name):
+    return next(r for r in DEFAULT_RULES if r.name == name)
+
+
+async def balances(*users):
+    async with get_session() as session:
+        return [(await session.get(User, u.id)).balance for u in users]
+
+
+async def transactions(transaction_type):
+    async with get_session() as session:
+        result = await session.execute(
+            select(Transaction.recipient_id, Transaction.amount)
+            .where(Transaction.transaction_type == transaction_type)
+            .order_by(Transaction.recipient_id)
+        )
+        return result.all()
+
+
+class TestAltarIncome:
+    """Test the daily altar payout."""
+
+    @pytest.mark.asyncio
+    async def test_paid_once_per_period(self):
+        """Test that a second run of the same day changes nothing."""
+        builder, honoured, other = await make_users(9801, 9802, 9803, balance=100)
+        async with get_session() as session:
+            session.add(Altar(for_user_id=honoured.id, built_by=builder.id, daily_amount=25))
+        engine = EconomyBatchEngine([rule("altar_income")])
+
+        (first,) = await engine.run(NOW)
+        (second,) = await engine.run(NOW + timedelta(hours=6))
+
+        assert (first.users, first.total, first.skipped) == (1, 25, False)
+        assert second.skipped
+        assert await balances(builder, honoured, other) == [100, 125, 100]
+        assert await transactions(TransactionType.ALTAR_INCOME) == [(honoured.id, 25)]
+
+        (next_day,) = await engine.run(NOW + timedelta(days=1))
+        assert not next_day.skipped
+        assert await balances(honoured) == [150]
+        async with get_session() as session:
+            runs = (await session.execute(select(func.count()).select_from(EconomyRun))).scalar_one()
+            income = await LedgerStatsRepository(session).get(honoured.id, TransactionType.ALTAR_INCOME)
+        assert runs == 2
+        assert (income.received, income.received_count) == (50, 2)
+
+
+class TestBalanceRules:
+    """Test the optional debits."""
+
+    @pytest.mark.asyncio
+    async def test_wealth_tax(self, monkeypatch):
+        """Test that only the balance above the threshold is taxed."""
+        monkeypatch.setattr(settings, "wealth_tax_rate", 0.1)
+        monkeypatch.setattr(settings, "wealth_tax_threshold", 1000)
+        rich, poor = await make_users(9804, 9805, balance=3000)
+        async with get_session() as session:
+            (await session.get(User, poor.id)).balance = 900
+
+        (result,) = await EconomyBatchEngine([rule("wealth_tax")]).run(NOW)
+
+        assert (result.users, result.total) == (1, 200)
+        assert await balances(rich, poor) == [2800, 900]
+        assert await transactions(TransactionType.WEALTH_TAX) == [(rich.id, 200)]
+
+    @pytest.mark.asyncio
+    async def test_inactivity_decay(self, monkeypatch):
+        """Test that users who sent something recently keep their balance."""
+        monkeypatch.setattr(settings, "inactivity_decay_rate", 0.5)
+        monkeypatch.setattr(settings, "inactivity_decay_days", 30)
+        old = NOW - timedelta(days=60)
+        idle, active = await make_users(9806, 9807, balance=400, created_at=old)
+        (newcomer,) = await make_users(9808, balance=400, created_at=NOW - timedelta(days=2))
+        async with get_session() as session:
+            session.add(Transaction(
+                sender_id=active.id, recipient_id=idle.id, amount=0,
+                transaction_type=TransactionType.TRANSFER,
+                created_at=(NOW - timedelta(days=3)).replace(tzinfo=None),
+            ))
+
+        (result,) = await EconomyBatchEngine([rule("inactivity_decay")]).run(NOW)
+
+        assert (result.users, result.total) == (1, 200)
+        assert await balances(idle, active, newcomer) == [200, 400, 400]
+
+    @pytest.mark.asyncio
+    async def test_disabled_rules_skipped(self):
+        """Test that rules with a zero rate do not run."""
+        await make_users(9809, balance=10 ** 9)
+        results = await EconomyBatchEngine().run(NOW)
+        assert [r.rule for r in results] == ["altar_income"]
+
+
+class TestMigration:
+    """Test the enum migration for the new transaction types."""
+
+    @pytest.mark.asyncio
+    async def test_postgres_enum_extended(self):
+        """Test that PostgreSQL gets one ALTER TYPE per value and SQLite nothing."""
+        conn = MagicMock(execute=AsyncMock())
+        conn.dialect.name = "sqlite"
+        await _economy_transaction_types(conn)
+        conn.execute.assert_not_awaited()
+
+        conn.dialect.name = "postgresql"
+        await _economy_transaction_types(conn)
+        statements = [str(c.args[0]) for c in conn.execute.await_args_list]
+        assert statements == [
+            f"ALTER TYPE transactiontype ADD VALUE IF NOT EXISTS '{t.name}'"
+            for t in (TransactionType.ALTAR_INCOME, TransactionType.WEALTH_TAX, TransactionType.INACTIVITY_DECAY)
+        ]
+
+
+class TestScale:
+    """Test that a run costs a fixed number of statements."""
+
+    @pytest.mark.asyncio
+    async def test_many_users(self, monkeypatch):
+        """Test a tax over 20k users in one pass."""
+        monkeypatch.setattr(settings, "wealth_tax_rate", 0.01)
+        monkeypatch.setattr(settings, "wealth_tax_threshold", 0)
+        async with get_session() as session:
+            await session.execute(insert(User), [
+                {"telegram_id": 10 ** 6 + i, "username": f"bulk{i}", "balance": 1000}
+                for i in range(20000)
+            ])
+
+        (result,) = await EconomyBatchEngine([rule("wealth_tax")]).run(NOW)
+
+        assert (result.users, result.total) == (20000, 200000)
+        async with get_session() as session:
+            total = (await session.execute(select(func.sum(User.balance)))).scalar_one()
+        assert total == 20000 * 990
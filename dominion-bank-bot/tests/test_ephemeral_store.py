@@ -0,0 +1,123 @@
+"""
+Tests for the ephemeral state store (cooldowns and pending requests).
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+
+from src.database.connection import get_session
+from src.database.ephemeral_store import EphemeralStore, get_ephemeral_state
+from src.database.models import CollarType, Cooldown
+from src.database.repositories import (
+    CooldownRepository,
+    PendingRequestRepository,
+)
+
+from conftest import make_users
+
+
+class TestEphemeralStore:
+    """Test TTL semantics of the in-memory store."""
+
+    def test_ttl_and_purge(self, monkeypatch):
+        """Test that entries expire on read and on purge."""
+        clock = [100.0]
+        monkeypatch.setattr("src.database.ephemeral_store.time.monotonic", lambda: clock[0])
+        store = EphemeralStore("demo")
+        store.set("a", 1, ttl=5)
+        store.set("b", 2, ttl=50)
+        store.set("c", 3, ttl=0)
+
+        assert store.get("a") == 1
+        assert store.get("c") is None
+        clock[0] += 10
+        assert store.get("a") is None
+        store.set("d", 4, ttl=1)
+        clock[0] += 5
+        assert store.purge() == 1
+        assert len(store) == 1
+
+    def test_dirty_keys(self):
+        """Test that only live dirty keys are handed out, once."""
+        store = EphemeralStore("demo")
+        store.set("a", 1, ttl=60, dirty=True)
+        store.set("b", 2, ttl=60)
+
+        assert store.take_dirty() == {"a": 1}
+        assert store.take_dirty() == {}
+
+
+class TestCooldownsInMemory:
+    """Test cooldowns served from memory and written by snapshots."""
+
+    @pytest.mark.asyncio
+    async def test_set_check_and_snapshot(self):
+        """Test that set/check need no rows until a snapshot writes them."""
+        (user,) = await make_users(9801)
+        state = get_ephemeral_state()
+        await state.load()
+
+        async with get_session() as session:
+            repo = CooldownRepository(session)
+            await repo.set_cooldown(user.id, "transfer", 60)
+            assert await repo.is_on_cooldown(user.id, "transfer")
+            assert await repo.is_on_cooldown(user.id, "other") is None
+            rows = (await session.execute(select(Cooldown))).scalars().all()
+            assert rows == []
+
+        assert await state.snapshot() == 1
+        async with get_session() as session:
+            await CooldownRepository(session).set_cooldown(user.id, "transfer", 120)
+        assert await state.snapshot() == 1
+
+        # A restart reloads the cooldown from the snapshot
+        state.clear()
+        assert await state.load() == 1
+        expires = state.cooldowns.get((user.id, "transfer"))
+        assert expires > datetime.now(timezone.utc) + timedelta(seconds=90)
+
+
+class TestPendingRequestsInMemory:
+    """Test pending request lookups from memory."""
+
+    @pytest.mark.asyncio
+    async def test_mirrored_on_commit(self):
+        """Test creation, lookup and deletion through the repository."""
+        owner, target = await make_users(9802, 9803)
+        state = get_ephemeral_state()
+        await state.load()
+
+        async with get_session() as session:
+            repo = PendingRequestRepository(session)
+            request = await repo.create_collar_request(owner.id, target.id, CollarType.FORMAL)
+            # Not visible before the transaction commits
+            assert await repo.get_pending_collar(target.id) is None
+
+        async with get_session() as session:
+            repo = PendingRequestRepository(session)
+            pending = await repo.get_pending_collar(target.id)
+            assert pending.id == request.id
+            assert pending.from_user_id == owner.id
+            assert await repo.get_pending_contract(target.id) is None
+            await repo.delete(pending.id)
+
+        async with get_session() as session:
+            assert await PendingRequestRepository(session).get_pending_collar(target.id) is None
+
+    @pytest.mark.asyncio
+    async def test_rollback_not_mirrored(self):
+        """Test that a rolled back request never shows up."""
+        owner, target = await make_users(9804, 9805)
+        state = get_ephemeral_state()
+        await state.load()
+
+        with pytest.raises(RuntimeError):
+            async with get_session() as session:
+                await PendingRequestRepository(session).create_collar_request(
+                    owner.id, target.id, CollarType.FORMAL
+                )
+                raise RuntimeError("abort")
+
+        async with get_session() as session:
+            assert await PendingRequestRepository(session).get_pending_collar(target.id) is None
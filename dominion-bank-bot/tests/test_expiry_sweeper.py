@@ -0,0 +1,77 @@
+"""
+Tests for the expiry sweeper and set-based clear_expired.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from src.database.connection import get_session
+from src.database.models import Cooldown, PendingRequest, RequestType
+from src.database.repositories import CooldownRepository, UserRepository
+from src.services.expiry_sweeper import ExpirySweeper
+
+
+async def make_user(telegram_id):
+    async with get_session() as session:
+        repo = UserRepository(session)
+        user, _ = await repo.get_or_create(telegram_id=telegram_id, username=f"u{telegram_id}")
+        return user
+
+
+async def count(model):
+    async with get_session() as session:
+        return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+class TestClearExpired:
+    """Test the chunked DELETE behind clear_expired."""
+
+    @pytest.mark.asyncio
+    async def test_limit_bounds_each_call(self):
+        """Test that only expired rows go, at most limit per call."""
+        user = await make_user(9701)
+        past = datetime.now(timezone.utc) - timedelta(minutes=5)
+        async with get_session() as session:
+            session.add_all(
+                Cooldown(user_id=user.id, action=f"a{i}", expires_at=past) for i in range(5)
+            )
+            await CooldownRepository(session).set_cooldown(user.id, "live", 3600)
+        before = await count(Cooldown)
+
+        async with get_session() as session:
+            assert await CooldownRepository(session).clear_expired(limit=3) == 3
+        async with get_session() as session:
+            assert await CooldownRepository(session).clear_expired() == 2
+        assert await count(Cooldown) == before - 5
+
+        async with get_session() as session:
+            assert await CooldownRepository(session).is_on_cooldown(user.id, "live")
+
+
+class TestExpirySweeper:
+    """Test periodic sweeping and its per-table stats."""
+
+    @pytest.mark.asyncio
+    async def test_sweeps_all_tables_in_chunks(self):
+        """Test that every table is drained chunk by chunk and counted."""
+        a, b = await make_user(9702), await make_user(9703)
+        past = datetime.now(timezone.utc) - timedelta(minutes=1)
+        async with get_session() as session:
+            session.add_all(
+                Cooldown(user_id=a.id, action=f"s{i}", expires_at=past) for i in range(7)
+            )
+            session.add(PendingRequest(
+                request_type=RequestType.COLLAR, from_user_id=a.id, to_user_id=b.id, expires_at=past
+            ))
+
+        sweeper = ExpirySweeper(chunk=2, interval=0)
+        swept = await sweeper.sweep()
+
+        assert swept["cooldowns"] >= 7
+        assert swept["pending_requests"] >= 1
+        assert await sweeper.sweep() == {"cooldowns": 0, "dungeon": 0, "pending_requests": 0}
+        stats = sweeper.stats()
+        assert stats["cooldowns"]["runs"] == 2
+        assert stats["cooldowns"]["deleted"] == swept["cooldowns"]
+        assert stats["cooldowns"]["last_deleted"] == 0
@@ -0,0 +1,121 @@
+"""
+Tests for the identity cache and its repository invalidation.
+"""
+import pytest
+from unittest.mock import patch
+
+from src.database.connection import get_session
+from src.database.identity_cache import IdentityCache, get_identity_cache
+from src.database.models import User, UserStatus
+from src.database.repositories import UserRepository
+from src.utils.request_context import request_scope
+
+from conftest import create_mock_context, create_mock_update
+
+
+def make_user(id: int, telegram_id: int, username: str = None, is_admin: bool = False) -> User:
+    """Build a detached User row."""
+    return User(
+        id=id,
+        telegram_id=telegram_id,
+        username=username,
+        first_name="Test",
+        is_admin=is_admin,
+        status=UserStatus.ACTIVE,
+        balance=999,
+    )
+
+
+class TestIdentityCache:
+    """Test the in-process cache on its own."""
+
+    def test_put_and_lookup(self):
+        """Test lookups by telegram_id and case-insensitive username."""
+        cache = IdentityCache(max_size=10, ttl=60)
+        cache.put(make_user(1, 100, "Ana"))
+
+        assert cache.get(100).id == 1
+        assert cache.get_by_username("@ANA").telegram_id == 100
+        assert not hasattr(cache.get(100), "balance")
+
+    def test_placeholders_not_cached(self):
+        """Test that imported users without telegram_id are skipped."""
+        cache = IdentityCache(max_size=10, ttl=60)
+        assert cache.put(make_user(1, 0, "ghost")) is None
+        assert cache.get_by_username("ghost") is None
+
+    def test_lru_eviction_and_ttl(self):
+        """Test size bound and expiry."""
+        cache = IdentityCache(max_size=2, ttl=60)
+        for i in range(3):
+            cache.put(make_user(i, 100 + i, f"u{i}"))
+        assert cache.get(100) is None
+        assert cache.get_by_username("u0") is None
+        assert len(cache) == 2
+
+        expired = IdentityCache(max_size=10, ttl=0)
+        expired.put(make_user(1, 100))
+        assert expired.get(100) is None
+
+    def test_invalidate_by_any_key(self):
+        """Test invalidation by user id, telegram_id and username."""
+        cache = IdentityCache(max_size=10, ttl=60)
+        cache.put(make_user(1, 100, "ana"))
+        cache.put(make_user(2, 200, "bea"))
+        cache.put(make_user(3, 300, "cris"))
+
+        cache.invalidate(user_id=1)
+        cache.invalidate(telegram_id=200)
+        cache.invalidate(username="@Cris")
+
+        assert len(cache) == 0
+        assert cache.get_by_username("ana") is None
+
+
+class TestRepositoryIntegration:
+    """Test that repository writes keep the cache correct."""
+
+    @pytest.mark.asyncio
+    async def test_set_admin_invalidates(self):
+        """Test that promoting a user is visible to the next admin check."""
+        async with get_session() as session:
+            repo = UserRepository(session)
+            user, _ = await repo.get_or_create(telegram_id=9001, username="ana")
+            await repo.get_by_telegram_id(9001)
+        assert get_identity_cache().get(9001).is_admin is False
+
+        async with get_session() as session:
+            await UserRepository(session).set_admin(user.id, True)
+        assert get_identity_cache().get(9001) is None
+
+        async with request_scope(create_mock_update(9001, "ana"), create_mock_context()) as request:
+            assert await request.is_admin() is True
+
+    @pytest.mark.asyncio
+    async def test_warm_admin_check_skips_database(self):
+        """Test that a cached identity answers admin checks without a session."""
+        async with get_session() as session:
+            await UserRepository(session).get_or_create(telegram_id=9002, username="bea")
+            await UserRepository(session).get_by_telegram_id(9002)
+
+        with patch("src.utils.request_context.get_session_factory") as factory:
+            async with request_scope(create_mock_update(9002, "bea"), create_mock_context()) as request:
+                assert await request.is_admin() is False
+                assert (await request.identity(register=True)).telegram_id == 9002
+            factory.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_username_lookup_uses_cache_and_balance_stays_fresh(self):
+        """Test cached username lookups still return the live balance."""
+        async with get_session() as session:
+            repo = UserRepository(session)
+            user, _ = await repo.get_or_create(telegram_id=9003, username="Cris", default_balance=10)
+            await repo.get_by_telegram_id(9003)
+
+        async with get_session() as session:
+            await UserRepository(session).update_balance(user.id, 5)
+
+        async with get_session() as session:
+            found = await UserRepository(session).get_by_username("@cris")
+        assert found.telegram_id == 9003
+        assert found.balance == 15
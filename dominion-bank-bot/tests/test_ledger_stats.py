@@ -0,0 +1,129 @@
+"""
+Tests for the incrementally maintained ledger stats and tribute pairs.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from src.database.connection import get_session
+from src.database.models import TransactionType, TributePair, UserLedgerStats
+from src.database.repositories import (
+    AltarRepository,
+    LedgerStatsRepository,
+    TransactionRepository,
+)
+
+from conftest import make_users
+
+
+async def tribute(sender, recipient, amount):
+    async with get_session() as session:
+        await TransactionRepository(session).create(
+            sender_id=sender.id,
+            recipient_id=recipient.id,
+            amount=amount,
+            transaction_type=TransactionType.TRIBUTE,
+        )
+
+
+async def snapshot():
+    async with get_session() as session:
+        stats = (await session.execute(
+            select(
+                UserLedgerStats.user_id,
+                UserLedgerStats.transaction_type,
+                UserLedgerStats.received,
+                UserLedgerStats.received_count,
+                UserLedgerStats.sent,
+                UserLedgerStats.sent_count,
+            ).order_by(UserLedgerStats.user_id, UserLedgerStats.transaction_type)
+        )).all()
+        pairs = (await session.execute(
+            select(TributePair.recipient_id, TributePair.sender_id, TributePair.total, TributePair.count)
+            .order_by(TributePair.recipient_id, TributePair.sender_id)
+        )).all()
+        return stats, pairs
+
+
+class TestIncrementalStats:
+    """Test that every transaction write updates the totals."""
+
+    @pytest.mark.asyncio
+    async def test_tribute_views(self):
+        """Test the altar totals, devotees and leaderboard."""
+        ama, amo, sub1, sub2 = await make_users(9901, 9902, 9903, 9904)
+        await tribute(sub1, ama, 100)
+        await tribute(sub1, ama, 50)
+        await tribute(sub2, ama, 300)
+        await tribute(sub2, amo, 20)
+
+        async with get_session() as session:
+            altar = AltarRepository(session)
+            assert await altar.get_total_received(ama.id) == 450
+            assert await altar.get_total_given(sub2.id) == 320
+            assert await altar.get_total_given(ama.id) == 0
+            assert await altar.get_devotee_count(ama.id) == 2
+            devotees = await altar.get_devotees(ama.id)
+            assert [(u.id, total) for u, total in devotees] == [(sub2.id, 300), (sub1.id, 150)]
+            top = await altar.get_top_receivers(limit=1)
+            assert [(u.id, total) for u, total in top] == [(ama.id, 450)]
+
+    @pytest.mark.asyncio
+    async def test_rollback_discards_totals(self):
+        """Test that totals roll back with their transaction."""
+        ama, sub = await make_users(9905, 9906)
+        with pytest.raises(RuntimeError):
+            async with get_session() as session:
+                await TransactionRepository(session).create(
+                    sender_id=sub.id,
+                    recipient_id=ama.id,
+                    amount=10,
+                    transaction_type=TransactionType.TRIBUTE,
+                )
+                raise RuntimeError("abort")
+
+        assert await snapshot() == ([], [])
+
+
+class TestRebuild:
+    """Test recomputing the tables from the transactions."""
+
+    @pytest.mark.asyncio
+    async def test_rebuild_matches_incremental(self):
+        """Test that a rebuild reproduces the incremental totals exactly."""
+        ama, sub1, sub2 = await make_users(9907, 9908, 9909)
+        await tribute(sub1, ama, 40)
+        await tribute(sub2, ama, 60)
+        async with get_session() as session:
+            await TransactionRepository(session).create(
+                recipient_id=sub1.id, amount=500, transaction_type=TransactionType.ADMIN_GIVE
+            )
+        incremental = await snapshot()
+
+        async with get_session() as session:
+            repo = LedgerStatsRepository(session)
+            (await repo.get(ama.id, TransactionType.TRIBUTE)).received = 0
+            counts = await repo.rebuild()
+
+        assert counts == (4, 2)
+        assert await snapshot() == incremental
+
+
+class TestDialects:
+    """Test that upserts are built for the session's database."""
+
+    @pytest.mark.asyncio
+    async def test_postgresql_upserts(self):
+        """Test that a PostgreSQL session gets PostgreSQL INSERT ... ON CONFLICT statements."""
+        session = MagicMock()
+        session.bind.dialect.name = "postgresql"
+        session.execute = AsyncMock()
+
+        await LedgerStatsRepository(session).record(1, 50, TransactionType.TRIBUTE, sender_id=2)
+
+        statements = [call.args[0] for call in session.execute.await_args_list]
+        assert len(statements) == 3
+        for stmt in statements:
+            assert isinstance(stmt, postgresql.Insert)
+            assert "ON CONFLICT" in str(stmt.compile(dialect=postgresql.dialect()))
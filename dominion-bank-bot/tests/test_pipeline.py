@@ -0,0 +1,135 @@
+"""
+Tests for the compiled middleware pipeline.
+"""
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.bot.commands import Command, CommandTable
+from src.config import settings
+from src.utils.pipeline import (
+    Halt,
+    Stage,
+    admin,
+    compile_pipeline,
+    feature,
+    get_stage_timings,
+    registered,
+)
+from src.utils.validators import ValidationError
+
+from conftest import create_mock_context, create_mock_update
+
+
+def recording_stage(name, calls, halt=None):
+    """Stage that records its name and optionally halts."""
+    async def check(update, context, request):
+        calls.append(name)
+        return halt
+    return Stage(name, check)
+
+
+class TestCompilePipeline:
+    """Test stage ordering, short-circuiting and error handling."""
+
+    @pytest.mark.asyncio
+    async def test_stages_run_in_order_then_handler(self):
+        """Test that every stage runs before the handler."""
+        calls = []
+        handler = AsyncMock(return_value="done")
+        run = compile_pipeline(
+            handler, [recording_stage("a", calls), recording_stage("b", calls)]
+        )
+        update = create_mock_update(8001, "ana")
+
+        assert await run(update, create_mock_context()) == "done"
+        assert calls == ["a", "b"]
+        handler.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_halt_short_circuits_and_replies(self):
+        """Test that a Halt stops later stages and the handler."""
+        calls = []
+        handler = AsyncMock()
+        run = compile_pipeline(handler, [
+            recording_stage("a", calls, Halt("nope", "No.")),
+            recording_stage("b", calls),
+        ])
+        update = create_mock_update(8002, "bea")
+
+        assert await run(update, create_mock_context()) is None
+        assert calls == ["a"]
+        handler.assert_not_awaited()
+        update.message.reply_text.assert_awaited_once_with("No.")
+
+    @pytest.mark.asyncio
+    async def test_validation_error_answered(self):
+        """Test that ValidationError from the handler becomes a reply."""
+        handler = AsyncMock(side_effect=ValidationError("Cantidad invalida"))
+        update = create_mock_update(8003, "cris")
+
+        await compile_pipeline(handler)(update, create_mock_context())
+
+        update.message.reply_text.assert_awaited_once_with("Cantidad invalida")
+
+    @pytest.mark.asyncio
+    async def test_registered_and_admin_stages(self):
+        """Test built-in stages against the database."""
+        handler = AsyncMock()
+        run = compile_pipeline(handler, [registered(), admin()])
+        update = create_mock_update(8004, "dani")
+        context = create_mock_context()
+        context.user_data = {}
+
+        await run(update, context)
+
+        handler.assert_not_awaited()
+        assert context.user_data["db_user"].telegram_id == 8004
+        update.message.reply_text.assert_awaited_once()
+
+    def test_enabled_feature_is_dropped(self):
+        """Test that feature flags are resolved when declared."""
+        with patch.object(settings, "enable_transfers", True):
+            assert feature("enable_transfers").check is None
+        with patch.object(settings, "enable_transfers", False):
+            assert feature("enable_transfers").check is not None
+
+    @pytest.mark.asyncio
+    async def test_timings_recorded(self):
+        """Test that per-stage and handler timings are collected when enabled."""
+        timings = get_stage_timings()
+        timings.reset()
+        run = compile_pipeline(
+            AsyncMock(), [recording_stage("a", [])], name="demo", timed=True
+        )
+
+        await run(create_mock_update(8005, "eva"), create_mock_context())
+
+        snapshot = timings.snapshot()
+        assert snapshot["a"]["count"] == 1
+        assert snapshot["handler:demo"]["count"] == 1
+        timings.reset()
+
+
+class TestCommandTableStages:
+    """Test that the command table compiles declared stages."""
+
+    @pytest.mark.asyncio
+    async def test_stages_compiled_at_build(self):
+        """Test that a command's stages run before its callback."""
+        calls = []
+        callback = AsyncMock()
+        table = CommandTable(
+            [Command("x", callback, stages=(recording_stage("gate", calls, Halt("no")),))],
+            timed=False,
+        )
+
+        await table.get("x").callback(create_mock_update(8006, "fer"), create_mock_context())
+
+        assert calls == ["gate"]
+        callback.assert_not_awaited()
+
+    def test_plain_commands_not_wrapped(self):
+        """Test that commands without stages keep their callback."""
+        callback = AsyncMock()
+        table = CommandTable([Command("y", callback)], timed=False)
+        assert table.get("y").callback is callback
@@ -0,0 +1,95 @@
+"""
+Tests for the per-update request context.
+"""
+import pytest
+from unittest.mock import patch
+
+from src.database.connection import get_session
+from src.database.repositories import UserRepository
+from src.utils.middleware import require_admin, require_registration
+from src.utils.request_context import current_request, request_scope
+
+from conftest import create_mock_update, create_mock_context
+
+
+class TestRequestContext:
+    """Test session sharing and user resolution within an update."""
+
+    @pytest.mark.asyncio
+    async def test_middleware_and_handler_share_lookup(self):
+        """Test that registration, admin check and handler resolve the user once."""
+        update = create_mock_update(7001, "ana")
+        context = create_mock_context()
+        seen = {}
+
+        @require_registration
+        @require_admin
+        async def handler(update, context):
+            request = current_request(context)
+            seen["user"] = await request.user()
+            seen["session"] = await request.session()
+
+        async with get_session() as session:
+            user, _ = await UserRepository(session).get_or_create(telegram_id=7001, username="ana")
+            user.is_admin = True
+
+        calls = []
+        original = UserRepository.get_by_telegram_id
+
+        async def counting_lookup(self, telegram_id):
+            calls.append(telegram_id)
+            return await original(self, telegram_id)
+
+        with patch.object(UserRepository, "get_by_telegram_id", counting_lookup):
+            async with request_scope(update, context) as request:
+                await handler(update, context)
+                assert seen["session"] is await request.session()
+
+        assert seen["user"].telegram_id == 7001
+        # get_or_create does one lookup; is_admin and the handler reuse it
+        assert calls == [7001]
+        assert context.request is None
+
+    @pytest.mark.asyncio
+    async def test_commit_once_at_scope_end(self):
+        """Test that changes are committed when the outermost scope exits."""
+        update = create_mock_update(7002, "bea")
+        context = create_mock_context()
+
+        async with request_scope(update, context) as request:
+            user = await request.ensure_user()
+            user.balance = 1234
+            async with request_scope(update, context) as inner:
+                assert inner is request
+
+        async with get_session() as session:
+            stored = await UserRepository(session).get_by_telegram_id(7002)
+        assert stored.balance == 1234
+
+    @pytest.mark.asyncio
+    async def test_rollback_on_error(self):
+        """Test that a failing handler leaves no partial writes."""
+        update = create_mock_update(7003, "cris")
+        context = create_mock_context()
+
+        with pytest.raises(RuntimeError):
+            async with request_scope(update, context) as request:
+                await request.ensure_user()
+                raise RuntimeError("boom")
+
+        async with get_session() as session:
+            assert await UserRepository(session).get_by_telegram_id(7003) is None
+
+    @pytest.mark.asyncio
+    async def test_unregistered_user_not_admin(self):
+        """Test admin resolution for unknown users and super admins."""
+        update = create_mock_update(7004, "dani")
+
+        async with request_scope(update, create_mock_context()) as request:
+            assert await request.user() is None
+            assert await request.is_admin() is False
+
+        from src.config import settings
+        with patch.object(type(settings), "is_super_admin", lambda self, uid: uid == 7004):
+            async with request_scope(update, create_mock_context()) as request:
+                assert await request.is_admin() is True
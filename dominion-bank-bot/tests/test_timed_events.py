@@ -0,0 +1,176 @@
+"""
+Tests for the timed event engine.
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from telegram.ext import ApplicationBuilder
+from unittest.mock import MagicMock
+
+from src.database.connection import get_session
+from src.database.models import ContractStatus, Dungeon, DungeonType
+from src.database.repositories import ContractRepository, DungeonRepository
+from src.services.timed_events import DEFAULT_EVENTS, TimedEventEngine, TimedEventType
+
+from conftest import make_users, utc_now
+
+
+def make_engine(horizon: float = 86400) -> TimedEventEngine:
+    engine = TimedEventEngine(horizon=horizon)
+    for event_type in DEFAULT_EVENTS:
+        engine.register(event_type)
+    return engine
+
+
+class TestHeap:
+    """Test scheduling and firing without the database."""
+
+    @pytest.mark.asyncio
+    async def test_fires_in_order_and_batches_per_kind(self):
+        """Test that only due entries fire, grouped per kind."""
+        calls = []
+
+        async def handler(keys):
+            calls.append(sorted(keys))
+
+        engine = TimedEventEngine(horizon=3600)
+        engine.register(TimedEventType("demo", Dungeon, "expires_at", handler))
+        t = utc_now()
+        engine.schedule("demo", 1, t + timedelta(seconds=10))
+        engine.schedule("demo", 2, t - timedelta(seconds=1))
+        engine.schedule("demo", 3, t - timedelta(seconds=2))
+
+        assert await engine.run_due(t) == {"demo": 2}
+        assert calls == [[2, 3]]
+        assert engine.next_due() == t + timedelta(seconds=10)
+
+    @pytest.mark.asyncio
+    async def test_reschedule_and_cancel(self):
+        """Test that moved and cancelled deadlines do not fire at the old time."""
+        calls = []
+
+        async def handler(keys):
+            calls.extend(keys)
+
+        engine = TimedEventEngine(horizon=3600)
+        engine.register(TimedEventType("demo", Dungeon, "expires_at", handler))
+        t = utc_now()
+        engine.schedule("demo", 1, t - timedelta(seconds=5))
+        engine.schedule("demo", 1, t + timedelta(seconds=60))
+        engine.schedule("demo", 2, t - timedelta(seconds=5))
+        engine.cancel("demo", 2)
+
+        await engine.run_due(t)
+        assert calls == []
+        assert len(engine) == 1
+
+    def test_timer_armed_for_earliest(self):
+        """Test that one job is kept pointing at the head of the heap."""
+        engine = make_engine()
+        job_queue = MagicMock()
+        engine._job_queue = job_queue
+        t = utc_now()
+
+        engine.schedule("dungeon", 1, t + timedelta(seconds=30))
+        engine.schedule("dungeon", 2, t + timedelta(seconds=60))
+        engine.schedule("dungeon", 3, t + timedelta(seconds=10))
+
+        whens = [c.kwargs["when"] for c in job_queue.run_once.call_args_list]
+        assert whens == [t + timedelta(seconds=30), t + timedelta(seconds=10)]
+
+
+class TestDatabaseEvents:
+    """Test loading, ORM flush hooks and the default handlers."""
+
+    @pytest.mark.asyncio
+    async def test_flush_schedules_and_handler_releases(self):
+        """Test that a new dungeon row is scheduled and released at expiry."""
+        jailer, prisoner = await make_users(9401, 9402)
+        engine = make_engine()
+        await engine.start()
+        try:
+            async with get_session() as session:
+                dungeon = await DungeonRepository(session).lock(
+                    prisoner.id, jailer.id, DungeonType.CALABOZO, hours=1
+                )
+                assert len(engine) == 1
+                assert await engine.run_due() == {}
+
+                # Moving the deadline reschedules it
+                dungeon.expires_at = utc_now() - timedelta(seconds=1)
+
+            fired = await engine.run_due()
+        finally:
+            engine.stop()
+
+        assert fired == {"dungeon": 1}
+        async with get_session() as session:
+            assert await session.get(Dungeon, prisoner.id) is None
+
+    @pytest.mark.asyncio
+    async def test_load_and_contract_expiry(self):
+        """Test startup loading with the horizon and contract expiry."""
+        dom, sub, other = await make_users(9403, 9404, 9405)
+        async with get_session() as session:
+            repo = ContractRepository(session)
+            due = await repo.create(dom.id, sub.id, "t", ends_at=utc_now() - timedelta(minutes=1))
+            later = await repo.create(dom.id, other.id, "t", ends_at=utc_now() + timedelta(days=30))
+
+        engine = make_engine(horizon=3600)
+        # The overdue contract's expiry and its (skipped) reminder
+        assert await engine.load() == 2
+        await engine.run_due()
+
+        async with get_session() as session:
+            repo = ContractRepository(session)
+            assert (await repo.get_by_id(due.id)).status == ContractStatus.EXPIRED
+            assert (await repo.get_by_id(later.id)).status == ContractStatus.ACTIVE
+
+    @pytest.mark.asyncio
+    async def test_broken_contract_cancelled(self):
+        """Test that a contract leaving ACTIVE drops its deadline."""
+        dom, sub = await make_users(9406, 9407)
+        engine = make_engine()
+        await engine.start()
+        try:
+            async with get_session() as session:
+                repo = ContractRepository(session)
+                contract = await repo.create(dom.id, sub.id, "t", ends_at=utc_now() + timedelta(hours=1))
+                # Expiry and reminder
+                assert len(engine) == 2
+                await repo.break_contract(contract.id, dom.id)
+            assert len(engine) == 0
+        finally:
+            engine.stop()
+
+
+class TestJobQueue:
+    """Test arming through a real PTB JobQueue."""
+
+    @pytest.mark.asyncio
+    async def test_overdue_deadline_fires_and_unblocks_later_ones(self):
+        """Test that a deadline already past when armed still fires, then the next one."""
+        fired = []
+
+        async def handler(keys):
+            fired.extend(keys)
+
+        application = ApplicationBuilder().token("123:test").build()
+        job_queue = application.job_queue
+        engine = TimedEventEngine(horizon=3600)
+        engine.register(TimedEventType("demo", Dungeon, "expires_at", handler, key="user_id"))
+        await job_queue.start()
+        try:
+            await engine.start(job_queue)
+            engine.schedule("demo", 1, utc_now() - timedelta(minutes=5))
+            engine.schedule("demo", 2, utc_now() + timedelta(milliseconds=300))
+            for _ in range(40):
+                if len(fired) == 2:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            engine.stop()
+            await job_queue.stop()
+
+        assert fired == [1, 2]
@@ -0,0 +1,210 @@
+"""
+Tests for the per-user ordered update processor.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from telegram import Chat, Message, Update, User
+
+from src.bot.update_processor import PerUserUpdateProcessor
+
+
+def make_update(update_id: int, user_id: int, chat_id: int, text: str = "x") -> Update:
+    """Build a text message update from a user in a chat."""
+    user = User(id=user_id, is_bot=False, first_name=f"U{user_id}")
+    chat = Chat(id=chat_id, type="group")
+    message = Message(message_id=update_id, date=None, chat=chat, from_user=user, text=text)
+    return Update(update_id=update_id, message=message)
+
+
+class TestPerUserUpdateProcessor:
+    """Test ordering and parallelism of update processing."""
+
+    @pytest.mark.asyncio
+    async def test_same_user_is_serialized_in_order(self):
+        """Test that updates with the same key never overlap and keep order."""
+        processor = PerUserUpdateProcessor(8)
+        order = []
+        running = 0
+
+        async def handle(label, delay):
+            nonlocal running
+            running += 1
+            assert running == 1
+            await asyncio.sleep(delay)
+            order.append(label)
+            running -= 1
+
+        tasks = [
+            asyncio.create_task(processor.process_update(make_update(i, 1, 10), handle(i, d)))
+            for i, d in enumerate([0.03, 0.0, 0.01])
+        ]
+        await asyncio.gather(*tasks)
+
+        assert order == [0, 1, 2]
+        assert processor.active_keys == 0
+
+    @pytest.mark.asyncio
+    async def test_different_users_run_in_parallel(self):
+        """Test that a slow update does not block another user."""
+        processor = PerUserUpdateProcessor(8)
+        gate = asyncio.Event()
+        done = []
+
+        async def slow():
+            await gate.wait()
+            done.append("slow")
+
+        async def fast():
+            done.append("fast")
+
+        slow_task = asyncio.create_task(processor.process_update(make_update(1, 1, 10), slow()))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(processor.process_update(make_update(2, 2, 10), fast()), timeout=1)
+
+        assert done == ["fast"]
+        gate.set()
+        await slow_task
+
+    @pytest.mark.asyncio
+    async def test_backlog_does_not_take_all_slots(self):
+        """Test that one user's queued updates leave slots for other users."""
+        processor = PerUserUpdateProcessor(2)
+        gate = asyncio.Event()
+
+        async def blocked():
+            await gate.wait()
+
+        async def quick():
+            return None
+
+        spam = [
+            asyncio.create_task(processor.process_update(make_update(i, 1, 10), blocked()))
+            for i in range(5)
+        ]
+        await asyncio.sleep(0)
+        await asyncio.wait_for(processor.process_update(make_update(9, 2, 10), quick()), timeout=1)
+
+        gate.set()
+        await asyncio.gather(*spam)
+
+    @pytest.mark.asyncio
+    async def test_same_user_other_chat_is_independent(self):
+        """Test that keys include the chat, not just the user."""
+        processor = PerUserUpdateProcessor(8)
+        assert processor.key_for(make_update(1, 1, 10)) != processor.key_for(make_update(2, 1, 11))
+        assert processor.key_for(object()) is None
+
+
+class TestUpdateLanes:
+    """Test lane classification, isolation and load shedding."""
+
+    def test_classification(self):
+        """Test that commands are routed to the expected lanes."""
+        from src.bot.update_processor import classify_update
+
+        assert classify_update(make_update(1, 1, 1, "/dar @ana 10")) == "economy"
+        assert classify_update(make_update(1, 1, 1, "/ruleta@PhantomBot")) == "ai"
+        assert classify_update(make_update(1, 1, 1, "/quitar @ana 5")) == "admin"
+        assert classify_update(make_update(1, 1, 1, "/ranking")) == "info"
+        assert classify_update(make_update(1, 1, 1, "hola")) == "economy"
+        assert classify_update(make_update(1, 1, 1, "/")) == "economy"
+
+    @pytest.mark.asyncio
+    async def test_economy_not_blocked_by_busy_ai_lane(self):
+        """Test that a full AI lane leaves money commands unaffected."""
+        processor = PerUserUpdateProcessor(
+            4, lane_limits={"economy": 2, "ai": 1}, shed_queue_depth=100
+        )
+        gate = asyncio.Event()
+
+        async def generate():
+            await gate.wait()
+
+        async def transfer():
+            return None
+
+        ai_tasks = [
+            asyncio.create_task(
+                processor.process_update(make_update(i, i, 10, "/escena"), generate())
+            )
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        assert processor.stats()["ai"]["waiting"] == 2
+
+        await asyncio.wait_for(
+            processor.process_update(make_update(9, 9, 10, "/dar @ana 5"), transfer()),
+            timeout=1,
+        )
+        assert processor.stats()["economy"]["processed"] == 1
+
+        gate.set()
+        await asyncio.gather(*ai_tasks)
+
+    @pytest.mark.asyncio
+    async def test_ai_commands_shed_under_load(self):
+        """Test that excess AI commands get a fallback reply without running."""
+        processor = PerUserUpdateProcessor(
+            4, lane_limits={"economy": 2, "ai": 1}, shed_queue_depth=1
+        )
+        gate = asyncio.Event()
+
+        async def generate():
+            await gate.wait()
+
+        running = asyncio.create_task(
+            processor.process_update(make_update(1, 1, 10, "/escena"), generate())
+        )
+        queued = asyncio.create_task(
+            processor.process_update(make_update(2, 2, 10, "/escena"), generate())
+        )
+        await asyncio.sleep(0)
+
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        shed_update = make_update(3, 3, 10, "/tarea")
+        shed_update.message.set_bot(bot)
+        handler = AsyncMock()
+
+        await processor.process_update(shed_update, handler())
+
+        handler.assert_not_awaited()
+        bot.send_message.assert_awaited_once()
+        assert bot.send_message.call_args.kwargs["text"]
+        assert processor.stats()["ai"]["shed"] == 1
+
+        gate.set()
+        await asyncio.gather(running, queued)
+
+    @pytest.mark.asyncio
+    async def test_own_backlog_does_not_shed_others(self):
+        """Test that updates queued behind their user's lock do not count as lane load."""
+        processor = PerUserUpdateProcessor(
+            4, lane_limits={"economy": 2, "ai": 1}, shed_queue_depth=1
+        )
+        gate = asyncio.Event()
+
+        async def generate():
+            await gate.wait()
+
+        backlog = [
+            asyncio.create_task(
+                processor.process_update(make_update(i, 1, 10, "/escena"), generate())
+            )
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        assert processor.stats()["ai"]["waiting"] == 0
+
+        other = asyncio.create_task(
+            processor.process_update(make_update(9, 2, 10, "/escena"), generate())
+        )
+        await asyncio.sleep(0)
+        assert processor.stats()["ai"]["waiting"] == 1
+
+        gate.set()
+        await asyncio.gather(*backlog, other)
+        assert processor.stats()["ai"]["shed"] == 0
+        assert processor.stats()["ai"]["processed"] == 4
@@ -0,0 +1,100 @@
+"""
+Tests for the normalized username column and its migration.
+"""
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.connection import get_session
+from src.database.migrations import run_migrations
+from src.database.repositories import UserRepository
+
+
+class TestUsernameNormalized:
+    """Test that the column follows username writes and backs lookups."""
+
+    @pytest.mark.asyncio
+    async def test_synced_on_insert_and_update(self):
+        """Test the column on create and on a username change."""
+        async with get_session() as session:
+            repo = UserRepository(session)
+            user, _ = await repo.get_or_create(telegram_id=9101, username="@Ana_X")
+            assert user.username_normalized == "ana_x"
+
+            await repo.get_or_create(telegram_id=9101, username="AnaY")
+            assert user.username_normalized == "anay"
+            assert await repo.get_by_username("ana_x") is None
+            assert (await repo.get_by_username("@ANAY")).id == user.id
+
+    @pytest.mark.asyncio
+    async def test_new_user_claims_placeholder(self):
+        """Test that /start by an imported username takes over the placeholder."""
+        async with get_session() as session:
+            repo = UserRepository(session)
+            placeholder = await repo.create_placeholder(username="Bea", balance=500)
+            assert placeholder.username_normalized == "bea"
+
+            user, created = await repo.get_or_create(telegram_id=9102, username="bea")
+
+            assert created is True
+            assert user.id == placeholder.id
+            assert user.telegram_id == 9102
+            assert user.balance == 500
+
+    @pytest.mark.asyncio
+    async def test_rename_to_placeholder_keeps_it(self, caplog):
+        """Test that a registered user renamed to a placeholder's username does not orphan it."""
+        async with get_session() as session:
+            repo = UserRepository(session)
+            user, _ = await repo.get_or_create(telegram_id=9212, username="Cleo")
+            placeholder = await repo.create_placeholder(username="Dana", balance=500)
+
+            with caplog.at_level(logging.WARNING):
+                renamed, created = await repo.get_or_create(telegram_id=9212, username="Dana")
+
+            assert renamed.id == user.id and not created
+            assert renamed.username == "Cleo"
+            assert (await repo.get_by_username("dana")).id == placeholder.id
+            assert placeholder.balance == 500
+            assert f"placeholder id {placeholder.id}" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_stale_holder_loses_username(self):
+        """Test that a username that changed hands is freed from the old owner."""
+        async with get_session() as session:
+            repo = UserRepository(session)
+            old, _ = await repo.get_or_create(telegram_id=9103, username="cris")
+            new, _ = await repo.get_or_create(telegram_id=9104, username="Cris")
+
+            assert old.username is None
+            assert old.username_normalized is None
+            assert (await repo.get_by_username("cris")).id == new.id
+
+
+class TestUsernameMigration:
+    """Test the backfill on a database created before the column existed."""
+
+    @pytest.mark.asyncio
+    async def test_backfill_and_duplicates(self):
+        """Test backfill, duplicate resolution and idempotency."""
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, telegram_id BIGINT, username VARCHAR(255))"
+            ))
+            await conn.execute(text(
+                "INSERT INTO users (id, telegram_id, username) VALUES "
+                "(1, 0, 'Dani'), (2, 555, '@dani'), (3, 556, 'Eva'), (4, 557, NULL)"
+            ))
+
+            assert "001_username_normalized" in await run_migrations(conn)
+            assert await run_migrations(conn) == []
+
+            rows = dict((await conn.execute(
+                text("SELECT id, username_normalized FROM users")
+            )).all())
+        await engine.dispose()
+
+        assert rows == {1: None, 2: "dani", 3: "eva", 4: None}
@@ -0,0 +1,138 @@
+"""
+Tests for the webhook ASGI app and shutdown drain.
+"""
+import asyncio
+import json
+import pytest
+
+from telegram.ext import Application
+
+from src.bot.webhook import WebhookApp, drain_updates
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 10,
+        "date": 0,
+        "chat": {"id": 5, "type": "private"},
+        "from": {"id": 5, "is_bot": False, "first_name": "Ana"},
+        "text": "/ver",
+    },
+}
+
+
+def make_application() -> Application:
+    """Build an application without an Updater, as webhook mode does."""
+    return Application.builder().token("123:TEST").updater(None).build()
+
+
+async def call(app, method="POST", path="/telegram", body=b"", headers=None):
+    """Invoke the ASGI app and return (status, decoded JSON body)."""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": headers or [],
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+class TestWebhookApp:
+    """Test request handling of the webhook endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_valid_update_is_queued(self):
+        """Test that an authenticated update is put on the update queue."""
+        application = make_application()
+        app = WebhookApp(application, secret_token="s3cret")
+
+        status, _ = await call(
+            app,
+            body=json.dumps(UPDATE).encode(),
+            headers=[(b"x-telegram-bot-api-secret-token", b"s3cret")],
+        )
+
+        assert status == 200
+        update = application.update_queue.get_nowait()
+        assert update.update_id == 1
+        assert update.message.text == "/ver"
+
+    @pytest.mark.asyncio
+    async def test_wrong_secret_rejected(self):
+        """Test that a missing or wrong secret token is refused."""
+        application = make_application()
+        app = WebhookApp(application, secret_token="s3cret")
+
+        status, _ = await call(app, body=json.dumps(UPDATE).encode())
+        assert status == 403
+        status, _ = await call(
+            app,
+            body=json.dumps(UPDATE).encode(),
+            headers=[(b"x-telegram-bot-api-secret-token", b"nope")],
+        )
+        assert status == 403
+        assert application.update_queue.empty()
+
+    @pytest.mark.asyncio
+    async def test_invalid_body_and_routes(self):
+        """Test bad payloads, unknown paths and the health endpoint."""
+        app = WebhookApp(make_application())
+
+        assert (await call(app, body=b"not json"))[0] == 400
+        assert (await call(app, path="/other"))[0] == 404
+        assert (await call(app, method="GET"))[0] == 405
+
+        status, payload = await call(app, method="GET", path="/health")
+        assert status == 200
+        assert payload["status"] == "ok"
+
+    @pytest.mark.asyncio
+    async def test_draining_refuses_new_updates(self):
+        """Test that updates are refused with 503 once draining starts."""
+        application = make_application()
+        app = WebhookApp(application)
+        app.accepting = False
+
+        status, _ = await call(app, body=json.dumps(UPDATE).encode())
+        assert status == 503
+        assert application.update_queue.empty()
+
+
+class TestDrainUpdates:
+    """Test waiting for queued updates on shutdown."""
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_processing(self):
+        """Test that draining returns once all updates are marked done."""
+        application = make_application()
+        queue = application.update_queue
+        await queue.put("a")
+
+        async def consume():
+            await asyncio.sleep(0.01)
+            queue.get_nowait()
+            queue.task_done()
+
+        task = asyncio.create_task(consume())
+        assert await drain_updates(application, timeout=1) is True
+        await task
+
+    @pytest.mark.asyncio
+    async def test_drain_timeout_drops_queued(self):
+        """Test that unstarted updates are dropped when the drain times out."""
+        application = make_application()
+        await application.update_queue.put("a")
+        await application.update_queue.put("b")
+
+        assert await drain_updates(application, timeout=0.01) is False
+        assert application.update_queue.empty()